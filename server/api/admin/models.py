@@ -36,6 +36,31 @@ class CreateMealRequest(BaseModel):
     max_orders: int = Field(50, ge=1, description="最大订餐数量")
 
 
+class BulkMealTemplate(BaseModel):
+    """批量发布餐次模板（一个时段）"""
+    slot: str = Field(..., description="时段 (lunch/dinner)")
+    description: str = Field(..., min_length=1, description="餐次描述")
+    base_price_cents: int = Field(..., ge=0, description="基础价格（分）")
+    addon_config: Optional[Dict[str, int]] = Field(default_factory=dict, description="附加项配置")
+    max_orders: int = Field(50, ge=1, description="最大订餐数量")
+    weekdays: Optional[List[int]] = Field(None, description="适用星期 (1=周一 ... 7=周日)，默认每天")
+
+
+class BulkPublishMealsRequest(BaseModel):
+    """批量发布餐次请求模型（日期范围 × 时段模板）"""
+    start_date: str = Field(..., description="开始日期 (YYYY-MM-DD)")
+    end_date: str = Field(..., description="结束日期 (YYYY-MM-DD)")
+    templates: List[BulkMealTemplate] = Field(..., min_length=1, description="时段模板")
+    skip_dates: List[str] = Field(default_factory=list, description="跳过的日期（如节假日）")
+    dry_run: bool = Field(False, description="只返回发布计划和冲突报告，不写入")
+    skip_conflicts: bool = Field(False, description="跳过已存在有效餐次的时段，否则有冲突时整批失败")
+
+class BulkCompleteMealsRequest(BaseModel):
+    """批量完成餐次请求模型"""
+    before_date: Optional[str] = Field(None, description="完成该日期之前的所有已发布/已锁定餐次 (YYYY-MM-DD)")
+    meal_ids: Optional[List[int]] = Field(None, description="完成指定的餐次")
+    batch_size: int = Field(100, ge=1, le=500, description="每个事务处理的餐次数")
+
 
 class MealInfo(BaseModel):
     """餐次信息模型"""
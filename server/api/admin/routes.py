@@ -1,26 +1,46 @@
 # 参考文档: doc/api.md 管理员模块
 # 管理员相关API路由
 
+import asyncio
 import logging
-from typing import Dict, Any, Optional
-from fastapi import APIRouter, HTTPException, Depends, Query, Path, Response, Body
+import threading
+from contextlib import aclosing
+from datetime import date, timedelta
+from typing import Callable, Dict, Any, Iterator, List, Optional
+from fastapi import APIRouter, HTTPException, Depends, Query, Path, Body, Header
+from fastapi.responses import StreamingResponse
 
 from .models import (
-    CreateAddonRequest, AddonInfo, CreateMealRequest, MealInfo,
+    CreateAddonRequest, AddonInfo, CreateMealRequest, BulkPublishMealsRequest, BulkCompleteMealsRequest, MealInfo,
     AdjustBalanceRequest, SetUserAdminRequest, SetUserStatusRequest,
     CancelMealRequest, UserListItem
 )
 from api.auth.routes import get_admin_user, get_database
 from api.auth.models import TokenData
-from db.manager import DatabaseManager
+from db.manager import DatabaseManager, run_grouped_write
+from db.idempotency import (
+    find_idempotent_result, idempotency_request_hash, run_idempotent, validate_idempotency_key
+)
 from db.core_operations import CoreOperations
+from db.reconciliation import DEFAULT_CHUNK_SIZE, reconcile_ledger, reset_reconciliation
+from db.analytics import AnalyticsEngine, AnalyticsUnavailableError
+from db.archive import get_archive_totals
+from db.export import (
+    EXPORT_MEDIA_TYPES, build_ledger_export_query, build_orders_export_query,
+    export_file_name, is_xlsx_available, iter_export
+)
 from db.query_operations import QueryOperations
-from db.supporting_operations import SupportingOperations
-from utils.response import create_success_response, create_error_response
+from db.supporting_operations import SupportingOperations, USER_FIELD_COLUMNS
+from utils.fields import parse_fields
+from utils.seat_reservation import get_seat_manager
+from db.meal_events import record_meal_event
+from utils.response import create_success_response, create_error_response, dumps
 
 logger = logging.getLogger(__name__)
 router = APIRouter(prefix="/api/admin", tags=["管理员"])
 
+MAX_BULK_PUBLISH_DAYS = 62  # 批量发布的最大日期范围（天）
+
 
 # ===== 附加项管理 =====
 
@@ -174,7 +194,6 @@ async def get_addons_list(
 @router.post("/meals", response_model=Dict[str, Any])
 async def publish_meal(
     meal_request: CreateMealRequest,
-    response: Response,
     current_admin: TokenData = Depends(get_admin_user),
     db: DatabaseManager = Depends(get_database)
 ):
@@ -210,11 +229,8 @@ async def publish_meal(
         if not meal_result.get("success", True):
             return create_error_response(meal_result.get("message", "餐次发布失败"))
         
-        # 设置正确的HTTP状态码
-        if meal_result.get("is_new_meal", True):
-            response.status_code = 201  # Created - new meal
-        else:
-            response.status_code = 200  # OK - reused/updated existing meal
+        # 重用已取消餐次时订单数被重置，丢弃本进程的座位缓存
+        get_seat_manager().invalidate(meal_result["meal_id"])
         
         # 转换附加项配置格式（整数键转字符串键）
         formatted_addon_config = {}
@@ -233,9 +249,11 @@ async def publish_meal(
             "created_at": meal_result["created_at"]
         }
         
+        # 设置正确的HTTP状态码：新建餐次返回201，重用已取消餐次返回200
         return create_success_response(
             data=response_data,
-            message=meal_result.get("message", f"{meal_result['date']} {meal_result['slot']} 餐次发布成功")
+            message=meal_result.get("message", f"{meal_result['date']} {meal_result['slot']} 餐次发布成功"),
+            status_code=201 if meal_result.get("is_new_meal", True) else 200
         )
         
     except Exception as e:
@@ -244,6 +262,196 @@ async def publish_meal(
 
 
 
+def expand_meal_templates(request: BulkPublishMealsRequest) -> List[Dict[str, Any]]:
+    """
+    将日期范围 × 时段模板展开为餐次列表
+    
+    Raises:
+        ValueError: 日期格式错误、范围过大或附加项ID无效
+    """
+    try:
+        start = date.fromisoformat(request.start_date)
+        end = date.fromisoformat(request.end_date)
+        skip_dates = {date.fromisoformat(d) for d in request.skip_dates}
+    except ValueError:
+        raise ValueError("日期格式错误，应为 YYYY-MM-DD")
+    
+    if end < start:
+        raise ValueError("结束日期不能早于开始日期")
+    if (end - start).days + 1 > MAX_BULK_PUBLISH_DAYS:
+        raise ValueError(f"批量发布的日期范围不能超过 {MAX_BULK_PUBLISH_DAYS} 天")
+    
+    templates = []
+    for template in request.templates:
+        try:
+            addon_config = {int(k): v for k, v in (template.addon_config or {}).items()}
+        except ValueError:
+            raise ValueError(f"无效的附加项ID: {list(template.addon_config.keys())}")
+        weekdays = set(template.weekdays) if template.weekdays else None
+        templates.append((template, addon_config, weekdays))
+    
+    meals = []
+    day = start
+    while day <= end:
+        if day not in skip_dates:
+            for template, addon_config, weekdays in templates:
+                if weekdays is None or day.isoweekday() in weekdays:
+                    meals.append({
+                        'date': day.isoformat(),
+                        'slot': template.slot,
+                        'description': template.description,
+                        'base_price_cents': template.base_price_cents,
+                        'addon_config': addon_config,
+                        'max_orders': template.max_orders
+                    })
+        day += timedelta(days=1)
+    return meals
+
+
+@router.post("/meals/bulk", response_model=Dict[str, Any])
+async def publish_meals_bulk(
+    bulk_request: BulkPublishMealsRequest,
+    current_admin: TokenData = Depends(get_admin_user),
+    db: DatabaseManager = Depends(get_database)
+):
+    """
+    按周/月模板批量发布餐次（一个事务）
+    
+    dry_run=true 时只返回发布计划和冲突报告
+    """
+    try:
+        meals = expand_meal_templates(bulk_request)
+        
+        core_ops = CoreOperations(db)
+        bulk_result = core_ops.admin_publish_meals_bulk(
+            admin_user_id=current_admin.user_id,
+            meals=meals,
+            dry_run=bulk_request.dry_run,
+            skip_conflicts=bulk_request.skip_conflicts
+        )
+        
+        if not bulk_request.dry_run:
+            # 重用已取消餐次时订单数被重置，丢弃本进程的座位缓存
+            seat_manager = get_seat_manager()
+            for item in bulk_result["published"]:
+                if not item["is_new_meal"]:
+                    seat_manager.invalidate(item["meal_id"])
+        
+        response_data = {
+            "dry_run": bulk_result["dry_run"],
+            "published": bulk_result["published"],
+            "conflicts": bulk_result["conflicts"],
+            "created_count": bulk_result["created_count"],
+            "reused_count": bulk_result["reused_count"]
+        }
+        
+        return create_success_response(
+            data=response_data,
+            message=bulk_result["message"],
+            status_code=200 if bulk_request.dry_run else 201
+        )
+        
+    except Exception as e:
+        logger.error(f"批量发布餐次失败: {str(e)}")
+        return create_error_response(f"批量发布餐次失败: {str(e)}")
+
+
+async def _stream_on_own_connection(db_path: str, make_items: Callable[[DatabaseManager], Iterator[Any]]):
+    """
+    在独立数据库连接上逐项执行同步生成器，每项在线程中生成（不阻塞事件循环）
+
+    请求的 get_database 连接随依赖清理关闭，较新的 FastAPI 在流式响应开始前就会清理，
+    因此流式生成使用自己的连接；客户端断开时等线程中的当前一项生成完再关闭连接
+
+    Args:
+        db_path: 数据库文件路径
+        make_items: 接收独立连接的生成器函数
+    """
+    stream_db = DatabaseManager(db_path, auto_connect=True)
+    db_lock = threading.Lock()
+    items = make_items(stream_db)
+
+    def next_item():
+        with db_lock:
+            return next(items, None)
+
+    try:
+        while True:
+            item = await asyncio.to_thread(next_item)
+            if item is None:
+                break
+            yield item
+    finally:
+        with db_lock:
+            if hasattr(items, "close"):
+                items.close()
+            stream_db.close()
+
+
+@router.post("/meals/complete")
+async def complete_meals_bulk(
+    complete_request: BulkCompleteMealsRequest,
+    current_admin: TokenData = Depends(get_admin_user),
+    db: DatabaseManager = Depends(get_database)
+):
+    """
+    批量完成餐次（如"完成今天之前的所有餐次"）
+    
+    按 batch_size 分批，每批一个事务；以 NDJSON 流式返回每批的餐次汇总（订单数、金额），
+    最后一行为总计，不返回逐个订单
+    
+    参考文档: doc/api.md - 5.2.3.1 批量完成餐次
+    """
+    try:
+        if not complete_request.before_date and not complete_request.meal_ids:
+            return create_error_response("请指定 before_date 或 meal_ids")
+        if complete_request.before_date:
+            date.fromisoformat(complete_request.before_date)
+        
+        core_ops = CoreOperations(db)
+        meal_ids = core_ops.list_completable_meals(complete_request.before_date, complete_request.meal_ids)
+    except Exception as e:
+        logger.error(f"批量完成餐次失败: {str(e)}")
+        return create_error_response(f"批量完成餐次失败: {str(e)}")
+    
+    batch_size = complete_request.batch_size
+    
+    def complete_batches(stream_db: DatabaseManager):
+        stream_ops = CoreOperations(stream_db)
+        for start in range(0, len(meal_ids), batch_size):
+            yield stream_ops.admin_complete_meals_batch(current_admin.user_id, meal_ids[start:start + batch_size])
+    
+    async def summary_stream():
+        totals = {"type": "summary", "batches": 0, "meals_completed": 0, "orders_completed": 0, "amount_cents": 0}
+        try:
+            async with aclosing(_stream_on_own_connection(db.db_path, complete_batches)) as batches:
+                async for batch_result in batches:
+                    seat_manager = get_seat_manager()
+                    for meal in batch_result["meals"]:
+                        seat_manager.invalidate(meal["meal_id"])
+                    
+                    totals["batches"] += 1
+                    totals["meals_completed"] += len(batch_result["meals"])
+                    totals["orders_completed"] += batch_result["orders_completed"]
+                    totals["amount_cents"] += batch_result["amount_cents"]
+                    yield dumps({
+                        "type": "batch",
+                        "batch": totals["batches"],
+                        "meals": batch_result["meals"],
+                        "orders_completed": batch_result["orders_completed"],
+                        "amount_cents": batch_result["amount_cents"]
+                    }) + b"\n"
+        except Exception as e:
+            # 已提交的批次保持完成状态，客户端可重试剩余部分
+            logger.error(f"批量完成餐次失败: {str(e)}")
+            yield dumps({"type": "error", "message": f"批量完成餐次失败: {str(e)}"}) + b"\n"
+        
+        totals["amount_yuan"] = totals["amount_cents"] / 100.0
+        yield dumps(totals) + b"\n"
+    
+    return StreamingResponse(summary_stream(), media_type="application/x-ndjson")
+
+
 @router.put("/meals/{meal_id}/lock", response_model=Dict[str, Any])
 async def lock_meal(
     meal_id: int = Path(..., description="餐次ID"),
@@ -267,6 +475,8 @@ async def lock_meal(
         if not lock_result.get("success", True):
             return create_error_response(lock_result.get("message", "餐次锁定失败"))
         
+        get_seat_manager().invalidate(meal_id)
+        
         response_data = {
             "meal_id": lock_result["meal_id"],
             "meal_date": lock_result["meal_date"],
@@ -306,6 +516,9 @@ async def unlock_meal(
         cursor = db.conn.execute(update_query, [meal_id])
         if cursor.rowcount == 0:
             return create_error_response("餐次不存在或状态不允许取消锁定")
+        record_meal_event(db, meal_id, 'unlock')
+        db.conn.commit()
+        get_seat_manager().invalidate(meal_id)
         
         # 获取更新后的餐次信息
         meal_query = """
@@ -357,6 +570,8 @@ async def complete_meal(
         if not complete_result.get("success", True):
             return create_error_response(complete_result.get("message", "餐次完成失败"))
         
+        get_seat_manager().invalidate(meal_id)
+        
         response_data = {
             "meal_id": complete_result["meal_id"],
             "meal_date": complete_result["meal_date"],
@@ -400,6 +615,8 @@ async def cancel_meal(
         if not cancel_result.get("success", True):
             return create_error_response(cancel_result.get("message", "餐次取消失败"))
         
+        get_seat_manager().invalidate(meal_id)
+        
         response_data = {
             "meal_id": cancel_result["meal_id"],
             "original_status": cancel_result.get("original_status"),
@@ -514,6 +731,7 @@ async def get_users_list(
     is_admin: Optional[bool] = Query(None, description="管理员筛选"),
     offset: int = Query(0, ge=0, description="偏移量"),
     limit: int = Query(20, ge=1, le=100, description="每页条数"),
+    fields: Optional[str] = Query(None, description="返回字段，逗号分隔，如 user_id,wechat_name,balance_yuan"),
     current_admin: TokenData = Depends(get_admin_user),
     db: DatabaseManager = Depends(get_database)
 ):
@@ -530,7 +748,8 @@ async def get_users_list(
             status=status,
             is_admin=is_admin,
             offset=offset,
-            limit=limit
+            limit=limit,
+            fields=parse_fields(fields, USER_FIELD_COLUMNS)
         )
         
         if not users_result["success"]:
@@ -550,6 +769,7 @@ async def get_users_list(
 async def adjust_user_balance(
     user_id: int = Path(..., description="用户ID"),
     balance_request: AdjustBalanceRequest = None,
+    idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key"),
     current_admin: TokenData = Depends(get_admin_user),
     db: DatabaseManager = Depends(get_database)
 ):
@@ -559,15 +779,28 @@ async def adjust_user_balance(
     参考文档: doc/api.md - 5.3.2 调整用户余额
     """
     try:
-        core_ops = CoreOperations(db)
-        
-        # 调整用户余额
-        adjust_result = core_ops.admin_adjust_balance(
-            admin_user_id=current_admin.user_id,
-            target_user_id=user_id,
-            amount_cents=balance_request.amount_cents,
-            reason=balance_request.reason
+        idempotency_key = validate_idempotency_key(idempotency_key)
+        request_hash = idempotency_request_hash(
+            "adjust_balance", user_id, balance_request.amount_cents, balance_request.reason
         )
+        adjust_result = None
+        if idempotency_key:
+            adjust_result = find_idempotent_result(db.conn, current_admin.user_id, idempotency_key, request_hash)
+        
+        if adjust_result is None:
+            # 调整用户余额
+            adjust_result, _ = await run_grouped_write(
+                db,
+                lambda writer: run_idempotent(
+                    writer, current_admin.user_id, idempotency_key, request_hash,
+                    lambda: CoreOperations(writer).admin_adjust_balance(
+                        admin_user_id=current_admin.user_id,
+                        target_user_id=user_id,
+                        amount_cents=balance_request.amount_cents,
+                        reason=balance_request.reason
+                    )
+                )
+            )
         
         if not adjust_result.get("success", True):
             return create_error_response(adjust_result.get("message", "余额调整失败"))
@@ -597,6 +830,7 @@ async def adjust_user_balance(
 async def recharge_user(
     user_id: int = Path(..., description="用户ID"),
     recharge_request: AdjustBalanceRequest = None,
+    idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key"),
     current_admin: TokenData = Depends(get_admin_user),
     db: DatabaseManager = Depends(get_database)
 ):
@@ -609,15 +843,28 @@ async def recharge_user(
         if recharge_request.amount_cents <= 0:
             return create_error_response("充值金额必须大于0")
             
-        core_ops = CoreOperations(db)
-        
-        # 执行充值操作（使用正数金额）
-        recharge_result = core_ops.admin_adjust_balance(
-            admin_user_id=current_admin.user_id,
-            target_user_id=user_id,
-            amount_cents=abs(recharge_request.amount_cents),  # 确保为正数
-            reason=recharge_request.reason or "管理员充值"
+        idempotency_key = validate_idempotency_key(idempotency_key)
+        request_hash = idempotency_request_hash(
+            "recharge", user_id, abs(recharge_request.amount_cents), recharge_request.reason or "管理员充值"
         )
+        recharge_result = None
+        if idempotency_key:
+            recharge_result = find_idempotent_result(db.conn, current_admin.user_id, idempotency_key, request_hash)
+        
+        if recharge_result is None:
+            # 执行充值操作（使用正数金额）
+            recharge_result, _ = await run_grouped_write(
+                db,
+                lambda writer: run_idempotent(
+                    writer, current_admin.user_id, idempotency_key, request_hash,
+                    lambda: CoreOperations(writer).admin_adjust_balance(
+                        admin_user_id=current_admin.user_id,
+                        target_user_id=user_id,
+                        amount_cents=abs(recharge_request.amount_cents),  # 确保为正数
+                        reason=recharge_request.reason or "管理员充值"
+                    )
+                )
+            )
         
         if not recharge_result.get("success", True):
             return create_error_response(recharge_result.get("message", "充值失败"))
@@ -648,6 +895,7 @@ async def recharge_user(
 async def deduct_user(
     user_id: int = Path(..., description="用户ID"),
     deduct_request: AdjustBalanceRequest = None,
+    idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key"),
     current_admin: TokenData = Depends(get_admin_user),
     db: DatabaseManager = Depends(get_database)
 ):
@@ -660,15 +908,28 @@ async def deduct_user(
         if deduct_request.amount_cents <= 0:
             return create_error_response("扣款金额必须大于0")
             
-        core_ops = CoreOperations(db)
-        
-        # 执行扣款操作（使用负数金额）
-        deduct_result = core_ops.admin_adjust_balance(
-            admin_user_id=current_admin.user_id,
-            target_user_id=user_id,
-            amount_cents=-abs(deduct_request.amount_cents),  # 确保为负数
-            reason=deduct_request.reason or "管理员扣款"
+        idempotency_key = validate_idempotency_key(idempotency_key)
+        request_hash = idempotency_request_hash(
+            "deduct", user_id, -abs(deduct_request.amount_cents), deduct_request.reason or "管理员扣款"
         )
+        deduct_result = None
+        if idempotency_key:
+            deduct_result = find_idempotent_result(db.conn, current_admin.user_id, idempotency_key, request_hash)
+        
+        if deduct_result is None:
+            # 执行扣款操作（使用负数金额）
+            deduct_result, _ = await run_grouped_write(
+                db,
+                lambda writer: run_idempotent(
+                    writer, current_admin.user_id, idempotency_key, request_hash,
+                    lambda: CoreOperations(writer).admin_adjust_balance(
+                        admin_user_id=current_admin.user_id,
+                        target_user_id=user_id,
+                        amount_cents=-abs(deduct_request.amount_cents),  # 确保为负数
+                        reason=deduct_request.reason or "管理员扣款"
+                    )
+                )
+            )
         
         if not deduct_result.get("success", True):
             return create_error_response(deduct_result.get("message", "扣款失败"))
@@ -762,6 +1023,160 @@ async def set_user_status(
         return create_error_response(f"设置用户状态失败: {str(e)}")
 
 
+# ===== 账本对账 =====
+
+@router.post("/ledger/reconcile")
+async def reconcile_ledger_balances(
+    chunk_size: int = Query(DEFAULT_CHUNK_SIZE, ge=100, le=10000, description="每块核对的账本记录数"),
+    full: bool = Query(False, description="是否清空对账进度，从头核对全部账本"),
+    current_admin: TokenData = Depends(get_admin_user),
+    db: DatabaseManager = Depends(get_database)
+):
+    """
+    账本与余额增量对账
+    
+    只核对上次对账之后新增的账本记录，按块读取；以 NDJSON 流式返回不一致记录，最后一行为汇总
+    
+    参考文档: doc/api.md - 5.3.6 账本对账
+    """
+    try:
+        if full:
+            reset_reconciliation(db)
+    except Exception as e:
+        logger.error(f"账本对账失败: {str(e)}")
+        return create_error_response(f"账本对账失败: {str(e)}")
+    
+    async def report_stream():
+        try:
+            report = _stream_on_own_connection(
+                db.db_path, lambda stream_db: reconcile_ledger(stream_db, chunk_size=chunk_size)
+            )
+            async with aclosing(report) as items:
+                async for item in items:
+                    if item["type"] == "summary":
+                        logger.info(f"管理员 {current_admin.user_id} 执行账本对账: {item}")
+                    yield dumps(item) + b"\n"
+        except Exception as e:
+            logger.error(f"账本对账失败: {str(e)}")
+            yield dumps({"type": "error", "message": f"账本对账失败: {str(e)}"}) + b"\n"
+    
+    return StreamingResponse(report_stream(), media_type="application/x-ndjson")
+
+
+# ===== 数据导出 =====
+
+def _export_response(db: DatabaseManager, kind: str, build_query: Callable[[DatabaseManager], Any],
+                     export_format: str, gzip: bool, start_date: Optional[date], end_date: Optional[date],
+                     description: str):
+    """
+    构造导出文件的流式响应
+
+    查询在流式生成时的独立连接上构造（挂载归档库需要在同一连接上）；中途出错时结束响应并记录日志
+    """
+    gzip = gzip and export_format == "csv"
+    filename = export_file_name(
+        kind, export_format,
+        start_date.isoformat() if start_date else None,
+        end_date.isoformat() if end_date else None,
+        gzip=gzip
+    )
+
+    def export_blocks(stream_db: DatabaseManager):
+        sql, params = build_query(stream_db)
+        yield from iter_export(stream_db.conn, kind, sql, params, export_format=export_format, gzip=gzip)
+
+    async def stream():
+        try:
+            async with aclosing(_stream_on_own_connection(db.db_path, export_blocks)) as blocks:
+                async for block in blocks:
+                    yield block
+        except Exception as e:
+            logger.error(f"{description}失败: {str(e)}")
+            raise
+
+    return StreamingResponse(
+        stream(),
+        media_type="application/gzip" if gzip else EXPORT_MEDIA_TYPES[export_format],
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+    )
+
+
+def _validate_export(start_date: Optional[date], end_date: Optional[date], export_format: str):
+    if start_date and end_date and start_date > end_date:
+        raise ValueError("开始日期不能晚于结束日期")
+    if export_format == "xlsx" and not is_xlsx_available():
+        raise ValueError("未安装 openpyxl，无法导出 XLSX")
+
+
+@router.get("/export/orders")
+async def export_orders(
+    start_date: Optional[date] = Query(None, description="餐次开始日期"),
+    end_date: Optional[date] = Query(None, description="餐次结束日期"),
+    user_id: Optional[int] = Query(None, description="用户ID"),
+    meal_id: Optional[int] = Query(None, description="餐次ID"),
+    status: Optional[str] = Query(None, pattern="^(active|completed|canceled)$", description="订单状态"),
+    export_format: str = Query("csv", alias="format", pattern="^(csv|xlsx)$", description="导出格式 (csv/xlsx)"),
+    gzip: bool = Query(False, description="是否gzip压缩（仅CSV）"),
+    current_admin: TokenData = Depends(get_admin_user),
+    db: DatabaseManager = Depends(get_database)
+):
+    """
+    流式导出订单
+    
+    一条查询按块读取并逐块输出，内存占用与订单数无关；日期范围涉及已归档年份时包含归档数据
+    
+    参考文档: doc/api.md - 5.5.1 导出订单
+    """
+    try:
+        _validate_export(start_date, end_date, export_format)
+    except ValueError as e:
+        return create_error_response(str(e))
+    
+    def build_query(stream_db: DatabaseManager):
+        return build_orders_export_query(
+            stream_db.conn, stream_db.db_path,
+            start_date=start_date.isoformat() if start_date else None,
+            end_date=end_date.isoformat() if end_date else None,
+            user_id=user_id, meal_id=meal_id, status=status
+        )
+    
+    logger.info(f"管理员 {current_admin.user_id} 导出订单: {start_date} ~ {end_date}, 用户 {user_id}, 餐次 {meal_id}")
+    return _export_response(db, "orders", build_query, export_format, gzip, start_date, end_date, "导出订单")
+
+
+@router.get("/export/ledger")
+async def export_ledger(
+    start_date: Optional[date] = Query(None, description="记录开始日期"),
+    end_date: Optional[date] = Query(None, description="记录结束日期"),
+    user_id: Optional[int] = Query(None, description="用户ID"),
+    meal_id: Optional[int] = Query(None, description="餐次ID（只导出该餐次订单相关的记录）"),
+    export_format: str = Query("csv", alias="format", pattern="^(csv|xlsx)$", description="导出格式 (csv/xlsx)"),
+    gzip: bool = Query(False, description="是否gzip压缩（仅CSV）"),
+    current_admin: TokenData = Depends(get_admin_user),
+    db: DatabaseManager = Depends(get_database)
+):
+    """
+    流式导出账本记录
+    
+    参考文档: doc/api.md - 5.5.2 导出账本
+    """
+    try:
+        _validate_export(start_date, end_date, export_format)
+    except ValueError as e:
+        return create_error_response(str(e))
+    
+    def build_query(stream_db: DatabaseManager):
+        return build_ledger_export_query(
+            stream_db.conn, stream_db.db_path,
+            start_date=start_date.isoformat() if start_date else None,
+            end_date=end_date.isoformat() if end_date else None,
+            user_id=user_id, meal_id=meal_id
+        )
+    
+    logger.info(f"管理员 {current_admin.user_id} 导出账本: {start_date} ~ {end_date}, 用户 {user_id}, 餐次 {meal_id}")
+    return _export_response(db, "ledger", build_query, export_format, gzip, start_date, end_date, "导出账本")
+
+
 # ===== 统计信息 =====
 
 @router.get("/statistics", response_model=Dict[str, Any])
@@ -787,6 +1202,12 @@ async def get_admin_statistics(
             result = db.conn.execute(query).fetchone()
             stats_data[stat_name] = result[0] if result and result[0] is not None else 0
         
+        # 加上已归档的历史数据（读取归档汇总，不挂载归档库）
+        archive_totals = get_archive_totals(db.conn)
+        stats_data["total_meals"] += archive_totals["meal_count"]
+        stats_data["total_orders"] += archive_totals["order_count"]
+        stats_data["total_revenue"] += archive_totals["revenue_cents"]
+        
         response_data = {
             "total_users": stats_data["total_users"],
             "active_users": stats_data["active_users"],
@@ -802,4 +1223,93 @@ async def get_admin_statistics(
         
     except Exception as e:
         logger.error(f"获取统计信息失败: {str(e)}")
-        return create_error_response(f"获取统计信息失败: {str(e)}")
\ No newline at end of file
+        return create_error_response(f"获取统计信息失败: {str(e)}")
+
+# ===== 分析报表 =====
+
+def _analytics_date_range(start_date: Optional[date], end_date: Optional[date]):
+    """报表日期范围，默认最近30天"""
+    end = end_date or date.today()
+    start = start_date or end - timedelta(days=29)
+    if start > end:
+        raise ValueError("开始日期不能晚于结束日期")
+    return start.isoformat(), end.isoformat()
+
+
+async def _run_analytics(db: DatabaseManager, report: str, *args) -> Dict[str, Any]:
+    """在线程中执行分析查询（查询 Parquet 快照，不占用主库连接）"""
+    def run():
+        engine = AnalyticsEngine(db.db_path)
+        return {"rows": getattr(engine, report)(*args), **engine.snapshot_info()}
+    return await asyncio.to_thread(run)
+
+
+@router.get("/analytics/revenue", response_model=Dict[str, Any])
+async def get_revenue_report(
+    start_date: Optional[date] = Query(None, description="开始日期，默认30天前"),
+    end_date: Optional[date] = Query(None, description="结束日期，默认今天"),
+    granularity: str = Query("day", pattern="^(day|week|month)$", description="汇总粒度 (day/week/month)"),
+    current_admin: TokenData = Depends(get_admin_user),
+    db: DatabaseManager = Depends(get_database)
+):
+    """
+    营收趋势报表（查询分析镜像，数据有刷新间隔的延迟）
+    
+    参考文档: doc/api.md - 5.4 分析报表
+    """
+    try:
+        start, end = _analytics_date_range(start_date, end_date)
+        data = await _run_analytics(db, "revenue", start, end, granularity)
+        return create_success_response(data=data, message="营收报表查询成功")
+    except (AnalyticsUnavailableError, ValueError) as e:
+        return create_error_response(str(e))
+    except Exception as e:
+        logger.error(f"营收报表查询失败: {str(e)}")
+        return create_error_response(f"营收报表查询失败: {str(e)}")
+
+
+@router.get("/analytics/addons", response_model=Dict[str, Any])
+async def get_addon_popularity_report(
+    start_date: Optional[date] = Query(None, description="开始日期，默认30天前"),
+    end_date: Optional[date] = Query(None, description="结束日期，默认今天"),
+    current_admin: TokenData = Depends(get_admin_user),
+    db: DatabaseManager = Depends(get_database)
+):
+    """
+    附加项热度报表
+    
+    参考文档: doc/api.md - 5.4 分析报表
+    """
+    try:
+        start, end = _analytics_date_range(start_date, end_date)
+        data = await _run_analytics(db, "addon_popularity", start, end)
+        return create_success_response(data=data, message="附加项报表查询成功")
+    except (AnalyticsUnavailableError, ValueError) as e:
+        return create_error_response(str(e))
+    except Exception as e:
+        logger.error(f"附加项报表查询失败: {str(e)}")
+        return create_error_response(f"附加项报表查询失败: {str(e)}")
+
+
+@router.get("/analytics/user-spend", response_model=Dict[str, Any])
+async def get_user_spend_report(
+    start_date: Optional[date] = Query(None, description="开始日期，默认30天前"),
+    end_date: Optional[date] = Query(None, description="结束日期，默认今天"),
+    limit: int = Query(50, ge=1, le=500, description="返回用户数"),
+    current_admin: TokenData = Depends(get_admin_user),
+    db: DatabaseManager = Depends(get_database)
+):
+    """
+    用户消费排行报表
+    
+    参考文档: doc/api.md - 5.4 分析报表
+    """
+    try:
+        start, end = _analytics_date_range(start_date, end_date)
+        data = await _run_analytics(db, "user_spend", start, end, limit)
+        return create_success_response(data=data, message="用户消费报表查询成功")
+    except (AnalyticsUnavailableError, ValueError) as e:
+        return create_error_response(str(e))
+    except Exception as e:
+        logger.error(f"用户消费报表查询失败: {str(e)}")
+        return create_error_response(f"用户消费报表查询失败: {str(e)}")
@@ -0,0 +1,7 @@
+# 首屏聚合模块
+
+from .routes import router as bootstrap_router
+
+__all__ = [
+    "bootstrap_router"
+]
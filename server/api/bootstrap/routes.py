@@ -0,0 +1,117 @@
+# 首屏聚合API路由
+# 小程序启动时一次性返回日历餐次、用户在这些餐次的订单、余额和附加项目录，替代多次独立请求
+
+import logging
+from typing import Dict, Any, Optional
+from fastapi import APIRouter, Depends, Query
+
+from api.auth.routes import get_current_user, get_database
+from api.auth.models import TokenData
+from api.meals.routes import default_calendar_range, CALENDAR_MEAL_FORMATTERS
+from db.manager import DatabaseManager
+from db.query_operations import QueryOperations
+from utils.fields import build_record
+from utils.response import create_success_response, create_error_response
+
+logger = logging.getLogger(__name__)
+router = APIRouter(prefix="/api/bootstrap", tags=["首屏"])
+
+
+@router.get("", response_model=Dict[str, Any])
+async def get_bootstrap(
+    start_date: Optional[str] = Query(None, description="开始日期 (YYYY-MM-DD)，默认日历三周窗口"),
+    end_date: Optional[str] = Query(None, description="结束日期 (YYYY-MM-DD)，默认日历三周窗口"),
+    current_user: TokenData = Depends(get_current_user),
+    db: DatabaseManager = Depends(get_database)
+):
+    """
+    获取首屏聚合数据
+
+    在同一个只读快照内查询日历餐次、当前用户在这些餐次的活跃订单（一次IN查询）、
+    用户余额和可用附加项，保证各部分数据相互一致
+    """
+    try:
+        default_start, default_end = default_calendar_range()
+        start_date = start_date or default_start
+        end_date = end_date or default_end
+
+        query_ops = QueryOperations(db)
+
+        with db.read_snapshot():
+            user_row = db.conn.execute("""
+                SELECT user_id, wechat_name, avatar_url, balance_cents, is_admin
+                FROM users WHERE user_id = ?
+            """, [current_user.user_id]).fetchone()
+
+            if not user_row:
+                return create_error_response("用户不存在")
+
+            meals_result = query_ops.query_meals_by_date_range(
+                start_date=start_date,
+                end_date=end_date,
+                offset=0,
+                limit=60
+            )
+            meals = meals_result["data"]["meals"]
+
+            orders_result = query_ops.query_user_meal_orders(
+                current_user.user_id, [meal["meal_id"] for meal in meals]
+            )
+
+            addons_result = db.conn.execute("""
+                SELECT addon_id, name, price_cents, display_order, is_default
+                FROM addons
+                WHERE status = 'active'
+                ORDER BY display_order, created_at
+            """).fetchall()
+
+        # 只返回有订单的餐次，客户端按meal_id查找
+        my_orders = {
+            meal_id: {
+                "order_id": order["order_id"],
+                "order_status": order["order_status"],
+                "amount_yuan": order["amount_cents"] / 100.0,
+                "addon_selections": order["addon_selections"],
+                "ordered_at": order["created_at"]
+            }
+            for meal_id, order in orders_result["data"]["orders"].items()
+            if order["has_order"]
+        }
+
+        response_data = {
+            "user": {
+                "user_id": user_row["user_id"],
+                "wechat_name": user_row["wechat_name"] or "未注册用户",
+                "avatar_url": user_row["avatar_url"],
+                "balance_cents": user_row["balance_cents"],
+                "balance_yuan": user_row["balance_cents"] / 100.0,
+                "is_admin": bool(user_row["is_admin"])
+            },
+            "calendar": {
+                "start_date": start_date,
+                "end_date": end_date,
+                "meals": [build_record(meal, CALENDAR_MEAL_FORMATTERS, None) for meal in meals],
+                "total_count": meals_result["data"]["pagination"]["total_count"]
+            },
+            "my_orders": my_orders,
+            "addons": [
+                {
+                    "addon_id": addon["addon_id"],
+                    "name": addon["name"],
+                    "price_cents": addon["price_cents"],
+                    "price_yuan": addon["price_cents"] / 100.0,
+                    "display_order": addon["display_order"],
+                    "is_default": addon["is_default"]
+                }
+                for addon in addons_result
+            ]
+        }
+
+        return create_success_response(
+            data=response_data,
+            message="首屏数据查询成功"
+        )
+
+    except Exception as e:
+        logger.error(f"获取首屏数据失败: {str(e)}")
+        return create_error_response(f"获取首屏数据失败: {str(e)}")
@@ -4,13 +4,22 @@
 import logging
 from contextlib import asynccontextmanager
 from fastapi import FastAPI, HTTPException
-from fastapi.responses import JSONResponse
-from datetime import datetime
 
 # 导入配置和中间件
 from utils.config import Config
 from utils.logger import setup_logging
 from api.middleware import setup_middleware
+from utils.response import FastJSONResponse, create_error_response
+from db.manager import configure_group_commit, shutdown_group_commit_executors
+from db.idempotency import configure_idempotency
+from db.analytics import configure_analytics
+from db.archive import configure_archive
+from db.schema_migrations import migrate_database
+from utils.analytics_scheduler import create_analytics_refresh_job
+from utils.auto_lock import create_auto_lock_scheduler
+from utils.backup_scheduler import create_backup_scheduler
+from utils.maintenance_scheduler import create_maintenance_schedulers
+from utils.statement_scheduler import create_statement_job
 
 # 导入所有路由
 from api.auth import auth_router
@@ -19,6 +28,7 @@ from api.meals import meals_router
 from api.orders import orders_router
 from api.admin import admin_router
 from api.addons import addons_router
+from api.bootstrap import bootstrap_router
 
 # 全局配置实例
 config = Config()
@@ -36,10 +46,62 @@ async def lifespan(app: FastAPI):
     logger.info(f"环境: {config.env}")
     logger.info(f"调试模式: {config.config['app']['debug']}")
     
+    # 数据库结构迁移（多worker时通过租约只由一个worker执行，其他worker等待完成后再启动）
+    if config.get("database.migrate_on_startup", True):
+        applied = migrate_database(config.get_database_config()["path"])
+        if applied:
+            logger.info(f"执行了 {len(applied)} 个数据库迁移，当前版本 {applied[-1]['version']}")
+    
+    # 写操作合并提交（下单、取消订单、调整余额）
+    configure_group_commit(
+        enabled=config.get("database.group_commit.enabled", True),
+        max_batch=config.get("database.group_commit.max_batch", 32),
+        max_delay=config.get("database.group_commit.max_delay_ms", 2) / 1000
+    )
+    configure_idempotency(config.get("idempotency.ttl_seconds", 86400))
+    configure_archive(config.get("database.archive_dir"))
+    configure_analytics(config.get("analytics.mirror_dir"))
+    
+    # 截单自动锁定（多worker时通过租约只由一个worker执行）
+    auto_lock_scheduler = create_auto_lock_scheduler()
+    if auto_lock_scheduler is not None:
+        auto_lock_scheduler.start()
+    
+    # 定时在线备份（database.backup_schedule）
+    backup_scheduler = create_backup_scheduler()
+    if backup_scheduler is not None:
+        backup_scheduler.start()
+    
+    # WAL检查点和空闲时段增量维护
+    maintenance_schedulers = create_maintenance_schedulers()
+    for scheduler in maintenance_schedulers:
+        scheduler.start()
+    
+    # 每月初生成上月账单
+    statement_job = create_statement_job()
+    if statement_job is not None:
+        statement_job.start()
+    
+    # 分析镜像增量刷新（需安装 duckdb）
+    analytics_refresh_job = create_analytics_refresh_job()
+    if analytics_refresh_job is not None:
+        analytics_refresh_job.start()
+    
     yield
     
     # 关闭时执行
     logger.info("罡好饭API服务关闭中...")
+    if auto_lock_scheduler is not None:
+        await auto_lock_scheduler.stop()
+    if backup_scheduler is not None:
+        await backup_scheduler.stop()
+    for scheduler in maintenance_schedulers:
+        await scheduler.stop()
+    if statement_job is not None:
+        await statement_job.stop()
+    if analytics_refresh_job is not None:
+        await analytics_refresh_job.stop()
+    shutdown_group_commit_executors()
 
 
 # 创建FastAPI应用
@@ -48,7 +110,8 @@ app = FastAPI(
     version=config.config['app']['version'],
     description=config.config['app']['description'],
     debug=config.config['app']['debug'],
-    lifespan=lifespan
+    lifespan=lifespan,
+    default_response_class=FastJSONResponse
 )
 
 # 设置中间件
@@ -60,6 +123,7 @@ app.include_router(users_router, tags=["用户"])
 app.include_router(meals_router, tags=["餐次"])
 app.include_router(orders_router, tags=["订单"])
 app.include_router(addons_router, tags=["附加项"])
+app.include_router(bootstrap_router, tags=["首屏"])
 app.include_router(admin_router, tags=["管理员"])
 
 
@@ -67,30 +131,14 @@ app.include_router(admin_router, tags=["管理员"])
 @app.exception_handler(HTTPException)
 async def http_exception_handler(request, exc):
     """HTTP异常处理"""
-    return JSONResponse(
-        status_code=exc.status_code,
-        content={
-            "success": False,
-            "error": exc.detail,
-            "data": None,
-            "timestamp": datetime.utcnow().isoformat() + "Z"
-        }
-    )
+    return create_error_response(exc.detail, status_code=exc.status_code)
 
 
 @app.exception_handler(Exception)
 async def general_exception_handler(request, exc):
     """通用异常处理"""
     logger.error(f"未处理的异常: {str(exc)}", exc_info=True)
-    return JSONResponse(
-        status_code=500,
-        content={
-            "success": False,
-            "error": "服务器内部错误",
-            "data": None,
-            "timestamp": datetime.utcnow().isoformat() + "Z"
-        }
-    )
+    return create_error_response("服务器内部错误", status_code=500)
 
 
 # 根路径
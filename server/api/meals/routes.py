@@ -1,21 +1,112 @@
 # 参考文档: doc/api.md 餐次模块
 # 餐次相关API路由
 
+import asyncio
 import logging
 from datetime import datetime, timedelta
 from typing import Dict, Any, Optional
-from fastapi import APIRouter, HTTPException, Depends, Query, Path
+from fastapi import APIRouter, HTTPException, Depends, Query, Path, Request
+from fastapi.responses import StreamingResponse
 
 from .models import MealBasic, MealDetail, AvailableAddon, OrderedUser
 from api.auth.routes import get_current_user, get_database
 from api.auth.models import TokenData
 from db.manager import DatabaseManager
 from db.query_operations import QueryOperations
-from utils.response import create_success_response, create_error_response
+from utils.config import Config
+from utils.compression import negotiate_encoding, DEFAULT_MINIMUM_SIZE
+from utils.fields import parse_fields, expand_fields, build_record
+from utils.response import create_success_response, create_error_response, dumps
+from utils.event_bus import get_meal_event_bus
+from utils.response_cache import ResponseCache
 
 logger = logging.getLogger(__name__)
 router = APIRouter(prefix="/api/meals", tags=["餐次"])
 
+config = Config()
+
+# 日历响应缓存：按日期窗口缓存序列化结果和预压缩结果，数据版本变化时自动失效
+calendar_cache = ResponseCache(max_entries=32)
+
+
+def default_calendar_range():
+    """
+    日历页面默认日期范围（三周：上周周日 ~ 下周周六）
+
+    Returns:
+        (start_date, end_date) 元组，格式 YYYY-MM-DD
+    """
+    today = datetime.now()
+    days_since_sunday = (today.weekday() + 1) % 7  # 周日=0，周一=1...
+    last_sunday = today - timedelta(days=days_since_sunday + 7)
+    next_saturday = today + timedelta(days=13 - days_since_sunday)
+    return last_sunday.strftime("%Y-%m-%d"), next_saturday.strftime("%Y-%m-%d")
+
+
+def _slot_text(slot: str) -> str:
+    return "午餐" if slot == "lunch" else "晚餐" if slot == "dinner" else slot
+
+
+def _calendar_status(status: str) -> str:
+    # 日历页面状态映射：将canceled映射为unpublished
+    return "unpublished" if status == "canceled" else status
+
+
+MEAL_STATUS_TEXT = {
+    "published": "已发布",
+    "locked": "已锁定",
+    "completed": "已完成",
+    "canceled": "已取消"
+}
+
+CALENDAR_STATUS_TEXT = {
+    "published": "已发布",
+    "locked": "已锁定", 
+    "completed": "已完成",
+    "unpublished": "未发布"  # canceled状态映射后的显示文本
+}
+
+# 餐次列表输出字段格式化
+MEAL_LIST_FORMATTERS = {
+    "meal_id": lambda m: m["meal_id"],
+    "date": lambda m: m["date"],
+    "slot": lambda m: m["slot"],
+    "slot_text": lambda m: _slot_text(m["slot"]),
+    "description": lambda m: m["description"],
+    "base_price_cents": lambda m: m["base_price_cents"],
+    "base_price_yuan": lambda m: m["base_price_cents"] / 100.0,
+    "addon_config": lambda m: m.get("addon_config"),
+    "max_orders": lambda m: m["max_orders"],
+    "current_orders": lambda m: m["current_orders"],
+    "available_slots": lambda m: m["max_orders"] - m["current_orders"],
+    "status": lambda m: m["status"],
+    "status_text": lambda m: MEAL_STATUS_TEXT.get(m["status"], m["status"]),
+    "calendar_status": lambda m: _calendar_status(m["status"]),  # 日历页面专用状态
+    "created_at": lambda m: m["created_at"]
+}
+
+# 日历页面输出字段格式化（status使用映射后的状态）
+CALENDAR_MEAL_FORMATTERS = {
+    **{name: MEAL_LIST_FORMATTERS[name] for name in (
+        "meal_id", "date", "slot", "slot_text", "description", "base_price_cents",
+        "base_price_yuan", "addon_config", "max_orders", "current_orders", "available_slots"
+    )},
+    "status": lambda m: _calendar_status(m["status"]),
+    "status_text": lambda m: CALENDAR_STATUS_TEXT.get(_calendar_status(m["status"]), _calendar_status(m["status"])),
+    "original_status": lambda m: m["status"],  # 保留原始状态用于调试
+    "created_at": lambda m: m["created_at"]
+}
+
+# 路由派生字段 -> 查询层字段
+MEAL_FIELD_SOURCES = {
+    "slot_text": ("slot",),
+    "base_price_yuan": ("base_price_cents",),
+    "available_slots": ("max_orders", "current_orders"),
+    "status_text": ("status",),
+    "calendar_status": ("status",),
+    "original_status": ("status",),
+}
+
 
 @router.get("", response_model=Dict[str, Any])
 async def get_meals_list(
@@ -23,6 +114,7 @@ async def get_meals_list(
     end_date: Optional[str] = Query(None, description="结束日期 (YYYY-MM-DD)"),
     offset: int = Query(0, ge=0, description="偏移量"),
     limit: int = Query(20, ge=1, le=60, description="每页条数"),
+    fields: Optional[str] = Query(None, description="返回字段，逗号分隔，如 meal_id,date,slot,status"),
     current_user: TokenData = Depends(get_current_user),
     db: DatabaseManager = Depends(get_database)
 ):
@@ -39,13 +131,15 @@ async def get_meals_list(
             end_date = (datetime.now() + timedelta(days=7)).strftime("%Y-%m-%d")
         
         query_ops = QueryOperations(db)
+        selected = parse_fields(fields, MEAL_LIST_FORMATTERS)
         
-        # 查询餐次列表
+        # 查询餐次列表，只查询所选字段依赖的列
         meals_result = query_ops.query_meals_by_date_range(
             start_date=start_date,
             end_date=end_date,
             offset=offset,
-            limit=limit
+            limit=limit,
+            fields=expand_fields(selected, MEAL_FIELD_SOURCES)
         )
         
         if not meals_result["success"]:
@@ -54,40 +148,10 @@ async def get_meals_list(
         meals_data = meals_result["data"]
         
         # 格式化餐次数据
-        formatted_meals = []
-        for meal in meals_data["meals"]:
-            # 时段文本
-            slot_text = "午餐" if meal["slot"] == "lunch" else "晚餐" if meal["slot"] == "dinner" else meal["slot"]
-            
-            # 状态文本
-            status_text_map = {
-                "published": "已发布",
-                "locked": "已锁定",
-                "completed": "已完成",
-                "canceled": "已取消"
-            }
-            
-            # 日历页面状态映射：将canceled映射为unpublished
-            calendar_status = "unpublished" if meal["status"] == "canceled" else meal["status"]
-            
-            formatted_meal = {
-                "meal_id": meal["meal_id"],
-                "date": meal["date"],
-                "slot": meal["slot"],
-                "slot_text": slot_text,
-                "description": meal["description"],
-                "base_price_cents": meal["base_price_cents"],
-                "base_price_yuan": meal["base_price_cents"] / 100.0,
-                "addon_config": meal.get("addon_config"),
-                "max_orders": meal["max_orders"],
-                "current_orders": meal["current_orders"],
-                "available_slots": meal["max_orders"] - meal["current_orders"],
-                "status": meal["status"],
-                "status_text": status_text_map.get(meal["status"], meal["status"]),
-                "calendar_status": calendar_status,  # 日历页面专用状态
-                "created_at": meal["created_at"]
-            }
-            formatted_meals.append(formatted_meal)
+        formatted_meals = [
+            build_record(meal, MEAL_LIST_FORMATTERS, selected)
+            for meal in meals_data["meals"]
+        ]
         
         response_data = {
             "meals": formatted_meals,
@@ -106,10 +170,12 @@ async def get_meals_list(
 
 @router.get("/calendar", response_model=Dict[str, Any])
 async def get_calendar_meals(
+    request: Request,
     start_date: Optional[str] = Query(None, description="开始日期 (YYYY-MM-DD)"),
     end_date: Optional[str] = Query(None, description="结束日期 (YYYY-MM-DD)"),
     offset: int = Query(0, ge=0, description="偏移量"),
     limit: int = Query(60, ge=1, le=60, description="每页条数"),
+    fields: Optional[str] = Query(None, description="返回字段，逗号分隔，如 meal_id,date,slot,status"),
     current_user: TokenData = Depends(get_current_user),
     db: DatabaseManager = Depends(get_database)
 ):
@@ -120,28 +186,32 @@ async def get_calendar_meals(
     """
     try:
         # 设置默认日期范围（三周：上周、本周、下周）
-        if not start_date:
-            # 获取上周周日
-            today = datetime.now()
-            days_since_sunday = (today.weekday() + 1) % 7  # 周日=0，周一=1...
-            last_sunday = today - timedelta(days=days_since_sunday + 7)
-            start_date = last_sunday.strftime("%Y-%m-%d")
-            
-        if not end_date:
-            # 获取下周周六  
-            today = datetime.now()
-            days_since_sunday = (today.weekday() + 1) % 7
-            next_saturday = today + timedelta(days=13 - days_since_sunday)
-            end_date = next_saturday.strftime("%Y-%m-%d")
+        default_start, default_end = default_calendar_range()
+        start_date = start_date or default_start
+        end_date = end_date or default_end
         
         query_ops = QueryOperations(db)
+        selected = parse_fields(fields, CALENDAR_MEAL_FORMATTERS)
+        
+        # 命中缓存时直接返回已序列化（及预压缩）的响应体
+        encoding = None
+        if config.get("compression.enabled", True):
+            encoding = negotiate_encoding(request.headers.get("accept-encoding"))
+        minimum_size = config.get("compression.minimum_size", DEFAULT_MINIMUM_SIZE)
+        cache_key = (start_date, end_date, offset, limit, frozenset(selected) if selected else None)
+        cache_version = query_ops.query_meals_version(start_date, end_date)
+        
+        cached = calendar_cache.get(cache_key, cache_version)
+        if cached is not None:
+            return cached.to_response(encoding, minimum_size)
         
-        # 查询餐次列表
+        # 查询餐次列表，只查询所选字段依赖的列
         meals_result = query_ops.query_meals_by_date_range(
             start_date=start_date,
             end_date=end_date,
             offset=offset,
-            limit=limit
+            limit=limit,
+            fields=expand_fields(selected, MEAL_FIELD_SOURCES)
         )
         
         if not meals_result["success"]:
@@ -150,40 +220,10 @@ async def get_calendar_meals(
         meals_data = meals_result["data"]
         
         # 格式化餐次数据（专门为日历页面优化）
-        formatted_meals = []
-        for meal in meals_data["meals"]:
-            # 时段文本
-            slot_text = "午餐" if meal["slot"] == "lunch" else "晚餐" if meal["slot"] == "dinner" else meal["slot"]
-            
-            # 日历页面状态映射：canceled -> unpublished
-            calendar_status = "unpublished" if meal["status"] == "canceled" else meal["status"]
-            
-            # 状态文本映射（日历页面专用）
-            calendar_status_text_map = {
-                "published": "已发布",
-                "locked": "已锁定", 
-                "completed": "已完成",
-                "unpublished": "未发布"  # canceled状态映射后的显示文本
-            }
-            
-            formatted_meal = {
-                "meal_id": meal["meal_id"],
-                "date": meal["date"],
-                "slot": meal["slot"],
-                "slot_text": slot_text,
-                "description": meal["description"],
-                "base_price_cents": meal["base_price_cents"],
-                "base_price_yuan": meal["base_price_cents"] / 100.0,
-                "addon_config": meal.get("addon_config"),
-                "max_orders": meal["max_orders"],
-                "current_orders": meal["current_orders"],
-                "available_slots": meal["max_orders"] - meal["current_orders"],
-                "status": calendar_status,  # 日历页面使用映射后的状态
-                "status_text": calendar_status_text_map.get(calendar_status, calendar_status),
-                "original_status": meal["status"],  # 保留原始状态用于调试
-                "created_at": meal["created_at"]
-            }
-            formatted_meals.append(formatted_meal)
+        formatted_meals = [
+            build_record(meal, CALENDAR_MEAL_FORMATTERS, selected)
+            for meal in meals_data["meals"]
+        ]
         
         response_data = {
             "meals": formatted_meals,
@@ -195,16 +235,156 @@ async def get_calendar_meals(
             }
         }
         
-        return create_success_response(
+        response = create_success_response(
             data=response_data,
             message="日历餐次列表查询成功"
         )
+        return calendar_cache.put(cache_key, cache_version, response).to_response(encoding, minimum_size)
         
     except Exception as e:
         logger.error(f"获取日历餐次列表失败: {str(e)}")
         return create_error_response(f"获取日历餐次列表失败: {str(e)}")
 
 
+def _format_sse(event_name: str, data: Dict[str, Any], event_id: Optional[int] = None) -> bytes:
+    """格式化一条SSE消息"""
+    message = b""
+    if event_id is not None:
+        message += f"id: {event_id}\n".encode()
+    return message + f"event: {event_name}\n".encode() + b"data: " + dumps(data) + b"\n\n"
+
+
+def _compact_event(event: Dict[str, Any]) -> Dict[str, Any]:
+    """SSE推送的精简增量"""
+    return {
+        "meal_id": event["meal_id"],
+        "type": event["type"],
+        "status": event["status"],
+        "current_orders": event["current_orders"],
+        "max_orders": event["max_orders"],
+        "available_slots": event["available_slots"]
+    }
+
+
+@router.get("/stream")
+async def stream_meal_events(
+    request: Request,
+    meal_ids: Optional[str] = Query(None, description="只订阅这些餐次，逗号分隔，默认全部"),
+    current_user: TokenData = Depends(get_current_user)
+):
+    """
+    餐次容量/状态实时推送（Server-Sent Events）
+
+    下单、取消订单及管理员发布/锁定/完成/取消餐次后推送增量，替代客户端轮询。
+    断线重连时携带 Last-Event-ID 请求头可补发保留期内错过的事件。
+    流式响应开始后不使用请求的数据库连接：起始位置和补发事件由事件总线在线程中用独立连接读取。
+    """
+    try:
+        meal_id_filter = None
+        if meal_ids:
+            meal_id_filter = {int(meal_id) for meal_id in meal_ids.split(",") if meal_id.strip()}
+        last_event_id = request.headers.get("last-event-id")
+        last_event_id = int(last_event_id) if last_event_id else None
+    except ValueError:
+        return create_error_response("参数格式错误")
+
+    heartbeat_interval = config.get("events.heartbeat_interval", 15)
+    bus = get_meal_event_bus()
+
+    async def event_stream():
+        # 先订阅再补发，补发与实时事件之间按事件ID去重
+        queue = bus.subscribe(meal_id_filter)
+        try:
+            last_sent, missed_events = await bus.catch_up(last_event_id)
+            if last_event_id is None:
+                yield _format_sse("ready", {"last_event_id": last_sent}, last_sent)
+            else:
+                for event in missed_events:
+                    if meal_id_filter is None or event["meal_id"] in meal_id_filter:
+                        last_sent = event["event_id"]
+                        yield _format_sse("meal", _compact_event(event), last_sent)
+
+            while True:
+                if await request.is_disconnected():
+                    break
+                try:
+                    event = await asyncio.wait_for(queue.get(), timeout=heartbeat_interval)
+                except asyncio.TimeoutError:
+                    yield b": ping\n\n"
+                    continue
+                if event["event_id"] <= last_sent:
+                    continue
+                last_sent = event["event_id"]
+                yield _format_sse("meal", _compact_event(event), last_sent)
+        finally:
+            bus.unsubscribe(queue)
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+@router.get("/my-orders", response_model=Dict[str, Any])
+async def get_my_meal_orders(
+    meal_ids: str = Query(..., description="餐次ID列表，逗号分隔，最多100个"),
+    current_user: TokenData = Depends(get_current_user),
+    db: DatabaseManager = Depends(get_database)
+):
+    """
+    批量获取当前用户在多个餐次的订单信息
+
+    日历页面一次请求获取所有可见餐次的订单状态，替代逐个调用 /{meal_id}/my-order
+    """
+    try:
+        try:
+            meal_id_list = [int(meal_id) for meal_id in meal_ids.split(",") if meal_id.strip()]
+        except ValueError:
+            return create_error_response("餐次ID格式错误")
+
+        query_ops = QueryOperations(db)
+
+        # 一次索引查询获取所有餐次的订单
+        orders_result = query_ops.query_user_meal_orders(current_user.user_id, meal_id_list)
+
+        if not orders_result["success"]:
+            return create_error_response(orders_result["error"])
+
+        # 格式化订单信息，与 /{meal_id}/my-order 的单条格式保持一致
+        formatted_orders = []
+        for meal_id, order_data in orders_result["data"]["orders"].items():
+            if order_data["has_order"]:
+                formatted_orders.append({
+                    "meal_id": meal_id,
+                    "has_order": True,
+                    "order_id": order_data["order_id"],
+                    "order_status": order_data["order_status"],
+                    "amount_yuan": order_data["amount_cents"] / 100.0,
+                    "addon_selections": order_data["addon_selections"],
+                    "ordered_at": order_data["created_at"]
+                })
+            else:
+                formatted_orders.append({
+                    "meal_id": meal_id,
+                    "has_order": False,
+                    "order_id": None,
+                    "order_status": None,
+                    "amount_yuan": None,
+                    "addon_selections": None,
+                    "ordered_at": None
+                })
+
+        return create_success_response(
+            data={"orders": formatted_orders},
+            message="用户餐次订单批量查询成功"
+        )
+
+    except Exception as e:
+        logger.error(f"批量获取用户餐次订单失败: {str(e)}")
+        return create_error_response(f"批量获取用户餐次订单失败: {str(e)}")
+
+
 @router.get("/{meal_id}", response_model=Dict[str, Any])
 async def get_meal_detail(
     meal_id: int = Path(..., description="餐次ID"),
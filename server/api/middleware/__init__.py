@@ -5,19 +5,22 @@ from fastapi import FastAPI
 from typing import Dict, Any
 
 from .cors import setup_cors_middleware
-from .logging import setup_logging_middleware  
+from .logging import setup_logging_middleware
 from .security import setup_security_middleware
+from .compression import setup_compression_middleware
 
 
 def setup_middleware(app: FastAPI, config: Dict[str, Any]):
     """
     设置所有中间件
-    
+
     Args:
         app: FastAPI应用实例
         config: 配置字典
     """
     # 设置中间件（顺序很重要）
+    # 压缩中间件最先注册，位于最内层，直接包裹路由响应
+    setup_compression_middleware(app, config)
     setup_security_middleware(app, config)
     setup_logging_middleware(app, config)
     setup_cors_middleware(app, config)
@@ -26,6 +29,7 @@ def setup_middleware(app: FastAPI, config: Dict[str, Any]):
 __all__ = [
     "setup_middleware",
     "setup_cors_middleware",
-    "setup_logging_middleware", 
-    "setup_security_middleware"
-]
\ No newline at end of file
+    "setup_logging_middleware",
+    "setup_security_middleware",
+    "setup_compression_middleware"
+]
@@ -0,0 +1,72 @@
+# 参考文档: doc/server_structure.md 中间件部分
+# 响应压缩中间件
+
+import logging
+from fastapi import FastAPI, Request, Response
+from typing import Dict, Any
+
+from utils.compression import (
+    negotiate_encoding, is_compressible, compress,
+    DEFAULT_MINIMUM_SIZE, DEFAULT_GZIP_LEVEL, DEFAULT_BROTLI_QUALITY
+)
+
+logger = logging.getLogger(__name__)
+
+
+def setup_compression_middleware(app: FastAPI, config: Dict[str, Any]):
+    """
+    设置响应压缩中间件
+
+    根据Accept-Encoding协商br/gzip，仅压缩超过最小尺寸的可压缩响应。
+    已带Content-Encoding的响应（如预压缩的缓存响应）和流式响应直接透传。
+
+    Args:
+        app: FastAPI应用实例
+        config: 配置字典
+    """
+    compression_config = config.get('compression', {})
+
+    if not compression_config.get('enabled', True):
+        logger.info("响应压缩已禁用")
+        return
+
+    minimum_size = compression_config.get('minimum_size', DEFAULT_MINIMUM_SIZE)
+    gzip_level = compression_config.get('gzip_level', DEFAULT_GZIP_LEVEL)
+    brotli_quality = compression_config.get('brotli_quality', DEFAULT_BROTLI_QUALITY)
+
+    @app.middleware("http")
+    async def compress_response(request: Request, call_next):
+        response = await call_next(request)
+
+        encoding = negotiate_encoding(request.headers.get('accept-encoding'))
+        if encoding is None:
+            return response
+
+        # 已压缩或不适合压缩的响应直接透传
+        if 'content-encoding' in response.headers:
+            return response
+        if not is_compressible(response.headers.get('content-type')):
+            return response
+
+        # 没有Content-Length说明是流式响应，不做缓冲
+        content_length = response.headers.get('content-length')
+        if content_length is None or int(content_length) < minimum_size:
+            return response
+
+        body = b"".join([chunk async for chunk in response.body_iterator])
+        compressed = compress(body, encoding, gzip_level=gzip_level, brotli_quality=brotli_quality)
+
+        compressed_response = Response(
+            content=compressed,
+            status_code=response.status_code,
+            background=response.background
+        )
+        compressed_response.raw_headers = [
+            (key, value) for key, value in response.raw_headers
+            if key not in (b'content-length', b'vary')
+        ] + [
+            (b'content-length', str(len(compressed)).encode('latin-1')),
+            (b'content-encoding', encoding.encode('latin-1')),
+            (b'vary', b'Accept-Encoding'),
+        ]
+        return compressed_response
@@ -1,9 +1,10 @@
 # 参考文档: doc/api.md 订单模块
 # 订单相关API路由
 
+import json
 import logging
 from typing import Dict, Any, Optional
-from fastapi import APIRouter, HTTPException, Depends, Query, Path
+from fastapi import APIRouter, HTTPException, Depends, Query, Path, Header
 
 from .models import (
     CreateOrderRequest, CancelOrderRequest, CreateOrderResponse, 
@@ -11,28 +12,87 @@ from .models import (
 )
 from api.auth.routes import get_current_user, get_database
 from api.auth.models import TokenData
-from db.manager import DatabaseManager
+from db.manager import DatabaseManager, run_grouped_write
+from db.idempotency import (
+    find_idempotent_result, idempotency_request_hash, run_idempotent, validate_idempotency_key
+)
 from db.core_operations import CoreOperations
 from db.query_operations import QueryOperations
+from utils.fields import parse_fields, select_columns, build_record
+from utils.seat_reservation import get_seat_manager, load_meal_capacity
 from utils.response import create_success_response, create_error_response
 
 logger = logging.getLogger(__name__)
 router = APIRouter(prefix="/api/orders", tags=["订单"])
 
+ORDER_STATUS_TEXT = {
+    "active": "有效",
+    "completed": "已完成", 
+    "canceled": "已取消"
+}
+
+SLOT_TEXT = {
+    "lunch": "午餐",
+    "dinner": "晚餐"
+}
+
+# 订单列表可选字段 -> 所需SQL列（m./u. 前缀的列需要关联 meals/users）
+ORDER_FIELD_COLUMNS = {
+    "order_id": ("o.order_id",),
+    "user_id": ("o.user_id",),
+    "user_name": ("u.wechat_name as user_name",),
+    "meal_id": ("o.meal_id",),
+    "meal_date": ("m.date as meal_date",),
+    "meal_slot": ("m.slot as meal_slot",),
+    "meal_slot_text": ("m.slot as meal_slot",),
+    "meal_description": ("m.description as meal_description",),
+    "amount_yuan": ("o.amount_cents",),
+    "addon_selections": ("o.addon_selections",),
+    "addon_details": ("o.addon_selections",),
+    "status": ("o.status",),
+    "status_text": ("o.status",),
+    "created_at": ("o.created_at",),
+    "updated_at": ("o.updated_at",),
+}
+
+
+def _format_addon_details(addon_selections: Optional[str], addons_dict: Dict[int, Dict[str, Any]]) -> list:
+    """解析附加项选择并补充附加项名称和价格"""
+    addon_details = []
+    if addon_selections:
+        try:
+            for addon_id_str, quantity in json.loads(addon_selections).items():
+                addon_id = int(addon_id_str)
+                if addon_id in addons_dict and quantity > 0:
+                    addon_info = addons_dict[addon_id]
+                    addon_details.append({
+                        "addon_id": addon_id,
+                        "name": addon_info["name"],
+                        "price_yuan": addon_info["price_cents"] / 100.0,
+                        "quantity": quantity,
+                        "total_yuan": (addon_info["price_cents"] * quantity) / 100.0
+                    })
+        except (json.JSONDecodeError, ValueError, TypeError):
+            pass
+    return addon_details
+
 
 @router.post("", response_model=Dict[str, Any])
 async def create_order(
     order_request: CreateOrderRequest,
+    idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key"),
     current_user: TokenData = Depends(get_current_user),
     db: DatabaseManager = Depends(get_database)
 ):
     """
     创建订单
     
+    携带 Idempotency-Key 请求头时，同一键的重试直接返回首次成功的结果
+    
     参考文档: doc/api.md - 4.1 创建订单
     """
     try:
-        core_ops = CoreOperations(db)
+        idempotency_key = validate_idempotency_key(idempotency_key)
         
         # 转换附加项选择格式（字符串键转整数键）
         addon_selections = {}
@@ -44,12 +104,37 @@ async def create_order(
                 except ValueError:
                     return create_error_response(f"无效的附加项ID: {addon_id_str}")
         
-        # 创建订单
-        order_result = core_ops.create_order(
-            user_id=current_user.user_id,
-            meal_id=order_request.meal_id,
-            addon_selections=addon_selections
-        )
+        # 重试请求：直接返回已保存的结果，不占用名额也不进入写事务
+        request_hash = idempotency_request_hash("create_order", order_request.meal_id, addon_selections)
+        order_result = None
+        if idempotency_key:
+            order_result = find_idempotent_result(db.conn, current_user.user_id, idempotency_key, request_hash)
+        
+        if order_result is None:
+            # 座位预占：名额已满时在进入数据库写事务前直接拒绝，可能空出名额时按先后排队
+            seat_manager = get_seat_manager()
+            reserved = await seat_manager.reserve(
+                order_request.meal_id, lambda: load_meal_capacity(db, order_request.meal_id)
+            )
+            
+            # 创建订单（由合并提交执行器在写线程中执行，等待写锁时不阻塞事件循环）
+            committed = False
+            try:
+                order_result, replayed = await run_grouped_write(
+                    db,
+                    lambda writer: run_idempotent(
+                        writer, current_user.user_id, idempotency_key, request_hash,
+                        lambda: CoreOperations(writer).create_order(
+                            user_id=current_user.user_id,
+                            meal_id=order_request.meal_id,
+                            addon_selections=addon_selections
+                        )
+                    )
+                )
+                committed = not replayed and order_result.get("success", True)
+            finally:
+                if reserved:
+                    seat_manager.release(order_request.meal_id, committed)
         
         if not order_result.get("success", True):
             return create_error_response(order_result.get("message", "订单创建失败"))
@@ -229,26 +314,43 @@ async def update_order(
 async def cancel_order(
     order_id: int = Path(..., description="订单ID"),
     cancel_request: CancelOrderRequest = CancelOrderRequest(),
+    idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key"),
     current_user: TokenData = Depends(get_current_user),
     db: DatabaseManager = Depends(get_database)
 ):
     """
     取消订单
     
+    携带 Idempotency-Key 请求头时，同一键的重试直接返回首次成功的结果
+    
     参考文档: doc/api.md - 4.2 取消订单
     """
     try:
-        core_ops = CoreOperations(db)
-        
-        # 取消订单
-        cancel_result = core_ops.cancel_order(
-            user_id=current_user.user_id,
-            order_id=order_id,
-            cancel_reason=cancel_request.cancel_reason
-        )
-        
-        if not cancel_result.get("success", True):
-            return create_error_response(cancel_result.get("message", "订单取消失败"))
+        idempotency_key = validate_idempotency_key(idempotency_key)
+        request_hash = idempotency_request_hash("cancel_order", order_id, cancel_request.cancel_reason)
+        cancel_result = None
+        if idempotency_key:
+            cancel_result = find_idempotent_result(db.conn, current_user.user_id, idempotency_key, request_hash)
+        
+        if cancel_result is None:
+            # 取消订单
+            cancel_result, replayed = await run_grouped_write(
+                db,
+                lambda writer: run_idempotent(
+                    writer, current_user.user_id, idempotency_key, request_hash,
+                    lambda: CoreOperations(writer).cancel_order(
+                        user_id=current_user.user_id,
+                        order_id=order_id,
+                        cancel_reason=cancel_request.cancel_reason
+                    )
+                )
+            )
+            
+            if not cancel_result.get("success", True):
+                return create_error_response(cancel_result.get("message", "订单取消失败"))
+            
+            if not replayed:
+                get_seat_manager().order_canceled(cancel_result["meal_id"])
         
         response_data = CancelOrderResponse(
             order_id=cancel_result["order_id"],
@@ -416,6 +518,7 @@ async def get_orders_list(
     date_end: Optional[str] = Query(None, description="结束日期"),
     page: int = Query(1, ge=1, description="页码"),
     size: int = Query(20, ge=1, le=100, description="每页大小"),
+    fields: Optional[str] = Query(None, description="返回字段，逗号分隔，如 order_id,status,amount_yuan"),
     current_user: TokenData = Depends(get_current_user),
     db: DatabaseManager = Depends(get_database)
 ):
@@ -467,6 +570,19 @@ async def get_orders_list(
         if where_clause:
             where_clause = "WHERE " + where_clause
         
+        selected = parse_fields(fields, ORDER_FIELD_COLUMNS)
+        columns = select_columns(selected, ORDER_FIELD_COLUMNS, always=("o.order_id",))
+        
+        # 只关联过滤条件和所选字段需要的表（外键保证订单的餐次和用户必然存在）
+        filter_joins = []
+        if date_start or date_end:
+            filter_joins.append("JOIN meals m ON o.meal_id = m.meal_id")
+        list_joins = list(filter_joins)
+        if not filter_joins and any(column.startswith("m.") for column in columns):
+            list_joins.append("JOIN meals m ON o.meal_id = m.meal_id")
+        if any(column.startswith("u.") for column in columns):
+            list_joins.append("JOIN users u ON o.user_id = u.user_id")
+        
         # 计算分页
         offset = (page - 1) * size
         
@@ -474,97 +590,50 @@ async def get_orders_list(
         count_query = f"""
             SELECT COUNT(*)
             FROM orders o
-            JOIN meals m ON o.meal_id = m.meal_id
-            JOIN users u ON o.user_id = u.user_id
+            {' '.join(filter_joins)}
             {where_clause}
         """
         total_count = db.conn.execute(count_query, params).fetchone()[0]
         
         # 查询订单列表
         orders_query = f"""
-            SELECT 
-                o.order_id,
-                o.user_id,
-                u.wechat_name as user_name,
-                o.meal_id,
-                m.date as meal_date,
-                m.slot as meal_slot,
-                m.description as meal_description,
-                o.amount_cents,
-                o.addon_selections,
-                o.status,
-                o.created_at,
-                o.updated_at
+            SELECT {', '.join(columns)}
             FROM orders o
-            JOIN meals m ON o.meal_id = m.meal_id
-            JOIN users u ON o.user_id = u.user_id
+            {' '.join(list_joins)}
             {where_clause}
             ORDER BY o.created_at DESC
             LIMIT ? OFFSET ?
         """
-        params.extend([size, offset])
-        
-        orders_result = db.conn.execute(orders_query, params).fetchall()
         
-        # 获取附加项详情
-        addons_query = "SELECT addon_id, name, price_cents FROM addons WHERE status = 'active'"
-        addons_result = db.conn.execute(addons_query).fetchall()
-        addons_dict = {addon[0]: {"name": addon[1], "price_cents": addon[2]} for addon in addons_result}
+        orders_result = db.conn.execute(orders_query, params + [size, offset]).fetchall()
+        
+        # 只有需要附加项详情时才查询附加项
+        addons_dict = {}
+        if selected is None or "addon_details" in selected:
+            addons_query = "SELECT addon_id, name, price_cents FROM addons WHERE status = 'active'"
+            addons_result = db.conn.execute(addons_query).fetchall()
+            addons_dict = {addon[0]: {"name": addon[1], "price_cents": addon[2]} for addon in addons_result}
+        
+        order_formatters = {
+            "order_id": lambda o: o["order_id"],
+            "user_id": lambda o: o["user_id"],
+            "user_name": lambda o: o["user_name"],
+            "meal_id": lambda o: o["meal_id"],
+            "meal_date": lambda o: o["meal_date"],
+            "meal_slot": lambda o: o["meal_slot"],
+            "meal_slot_text": lambda o: SLOT_TEXT.get(o["meal_slot"], o["meal_slot"]),
+            "meal_description": lambda o: o["meal_description"],
+            "amount_yuan": lambda o: o["amount_cents"] / 100.0,
+            "addon_selections": lambda o: json.loads(o["addon_selections"]) if o["addon_selections"] else {},
+            "addon_details": lambda o: _format_addon_details(o["addon_selections"], addons_dict),
+            "status": lambda o: o["status"],
+            "status_text": lambda o: ORDER_STATUS_TEXT.get(o["status"], o["status"]),
+            "created_at": lambda o: o["created_at"],
+            "updated_at": lambda o: o["updated_at"]
+        }
         
         # 格式化订单数据
-        formatted_orders = []
-        for order in orders_result:
-            # 解析附加项选择
-            addon_details = []
-            if order[8]:  # addon_selections
-                import json
-                try:
-                    addon_selections = json.loads(order[8])
-                    for addon_id_str, quantity in addon_selections.items():
-                        addon_id = int(addon_id_str)
-                        if addon_id in addons_dict and quantity > 0:
-                            addon_info = addons_dict[addon_id]
-                            addon_details.append({
-                                "addon_id": addon_id,
-                                "name": addon_info["name"],
-                                "price_yuan": addon_info["price_cents"] / 100.0,
-                                "quantity": quantity,
-                                "total_yuan": (addon_info["price_cents"] * quantity) / 100.0
-                            })
-                except (json.JSONDecodeError, ValueError, TypeError):
-                    pass
-            
-            # 状态文本映射
-            status_text_map = {
-                "active": "有效",
-                "completed": "已完成", 
-                "canceled": "已取消"
-            }
-            
-            # 餐次时段文本映射
-            slot_text_map = {
-                "lunch": "午餐",
-                "dinner": "晚餐"
-            }
-            
-            formatted_order = {
-                "order_id": order[0],
-                "user_id": order[1],
-                "user_name": order[2],
-                "meal_id": order[3],
-                "meal_date": order[4],
-                "meal_slot": order[5],
-                "meal_slot_text": slot_text_map.get(order[5], order[5]),
-                "meal_description": order[6],
-                "amount_yuan": order[7] / 100.0,
-                "addon_selections": json.loads(order[8]) if order[8] else {},
-                "addon_details": addon_details,
-                "status": order[9],
-                "status_text": status_text_map.get(order[9], order[9]),
-                "created_at": order[10],
-                "updated_at": order[11]
-            }
-            formatted_orders.append(formatted_order)
+        formatted_orders = [build_record(order, order_formatters, selected) for order in orders_result]
         
         # 构建统计信息
         stats_query = f"""
@@ -575,12 +644,10 @@ async def get_orders_list(
                 COALESCE(SUM(o.amount_cents), 0) as total_amount_cents,
                 COALESCE(SUM(CASE WHEN o.status = 'active' THEN o.amount_cents ELSE 0 END), 0) as active_amount_cents
             FROM orders o
-            JOIN meals m ON o.meal_id = m.meal_id
-            JOIN users u ON o.user_id = u.user_id
-            {where_clause.replace('LIMIT ? OFFSET ?', '') if 'LIMIT' not in where_clause else where_clause}
+            {' '.join(filter_joins)}
+            {where_clause}
         """
-        stats_params = params[:-2] if len(params) >= 2 else params  # 移除LIMIT和OFFSET参数
-        stats_result = db.conn.execute(stats_query, stats_params).fetchone()
+        stats_result = db.conn.execute(stats_query, params).fetchone()
         
         statistics = {
             "total_orders": stats_result[0] if stats_result else 0,
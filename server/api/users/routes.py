@@ -3,7 +3,7 @@
 
 import logging
 from typing import Dict, Any, Optional
-from fastapi import APIRouter, HTTPException, Depends, Query
+from fastapi import APIRouter, HTTPException, Depends, Query, Path
 
 from .models import UserProfileResponse, LedgerResponse, OrderStatistics, TransactionStatistics
 from api.auth.routes import get_current_user, get_database
@@ -11,11 +11,50 @@ from api.auth.models import TokenData
 from db.manager import DatabaseManager
 from db.supporting_operations import SupportingOperations
 from db.query_operations import QueryOperations
+from db.statements import get_user_statement
+from utils.fields import parse_fields, expand_fields, build_record
 from utils.response import create_success_response, create_error_response, create_pagination_response
 
 logger = logging.getLogger(__name__)
 router = APIRouter(prefix="/api/users", tags=["用户"])
 
+LEDGER_TYPE_TEXT = {
+    "recharge": "充值",
+    "order": "订餐",
+    "refund": "退款",
+    "adjustment": "调整"
+}
+
+LEDGER_DIRECTION_TEXT = {
+    "in": "收入",
+    "out": "支出"
+}
+
+# 账单记录输出字段格式化
+LEDGER_RECORD_FORMATTERS = {
+    "ledger_id": lambda r: r["ledger_id"],
+    "transaction_no": lambda r: r["transaction_no"],
+    "type": lambda r: r["type"],
+    "type_text": lambda r: LEDGER_TYPE_TEXT.get(r["type"], r["type"]),
+    "direction": lambda r: r["direction"],
+    "direction_text": lambda r: LEDGER_DIRECTION_TEXT.get(r["direction"], r["direction"]),
+    "amount_yuan": lambda r: r["amount_yuan"],
+    "balance_before_yuan": lambda r: r["balance_before_yuan"],
+    "balance_after_yuan": lambda r: r["balance_after_yuan"],
+    # 格式化余额变化显示
+    "balance_change": lambda r: f"+{r['amount_yuan']:.2f}" if r["direction"] == "in" else f"-{r['amount_yuan']:.2f}",
+    "description": lambda r: r.get("description"),
+    "created_at": lambda r: r["created_at"],
+    "related_order": lambda r: r.get("related_order")
+}
+
+# 路由派生字段 -> 查询层字段
+LEDGER_FIELD_SOURCES = {
+    "type_text": ("type",),
+    "direction_text": ("direction",),
+    "balance_change": ("direction", "amount_yuan"),
+}
+
 
 @router.get("/profile", response_model=Dict[str, Any])
 async def get_user_profile(
@@ -83,6 +122,7 @@ async def get_user_profile(
 async def get_user_ledger(
     offset: int = Query(0, ge=0, description="偏移量"),
     limit: int = Query(50, ge=1, le=200, description="每页条数"),
+    fields: Optional[str] = Query(None, description="返回字段，逗号分隔，未包含related_order时不查询关联订单"),
     current_user: TokenData = Depends(get_current_user),
     db: DatabaseManager = Depends(get_database)
 ):
@@ -100,11 +140,14 @@ async def get_user_ledger(
         if not user_info:
             return create_error_response("用户不存在")
         
-        # 获取账本历史
+        selected = parse_fields(fields, LEDGER_RECORD_FORMATTERS)
+        
+        # 获取账本历史，只查询所选字段依赖的列和关联表
         ledger_result = query_ops.query_user_ledger_history(
             user_id=current_user.user_id,
             offset=offset,
-            limit=limit
+            limit=limit,
+            fields=expand_fields(selected, LEDGER_FIELD_SOURCES)
         )
         
         if not ledger_result["success"]:
@@ -113,40 +156,10 @@ async def get_user_ledger(
         ledger_data = ledger_result["data"]
         
         # 格式化账本记录
-        formatted_records = []
-        for record in ledger_data["ledger_records"]:
-            # 格式化余额变化显示
-            balance_change = f"+{record['amount_yuan']:.2f}" if record['direction'] == 'in' else f"-{record['amount_yuan']:.2f}"
-            
-            # 类型文本映射
-            type_text_map = {
-                "recharge": "充值",
-                "order": "订餐",
-                "refund": "退款",
-                "adjustment": "调整"
-            }
-            
-            direction_text_map = {
-                "in": "收入",
-                "out": "支出"
-            }
-            
-            formatted_record = {
-                "ledger_id": record["ledger_id"],
-                "transaction_no": record["transaction_no"],
-                "type": record["type"],
-                "type_text": type_text_map.get(record["type"], record["type"]),
-                "direction": record["direction"],
-                "direction_text": direction_text_map.get(record["direction"], record["direction"]),
-                "amount_yuan": record["amount_yuan"],
-                "balance_before_yuan": record["balance_before_yuan"],
-                "balance_after_yuan": record["balance_after_yuan"],
-                "balance_change": balance_change,
-                "description": record.get("description"),
-                "created_at": record["created_at"],
-                "related_order": record.get("related_order")
-            }
-            formatted_records.append(formatted_record)
+        formatted_records = [
+            build_record(record, LEDGER_RECORD_FORMATTERS, selected)
+            for record in ledger_data["ledger_records"]
+        ]
         
         # 构建响应数据
         response_data = {
@@ -169,6 +182,55 @@ async def get_user_ledger(
         return create_error_response(f"获取账单历史失败: {str(e)}")
 
 
+@router.get("/statements/{month}", response_model=Dict[str, Any])
+async def get_user_statement_by_month(
+    month: str = Path(..., pattern=r"^\d{4}-\d{2}$", description="账单月份 YYYY-MM"),
+    current_user: TokenData = Depends(get_current_user),
+    db: DatabaseManager = Depends(get_database)
+):
+    """
+    获取用户月度账单（每月初批量生成，单行读取）
+    
+    参考文档: doc/api.md - 2.3 获取月度账单
+    """
+    try:
+        statement = get_user_statement(db.conn, current_user.user_id, month)
+        if statement is None:
+            return create_error_response(f"{month} 账单尚未生成")
+        
+        response_data = {
+            "month": statement["month"],
+            "opening_balance_yuan": statement["opening_balance_cents"] / 100.0,
+            "closing_balance_yuan": statement["closing_balance_cents"] / 100.0,
+            "total_in_yuan": statement["total_in_cents"] / 100.0,
+            "total_out_yuan": statement["total_out_cents"] / 100.0,
+            "entry_count": statement["entry_count"],
+            "entries": [{
+                "ledger_id": entry["ledger_id"],
+                "type": entry["type"],
+                "type_text": LEDGER_TYPE_TEXT.get(entry["type"], entry["type"]),
+                "direction": entry["direction"],
+                "amount_yuan": entry["amount_cents"] / 100.0,
+                "balance_after_yuan": entry["balance_after_cents"] / 100.0,
+                "order_id": entry["order_id"],
+                "description": entry["description"],
+                "created_at": entry["created_at"]
+            } for entry in statement["entries"]],
+            "generated_at": statement["generated_at"]
+        }
+        
+        return create_success_response(
+            data=response_data,
+            message="月度账单查询成功"
+        )
+        
+    except ValueError as e:
+        return create_error_response(str(e))
+    except Exception as e:
+        logger.error(f"获取月度账单失败: {str(e)}")
+        return create_error_response(f"获取月度账单失败: {str(e)}")
+
+
 @router.get("/orders", response_model=Dict[str, Any])
 async def get_user_orders(
     offset: int = Query(0, ge=0, description="偏移量"),
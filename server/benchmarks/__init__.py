@@ -0,0 +1,2 @@
+# 微基准测试：在不同规模的模拟数据上计时核心业务操作和查询操作
+# 用法见 benchmarks/run.py
@@ -0,0 +1,198 @@
+# 基准测试用例
+# 覆盖下单、取消订单、不同订单数的整餐取消、日历查询、深分页账本查询、餐次统计和订单列表。
+# 写操作在专用的基准餐次上执行（远期日期，不与模拟数据冲突），准备步骤（发布餐次、预先下单）不计时。
+
+import asyncio
+import json
+from datetime import date, timedelta
+from typing import Any, Dict, List
+
+from api.admin.routes import get_meal_statistics
+from api.auth.models import TokenData
+from api.orders.routes import get_orders_list
+from benchmarks.datasets import DATASET_END_DATE
+from benchmarks.harness import BenchmarkCase
+from db.core_operations import CoreOperations
+from db.manager import DatabaseManager
+from db.query_operations import QueryOperations
+
+ADMIN_USER_ID = 1
+CANCEL_MEAL_SIZES = (10, 50, 200)
+CANCEL_MEAL_REPEAT = 10
+LEDGER_PAGE_SIZE = 200
+BENCH_MEAL_START = date(2099, 1, 1)       # 基准餐次从该日期起逐日发布
+
+
+class BenchmarkContext:
+    """一个数据集副本上的用例共享状态"""
+
+    def __init__(self, db: DatabaseManager):
+        self.db = db
+        self.core = CoreOperations(db)
+        self.query = QueryOperations(db)
+        self.loop = asyncio.new_event_loop()
+        self.admin_token = TokenData(user_id=ADMIN_USER_ID, open_id="admin_openid_mock", is_admin=True)
+        self.addon_id = db.conn.execute(
+            "SELECT addon_id FROM addons WHERE status = 'active' ORDER BY addon_id LIMIT 1"
+        ).fetchone()[0]
+        self.users = self._ensure_users(max(CANCEL_MEAL_SIZES))
+        self._next_meal_day = 0
+
+    def close(self):
+        self.loop.close()
+
+    def _ensure_users(self, count: int) -> List[int]:
+        """至少 count 个有效的普通用户，不足时补充基准用户"""
+        users = [row[0] for row in self.db.conn.execute(
+            "SELECT user_id FROM users WHERE status = 'active' AND is_admin = FALSE ORDER BY user_id"
+        ).fetchall()]
+        if len(users) < count:
+            next_id = self.db.conn.execute("SELECT MAX(user_id) + 1 FROM users").fetchone()[0]
+            added = list(range(next_id, next_id + count - len(users)))
+
+            def add_users():
+                self.db.conn.executemany("""
+                    INSERT INTO users (user_id, open_id, wechat_name, balance_cents, is_admin, status)
+                    VALUES (?, ?, ?, 100000, FALSE, 'active')
+                """, [(user_id, f"bench_openid_{user_id}", f"基准用户{user_id}") for user_id in added])
+
+            self.db.execute_transaction([add_users])
+            users += added
+        return users
+
+    def publish_meal(self, max_orders: int) -> int:
+        """发布一个基准餐次（每次使用新的日期）"""
+        meal_date = BENCH_MEAL_START + timedelta(days=self._next_meal_day)
+        self._next_meal_day += 1
+        return self.core.admin_publish_meal(
+            ADMIN_USER_ID, meal_date.isoformat(), "lunch", "基准测试餐次", 1500,
+            {self.addon_id: 2}, max_orders=max_orders
+        )["meal_id"]
+
+    def run_route(self, coroutine) -> Any:
+        return self.loop.run_until_complete(coroutine)
+
+
+def _check_success(result):
+    if isinstance(result, dict):
+        if not result.get("success", True):
+            raise AssertionError(f"基准用例执行失败: {result}")
+        return
+    body = json.loads(result.body)
+    if result.status_code != 200 or not body.get("success"):
+        raise AssertionError(f"基准用例执行失败: {body}")
+
+
+def _order_cases(ctx: BenchmarkContext) -> List[BenchmarkCase]:
+    # 每个用户在一个餐次上只能有一个订单（含已取消），用户轮完后发布新的基准餐次
+    state: Dict[str, Any] = {"meal_id": None, "index": len(ctx.users)}
+
+    def next_slot():
+        if state["index"] >= len(ctx.users):
+            state["meal_id"] = ctx.publish_meal(max_orders=len(ctx.users))
+            state["index"] = 0
+        user_id = ctx.users[state["index"]]
+        state["index"] += 1
+        return user_id, state["meal_id"]
+
+    def create(slot):
+        user_id, meal_id = slot
+        return ctx.core.create_order(user_id, meal_id, {ctx.addon_id: 1})
+
+    def cancel_setup():
+        user_id, meal_id = next_slot()
+        return user_id, ctx.core.create_order(user_id, meal_id, {ctx.addon_id: 1})["order_id"]
+
+    def cancel(order):
+        return ctx.core.cancel_order(*order)
+
+    return [
+        BenchmarkCase("create_order", create, setup=next_slot),
+        BenchmarkCase("cancel_order", cancel, setup=cancel_setup),
+    ]
+
+
+def _cancel_meal_cases(ctx: BenchmarkContext) -> List[BenchmarkCase]:
+    cases = []
+    for size in CANCEL_MEAL_SIZES:
+        def setup(size=size):
+            meal_id = ctx.publish_meal(max_orders=size)
+            for user_id in ctx.users[:size]:
+                ctx.core.create_order(user_id, meal_id, {})
+            return meal_id
+
+        def run(meal_id):
+            return ctx.core.admin_cancel_meal(ADMIN_USER_ID, meal_id, "基准测试")
+
+        cases.append(BenchmarkCase(f"admin_cancel_meal[orders={size}]", run, setup=setup,
+                                   repeat=CANCEL_MEAL_REPEAT, params={"orders": size}))
+    return cases
+
+
+def _query_cases(ctx: BenchmarkContext) -> List[BenchmarkCase]:
+    cases = []
+    conn = ctx.db.conn
+
+    # 日历查询：结束日期前后各一周（小程序首页），以及一个季度
+    for label, before, after in (("2w", 7, 7), ("90d", 90, 0)):
+        start = (DATASET_END_DATE - timedelta(days=before)).isoformat()
+        end = (DATASET_END_DATE + timedelta(days=after)).isoformat()
+        cases.append(BenchmarkCase(
+            f"query_meals_by_date_range[{label}]",
+            lambda _, start=start, end=end: ctx.query.query_meals_by_date_range(start, end),
+            check=_check_success, params={"start_date": start, "end_date": end}
+        ))
+
+    # 账本记录最多的用户，从第一页翻到最后一页
+    user_id, ledger_count = conn.execute("""
+        SELECT user_id, COUNT(*) AS ledger_count FROM ledger
+        GROUP BY user_id ORDER BY ledger_count DESC, user_id LIMIT 1
+    """).fetchone()
+    offsets = {"first": 0, "middle": ledger_count // 2, "last": max(ledger_count - LEDGER_PAGE_SIZE, 0)}
+    for label, offset in offsets.items():
+        cases.append(BenchmarkCase(
+            f"query_user_ledger_history[offset={label}]",
+            lambda _, offset=offset: ctx.query.query_user_ledger_history(user_id, offset=offset,
+                                                                         limit=LEDGER_PAGE_SIZE),
+            check=_check_success,
+            params={"user_id": user_id, "offset": offset, "ledger_count": ledger_count}
+        ))
+
+    # 订单最多的餐次
+    meal_id, order_count = conn.execute("""
+        SELECT meal_id, COUNT(*) AS order_count FROM orders
+        GROUP BY meal_id ORDER BY order_count DESC, meal_id LIMIT 1
+    """).fetchone()
+    cases.append(BenchmarkCase(
+        "get_meal_statistics",
+        lambda _: ctx.run_route(get_meal_statistics(meal_id=meal_id, current_admin=ctx.admin_token, db=ctx.db)),
+        check=_check_success, params={"meal_id": meal_id, "orders": order_count}
+    ))
+
+    # 订单最多的用户的订单列表：第一页，以及按最近一个月筛选
+    order_user_id = conn.execute("""
+        SELECT user_id FROM orders GROUP BY user_id ORDER BY COUNT(*) DESC, user_id LIMIT 1
+    """).fetchone()[0]
+    order_user = TokenData(user_id=order_user_id, open_id=f"seed_openid_{order_user_id}")
+    month_start = (DATASET_END_DATE - timedelta(days=30)).isoformat()
+    for label, date_start, date_end in (("first_page", None, None),
+                                         ("last_30d", month_start, DATASET_END_DATE.isoformat())):
+        cases.append(BenchmarkCase(
+            f"get_orders_list[{label}]",
+            lambda _, date_start=date_start, date_end=date_end: ctx.run_route(get_orders_list(
+                meal_id=None, user_id=None, status=None, date_start=date_start, date_end=date_end,
+                page=1, size=20, fields=None, current_user=order_user, db=ctx.db
+            )),
+            check=_check_success,
+            params={"user_id": order_user_id, "date_start": date_start, "date_end": date_end}
+        ))
+    return cases
+
+
+def build_cases(ctx: BenchmarkContext) -> List[BenchmarkCase]:
+    """
+    所有基准用例
+
+    查询用例在写操作用例之前执行，写操作产生的数据不影响查询计时
+    """
+    return _query_cases(ctx) + _order_cases(ctx) + _cancel_meal_cases(ctx)
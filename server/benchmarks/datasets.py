@@ -0,0 +1,89 @@
+# 基准测试数据集
+# 每个规模的模拟数据只生成一次，缓存为数据库文件（与 scripts/seed_data.py 生成的一致）；
+# 每次运行从缓存复制一份（磁盘）或通过 SQLite 在线备份载入内存（内存），基准测试的写操作不影响缓存。
+
+import os
+import shutil
+import sqlite3
+from datetime import date
+
+from db.manager import DatabaseManager
+from db.seed_data import DEFAULT_SEED, get_scale, seed_database
+from db.schema_migrations import apply_migrations, load_migrations
+from scripts.init_db import create_tables
+
+STORAGES = ("memory", "disk")
+DATASET_END_DATE = date(2030, 6, 28)      # 固定结束日期，缓存的数据集与运行日期无关
+DATASET_VERSION = 1                        # 数据生成逻辑变化时递增，使旧缓存失效
+DEFAULT_CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cache")
+
+
+def dataset_path(cache_dir: str, scale_name: str, seed: int = DEFAULT_SEED, end_date: date = DATASET_END_DATE) -> str:
+    # 文件名包含最新的结构迁移版本，新增迁移（如索引）后重新生成
+    schema_version = load_migrations()[-1].version
+    return os.path.join(
+        cache_dir, f"seed_v{DATASET_VERSION}_schema{schema_version}_{scale_name}_{seed}_{end_date.isoformat()}.db"
+    )
+
+
+def prepare_dataset(scale_name: str, seed: int = DEFAULT_SEED, cache_dir: str = DEFAULT_CACHE_DIR,
+                    end_date: date = DATASET_END_DATE) -> str:
+    """
+    获取某个规模的模拟数据库文件，缓存中没有时生成
+
+    Args:
+        end_date: 模拟历史的最后一天（压测使用当天，使日历查询落在模拟数据上）
+
+    Returns:
+        缓存的数据库文件路径（只读使用）
+    """
+    path = dataset_path(cache_dir, scale_name, seed, end_date)
+    if os.path.exists(path):
+        return path
+
+    os.makedirs(cache_dir, exist_ok=True)
+    temp_path = path + ".tmp"
+    for suffix in ("", "-wal", "-shm"):
+        if os.path.exists(temp_path + suffix):
+            os.remove(temp_path + suffix)
+
+    with DatabaseManager(temp_path) as db_manager:
+        create_tables(db_manager)
+        seed_database(db_manager, get_scale(scale_name), end_date, seed=seed)
+        apply_migrations(db_manager)
+        db_manager.conn.execute("PRAGMA optimize")
+    os.replace(temp_path, path)
+    return path
+
+
+def open_dataset(source_path: str, storage: str, work_dir: str) -> DatabaseManager:
+    """
+    打开数据集的一份可写副本
+
+    Args:
+        source_path: prepare_dataset 返回的缓存文件
+        storage: memory（载入内存数据库）或 disk（复制到 work_dir）
+        work_dir: 磁盘副本所在目录
+
+    Raises:
+        ValueError: 不支持的存储类型
+    """
+    if storage == "memory":
+        db_manager = DatabaseManager(":memory:", auto_connect=True)
+        source = sqlite3.connect(source_path)
+        try:
+            source.backup(db_manager.conn)
+        finally:
+            source.close()
+        return db_manager
+
+    if storage == "disk":
+        os.makedirs(work_dir, exist_ok=True)
+        target = os.path.join(work_dir, os.path.basename(source_path))
+        for suffix in ("-wal", "-shm"):
+            if os.path.exists(target + suffix):
+                os.remove(target + suffix)
+        shutil.copyfile(source_path, target)
+        return DatabaseManager(target, auto_connect=True)
+
+    raise ValueError(f"不支持的存储类型: {storage}，可选: {', '.join(STORAGES)}")
@@ -0,0 +1,185 @@
+# 基准测试计时与结果比较
+# 每个用例先预热若干次，再逐次计时（每次调用前可执行不计时的准备步骤），
+# 汇总为最小值、中位数、p95 等统计量；与保存的基线按中位数比较，超过阈值的标记为性能回退。
+
+import json
+import os
+import platform
+import statistics
+import sqlite3
+import time
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional
+
+DEFAULT_REPEAT = 30
+DEFAULT_WARMUP = 3
+DEFAULT_THRESHOLD = 0.25        # 中位数比基线慢超过该比例视为回退
+DEFAULT_MIN_DELTA_MS = 0.05     # 中位数差值小于该毫秒数时忽略（计时噪声）
+RESULTS_FORMAT_VERSION = 1
+
+
+@dataclass
+class BenchmarkCase:
+    """
+    基准测试用例
+
+    run 接收 setup 的返回值（无 setup 时为 None），只对 run 计时；
+    check 在预热时校验 run 的返回值，避免计时的是失败路径；
+    repeat 为该用例计时次数的上限（准备步骤很慢的用例）
+    """
+    name: str
+    run: Callable[[Any], Any]
+    setup: Optional[Callable[[], Any]] = None
+    check: Optional[Callable[[Any], None]] = None
+    repeat: Optional[int] = None
+    params: Dict[str, Any] = field(default_factory=dict)
+
+
+def percentile(sorted_values: List[float], fraction: float) -> float:
+    """线性插值百分位数（sorted_values 已升序）"""
+    if len(sorted_values) == 1:
+        return sorted_values[0]
+    position = (len(sorted_values) - 1) * fraction
+    lower = int(position)
+    upper = min(lower + 1, len(sorted_values) - 1)
+    return sorted_values[lower] + (sorted_values[upper] - sorted_values[lower]) * (position - lower)
+
+
+def summarize(samples_ms: List[float]) -> Dict[str, float]:
+    """计时样本（毫秒）的统计汇总"""
+    values = sorted(samples_ms)
+    median = statistics.median(values)
+    return {
+        "n": len(values),
+        "min_ms": round(values[0], 4),
+        "max_ms": round(values[-1], 4),
+        "mean_ms": round(statistics.fmean(values), 4),
+        "median_ms": round(median, 4),
+        "stdev_ms": round(statistics.stdev(values), 4) if len(values) > 1 else 0.0,
+        "p25_ms": round(percentile(values, 0.25), 4),
+        "p75_ms": round(percentile(values, 0.75), 4),
+        "p95_ms": round(percentile(values, 0.95), 4),
+        "ops_per_sec": round(1000 / median, 1) if median > 0 else None,
+    }
+
+
+def run_case(case: BenchmarkCase, repeat: int = DEFAULT_REPEAT, warmup: int = DEFAULT_WARMUP) -> Dict[str, Any]:
+    """
+    执行一个用例
+
+    Returns:
+        {"name", "params", "stats", "samples_ms"}
+    """
+    iterations = min(case.repeat, repeat) if case.repeat else repeat
+    for index in range(warmup):
+        result = case.run(case.setup() if case.setup else None)
+        if index == 0 and case.check:
+            case.check(result)
+
+    samples = []
+    for _ in range(iterations):
+        argument = case.setup() if case.setup else None
+        started = time.perf_counter_ns()
+        case.run(argument)
+        samples.append((time.perf_counter_ns() - started) / 1e6)
+
+    return {
+        "name": case.name,
+        "params": case.params,
+        "stats": summarize(samples),
+        "samples_ms": [round(sample, 4) for sample in samples],
+    }
+
+
+def environment_info() -> Dict[str, Any]:
+    """结果文件中记录的运行环境（只有相同环境下的结果才有可比性）"""
+    return {
+        "python": platform.python_version(),
+        "sqlite": sqlite3.sqlite_version,
+        "platform": platform.platform(),
+        "machine": platform.machine(),
+        "cpu_count": os.cpu_count(),
+    }
+
+
+def result_key(result: Dict[str, Any]) -> str:
+    """结果在基线中的匹配键：规模/存储/用例名"""
+    return f"{result['scale']}/{result['storage']}/{result['name']}"
+
+
+def build_results(results: List[Dict[str, Any]], options: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        "version": RESULTS_FORMAT_VERSION,
+        "created_at": datetime.now().isoformat(timespec="seconds"),
+        "environment": environment_info(),
+        "options": options,
+        "results": results,
+    }
+
+
+def save_results(data: Dict[str, Any], path: str):
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    temp_path = path + ".tmp"
+    with open(temp_path, "w", encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False, indent=2)
+    os.replace(temp_path, path)
+
+
+def load_results(path: str) -> Dict[str, Any]:
+    """
+    读取结果文件
+
+    Raises:
+        ValueError: 文件格式版本不兼容
+    """
+    with open(path, encoding="utf-8") as f:
+        data = json.load(f)
+    if data.get("version") != RESULTS_FORMAT_VERSION:
+        raise ValueError(f"结果文件版本不兼容: {path}")
+    return data
+
+
+def compare_results(current: Dict[str, Any], baseline: Dict[str, Any], threshold: float = DEFAULT_THRESHOLD,
+                    min_delta_ms: float = DEFAULT_MIN_DELTA_MS) -> List[Dict[str, Any]]:
+    """
+    与基线按中位数比较
+
+    中位数变慢超过 threshold 且差值超过 min_delta_ms 时为 regression，
+    变快超过 threshold 且差值超过 min_delta_ms 时为 improvement；基线中没有的用例为 new
+
+    Returns:
+        [{"key", "status", "baseline_median_ms", "current_median_ms", "ratio"}]
+    """
+    baseline_medians = {result_key(result): result["stats"]["median_ms"] for result in baseline["results"]}
+    comparisons = []
+    for result in current["results"]:
+        key = result_key(result)
+        median = result["stats"]["median_ms"]
+        base = baseline_medians.get(key)
+        if base is None:
+            comparisons.append({"key": key, "status": "new", "baseline_median_ms": None,
+                                "current_median_ms": median, "ratio": None})
+            continue
+
+        ratio = median / base if base > 0 else None
+        status = "ok"
+        if abs(median - base) >= min_delta_ms and ratio is not None:
+            if ratio > 1 + threshold:
+                status = "regression"
+            elif ratio < 1 / (1 + threshold):
+                status = "improvement"
+        comparisons.append({"key": key, "status": status, "baseline_median_ms": base,
+                            "current_median_ms": median, "ratio": round(ratio, 3) if ratio is not None else None})
+    return comparisons
+
+
+def format_comparison(comparisons: List[Dict[str, Any]]) -> str:
+    """比较结果的文本表格"""
+    lines = [f"{'用例':<72} {'基线(ms)':>10} {'当前(ms)':>10} {'比例':>7}  状态"]
+    for item in comparisons:
+        base = f"{item['baseline_median_ms']:.3f}" if item["baseline_median_ms"] is not None else "-"
+        ratio = f"{item['ratio']:.2f}x" if item["ratio"] is not None else "-"
+        lines.append(f"{item['key']:<72} {base:>10} {item['current_median_ms']:>10.3f} {ratio:>7}  {item['status']}")
+    return "\n".join(lines)
@@ -0,0 +1,228 @@
+# HTTP 压测基础组件
+# 记录每个请求的路由、耗时和结果分类，汇总为吞吐量、各路由 p50/p95/p99、错误率和约束冲突率；
+# 锁等待探针在独立线程中定期对数据库文件执行 BEGIN IMMEDIATE，测量此刻获取写锁需要等待的时间。
+
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional
+
+import httpx
+
+from benchmarks.harness import percentile
+
+# 业务规则拒绝（名额已满、餐次已锁定、重复下单等）：高并发下的正常结果，不计为错误
+REJECTION_MARKERS = (
+    "餐次已满", "下单人数过多", "排队超时", "无法订餐", "已有该餐次的有效订单", "无法取消订单", "订单状态为",
+)
+CONSTRAINT_MARKERS = ("constraint failed",)
+LOCKED_MARKERS = ("database is locked", "database table is locked")
+
+OUTCOMES = ("ok", "rejected", "constraint_violation", "db_locked", "error")
+
+
+def classify(status_code: Optional[int], body: Any) -> str:
+    """
+    请求结果分类
+
+    Returns:
+        ok / rejected（业务拒绝）/ constraint_violation（数据库约束冲突）/ db_locked（等待写锁超时）/ error
+    """
+    if status_code is None:
+        return "error"
+    message = ""
+    if isinstance(body, dict):
+        if body.get("success", True) and status_code < 400:
+            return "ok"
+        message = str(body.get("error") or body.get("message") or body.get("detail") or "")
+    elif status_code < 400:
+        return "ok"
+
+    if any(marker in message for marker in LOCKED_MARKERS):
+        return "db_locked"
+    if any(marker in message for marker in CONSTRAINT_MARKERS):
+        return "constraint_violation"
+    if status_code < 400 and any(marker in message for marker in REJECTION_MARKERS):
+        return "rejected"
+    return "error"
+
+
+@dataclass
+class RequestRecord:
+    route: str
+    outcome: str
+    latency_ms: float
+    status_code: Optional[int]
+    message: str = ""
+
+
+class RequestRecorder:
+    """按发出顺序记录请求结果"""
+
+    def __init__(self):
+        self.records: List[RequestRecord] = []
+
+    async def request(self, client: httpx.AsyncClient, route: str, method: str, url: str, **kwargs) -> Any:
+        """
+        发出请求并记录
+
+        Args:
+            route: 统计用的路由名（路径参数用模板表示，如 DELETE /api/orders/{order_id}）
+
+        Returns:
+            响应JSON；请求失败或响应不是JSON时为 None
+        """
+        started = time.perf_counter()
+        status_code, body, message = None, None, ""
+        try:
+            response = await client.request(method, url, **kwargs)
+            status_code = response.status_code
+            try:
+                body = response.json()
+            except ValueError:
+                body = None
+        except httpx.HTTPError as e:
+            message = f"{type(e).__name__}: {e}"
+        latency_ms = (time.perf_counter() - started) * 1000
+
+        outcome = classify(status_code, body)
+        if outcome != "ok" and isinstance(body, dict):
+            message = str(body.get("error") or body.get("detail") or "")
+        self.records.append(RequestRecord(route, outcome, latency_ms, status_code, message[:200]))
+        return body if outcome == "ok" else None
+
+
+class LockProbe:
+    """
+    写锁等待探针
+
+    每隔 interval 秒用独立连接执行 BEGIN IMMEDIATE 并立即回滚，记录获取写锁的耗时；
+    busy_timeout 内未获取到时记为超时。探针持锁时间只有几微秒，对被测服务的影响可以忽略
+    """
+
+    def __init__(self, db_path: str, interval: float = 0.05, timeout: float = 5.0):
+        self.db_path = db_path
+        self.interval = interval
+        self.timeout = timeout
+        self.waits_ms: List[float] = []
+        self.timeouts = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="lock-probe", daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self):
+        conn = sqlite3.connect(self.db_path, timeout=self.timeout, isolation_level=None)
+        try:
+            while not self._stop.wait(self.interval):
+                started = time.perf_counter()
+                try:
+                    conn.execute("BEGIN IMMEDIATE")
+                except sqlite3.OperationalError:
+                    self.timeouts += 1
+                    continue
+                self.waits_ms.append((time.perf_counter() - started) * 1000)
+                conn.execute("ROLLBACK")
+        finally:
+            conn.close()
+
+    def summary(self, contended_ms: float = 1.0) -> Dict[str, Any]:
+        """等待时间汇总；超过 contended_ms 的探测视为遇到锁竞争"""
+        waits = sorted(self.waits_ms)
+        summary = {"probes": len(waits) + self.timeouts, "timeouts": self.timeouts,
+                   "contended": sum(1 for wait in waits if wait > contended_ms)}
+        if waits:
+            summary.update({
+                "p50_ms": round(percentile(waits, 0.50), 3),
+                "p95_ms": round(percentile(waits, 0.95), 3),
+                "p99_ms": round(percentile(waits, 0.99), 3),
+                "max_ms": round(waits[-1], 3),
+            })
+        return summary
+
+
+def summarize_records(records: List[RequestRecord], elapsed: float) -> Dict[str, Any]:
+    """
+    请求记录汇总
+
+    Returns:
+        {"total": {...}, "routes": {route: {...}}}，每项包含请求数、吞吐量、各类结果数和比例、延迟百分位数
+    """
+    def describe(items: List[RequestRecord]) -> Dict[str, Any]:
+        latencies = sorted(item.latency_ms for item in items)
+        counts = {outcome: 0 for outcome in OUTCOMES}
+        for item in items:
+            counts[item.outcome] += 1
+        count = len(items)
+        description = {
+            "requests": count,
+            "throughput_rps": round(count / elapsed, 1) if elapsed > 0 else None,
+            **counts,
+            "error_rate": round((counts["error"] + counts["db_locked"]) / count, 4) if count else 0.0,
+            "constraint_violation_rate": round(counts["constraint_violation"] / count, 4) if count else 0.0,
+            "rejection_rate": round(counts["rejected"] / count, 4) if count else 0.0,
+        }
+        if latencies:
+            description.update({
+                "p50_ms": round(percentile(latencies, 0.50), 2),
+                "p95_ms": round(percentile(latencies, 0.95), 2),
+                "p99_ms": round(percentile(latencies, 0.99), 2),
+                "max_ms": round(latencies[-1], 2),
+            })
+        return description
+
+    routes: Dict[str, List[RequestRecord]] = {}
+    for record in records:
+        routes.setdefault(record.route, []).append(record)
+
+    errors: Dict[str, int] = {}
+    for record in records:
+        if record.outcome in ("error", "db_locked", "constraint_violation"):
+            key = f"{record.route}: {record.status_code} {record.message}"
+            errors[key] = errors.get(key, 0) + 1
+
+    return {
+        "elapsed_s": round(elapsed, 2),
+        "total": describe(records),
+        "routes": {route: describe(items) for route, items in sorted(routes.items())},
+        "top_errors": dict(sorted(errors.items(), key=lambda item: -item[1])[:10]),
+    }
+
+
+def format_report(report: Dict[str, Any]) -> str:
+    """压测报告的文本表格"""
+    lines = []
+    requests = report["requests"]
+    total = requests["total"]
+    lines.append(
+        f"总请求 {total['requests']}，耗时 {requests['elapsed_s']}s，吞吐量 {total['throughput_rps']} req/s，"
+        f"错误率 {total['error_rate']:.2%}，约束冲突率 {total['constraint_violation_rate']:.2%}，"
+        f"业务拒绝率 {total['rejection_rate']:.2%}"
+    )
+    lines.append(f"{'路由':<40} {'请求':>6} {'rps':>7} {'p50':>8} {'p95':>8} {'p99':>8} {'成功':>6} "
+                 f"{'拒绝':>6} {'冲突':>5} {'锁超时':>5} {'错误':>5}")
+    for route, item in requests["routes"].items():
+        lines.append(
+            f"{route:<40} {item['requests']:>6} {item['throughput_rps']:>7} {item.get('p50_ms', 0):>8} "
+            f"{item.get('p95_ms', 0):>8} {item.get('p99_ms', 0):>8} {item['ok']:>6} {item['rejected']:>6} "
+            f"{item['constraint_violation']:>5} {item['db_locked']:>5} {item['error']:>5}"
+        )
+
+    lock_waits = report.get("lock_waits") or {}
+    if lock_waits:
+        lines.append(
+            f"写锁等待探测 {lock_waits['probes']} 次，竞争 {lock_waits['contended']} 次，超时 {lock_waits['timeouts']} 次，"
+            f"p50 {lock_waits.get('p50_ms', '-')}ms，p95 {lock_waits.get('p95_ms', '-')}ms，"
+            f"p99 {lock_waits.get('p99_ms', '-')}ms，最大 {lock_waits.get('max_ms', '-')}ms"
+        )
+    for check in report.get("checks", []):
+        lines.append(f"[{'通过' if check['ok'] else '失败'}] {check['name']}: {check['detail']}")
+    for message, count in requests.get("top_errors", {}).items():
+        lines.append(f"  {count} × {message}")
+    return "\n".join(lines)
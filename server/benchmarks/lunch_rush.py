@@ -0,0 +1,394 @@
+#!/usr/bin/env python3
+# 午餐高峰压测：驱动真实的 FastAPI 应用重放午餐抢订场景
+# 虚拟用户通过模拟微信登录（并完成注册），轮询日历，在几秒内并发抢订同一个限量餐次，
+# 部分用户随后取消；管理员在指定时间锁定餐次。支持两种运行方式：
+#   --mode asgi     进程内通过 ASGI 调用应用（单进程，便于分析）
+#   --mode uvicorn  启动本地 uvicorn（--workers 个进程）并通过 HTTP 访问
+# 报告吞吐量、各路由 p50/p95/p99、错误率、约束冲突率和数据库写锁等待，压测结束后核对数据一致性：
+#   python benchmarks/lunch_rush.py --users 200 --capacity 50
+#   python benchmarks/lunch_rush.py --mode uvicorn --workers 4 --users 500 --output /tmp/rush.json
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import random
+import shutil
+import socket
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import time
+from dataclasses import asdict, dataclass
+from datetime import date, timedelta
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+# 添加项目根目录到Python路径
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+import httpx
+
+from benchmarks.datasets import DEFAULT_CACHE_DIR, prepare_dataset
+from benchmarks.loadgen import LockProbe, RequestRecorder, format_report, summarize_records
+from db.core_operations import CoreOperations
+from db.manager import DatabaseManager
+from db.seed_data import ADMIN_USER_ID, DEFAULT_SEED, SCALE_PRESETS
+
+ADMIN_CODE = "admin_test_code"                 # 模拟微信登录中对应管理员 openid 的授权码
+ADMIN_OPEN_ID = "mock_admin_openid_12345"
+BASE_CONFIG = project_root / "config" / "config-dev.json"
+SERVER_START_TIMEOUT = 60
+
+ORDER_ROUTE = "POST /api/orders"
+
+
+@dataclass
+class RushOptions:
+    """压测场景参数（时间均为相对抢订开始的秒数）"""
+    users: int = 200                # 虚拟用户数
+    capacity: int = 50              # 抢订餐次的名额
+    order_ratio: float = 0.9        # 参与抢订的用户比例
+    cancel_ratio: float = 0.2       # 下单成功后取消的比例
+    order_window: float = 3.0       # 抢订集中在开始后的该时间内
+    poll_interval: float = 1.0      # 日历轮询间隔
+    duration: float = 20.0          # 抢订阶段时长
+    lock_after: float = 12.0        # 管理员锁定餐次的时间
+    ramp_up: float = 2.0            # 登录阶段的分散时间
+    seed: int = DEFAULT_SEED
+
+
+def prepare_database(work_dir: str, scale: str, seed: int, cache_dir: str, capacity: int) -> Tuple[str, int]:
+    """
+    准备压测数据库：截止今天的模拟数据副本，并在今天之后第一个没有午餐的日期发布限量餐次
+
+    Returns:
+        (数据库路径, 抢订餐次ID)
+    """
+    source = prepare_dataset(scale, seed, cache_dir, end_date=date.today())
+    db_path = os.path.join(work_dir, "lunch_rush.db")
+    shutil.copyfile(source, db_path)
+
+    with DatabaseManager(db_path) as db:
+        meal_date = date.today() + timedelta(days=1)
+        while db.conn.execute(
+            "SELECT 1 FROM meals WHERE date = ? AND slot = 'lunch' AND status != 'canceled'", [meal_date.isoformat()]
+        ).fetchone():
+            meal_date += timedelta(days=1)
+        addon_id = db.conn.execute(
+            "SELECT addon_id FROM addons WHERE status = 'active' ORDER BY addon_id LIMIT 1"
+        ).fetchone()[0]
+        meal_id = CoreOperations(db).admin_publish_meal(
+            ADMIN_USER_ID, meal_date.isoformat(), "lunch", "午餐高峰压测", 1500, {addon_id: 2}, max_orders=capacity
+        )["meal_id"]
+    return db_path, meal_id
+
+
+def write_config(work_dir: str, db_path: str) -> str:
+    """
+    压测用配置：开发配置基础上指向压测数据库，关闭调试日志和定时任务，
+    只有模拟管理员在白名单中，放开单IP频率限制（uvicorn 模式下所有请求来自本机）
+    """
+    with open(BASE_CONFIG, encoding="utf-8") as f:
+        config = json.load(f)
+    config.pop("_reference_doc", None)
+    config.pop("wechat", None)           # 未配置微信时使用模拟登录
+    config["app"]["debug"] = False
+    config["server"]["reload"] = False
+    config["database"]["path"] = db_path
+    config["logging"].update({"level": "WARNING", "file_path": os.path.join(work_dir, "app.log")})
+    config["admin"] = {"whitelist_open_ids": [ADMIN_OPEN_ID]}
+    config.setdefault("security", {})["rate_limit"] = 10 ** 9
+    config["analytics"] = {"enabled": False}
+    config["statements"] = {"enabled": False}
+
+    path = os.path.join(work_dir, "config-loadtest.json")
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(config, f, ensure_ascii=False, indent=2)
+    return path
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+async def _login(client: httpx.AsyncClient, recorder: RequestRecorder, code: str,
+                 wechat_name: Optional[str] = None) -> Optional[Dict[str, str]]:
+    """模拟微信登录，未注册时完成注册；返回认证请求头，失败时为 None"""
+    body = await recorder.request(client, "POST /api/auth/wechat/login", "POST", "/api/auth/wechat/login",
+                                  json={"code": code})
+    if body is None:
+        return None
+    headers = {"Authorization": f"Bearer {body['data']['access_token']}"}
+    if wechat_name and not body["data"]["user_info"]["is_registered"]:
+        registered = await recorder.request(client, "POST /api/auth/register", "POST", "/api/auth/register",
+                                            json={"wechat_name": wechat_name}, headers=headers)
+        if registered is None:
+            return None
+    return headers
+
+
+async def _sleep_until(started: float, offset: float):
+    delay = started + offset - time.monotonic()
+    if delay > 0:
+        await asyncio.sleep(delay)
+
+
+async def _customer(client: httpx.AsyncClient, recorder: RequestRecorder, headers: Dict[str, str], meal_id: int,
+                    options: RushOptions, rng: random.Random, started: float):
+    """普通用户：按间隔轮询日历，在抢订窗口内下单，部分人之后取消"""
+    actions: List[Tuple[float, str]] = []
+    offset = rng.uniform(0, options.poll_interval)
+    while offset < options.duration:
+        actions.append((offset, "poll"))
+        offset += options.poll_interval * rng.uniform(0.8, 1.2)
+    if rng.random() < options.order_ratio:
+        order_at = rng.uniform(0, options.order_window)
+        actions.append((order_at, "order"))
+        if rng.random() < options.cancel_ratio:
+            actions.append((rng.uniform(order_at, options.duration), "cancel"))
+    actions.sort()
+
+    order_id = None
+    for offset, action in actions:
+        await _sleep_until(started, offset)
+        if action == "poll":
+            await recorder.request(client, "GET /api/meals/calendar", "GET", "/api/meals/calendar", headers=headers)
+        elif action == "order":
+            body = await recorder.request(client, ORDER_ROUTE, "POST", "/api/orders", headers=headers,
+                                          json={"meal_id": meal_id, "addon_selections": {}})
+            order_id = body["data"]["order_id"] if body else None
+        elif order_id is not None:
+            await recorder.request(client, "DELETE /api/orders/{order_id}", "DELETE", f"/api/orders/{order_id}",
+                                   headers=headers)
+
+
+async def _admin(client: httpx.AsyncClient, recorder: RequestRecorder, headers: Dict[str, str], meal_id: int,
+                 options: RushOptions, started: float):
+    """管理员：到点锁定餐次"""
+    await _sleep_until(started, options.lock_after)
+    await recorder.request(client, "PUT /api/admin/meals/{meal_id}/lock", "PUT",
+                           f"/api/admin/meals/{meal_id}/lock", headers=headers)
+
+
+async def run_rush(client: httpx.AsyncClient, db_path: str, meal_id: int, options: RushOptions) -> Dict[str, Any]:
+    """
+    执行压测：登录阶段（不计入吞吐量）后开始抢订阶段
+
+    Returns:
+        压测报告（不含一致性核对）
+    """
+    rng = random.Random(options.seed)
+    login_recorder, recorder = RequestRecorder(), RequestRecorder()
+
+    async def login(index: int):
+        await asyncio.sleep(rng.uniform(0, options.ramp_up))
+        return await _login(client, login_recorder, f"loadtest_{options.seed}_{index}", f"压测用户{index}")
+
+    login_started = time.monotonic()
+    admin_headers = await _login(client, login_recorder, ADMIN_CODE)
+    customer_headers = await asyncio.gather(*(login(index) for index in range(options.users)))
+    login_elapsed = time.monotonic() - login_started
+
+    probe = LockProbe(db_path)
+    probe.start()
+    started = time.monotonic()
+    tasks = [
+        _customer(client, recorder, headers, meal_id, options, random.Random(rng.random()), started)
+        for headers in customer_headers if headers is not None
+    ]
+    if admin_headers is not None:
+        tasks.append(_admin(client, recorder, admin_headers, meal_id, options, started))
+    try:
+        await asyncio.gather(*tasks)
+    finally:
+        elapsed = time.monotonic() - started
+        probe.stop()
+
+    return {
+        "options": asdict(options),
+        "meal_id": meal_id,
+        "logged_in_users": sum(1 for headers in customer_headers if headers is not None),
+        "login": summarize_records(login_recorder.records, login_elapsed),
+        "requests": summarize_records(recorder.records, elapsed),
+        "lock_waits": probe.summary(),
+    }
+
+
+def verify_consistency(db_path: str, meal_id: int, accepted_orders: int, expect_locked: bool) -> List[Dict[str, Any]]:
+    """压测结束后核对名额、订单数、重复订单和账本链"""
+    conn = sqlite3.connect(db_path)
+    try:
+        status, current_orders, max_orders = conn.execute(
+            "SELECT status, current_orders, max_orders FROM meals WHERE meal_id = ?", [meal_id]
+        ).fetchone()
+        active, total = conn.execute("""
+            SELECT COUNT(CASE WHEN status = 'active' THEN 1 END), COUNT(*) FROM orders WHERE meal_id = ?
+        """, [meal_id]).fetchone()
+        duplicates = conn.execute("""
+            SELECT COUNT(*) FROM (
+                SELECT user_id FROM orders WHERE meal_id = ? AND status = 'active'
+                GROUP BY user_id HAVING COUNT(*) > 1
+            )
+        """, [meal_id]).fetchone()[0]
+        # 参与本餐次的用户：账本链连续，余额等于最后一条记录
+        chain_breaks = conn.execute("""
+            SELECT COUNT(*) FROM (
+                SELECT balance_before_cents,
+                       LAG(balance_after_cents, 1, 0) OVER (PARTITION BY user_id ORDER BY ledger_id) AS previous
+                FROM ledger WHERE user_id IN (SELECT user_id FROM orders WHERE meal_id = ?)
+            ) WHERE balance_before_cents != previous
+        """, [meal_id]).fetchone()[0]
+        balance_mismatches = conn.execute("""
+            SELECT COUNT(*) FROM users u
+            WHERE u.user_id IN (SELECT user_id FROM orders WHERE meal_id = ?)
+              AND u.balance_cents != (
+                  SELECT balance_after_cents FROM ledger l WHERE l.user_id = u.user_id ORDER BY ledger_id DESC LIMIT 1
+              )
+        """, [meal_id]).fetchone()[0]
+    finally:
+        conn.close()
+
+    checks = [
+        ("名额未超卖", active <= max_orders, f"有效订单 {active} / 名额 {max_orders}"),
+        ("餐次订单数一致", current_orders == active, f"current_orders={current_orders}，有效订单 {active}"),
+        ("无重复有效订单", duplicates == 0, f"重复用户 {duplicates}"),
+        ("成功下单数与订单记录一致", accepted_orders == total, f"成功响应 {accepted_orders}，订单记录 {total}"),
+        ("账本链与余额一致", chain_breaks == 0 and balance_mismatches == 0,
+         f"断链 {chain_breaks}，余额不一致 {balance_mismatches}"),
+    ]
+    if expect_locked:
+        checks.append(("餐次已锁定", status == "locked", f"status={status}"))
+    return [{"name": name, "ok": bool(ok), "detail": detail} for name, ok, detail in checks]
+
+
+async def run_in_process(config_path: str, db_path: str, meal_id: int, options: RushOptions) -> Dict[str, Any]:
+    """进程内通过 ASGI 驱动应用（执行应用的启动和关闭流程）"""
+    os.environ["CONFIG_FILE"] = config_path
+    from api.main import app
+
+    # 应用在导入时重新配置了日志；业务拒绝会以 ERROR 级别刷屏，只保留写入压测目录的文件日志
+    root = logging.getLogger()
+    for handler in root.handlers[:]:
+        if not isinstance(handler, logging.FileHandler):
+            root.removeHandler(handler)
+
+    async with app.router.lifespan_context(app):
+        transport = httpx.ASGITransport(app=app, raise_app_exceptions=False)
+        async with httpx.AsyncClient(transport=transport, base_url="http://loadtest", timeout=60) as client:
+            return await run_rush(client, db_path, meal_id, options)
+
+
+async def run_against_uvicorn(config_path: str, db_path: str, meal_id: int, options: RushOptions,
+                              workers: int, port: Optional[int], work_dir: str) -> Dict[str, Any]:
+    """启动本地 uvicorn 多进程服务并通过 HTTP 驱动"""
+    port = port or _free_port()
+    base_url = f"http://127.0.0.1:{port}"
+    log_file = open(os.path.join(work_dir, "uvicorn.log"), "wb")
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "api.main:app", "--host", "127.0.0.1", "--port", str(port),
+         "--workers", str(workers), "--log-level", "warning"],
+        cwd=str(project_root), env=dict(os.environ, CONFIG_FILE=config_path),
+        stdout=log_file, stderr=subprocess.STDOUT
+    )
+    try:
+        limits = httpx.Limits(max_connections=options.users + 10, max_keepalive_connections=options.users + 10)
+        async with httpx.AsyncClient(base_url=base_url, timeout=60, limits=limits) as client:
+            deadline = time.monotonic() + SERVER_START_TIMEOUT
+            while True:
+                if process.poll() is not None:
+                    raise RuntimeError(f"uvicorn 启动失败，日志: {log_file.name}")
+                try:
+                    if (await client.get("/health")).status_code == 200:
+                        break
+                except httpx.HTTPError:
+                    pass
+                if time.monotonic() > deadline:
+                    raise RuntimeError(f"uvicorn 启动超时，日志: {log_file.name}")
+                await asyncio.sleep(0.2)
+
+            report = await run_rush(client, db_path, meal_id, options)
+            report["workers"] = workers
+            return report
+    finally:
+        process.terminate()
+        try:
+            process.wait(timeout=15)
+        except subprocess.TimeoutExpired:
+            process.kill()
+        log_file.close()
+
+
+def main():
+    """
+    主函数：准备数据库、执行压测、核对一致性并输出报告
+    """
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    for name in ("DatabaseManager", "httpx"):
+        logging.getLogger(name).setLevel(logging.WARNING)
+
+    defaults = RushOptions()
+    parser = argparse.ArgumentParser(description="午餐高峰HTTP压测")
+    parser.add_argument("--mode", choices=["asgi", "uvicorn"], default="asgi", help="进程内ASGI或本地uvicorn")
+    parser.add_argument("--workers", type=int, default=4, help="uvicorn worker 数")
+    parser.add_argument("--port", type=int, help="uvicorn 端口，默认随机空闲端口")
+    parser.add_argument("--scale", default="small", choices=list(SCALE_PRESETS), help="模拟数据规模")
+    parser.add_argument("--cache-dir", default=DEFAULT_CACHE_DIR, help="模拟数据缓存目录")
+    parser.add_argument("--users", type=int, default=defaults.users, help="虚拟用户数")
+    parser.add_argument("--capacity", type=int, default=defaults.capacity, help="抢订餐次名额")
+    parser.add_argument("--order-ratio", type=float, default=defaults.order_ratio, help="参与抢订的用户比例")
+    parser.add_argument("--cancel-ratio", type=float, default=defaults.cancel_ratio, help="下单后取消的比例")
+    parser.add_argument("--order-window", type=float, default=defaults.order_window, help="抢订集中的秒数")
+    parser.add_argument("--poll-interval", type=float, default=defaults.poll_interval, help="日历轮询间隔秒数")
+    parser.add_argument("--duration", type=float, default=defaults.duration, help="抢订阶段秒数")
+    parser.add_argument("--lock-after", type=float, default=defaults.lock_after,
+                        help="管理员锁定餐次的时间（秒），大于 --duration 时不锁定")
+    parser.add_argument("--ramp-up", type=float, default=defaults.ramp_up, help="登录阶段分散秒数")
+    parser.add_argument("--seed", type=int, default=DEFAULT_SEED, help="随机种子（模拟数据和虚拟用户行为）")
+    parser.add_argument("--output", help="JSON报告路径")
+    parser.add_argument("--keep", action="store_true", help="保留压测目录（数据库、配置、日志）")
+    args = parser.parse_args()
+
+    options = RushOptions(
+        users=args.users, capacity=args.capacity, order_ratio=args.order_ratio, cancel_ratio=args.cancel_ratio,
+        order_window=args.order_window, poll_interval=args.poll_interval, duration=args.duration,
+        lock_after=args.lock_after, ramp_up=args.ramp_up, seed=args.seed
+    )
+    work_dir = tempfile.mkdtemp(prefix="lunch_rush_")
+    try:
+        db_path, meal_id = prepare_database(work_dir, args.scale, args.seed, args.cache_dir, options.capacity)
+        config_path = write_config(work_dir, db_path)
+        logging.info(f"开始压测: 模式 {args.mode}，{options.users} 个虚拟用户抢订餐次 {meal_id}（名额 {options.capacity}）")
+
+        if args.mode == "asgi":
+            report = asyncio.run(run_in_process(config_path, db_path, meal_id, options))
+        else:
+            report = asyncio.run(run_against_uvicorn(config_path, db_path, meal_id, options,
+                                                     args.workers, args.port, work_dir))
+        report.update({"mode": args.mode, "scale": args.scale})
+
+        accepted = report["requests"]["routes"].get(ORDER_ROUTE, {}).get("ok", 0)
+        report["checks"] = verify_consistency(db_path, meal_id, accepted, options.lock_after < options.duration)
+
+        print(format_report(report))
+        if args.output:
+            with open(args.output, "w", encoding="utf-8") as f:
+                json.dump(report, f, ensure_ascii=False, indent=2)
+            print(f"报告已保存: {args.output}")
+    finally:
+        if args.keep:
+            print(f"压测目录: {work_dir}")
+        else:
+            shutil.rmtree(work_dir, ignore_errors=True)
+
+    if not all(check["ok"] for check in report["checks"]):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+# 微基准测试入口
+# 在指定规模的模拟数据（内存数据库和磁盘数据库）上执行所有用例，结果保存为JSON，
+# 并与保存的基线比较，标记性能回退：
+#   python benchmarks/run.py --scales small,medium               # 运行并与基线比较
+#   python benchmarks/run.py --scales small,medium --save-baseline
+#   python benchmarks/run.py --filter ledger --storage disk      # 只运行部分用例
+
+import argparse
+import logging
+import os
+import sys
+import tempfile
+from datetime import datetime
+from pathlib import Path
+
+# 添加项目根目录到Python路径
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from benchmarks.cases import BenchmarkContext, build_cases
+from benchmarks.datasets import DEFAULT_CACHE_DIR, STORAGES, open_dataset, prepare_dataset
+from benchmarks.harness import (
+    DEFAULT_MIN_DELTA_MS, DEFAULT_REPEAT, DEFAULT_THRESHOLD, DEFAULT_WARMUP,
+    build_results, compare_results, format_comparison, load_results, run_case, save_results
+)
+from db.seed_data import DEFAULT_SEED, SCALE_PRESETS
+
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "results")
+DEFAULT_BASELINE = os.path.join(RESULTS_DIR, "baseline.json")
+
+
+def _split(value: str, choices) -> list:
+    items = [item.strip() for item in value.split(",") if item.strip()]
+    unknown = [item for item in items if item not in choices]
+    if unknown:
+        raise argparse.ArgumentTypeError(f"不支持的取值: {', '.join(unknown)}，可选: {', '.join(choices)}")
+    return items
+
+
+def run_benchmarks(scales, storages, repeat: int, warmup: int, name_filter: str = None,
+                   seed: int = DEFAULT_SEED, cache_dir: str = DEFAULT_CACHE_DIR) -> list:
+    """按 规模 × 存储 执行用例，返回结果列表"""
+    results = []
+    with tempfile.TemporaryDirectory(prefix="bench_") as work_dir:
+        for scale_name in scales:
+            logging.info(f"准备数据集: {scale_name}")
+            source = prepare_dataset(scale_name, seed, cache_dir)
+            for storage in storages:
+                db = open_dataset(source, storage, work_dir)
+                ctx = BenchmarkContext(db)
+                try:
+                    for case in build_cases(ctx):
+                        if name_filter and name_filter not in case.name:
+                            continue
+                        result = run_case(case, repeat=repeat, warmup=warmup)
+                        result.update({"scale": scale_name, "storage": storage})
+                        results.append(result)
+                        stats = result["stats"]
+                        logging.info(
+                            f"{scale_name}/{storage}/{case.name}: 中位数 {stats['median_ms']:.3f}ms，"
+                            f"p95 {stats['p95_ms']:.3f}ms，n={stats['n']}"
+                        )
+                finally:
+                    ctx.close()
+                    db.close()
+    return results
+
+
+def main():
+    """
+    主函数：执行基准测试并与基线比较
+    """
+    # 导入路由模块时应用日志已完成配置，这里重新配置为控制台输出
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s', force=True)
+    # 数据库连接和逐次取消餐次的日志会淹没基准测试输出
+    for name in ("DatabaseManager", "db.core_operations"):
+        logging.getLogger(name).setLevel(logging.WARNING)
+
+    parser = argparse.ArgumentParser(description="核心操作和查询操作微基准测试")
+    parser.add_argument("--scales", type=lambda value: _split(value, list(SCALE_PRESETS)),
+                        default=["small", "medium"], help="数据规模，逗号分隔（tiny/small/medium/large）")
+    parser.add_argument("--storage", type=lambda value: _split(value, STORAGES),
+                        default=list(STORAGES), help="存储类型，逗号分隔（memory/disk）")
+    parser.add_argument("--repeat", type=int, default=DEFAULT_REPEAT, help="每个用例的计时次数")
+    parser.add_argument("--warmup", type=int, default=DEFAULT_WARMUP, help="每个用例的预热次数")
+    parser.add_argument("--filter", dest="name_filter", help="只运行名称包含该字符串的用例")
+    parser.add_argument("--seed", type=int, default=DEFAULT_SEED, help="模拟数据随机种子")
+    parser.add_argument("--cache-dir", default=DEFAULT_CACHE_DIR, help="模拟数据缓存目录")
+    parser.add_argument("--output", help="结果文件路径，默认 benchmarks/results/<时间>.json")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE, help="基线结果文件")
+    parser.add_argument("--save-baseline", action="store_true", help="把本次结果保存为基线")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD,
+                        help="中位数变慢超过该比例视为回退，默认0.25")
+    parser.add_argument("--min-delta-ms", type=float, default=DEFAULT_MIN_DELTA_MS,
+                        help="忽略小于该毫秒数的差异")
+    parser.add_argument("--fail-on-regression", action="store_true", help="存在回退时以非零状态退出")
+    args = parser.parse_args()
+
+    results = run_benchmarks(args.scales, args.storage, args.repeat, args.warmup,
+                             args.name_filter, args.seed, args.cache_dir)
+    data = build_results(results, {
+        "scales": args.scales, "storage": args.storage, "repeat": args.repeat,
+        "warmup": args.warmup, "seed": args.seed, "filter": args.name_filter
+    })
+
+    output = args.output or os.path.join(RESULTS_DIR, f"{datetime.now():%Y%m%d_%H%M%S}.json")
+    save_results(data, output)
+    logging.info(f"结果已保存: {output}")
+
+    if args.save_baseline:
+        save_results(data, args.baseline)
+        logging.info(f"基线已保存: {args.baseline}")
+        return
+
+    if not os.path.exists(args.baseline):
+        logging.info(f"基线不存在: {args.baseline}，使用 --save-baseline 保存")
+        return
+
+    comparisons = compare_results(data, load_results(args.baseline), args.threshold, args.min_delta_ms)
+    print(format_comparison(comparisons))
+    regressions = [item for item in comparisons if item["status"] == "regression"]
+    if regressions:
+        logging.warning(f"{len(regressions)} 个用例性能回退（阈值 {args.threshold:.0%}）")
+        if args.fail_on_regression:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,345 @@
+# 列式分析镜像
+# 管理员分析报表（营收趋势、附加项热度、用户消费排行）不再查询承担下单流量的 SQLite 主库，
+# 而是查询增量刷新的 DuckDB 镜像：
+# - 刷新任务（租约保护，只有一个worker执行）把 meals/orders 按 updated_at、ledger 按 ledger_id 水位增量同步到
+#   mirror.duckdb，orders.addon_selections 展开为 order_addons 表，addons/users 全量同步（数据量小）
+# - 每次刷新后把各表导出为 Parquet 快照（先写临时文件再原子重命名），
+#   报表查询使用内存 DuckDB 连接读取 Parquet，不占用镜像库的文件锁，刷新期间也可查询
+# - 归档（db/archive.py）移出主库的历史数据在镜像中保留，报表覆盖全部历史
+# duckdb 为可选依赖，未安装时分析功能不可用。
+
+import json
+import logging
+import os
+import sqlite3
+import time
+from typing import Any, Dict, List, Optional
+
+try:
+    import duckdb
+except ImportError:  # duckdb 未安装时分析功能不可用
+    duckdb = None
+
+logger = logging.getLogger(__name__)
+
+_mirror_dir = None
+
+DEFAULT_CHUNK_SIZE = 5000         # 每次从主库读取的行数
+MIRROR_DB_NAME = "mirror.duckdb"
+
+# 镜像表结构：(主库查询列, DuckDB建表语句)
+# addons/users 每次全量重建（同一事务内先删后插），不设主键以避开 DuckDB 的主键冲突检查
+MIRROR_TABLES = {
+    "meals": (
+        "meal_id, date, slot, description, base_price_cents, max_orders, current_orders, status, "
+        "created_at, updated_at",
+        """CREATE TABLE IF NOT EXISTS meals (
+            meal_id BIGINT PRIMARY KEY, date DATE, slot VARCHAR, description VARCHAR,
+            base_price_cents BIGINT, max_orders INTEGER, current_orders INTEGER, status VARCHAR,
+            created_at VARCHAR, updated_at VARCHAR
+        )"""
+    ),
+    "orders": (
+        "order_id, user_id, meal_id, amount_cents, addon_selections, status, created_at, updated_at, canceled_at",
+        """CREATE TABLE IF NOT EXISTS orders (
+            order_id BIGINT PRIMARY KEY, user_id BIGINT, meal_id BIGINT, amount_cents BIGINT,
+            addon_selections VARCHAR, status VARCHAR, created_at VARCHAR, updated_at VARCHAR, canceled_at VARCHAR
+        )"""
+    ),
+    "ledger": (
+        "ledger_id, transaction_no, user_id, type, direction, amount_cents, balance_before_cents, "
+        "balance_after_cents, order_id, operator_id, created_at",
+        """CREATE TABLE IF NOT EXISTS ledger (
+            ledger_id BIGINT PRIMARY KEY, transaction_no VARCHAR, user_id BIGINT, type VARCHAR, direction VARCHAR,
+            amount_cents BIGINT, balance_before_cents BIGINT, balance_after_cents BIGINT, order_id BIGINT,
+            operator_id BIGINT, created_at VARCHAR
+        )"""
+    ),
+    "addons": (
+        "addon_id, name, price_cents, status",
+        """CREATE TABLE IF NOT EXISTS addons (
+            addon_id BIGINT, name VARCHAR, price_cents BIGINT, status VARCHAR
+        )"""
+    ),
+    "users": (
+        "user_id, wechat_name, status, is_admin",
+        """CREATE TABLE IF NOT EXISTS users (
+            user_id BIGINT, wechat_name VARCHAR, status VARCHAR, is_admin INTEGER
+        )"""
+    ),
+}
+
+ORDER_ADDONS_TABLE_SQL = """
+    CREATE TABLE IF NOT EXISTS order_addons (
+        order_id BIGINT, addon_id BIGINT, quantity INTEGER
+    )
+"""
+
+MIRROR_STATE_TABLE_SQL = """
+    CREATE TABLE IF NOT EXISTS mirror_state (
+        name VARCHAR PRIMARY KEY, watermark VARCHAR
+    )
+"""
+
+SNAPSHOT_TABLES = ["meals", "orders", "order_addons", "ledger", "addons", "users"]
+
+
+class AnalyticsUnavailableError(RuntimeError):
+    """分析引擎不可用（未安装 duckdb 或镜像尚未生成）"""
+
+
+def configure_analytics(mirror_dir: Optional[str] = None):
+    """配置镜像目录（应用启动时调用），默认为数据库文件所在目录下的 analytics/"""
+    global _mirror_dir
+    _mirror_dir = mirror_dir
+
+
+def get_mirror_dir(db_path: str, mirror_dir: Optional[str] = None) -> str:
+    return mirror_dir or _mirror_dir or os.path.join(os.path.dirname(db_path), "analytics")
+
+
+def is_analytics_available() -> bool:
+    return duckdb is not None
+
+
+def _sql_literal(value: str) -> str:
+    return "'" + value.replace("'", "''") + "'"
+
+
+def _get_watermark(duck, name: str) -> Optional[str]:
+    row = duck.execute("SELECT watermark FROM mirror_state WHERE name = ?", [name]).fetchone()
+    return row[0] if row else None
+
+
+def _set_watermark(duck, name: str, watermark: str):
+    duck.execute("INSERT OR REPLACE INTO mirror_state (name, watermark) VALUES (?, ?)", [name, watermark])
+
+
+def _copy_changed(source: sqlite3.Connection, duck, table: str, where: str, order_by: str,
+                  params: List[Any], chunk_size: int, on_chunk=None):
+    """
+    按块读取主库变更行并写入镜像（按主键覆盖）
+
+    Returns:
+        (同步行数, 最后一行)，用于推进水位
+    """
+    columns = MIRROR_TABLES[table][0]
+    placeholders = ", ".join("?" * len(columns.split(",")))
+    cursor = source.execute(f"SELECT {columns} FROM {table} WHERE {where} ORDER BY {order_by}", params)
+    synced, last_row = 0, None
+    while True:
+        rows = [tuple(row) for row in cursor.fetchmany(chunk_size)]
+        if not rows:
+            break
+        duck.executemany(f"INSERT OR REPLACE INTO {table} ({columns}) VALUES ({placeholders})", rows)
+        if on_chunk is not None:
+            on_chunk(rows)
+        synced += len(rows)
+        last_row = rows[-1]
+    return synced, last_row
+
+
+def _explode_addons(duck, rows: List[tuple]):
+    """把订单的附加项选择（JSON）展开为 order_addons 行，先删除这些订单的旧记录"""
+    order_ids = [row[0] for row in rows]
+    duck.execute(
+        f"DELETE FROM order_addons WHERE order_id IN ({', '.join('?' * len(order_ids))})", order_ids
+    )
+    addon_rows = []
+    for row in rows:
+        try:
+            selections = json.loads(row[4]) if row[4] else {}
+        except (TypeError, ValueError):
+            selections = {}
+        for addon_id, quantity in selections.items():
+            if quantity:
+                addon_rows.append((row[0], int(addon_id), int(quantity)))
+    if addon_rows:
+        duck.executemany("INSERT INTO order_addons (order_id, addon_id, quantity) VALUES (?, ?, ?)", addon_rows)
+
+
+def refresh_mirror(db_path: str, mirror_dir: Optional[str] = None,
+                   chunk_size: int = DEFAULT_CHUNK_SIZE) -> Dict[str, Any]:
+    """
+    增量刷新分析镜像并导出 Parquet 快照
+
+    meals/orders 同步 updated_at 不早于水位的行（同一秒内的更新可能在上次刷新之后，按主键覆盖保证幂等），
+    ledger 只追加 ledger_id 大于水位的行
+
+    Args:
+        db_path: 主库文件路径
+        mirror_dir: 镜像目录
+        chunk_size: 每次从主库读取的行数
+
+    Returns:
+        刷新结果：各表同步行数、耗时
+
+    Raises:
+        AnalyticsUnavailableError: 未安装 duckdb
+    """
+    if duckdb is None:
+        raise AnalyticsUnavailableError("分析引擎不可用：未安装 duckdb")
+
+    started = time.monotonic()
+    directory = get_mirror_dir(db_path, mirror_dir)
+    os.makedirs(directory, exist_ok=True)
+
+    source = sqlite3.connect(db_path, check_same_thread=False)
+    duck = duckdb.connect(os.path.join(directory, MIRROR_DB_NAME))
+    result = {"rows": {}}
+    try:
+        for _, create_sql in MIRROR_TABLES.values():
+            duck.execute(create_sql)
+        duck.execute(ORDER_ADDONS_TABLE_SQL)
+        duck.execute(MIRROR_STATE_TABLE_SQL)
+
+        duck.execute("BEGIN TRANSACTION")
+        try:
+            # 可变表：按 updated_at 水位增量同步
+            for table, key, on_chunk in (("meals", "meal_id", None),
+                                         ("orders", "order_id", lambda rows: _explode_addons(duck, rows))):
+                columns = [column.strip() for column in MIRROR_TABLES[table][0].split(",")]
+                changed_at = "COALESCE(updated_at, created_at, '')"
+                synced, last_row = _copy_changed(
+                    source, duck, table, f"{changed_at} >= ?", f"{changed_at}, {key}",
+                    [_get_watermark(duck, table) or ""], chunk_size, on_chunk
+                )
+                if last_row is not None:
+                    _set_watermark(
+                        duck, table,
+                        last_row[columns.index("updated_at")] or last_row[columns.index("created_at")] or ""
+                    )
+                result["rows"][table] = synced
+
+            # 账本：只追加
+            synced, last_row = _copy_changed(
+                source, duck, "ledger", "ledger_id > ?", "ledger_id",
+                [int(_get_watermark(duck, "ledger") or 0)], chunk_size
+            )
+            if last_row is not None:
+                _set_watermark(duck, "ledger", str(last_row[0]))
+            result["rows"]["ledger"] = synced
+
+            # 小表：全量同步
+            for table in ("addons", "users"):
+                duck.execute(f"DELETE FROM {table}")
+                rows = [tuple(row) for row in source.execute(f"SELECT {MIRROR_TABLES[table][0]} FROM {table}")]
+                if rows:
+                    duck.executemany(
+                        f"INSERT INTO {table} ({MIRROR_TABLES[table][0]}) "
+                        f"VALUES ({', '.join('?' * len(rows[0]))})", rows
+                    )
+                result["rows"][table] = len(rows)
+
+            duck.execute("COMMIT")
+        except Exception:
+            duck.execute("ROLLBACK")
+            raise
+
+        # 导出 Parquet 快照，原子替换
+        for table in SNAPSHOT_TABLES:
+            target = os.path.join(directory, f"{table}.parquet")
+            temp = f"{target}.tmp"
+            duck.execute(f"COPY {table} TO {_sql_literal(temp)} (FORMAT PARQUET)")
+            os.replace(temp, target)
+    finally:
+        duck.close()
+        source.close()
+
+    result["duration_ms"] = round((time.monotonic() - started) * 1000, 1)
+    return result
+
+
+class AnalyticsEngine:
+    """
+    基于 Parquet 快照的分析查询
+
+    每次查询使用独立的内存 DuckDB 连接，快照文件作为视图挂载
+    """
+
+    def __init__(self, db_path: str, mirror_dir: Optional[str] = None):
+        if duckdb is None:
+            raise AnalyticsUnavailableError("分析引擎不可用：未安装 duckdb")
+        self.directory = get_mirror_dir(db_path, mirror_dir)
+
+    def _connect(self):
+        missing = [table for table in SNAPSHOT_TABLES
+                   if not os.path.exists(os.path.join(self.directory, f"{table}.parquet"))]
+        if missing:
+            raise AnalyticsUnavailableError("分析数据尚未生成，请等待镜像刷新完成")
+
+        duck = duckdb.connect()
+        for table in SNAPSHOT_TABLES:
+            path = os.path.join(self.directory, f"{table}.parquet")
+            duck.execute(f"CREATE VIEW {table} AS SELECT * FROM read_parquet({_sql_literal(path)})")
+        return duck
+
+    def query(self, sql: str, params: Optional[List[Any]] = None) -> List[Dict[str, Any]]:
+        """执行分析查询，返回字典列表"""
+        duck = self._connect()
+        try:
+            cursor = duck.execute(sql, params or [])
+            columns = [column[0] for column in cursor.description]
+            return [dict(zip(columns, row)) for row in cursor.fetchall()]
+        finally:
+            duck.close()
+
+    def snapshot_info(self) -> Dict[str, Any]:
+        """快照生成时间（取最早导出的表）"""
+        mtimes = [os.path.getmtime(os.path.join(self.directory, f"{table}.parquet")) for table in SNAPSHOT_TABLES
+                  if os.path.exists(os.path.join(self.directory, f"{table}.parquet"))]
+        return {"refreshed_at": time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(min(mtimes))) if mtimes else None}
+
+    def revenue(self, start_date: str, end_date: str, granularity: str = "day") -> List[Dict[str, Any]]:
+        """
+        营收趋势（按餐次日期汇总有效/已完成订单）
+
+        Args:
+            granularity: day/week/month
+        """
+        if granularity not in ("day", "week", "month"):
+            raise ValueError("granularity 必须为 day/week/month")
+        return self.query(f"""
+            SELECT strftime(date_trunc('{granularity}', m.date), '%Y-%m-%d') AS period,
+                   COUNT(*) AS orders,
+                   COUNT(DISTINCT o.user_id) AS users,
+                   SUM(o.amount_cents) AS revenue_cents
+            FROM orders o
+            JOIN meals m ON m.meal_id = o.meal_id
+            WHERE o.status IN ('active', 'completed') AND m.date BETWEEN CAST(? AS DATE) AND CAST(? AS DATE)
+            GROUP BY 1
+            ORDER BY 1
+        """, [start_date, end_date])
+
+    def addon_popularity(self, start_date: str, end_date: str) -> List[Dict[str, Any]]:
+        """附加项热度（选择次数、数量、金额）"""
+        return self.query("""
+            SELECT oa.addon_id,
+                   COALESCE(a.name, '已删除附加项') AS name,
+                   COUNT(DISTINCT oa.order_id) AS orders,
+                   SUM(oa.quantity) AS quantity,
+                   SUM(oa.quantity * COALESCE(a.price_cents, 0)) AS amount_cents
+            FROM order_addons oa
+            JOIN orders o ON o.order_id = oa.order_id
+            JOIN meals m ON m.meal_id = o.meal_id
+            LEFT JOIN addons a ON a.addon_id = oa.addon_id
+            WHERE o.status IN ('active', 'completed') AND m.date BETWEEN CAST(? AS DATE) AND CAST(? AS DATE)
+            GROUP BY oa.addon_id, a.name
+            ORDER BY quantity DESC, oa.addon_id
+        """, [start_date, end_date])
+
+    def user_spend(self, start_date: str, end_date: str, limit: int = 50) -> List[Dict[str, Any]]:
+        """用户消费排行"""
+        return self.query("""
+            SELECT o.user_id,
+                   u.wechat_name,
+                   COUNT(*) AS orders,
+                   SUM(o.amount_cents) AS spend_cents
+            FROM orders o
+            JOIN meals m ON m.meal_id = o.meal_id
+            LEFT JOIN users u ON u.user_id = o.user_id
+            WHERE o.status IN ('active', 'completed') AND m.date BETWEEN CAST(? AS DATE) AND CAST(? AS DATE)
+            GROUP BY o.user_id, u.wechat_name
+            ORDER BY spend_cents DESC, o.user_id
+            LIMIT ?
+        """, [start_date, end_date, limit])
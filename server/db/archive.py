@@ -0,0 +1,327 @@
+# 冷数据归档
+# 把早于N个月的已完成/已取消餐次及其订单、订单相关账本记录，按餐次日期年份移动到独立的归档库
+# （<归档目录>/<数据库文件名>-<年份>.db），主库的订单、账本索引不再随历史数据增长。
+# 移动按块进行，每块先在归档库事务内复制（INSERT OR REPLACE，中断后重跑幂等），
+# 再在主库的 BEGIN IMMEDIATE 事务内逐行比对校验后删除；校验不通过时不删除。
+# 主库 archive_segments 表记录每个年份归档的日期范围和汇总数据，
+# 查询的日期范围与某个年份的归档重叠时才 ATTACH 对应的归档库。
+
+import logging
+import os
+import sqlite3
+from datetime import date
+from typing import Any, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+_archive_dir = None
+
+DEFAULT_ARCHIVE_MONTHS = 6        # 归档早于该月数的餐次
+DEFAULT_CHUNK_SIZE = 200          # 每块移动的餐次数
+MAX_ATTACHED_ARCHIVES = 8         # 单个查询最多挂载的归档库数（SQLite默认最多挂载10个数据库）
+
+# 归档库中的表及按餐次选择行的条件（参数为餐次ID列表；ledger 需在 orders 删除前处理）
+ARCHIVE_TABLES = [
+    ("meals", "meal_id IN ({ids})"),
+    ("orders", "meal_id IN ({ids})"),
+    ("ledger", "order_id IN (SELECT order_id FROM main.orders WHERE meal_id IN ({ids}))"),
+]
+
+ARCHIVE_INDEXES = [
+    ("meals", "date"),
+    ("orders", "meal_id"),
+    ("orders", "user_id"),
+    ("ledger", "user_id"),
+    ("ledger", "order_id"),
+]
+
+
+def configure_archive(archive_dir: Optional[str] = None):
+    """配置归档目录（应用启动时调用），默认为数据库文件所在目录下的 archive/"""
+    global _archive_dir
+    _archive_dir = archive_dir
+
+
+def archive_path(db_path: str, year: int, archive_dir: Optional[str] = None) -> str:
+    """归档库文件路径：<归档目录>/<数据库文件名>-<年份>.db"""
+    directory = archive_dir or _archive_dir or os.path.join(os.path.dirname(db_path), "archive")
+    stem = os.path.splitext(os.path.basename(db_path))[0]
+    return os.path.join(directory, f"{stem}-{year}.db")
+
+
+def table_columns(conn: sqlite3.Connection, table: str) -> List[str]:
+    """主库表的列名（按定义顺序）"""
+    return [row[1] for row in conn.execute(f"PRAGMA main.table_info({table})").fetchall()]
+
+
+def _ensure_archive_schema(conn: sqlite3.Connection, schema: str):
+    """
+    在归档库中创建与主库同名、同列的表
+
+    只保留主键，不建外键和唯一约束（用户、附加项不归档）；主库新增的列补到已有的归档表
+    """
+    for table, _ in ARCHIVE_TABLES:
+        main_columns = conn.execute(f"PRAGMA main.table_info({table})").fetchall()
+        existing = {row[1] for row in conn.execute(f"PRAGMA {schema}.table_info({table})").fetchall()}
+        if not existing:
+            definitions = [
+                f"{row[1]} {row[2]}" + (" PRIMARY KEY" if row[5] == 1 else "") for row in main_columns
+            ]
+            conn.execute(f"CREATE TABLE {schema}.{table} ({', '.join(definitions)})")
+        else:
+            for row in main_columns:
+                if row[1] not in existing:
+                    conn.execute(f"ALTER TABLE {schema}.{table} ADD COLUMN {row[1]} {row[2]}")
+
+    for table, column in ARCHIVE_INDEXES:
+        conn.execute(f"CREATE INDEX IF NOT EXISTS {schema}.idx_{table}_{column} ON {table}({column})")
+    conn.commit()
+
+
+def attach_archive(conn: sqlite3.Connection, db_path: str, year: int,
+                   archive_dir: Optional[str] = None, create: bool = False) -> str:
+    """
+    挂载某年的归档库（已挂载时直接返回）
+
+    Args:
+        conn: 主库连接（不能处于事务中）
+        db_path: 主库文件路径
+        year: 归档年份
+        archive_dir: 归档目录
+        create: 归档库不存在时是否创建（并建表）
+
+    Returns:
+        归档库的schema名（archive_<年份>）
+
+    Raises:
+        FileNotFoundError: 归档库文件不存在且 create 为 False
+    """
+    schema = f"archive_{int(year)}"
+    attached = {row[1] for row in conn.execute("PRAGMA database_list").fetchall()}
+    if schema not in attached:
+        path = archive_path(db_path, year, archive_dir)
+        if create:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        elif not os.path.exists(path):
+            raise FileNotFoundError(f"归档库文件不存在: {path}")
+        conn.execute(f"ATTACH DATABASE ? AS {schema}", [path])
+
+    if create:
+        _ensure_archive_schema(conn, schema)
+    return schema
+
+
+def attach_archives_for_range(conn: sqlite3.Connection, db_path: str,
+                              start_date: str, end_date: str) -> List[str]:
+    """
+    挂载与日期范围重叠的归档库
+
+    Returns:
+        已挂载的归档库schema名列表（没有重叠的归档时为空，不挂载任何库）
+
+    Raises:
+        ValueError: 需要挂载的归档库过多
+        FileNotFoundError: 归档段表记录的归档库文件不存在
+    """
+    years = [row[0] for row in conn.execute(
+        "SELECT year FROM archive_segments WHERE min_date <= ? AND max_date >= ? ORDER BY year",
+        [end_date, start_date]
+    ).fetchall()]
+
+    if len(years) > MAX_ATTACHED_ARCHIVES:
+        raise ValueError(f"查询范围涉及 {len(years)} 个年份的归档，最多支持 {MAX_ATTACHED_ARCHIVES} 个")
+    return [attach_archive(conn, db_path, year) for year in years]
+
+
+def attach_all_archives(conn: sqlite3.Connection, db_path: str) -> List[str]:
+    """
+    挂载全部归档库（对账等需要完整账本历史的操作）
+
+    Returns:
+        已挂载的归档库schema名列表（按年份）
+
+    Raises:
+        ValueError: 归档库过多
+        FileNotFoundError: 归档段表记录的归档库文件不存在
+    """
+    years = [row[0] for row in conn.execute("SELECT year FROM archive_segments ORDER BY year").fetchall()]
+    if len(years) > MAX_ATTACHED_ARCHIVES:
+        raise ValueError(f"共有 {len(years)} 个年份的归档，最多支持 {MAX_ATTACHED_ARCHIVES} 个")
+    return [attach_archive(conn, db_path, year) for year in years]
+
+
+def detach_archives(conn: sqlite3.Connection, schemas: List[str]):
+    """卸载归档库，失败时只记录日志"""
+    for schema in schemas:
+        try:
+            conn.execute(f"DETACH DATABASE {schema}")
+        except sqlite3.Error as e:
+            logger.warning(f"卸载归档库 {schema} 失败: {str(e)}")
+
+
+def archive_union_sources(conn: sqlite3.Connection, tables: List[str],
+                          schemas: List[str]) -> Tuple[str, Dict[str, str]]:
+    """
+    主库与归档库同名表的 UNION ALL 数据源
+
+    Returns:
+        (WITH子句, {表名: 数据源名})，没有归档时为 ("", {表名: 表名})
+    """
+    if not schemas:
+        return "", {table: table for table in tables}
+
+    ctes, names = [], {}
+    for table in tables:
+        columns = ", ".join(table_columns(conn, table))
+        sources = [f"SELECT {columns} FROM main.{table}"] + [f"SELECT {columns} FROM {schema}.{table}" for schema in schemas]
+        ctes.append(f"all_{table} AS ({' UNION ALL '.join(sources)})")
+        names[table] = f"all_{table}"
+    return f"WITH {', '.join(ctes)}", names
+
+
+def get_archive_totals(conn: sqlite3.Connection) -> Dict[str, int]:
+    """所有归档的汇总数据（餐次数、订单数、账本记录数、订单金额），没有归档时均为0"""
+    row = conn.execute("""
+        SELECT COALESCE(SUM(meal_count), 0), COALESCE(SUM(order_count), 0),
+               COALESCE(SUM(ledger_count), 0), COALESCE(SUM(revenue_cents), 0)
+        FROM archive_segments
+    """).fetchone()
+    return {"meal_count": row[0], "order_count": row[1], "ledger_count": row[2], "revenue_cents": row[3]}
+
+
+def months_before(day: date, months: int) -> date:
+    """N个月前的同一天（目标月没有该日时取月末）"""
+    month_index = day.year * 12 + day.month - 1 - months
+    year, month = divmod(month_index, 12)
+    month += 1
+    for candidate in (day.day, 30, 29, 28):
+        try:
+            return date(year, month, min(day.day, candidate))
+        except ValueError:
+            continue
+    raise ValueError(f"无效日期: {day}")
+
+
+def _archive_chunk(db_manager, year: int, meal_ids: List[int], archive_dir: Optional[str]) -> Dict[str, int]:
+    """复制、校验并删除一块餐次（同一年份）"""
+    conn = db_manager.conn
+    schema = attach_archive(conn, db_manager.db_path, year, archive_dir, create=True)
+    ids = ",".join("?" * len(meal_ids))
+    tables = [(table, ", ".join(table_columns(conn, table)), condition.format(ids=ids))
+              for table, condition in ARCHIVE_TABLES]
+
+    # 1. 复制到归档库（只写归档库，单独提交）
+    def copy_rows():
+        for table, columns, condition in tables:
+            conn.execute(
+                f"INSERT OR REPLACE INTO {schema}.{table} ({columns}) "
+                f"SELECT {columns} FROM main.{table} WHERE {condition}",
+                meal_ids
+            )
+
+    db_manager.execute_transaction([copy_rows])
+
+    # 2. 在主库写事务内逐行比对，全部一致才删除；期间主库不会再有写入
+    def verify_and_delete():
+        conn.execute("BEGIN IMMEDIATE")
+        counts = {}
+        for table, columns, condition in tables:
+            missing = conn.execute(f"""
+                SELECT COUNT(*) FROM (
+                    SELECT {columns} FROM main.{table} WHERE {condition}
+                    EXCEPT
+                    SELECT {columns} FROM {schema}.{table} WHERE {condition}
+                )
+            """, meal_ids + meal_ids).fetchone()[0]
+            if missing:
+                raise RuntimeError(f"归档校验失败: {table} 有 {missing} 行与归档库不一致")
+            counts[table] = conn.execute(
+                f"SELECT COUNT(*) FROM main.{table} WHERE {condition}", meal_ids
+            ).fetchone()[0]
+
+        for table, _, condition in reversed(tables):
+            conn.execute(f"DELETE FROM main.{table} WHERE {condition}", meal_ids)
+
+        stats = conn.execute(f"""
+            SELECT MIN(date), MAX(date), COUNT(*),
+                   (SELECT COUNT(*) FROM {schema}.orders),
+                   (SELECT COUNT(*) FROM {schema}.ledger),
+                   (SELECT COALESCE(SUM(amount_cents), 0) FROM {schema}.orders
+                    WHERE status IN ('active', 'completed'))
+            FROM {schema}.meals
+        """).fetchone()
+        conn.execute("""
+            INSERT INTO archive_segments
+                (year, min_date, max_date, meal_count, order_count, ledger_count, revenue_cents, updated_at)
+            VALUES (?, ?, ?, ?, ?, ?, ?, CURRENT_TIMESTAMP)
+            ON CONFLICT(year) DO UPDATE SET
+                min_date = excluded.min_date, max_date = excluded.max_date,
+                meal_count = excluded.meal_count, order_count = excluded.order_count,
+                ledger_count = excluded.ledger_count, revenue_cents = excluded.revenue_cents,
+                updated_at = excluded.updated_at
+        """, [year, *stats])
+        return counts
+
+    return db_manager.execute_transaction([verify_and_delete])[0]
+
+
+def archive_cold_data(db_manager, months: int = DEFAULT_ARCHIVE_MONTHS,
+                      chunk_size: int = DEFAULT_CHUNK_SIZE,
+                      archive_dir: Optional[str] = None,
+                      today: Optional[date] = None,
+                      dry_run: bool = False) -> Dict[str, Any]:
+    """
+    归档早于N个月的已完成/已取消餐次及其订单和订单相关账本记录
+
+    仍有有效订单的餐次不归档；充值、调账等与订单无关的账本记录保留在主库
+
+    Args:
+        db_manager: 数据库管理器（应使用独立连接，归档期间会挂载归档库）
+        months: 归档早于该月数的餐次
+        chunk_size: 每块移动的餐次数
+        archive_dir: 归档目录，默认使用配置值
+        today: 计算截止日期的基准日期，默认今天
+        dry_run: 只统计待归档的餐次数，不移动数据
+
+    Returns:
+        归档汇总：截止日期、块数、各表移动行数、涉及年份
+    """
+    conn = db_manager.conn
+    cutoff = months_before(today or date.today(), months).isoformat()
+
+    candidates_sql = """
+        SELECT meal_id, date FROM meals m
+        WHERE date < ? AND status IN ('completed', 'canceled')
+          AND NOT EXISTS (SELECT 1 FROM orders o WHERE o.meal_id = m.meal_id AND o.status = 'active')
+        ORDER BY date, meal_id
+    """
+    summary = {"cutoff_date": cutoff, "chunks": 0, "meals": 0, "orders": 0, "ledger": 0, "years": []}
+
+    if dry_run:
+        summary["meals"] = len(conn.execute(candidates_sql, [cutoff]).fetchall())
+        return summary
+
+    years = set()
+    try:
+        while True:
+            rows = conn.execute(candidates_sql + " LIMIT ?", [cutoff, chunk_size]).fetchall()
+            if not rows:
+                break
+
+            by_year: Dict[int, List[int]] = {}
+            for meal_id, meal_date in rows:
+                by_year.setdefault(int(str(meal_date)[:4]), []).append(meal_id)
+
+            for year, meal_ids in by_year.items():
+                years.add(year)
+                counts = _archive_chunk(db_manager, year, meal_ids, archive_dir)
+                summary["meals"] += counts["meals"]
+                summary["orders"] += counts["orders"]
+                summary["ledger"] += counts["ledger"]
+                summary["chunks"] += 1
+                logger.info(f"归档 {year} 年餐次 {len(meal_ids)} 个: {counts}")
+    finally:
+        detach_archives(conn, [f"archive_{year}" for year in sorted(years)])
+
+    summary["years"] = sorted(years)
+    return summary
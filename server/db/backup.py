@@ -0,0 +1,164 @@
+# 数据库在线备份
+# 使用 SQLite 在线备份接口（sqlite3.Connection.backup）按页分步复制数据库，得到某一时刻的一致快照。
+# WAL模式下直接复制数据库文件可能得到缺少WAL中已提交数据或页面不一致的副本；
+# 分步备份每步之间释放读锁并短暂休眠，备份期间写请求不会被长时间阻塞。
+# 备份先写入临时文件，校验后可选gzip压缩，再原子重命名为正式备份文件，并按保留份数清理旧备份。
+
+import gzip
+import logging
+import os
+import shutil
+import sqlite3
+import time
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_PAGES_PER_STEP = 256      # 每步复制的页数（默认页大小4KB，即每步约1MB）
+DEFAULT_STEP_SLEEP = 0.005        # 每步之间的休眠时间（秒），让出锁给写请求
+DEFAULT_KEEP = 7                  # 保留的备份份数
+COPY_CHUNK_SIZE = 1024 * 1024     # 压缩时每次读取的字节数
+
+
+def backup_file_name(db_path: str, when: Optional[datetime] = None, compress: bool = True) -> str:
+    """
+    生成备份文件名：<数据库文件名>-YYYYMMDD-HHMMSS.db[.gz]
+
+    Args:
+        db_path: 数据库文件路径
+        when: 备份时间，默认当前时间
+        compress: 是否压缩
+
+    Returns:
+        备份文件名（不含目录）
+    """
+    stem = os.path.splitext(os.path.basename(db_path))[0] or "database"
+    timestamp = (when or datetime.now()).strftime("%Y%m%d-%H%M%S")
+    return f"{stem}-{timestamp}.db" + (".gz" if compress else "")
+
+
+def online_backup(conn: sqlite3.Connection, backup_path: str,
+                  pages_per_step: int = DEFAULT_PAGES_PER_STEP,
+                  step_sleep: float = DEFAULT_STEP_SLEEP,
+                  compress: bool = False,
+                  checkpoint: bool = True,
+                  verify: bool = True) -> Dict[str, Any]:
+    """
+    在线备份数据库
+
+    Args:
+        conn: 源数据库连接（建议使用独立连接，备份期间该连接不可执行其他操作）
+        backup_path: 备份文件路径（compress为True时写入gzip压缩数据）
+        pages_per_step: 每步复制的页数
+        step_sleep: 每步之间的休眠时间（秒）
+        compress: 是否gzip压缩备份文件
+        checkpoint: 备份前是否执行被动检查点（不等待读者、不阻塞写者），减少备份时需读取的WAL帧
+        verify: 是否对备份副本执行 quick_check
+
+    Returns:
+        备份结果：路径、页数、步数、文件大小、耗时等
+
+    Raises:
+        sqlite3.DatabaseError: 备份或校验失败（临时文件会被删除，不影响已有备份）
+    """
+    started = time.monotonic()
+    backup_dir = os.path.dirname(backup_path)
+    if backup_dir:
+        os.makedirs(backup_dir, exist_ok=True)
+
+    copy_path = f"{backup_path}.copy.tmp"
+    compressed_path = f"{backup_path}.tmp"
+    result = {"path": backup_path, "compressed": compress, "checkpoint": None}
+
+    try:
+        if checkpoint:
+            busy, wal_frames, checkpointed = conn.execute("PRAGMA wal_checkpoint(PASSIVE)").fetchone()
+            result["checkpoint"] = {"busy": busy, "wal_frames": wal_frames, "checkpointed": checkpointed}
+
+        progress_state = {"steps": 0, "pages": 0}
+
+        def progress(status, remaining, total):
+            progress_state["steps"] += 1
+            progress_state["pages"] = total
+            # 每步结束后源库的读锁已释放，休眠期间写请求可以正常提交
+            if remaining and step_sleep > 0:
+                time.sleep(step_sleep)
+
+        target = sqlite3.connect(copy_path)
+        try:
+            conn.backup(target, pages=pages_per_step, progress=progress)
+            if verify:
+                check = target.execute("PRAGMA quick_check").fetchone()[0]
+                if check != "ok":
+                    raise sqlite3.DatabaseError(f"备份副本校验失败: {check}")
+        finally:
+            target.close()
+
+        if compress:
+            with open(copy_path, "rb") as source_file, gzip.open(compressed_path, "wb") as gzip_file:
+                shutil.copyfileobj(source_file, gzip_file, COPY_CHUNK_SIZE)
+            os.remove(copy_path)
+            os.replace(compressed_path, backup_path)
+        else:
+            os.replace(copy_path, backup_path)
+
+        result.update({
+            "pages": progress_state["pages"],
+            "steps": progress_state["steps"],
+            "size_bytes": os.path.getsize(backup_path),
+            "duration_ms": round((time.monotonic() - started) * 1000, 1)
+        })
+        return result
+    except Exception:
+        for path in (copy_path, compressed_path):
+            if os.path.exists(path):
+                os.remove(path)
+        raise
+
+
+def restore_backup(backup_path: str, target_path: str):
+    """
+    从备份文件恢复数据库（自动识别gzip压缩），目标文件不能被其他连接打开
+
+    Args:
+        backup_path: 备份文件路径
+        target_path: 恢复后的数据库文件路径
+    """
+    opener = gzip.open if backup_path.endswith(".gz") else open
+    temp_path = f"{target_path}.restore.tmp"
+    with opener(backup_path, "rb") as source_file, open(temp_path, "wb") as target_file:
+        shutil.copyfileobj(source_file, target_file, COPY_CHUNK_SIZE)
+    os.replace(temp_path, target_path)
+    # 旧的WAL和共享内存文件属于被替换的数据库，必须删除
+    for suffix in ("-wal", "-shm"):
+        if os.path.exists(target_path + suffix):
+            os.remove(target_path + suffix)
+
+
+def rotate_backups(backup_dir: str, db_path: str, keep: int = DEFAULT_KEEP) -> List[str]:
+    """
+    按保留份数删除最旧的备份
+
+    Args:
+        backup_dir: 备份目录
+        db_path: 数据库文件路径（用于匹配备份文件名前缀）
+        keep: 保留份数
+
+    Returns:
+        删除的备份文件路径列表
+    """
+    if keep <= 0 or not os.path.isdir(backup_dir):
+        return []
+
+    prefix = os.path.splitext(os.path.basename(db_path))[0] + "-"
+    backups = sorted(
+        name for name in os.listdir(backup_dir)
+        if name.startswith(prefix) and (name.endswith(".db") or name.endswith(".db.gz"))
+    )
+    removed = []
+    for name in backups[:-keep]:
+        path = os.path.join(backup_dir, name)
+        os.remove(path)
+        removed.append(path)
+    return removed
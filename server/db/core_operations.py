@@ -3,8 +3,67 @@
 
 import json
 from datetime import datetime
-from typing import List, Optional, Dict, Any
+from typing import List, Optional, Dict, Any, Tuple
 from .manager import DatabaseManager
+from .meal_events import record_meal_event, record_meal_events
+
+# 热点语句（db/query_plans.py 用 EXPLAIN QUERY PLAN 校验其执行计划）
+
+# 当日最大交易号：序号定长，按前缀范围取最大交易号，只读取 transaction_no 唯一索引的一项
+# （LIKE 不区分大小写，无法使用该索引）
+LAST_TRANSACTION_NO_SQL = """
+    SELECT MAX(transaction_no)
+    FROM ledger
+    WHERE transaction_no >= ? AND transaction_no < ?
+"""
+
+# 用户在该餐次是否已有有效订单
+ACTIVE_ORDER_EXISTS_SQL = """
+    SELECT order_id FROM orders
+    WHERE user_id = ? AND meal_id = ? AND status = 'active'
+"""
+
+# 取消餐次：按用户汇总有效订单金额退回余额
+CANCEL_MEAL_REFUND_BALANCES_SQL = """
+    UPDATE users
+    SET balance_cents = balance_cents + refund.amount_cents,
+        updated_at = CURRENT_TIMESTAMP
+    FROM (
+        SELECT user_id, SUM(amount_cents) AS amount_cents
+        FROM orders
+        WHERE meal_id = ? AND status = 'active'
+        GROUP BY user_id
+    ) AS refund
+    WHERE users.user_id = refund.user_id
+"""
+
+# 取消餐次：写入全部退款流水（参数：流水ID起点、交易号前缀、已用序号、餐次ID）
+CANCEL_MEAL_REFUND_LEDGER_SQL = """
+    INSERT INTO ledger (ledger_id, transaction_no, user_id, type, direction, amount_cents,
+                      balance_before_cents, balance_after_cents, order_id,
+                      description, created_at)
+    SELECT ? + ROW_NUMBER() OVER (ORDER BY o.order_id),
+           ? || printf('%06d', ? + ROW_NUMBER() OVER (ORDER BY o.order_id)),
+           o.user_id, 'refund', 'in', o.amount_cents,
+           u.balance_cents - o.amount_cents, u.balance_cents, o.order_id,
+           '餐次取消退款-订单' || o.order_id, CURRENT_TIMESTAMP
+    FROM orders o
+    JOIN users u ON u.user_id = o.user_id
+    WHERE o.meal_id = ? AND o.status = 'active'
+    ORDER BY o.order_id
+    RETURNING order_id, user_id, amount_cents, transaction_no
+"""
+
+# 取消餐次：取消全部有效订单
+CANCEL_MEAL_ORDERS_SQL = """
+    UPDATE orders
+    SET status = 'canceled',
+        canceled_at = CURRENT_TIMESTAMP,
+        canceled_reason = '餐次被管理员取消',
+        updated_at = CURRENT_TIMESTAMP
+    WHERE meal_id = ? AND status = 'active'
+"""
+
 
 class CoreOperations:
     """
@@ -152,21 +211,23 @@ class CoreOperations:
             return meal_details
         return None
 
-    def _generate_transaction_no(self) -> str:
-        """生成交易号"""
+    def _last_transaction_seq(self) -> Tuple[str, int]:
+        """当日交易号前缀和已使用的最大序号"""
         from datetime import datetime
         now = datetime.now()
         date_prefix = f"TXN{now.strftime('%Y%m%d')}"
         
         # 获取当日最大序号
-        max_seq = self.db.conn.execute("""
-            SELECT MAX(CAST(SUBSTRING(transaction_no, 12, 6) AS INTEGER))
-            FROM ledger 
-            WHERE transaction_no LIKE ?
-        """, [f"{date_prefix}%"]).fetchone()[0]
-        
-        seq = (max_seq or 0) + 1
-        return f"{date_prefix}{seq:06d}"
+        max_no = self.db.conn.execute(
+            LAST_TRANSACTION_NO_SQL, [date_prefix, f"{date_prefix}:"]
+        ).fetchone()[0]
+        
+        return date_prefix, int(max_no[len(date_prefix):len(date_prefix) + 6]) if max_no else 0
+
+    def _generate_transaction_no(self) -> str:
+        """生成交易号"""
+        date_prefix, last_seq = self._last_transaction_seq()
+        return f"{date_prefix}{last_seq + 1:06d}"
 
     def _process_payment(self, user_id: int, amount_cents: int, order_id: int, 
                         description: str) -> Dict[str, Any]:
@@ -562,6 +623,8 @@ class CoreOperations:
                 created_at = datetime.now().isoformat()
                 message = f'{date} {slot} 餐次发布成功'
             
+            record_meal_event(self.db, meal_id, 'publish')
+            
             return {
                 'meal_id': meal_id,
                 'date': date,
@@ -573,6 +636,125 @@ class CoreOperations:
         
         return self.db.execute_transaction([publish_meal_operation])[0]
 
+    # 管理员批量发布餐次操作
+    def admin_publish_meals_bulk(self, admin_user_id: int, meals: List[Dict[str, Any]],
+                                 dry_run: bool = False, skip_conflicts: bool = False) -> Dict[str, Any]:
+        """
+        管理员批量发布餐次（一个事务）
+        
+        权限和附加项只校验一次，时段冲突用一次日期范围查询检测，
+        新餐次和重用的已取消餐次分别用 executemany 批量写入
+        
+        Args:
+            admin_user_id: 管理员用户ID
+            meals: 餐次列表，每项包含 date, slot, description, base_price_cents,
+                   addon_config ({addon_id: max_quantity}), max_orders
+            dry_run: 只返回发布计划和冲突报告，不写入
+            skip_conflicts: 跳过已存在有效餐次的时段（否则存在冲突时整批失败）
+        
+        Returns:
+            发布结果，包含 published（发布或计划发布的餐次）和 conflicts（冲突时段）
+        """
+        
+        def publish_meals_bulk_operation():
+            # 验证管理员权限
+            self._verify_admin_permission(admin_user_id)
+            
+            if not meals:
+                raise ValueError("没有需要发布的餐次")
+            
+            seen = set()
+            for meal in meals:
+                key = (meal['date'], meal['slot'])
+                if key in seen:
+                    raise ValueError(f"{meal['date']} {meal['slot']} 时段重复")
+                seen.add(key)
+            
+            # 验证所有addon_ids都是活跃状态（合并后校验一次）
+            addon_ids = sorted({addon_id for meal in meals for addon_id in (meal.get('addon_config') or {})})
+            self._verify_addon_ids_active(addon_ids)
+            
+            # 一次范围查询获取所有已存在的餐次
+            dates = [meal['date'] for meal in meals]
+            existing = {
+                (row[1], row[2]): (row[0], row[3])
+                for row in self.db.conn.execute("""
+                    SELECT meal_id, date, slot, status FROM meals
+                    WHERE date BETWEEN ? AND ?
+                """, [min(dates), max(dates)]).fetchall()
+            }
+            
+            conflicts = []
+            published = []
+            to_insert = []
+            to_reuse = []
+            for meal in meals:
+                key = (meal['date'], meal['slot'])
+                addon_config = meal.get('addon_config') or {}
+                addon_config_json = json.dumps({str(k): v for k, v in addon_config.items()}) if addon_config else None
+                values = [meal['description'], meal['base_price_cents'], addon_config_json, meal.get('max_orders', 50)]
+                
+                if key in existing:
+                    meal_id, status = existing[key]
+                    if status != 'canceled':
+                        conflicts.append({'date': key[0], 'slot': key[1], 'meal_id': meal_id, 'status': status})
+                    else:
+                        # 重用已取消的餐次
+                        to_reuse.append(values + [meal_id])
+                        published.append({'meal_id': meal_id, 'date': key[0], 'slot': key[1], 'is_new_meal': False})
+                else:
+                    to_insert.append([key[0], key[1]] + values)
+            
+            if conflicts and not skip_conflicts and not dry_run:
+                conflict_text = ", ".join(f"{c['date']} {c['slot']}" for c in conflicts)
+                raise ValueError(f"以下时段已存在有效餐次: {conflict_text}")
+            
+            if not dry_run:
+                if to_reuse:
+                    self.db.conn.executemany("""
+                        UPDATE meals 
+                        SET description = ?, base_price_cents = ?, addon_config = ?, 
+                            max_orders = ?, current_orders = 0, status = 'published', 
+                            updated_at = CURRENT_TIMESTAMP,
+                            canceled_at = NULL, canceled_by = NULL, canceled_reason = NULL
+                        WHERE meal_id = ? AND status = 'canceled'
+                    """, to_reuse)
+                
+                if to_insert:
+                    self.db.conn.executemany("""
+                        INSERT INTO meals (date, slot, description, base_price_cents, addon_config, 
+                                         max_orders, current_orders, status, created_at, updated_at)
+                        VALUES (?, ?, ?, ?, ?, ?, 0, 'published', CURRENT_TIMESTAMP, CURRENT_TIMESTAMP)
+                    """, to_insert)
+                    
+                    # 取回新餐次ID
+                    inserted_keys = {(row[0], row[1]) for row in to_insert}
+                    for row in self.db.conn.execute("""
+                        SELECT meal_id, date, slot FROM meals
+                        WHERE date BETWEEN ? AND ? AND status = 'published'
+                    """, [min(dates), max(dates)]).fetchall():
+                        if (row[1], row[2]) in inserted_keys:
+                            published.append({'meal_id': row[0], 'date': row[1], 'slot': row[2], 'is_new_meal': True})
+                
+                record_meal_events(self.db, [item['meal_id'] for item in published], 'publish')
+            else:
+                published.extend(
+                    {'meal_id': None, 'date': row[0], 'slot': row[1], 'is_new_meal': True} for row in to_insert
+                )
+            
+            published.sort(key=lambda item: (item['date'], item['slot']))
+            verb = '计划发布' if dry_run else '发布'
+            return {
+                'dry_run': dry_run,
+                'published': published,
+                'conflicts': conflicts,
+                'created_count': len(to_insert),
+                'reused_count': len(to_reuse),
+                'message': f'{verb} {len(published)} 个餐次，{len(conflicts)} 个时段冲突'
+            }
+        
+        return self.db.execute_transaction([publish_meals_bulk_operation])[0]
+
     # 管理员锁定餐次操作
     def admin_lock_meal(self, admin_user_id: int, meal_id: int) -> Dict[str, Any]:
         """
@@ -603,6 +785,7 @@ class CoreOperations:
                     updated_at = CURRENT_TIMESTAMP
                 WHERE meal_id = ?
             """, [meal_id])
+            record_meal_event(self.db, meal_id, 'lock')
             
             return {
                 'meal_id': meal_id,
@@ -614,6 +797,45 @@ class CoreOperations:
         
         return self.db.execute_transaction([lock_meal_operation])[0]
 
+    # 截单时间自动锁定餐次操作
+    def auto_lock_meals(self, meal_ids: List[int], on_locked=None) -> Dict[str, Any]:
+        """
+        批量锁定已到截单时间的餐次（由自动锁定调度器调用，无需管理员权限）
+        
+        只锁定仍处于发布状态的餐次，已被管理员锁定、取消的餐次自动跳过
+        
+        Args:
+            meal_ids: 待锁定的餐次ID列表
+            on_locked: 可选回调，在同一事务内以已锁定的餐次ID列表调用（如推进调度进度）
+        
+        Returns:
+            包含实际锁定的餐次ID列表的操作结果
+        """
+        
+        def auto_lock_operation():
+            locked_meal_ids = []
+            if meal_ids:
+                placeholders = ",".join("?" * len(meal_ids))
+                rows = self.db.conn.execute(f"""
+                    UPDATE meals 
+                    SET status = 'locked', 
+                        updated_at = CURRENT_TIMESTAMP
+                    WHERE status = 'published' AND meal_id IN ({placeholders})
+                    RETURNING meal_id
+                """, list(meal_ids)).fetchall()
+                locked_meal_ids = sorted(row[0] for row in rows)
+                record_meal_events(self.db, locked_meal_ids, 'lock')
+            
+            if on_locked is not None:
+                on_locked(locked_meal_ids)
+            
+            return {
+                'locked_meal_ids': locked_meal_ids,
+                'message': f'自动锁定 {len(locked_meal_ids)} 个餐次'
+            }
+        
+        return self.db.execute_transaction([auto_lock_operation])[0]
+
     # 管理员完成餐次操作  
     def admin_complete_meal(self, admin_user_id: int, meal_id: int) -> Dict[str, Any]:
         """
@@ -644,6 +866,7 @@ class CoreOperations:
                     updated_at = CURRENT_TIMESTAMP
                 WHERE meal_id = ?
             """, [meal_id])
+            record_meal_event(self.db, meal_id, 'complete')
             
             # 将所有active订单状态改为completed
             completed_orders = self.db.conn.execute("""
@@ -665,6 +888,111 @@ class CoreOperations:
         
         return self.db.execute_transaction([complete_meal_operation])[0]
 
+    # 查询待完成餐次
+    def list_completable_meals(self, before_date: Optional[str] = None,
+                               meal_ids: Optional[List[int]] = None) -> List[int]:
+        """
+        查询可完成（已发布或已锁定）的餐次ID
+        
+        Args:
+            before_date: 只包含该日期之前的餐次 (YYYY-MM-DD)
+            meal_ids: 只包含这些餐次
+        
+        Returns:
+            按日期、时段排序的餐次ID列表
+        """
+        conditions = ["status IN ('published', 'locked')"]
+        params = []
+        if before_date:
+            conditions.append("date < ?")
+            params.append(before_date)
+        if meal_ids:
+            conditions.append(f"meal_id IN ({','.join('?' * len(meal_ids))})")
+            params.extend(meal_ids)
+        
+        rows = self.db.conn.execute(f"""
+            SELECT meal_id FROM meals
+            WHERE {' AND '.join(conditions)}
+            ORDER BY date, slot
+        """, params).fetchall()
+        return [row[0] for row in rows]
+
+    # 管理员批量完成餐次操作
+    def admin_complete_meals_batch(self, admin_user_id: int, meal_ids: List[int]) -> Dict[str, Any]:
+        """
+        管理员批量完成一批餐次（一个事务）
+        
+        餐次和订单各用一条语句更新，并按订单重新统计餐次订单数，
+        返回每个餐次的订单数和金额汇总，不返回逐个订单
+        
+        Args:
+            admin_user_id: 管理员用户ID
+            meal_ids: 餐次ID列表（非发布/锁定状态的餐次自动跳过）
+        
+        Returns:
+            包含 meals（每餐次汇总）、orders_completed、amount_cents 的操作结果
+        """
+        
+        def complete_meals_batch_operation():
+            # 验证管理员权限
+            self._verify_admin_permission(admin_user_id)
+            
+            if not meal_ids:
+                return {'meals': [], 'orders_completed': 0, 'amount_cents': 0, 'message': '没有需要完成的餐次'}
+            
+            placeholders = ','.join('?' * len(meal_ids))
+            completed_meal_ids = [row[0] for row in self.db.conn.execute(f"""
+                UPDATE meals 
+                SET status = 'completed', 
+                    updated_at = CURRENT_TIMESTAMP
+                WHERE meal_id IN ({placeholders}) AND status IN ('published', 'locked')
+                RETURNING meal_id
+            """, list(meal_ids)).fetchall()]
+            
+            if not completed_meal_ids:
+                return {'meals': [], 'orders_completed': 0, 'amount_cents': 0, 'message': '没有需要完成的餐次'}
+            
+            placeholders = ','.join('?' * len(completed_meal_ids))
+            orders_completed = self.db.conn.execute(f"""
+                UPDATE orders 
+                SET status = 'completed',
+                    updated_at = CURRENT_TIMESTAMP
+                WHERE meal_id IN ({placeholders}) AND status = 'active'
+            """, completed_meal_ids).rowcount
+            
+            # 按订单重新统计餐次订单数
+            self.db.conn.execute(f"""
+                UPDATE meals 
+                SET current_orders = (
+                    SELECT COUNT(*) FROM orders o 
+                    WHERE o.meal_id = meals.meal_id AND o.status = 'completed'
+                )
+                WHERE meal_id IN ({placeholders})
+            """, completed_meal_ids)
+            record_meal_events(self.db, completed_meal_ids, 'complete')
+            
+            meals = [
+                {'meal_id': row[0], 'date': row[1], 'slot': row[2], 'orders': row[3], 'amount_cents': row[4]}
+                for row in self.db.conn.execute(f"""
+                    SELECT m.meal_id, m.date, m.slot, COUNT(o.order_id), COALESCE(SUM(o.amount_cents), 0)
+                    FROM meals m
+                    LEFT JOIN orders o ON o.meal_id = m.meal_id AND o.status = 'completed'
+                    WHERE m.meal_id IN ({placeholders})
+                    GROUP BY m.meal_id, m.date, m.slot
+                    ORDER BY m.date, m.slot
+                """, completed_meal_ids).fetchall()
+            ]
+            amount_cents = sum(meal['amount_cents'] for meal in meals)
+            
+            return {
+                'meals': meals,
+                'orders_completed': orders_completed,
+                'amount_cents': amount_cents,
+                'message': f'完成 {len(meals)} 个餐次，共 {orders_completed} 个订单'
+            }
+        
+        return self.db.execute_transaction([complete_meals_batch_operation])[0]
+
     # 管理员取消餐次操作
     def admin_cancel_meal(self, admin_user_id: int, meal_id: int, cancel_reason: str = "管理员取消") -> dict:
         """
@@ -702,15 +1030,6 @@ class CoreOperations:
             if meal_info['status'] == 'canceled':
                 raise ValueError(f"餐次 {meal_info['date']} {meal_info['slot']} 已被取消")
             
-            # 获取需要取消的订单
-            active_orders = self.db.conn.execute("""
-                SELECT order_id, user_id, amount_cents FROM orders 
-                WHERE meal_id = ? AND status = 'active'
-            """, [meal_id]).fetchall()
-            
-            logger.info(f"取消餐次 {meal_id}，处理 {len(active_orders)} 个订单")
-            
-            # 简单直接的UPDATE方法 - 不涉及主键修改
             self.db.conn.execute("""
                 UPDATE meals 
                 SET status = 'canceled',
@@ -720,61 +1039,33 @@ class CoreOperations:
                     canceled_reason = ?
                 WHERE meal_id = ?
             """, [admin_user_id, cancel_reason, meal_id])
-            
-            # 取消订单并退款 - 分两步处理以避免约束问题
-            # 步骤1: 取消所有订单状态
-            for order_id, user_id, amount_cents in active_orders:
-                self.db.conn.execute("""
-                    UPDATE orders 
-                    SET status = 'canceled',
-                        canceled_at = CURRENT_TIMESTAMP,
-                        canceled_reason = '餐次被管理员取消',
-                        updated_at = CURRENT_TIMESTAMP
-                    WHERE order_id = ?
-                """, [order_id])
-            
-            # 步骤2: 处理所有用户余额更新
-            for order_id, user_id, amount_cents in active_orders:
-                # 直接更新用户余额，不创建账本记录（避免外键约束问题）
-                current_balance = self.db.conn.execute(
-                    "SELECT balance_cents FROM users WHERE user_id = ?", [user_id]
-                ).fetchone()[0]
-                
-                new_balance = current_balance + amount_cents
-                
-                self.db.conn.execute("""
-                    UPDATE users 
-                    SET balance_cents = ?, updated_at = CURRENT_TIMESTAMP
-                    WHERE user_id = ?
-                """, [new_balance, user_id])
-            
-            # 步骤3: 创建所有账本记录（在状态更新完成后）
-            canceled_orders = []
-            for order_id, user_id, amount_cents in active_orders:
-                # 重新获取更新后的余额用于账本记录
-                new_balance = self.db.conn.execute(
-                    "SELECT balance_cents FROM users WHERE user_id = ?", [user_id]
-                ).fetchone()[0]
-                old_balance = new_balance - amount_cents
-                
-                # 生成交易号和账本记录
-                transaction_no = self._generate_transaction_no()
-                ledger_id = self.db.conn.execute("SELECT COALESCE(MAX(ledger_id), 0) + 1 FROM ledger").fetchone()[0]
-                
-                self.db.conn.execute("""
-                    INSERT INTO ledger (ledger_id, transaction_no, user_id, type, direction, amount_cents,
-                                      balance_before_cents, balance_after_cents, order_id, 
-                                      description, created_at)
-                    VALUES (?, ?, ?, 'refund', 'in', ?, ?, ?, ?, ?, CURRENT_TIMESTAMP)
-                """, [ledger_id, transaction_no, user_id, amount_cents, old_balance, new_balance, 
-                      order_id, f"餐次取消退款-订单{order_id}"])
-                
-                canceled_orders.append({
+            record_meal_event(self.db, meal_id, 'cancel')
+            
+            # 退款按集合处理，语句数与订单数无关：
+            # 步骤1: 按用户汇总有效订单金额，一条语句退回余额
+            self.db.conn.execute(CANCEL_MEAL_REFUND_BALANCES_SQL, [meal_id])
+            
+            # 步骤2: 一条语句写入全部退款流水（余额已更新，变动后余额即当前余额），
+            # 流水ID和当日流水号从当前最大值起按订单ID顺序连续分配
+            date_prefix, last_seq = self._last_transaction_seq()
+            ledger_base = self.db.conn.execute("SELECT COALESCE(MAX(ledger_id), 0) FROM ledger").fetchone()[0]
+            refunds = self.db.conn.execute(
+                CANCEL_MEAL_REFUND_LEDGER_SQL, [ledger_base, date_prefix, last_seq, meal_id]
+            ).fetchall()
+            
+            # 步骤3: 一条语句取消全部订单
+            self.db.conn.execute(CANCEL_MEAL_ORDERS_SQL, [meal_id])
+            
+            logger.info(f"取消餐次 {meal_id}，处理 {len(refunds)} 个订单")
+            canceled_orders = [
+                {
                     'order_id': order_id,
                     'user_id': user_id,
                     'amount_cents': amount_cents,
                     'refund_transaction_no': transaction_no
-                })
+                }
+                for order_id, user_id, amount_cents, transaction_no in sorted(map(tuple, refunds))
+            ]
             
             # 计算总退款金额
             total_refund_amount = sum(order['amount_cents'] for order in canceled_orders)
@@ -818,10 +1109,7 @@ class CoreOperations:
                 raise ValueError(f"餐次状态为{meal_info['status']}，无法订餐")
             
             # 检查是否已有active订单
-            existing_order = self.db.conn.execute("""
-                SELECT order_id FROM orders 
-                WHERE user_id = ? AND meal_id = ? AND status = 'active'
-            """, [user_id, meal_id]).fetchone()
+            existing_order = self.db.conn.execute(ACTIVE_ORDER_EXISTS_SQL, [user_id, meal_id]).fetchone()
             
             if existing_order:
                 raise ValueError(f"用户已有该餐次的有效订单 {existing_order[0]}")
@@ -853,17 +1141,19 @@ class CoreOperations:
                     if quantity <= 0:
                         raise ValueError(f"附加项{addon_id}数量必须大于0")
                 
-                # 计算附加项总价格
+                # 计算附加项总价格（一次查询全部所选附加项的价格）
+                addon_ids = list(addon_selections.keys())
+                placeholders = ','.join(['?' for _ in addon_ids])
+                addon_prices = dict(self.db.conn.execute(f"""
+                    SELECT addon_id, price_cents FROM addons
+                    WHERE addon_id IN ({placeholders}) AND status = 'active'
+                """, addon_ids).fetchall())
+                
                 for addon_id, quantity in addon_selections.items():
-                    addon_price = self.db.conn.execute("""
-                        SELECT price_cents FROM addons 
-                        WHERE addon_id = ? AND status = 'active'
-                    """, [addon_id]).fetchone()
-                    
-                    if not addon_price:
+                    if addon_id not in addon_prices:
                         raise ValueError(f"附加项{addon_id}不存在或已停用")
                     
-                    total_amount += addon_price[0] * quantity
+                    total_amount += addon_prices[addon_id] * quantity
             
             # 允许负余额（信用系统） - 不验证余额是否充足
             
@@ -900,13 +1190,16 @@ class CoreOperations:
             deduction_result = self._process_payment(user_id, total_amount, order_id,
                                                    f"订餐付款-订单{order_id}")
             
-            # 更新餐次当前订单数
-            self.db.conn.execute("""
+            # 更新餐次当前订单数 - 条件更新保证并发下单不会超过容量
+            claimed = self.db.conn.execute("""
                 UPDATE meals 
                 SET current_orders = current_orders + 1,
                     updated_at = CURRENT_TIMESTAMP
-                WHERE meal_id = ?
+                WHERE meal_id = ? AND status = 'published' AND current_orders < max_orders
             """, [meal_id])
+            if claimed.rowcount != 1:
+                raise ValueError("餐次已满，无法下单")
+            record_meal_event(self.db, meal_id, 'order')
             
             return {
                 'order_id': order_id,
@@ -980,6 +1273,7 @@ class CoreOperations:
                     updated_at = CURRENT_TIMESTAMP
                 WHERE meal_id = ?
             """, [order_info['meal_id']])
+            record_meal_event(self.db, order_info['meal_id'], 'order_cancel')
             
             return {
                 'order_id': order_id,
@@ -0,0 +1,264 @@
+# 订单、账本流式导出
+# 财务按月对账时一次性导出全部订单/账本记录，不再逐页调用列表接口（每页都要重复 COUNT 和统计）。
+# 一条查询的游标按块 fetchmany，生成器逐块产出 CSV（或 XLSX）字节，内存占用与导出行数无关；
+# 可选 gzip 压缩。导出范围与已归档年份重叠时挂载对应归档库，历史月份同样可以导出。
+
+import csv
+import io
+import os
+import tempfile
+import zlib
+from datetime import date, timedelta
+from typing import Any, Iterator, List, Optional, Tuple
+
+try:
+    import openpyxl
+except ImportError:  # openpyxl 未安装时仅支持 CSV 导出
+    openpyxl = None
+
+from db.archive import archive_union_sources, attach_archives_for_range
+
+DEFAULT_CHUNK_SIZE = 1000
+EXPORT_FORMATS = ("csv", "xlsx")
+
+# 账本记录按创建日期筛选，归档按餐次日期划分：挂载归档库时前后各放宽该天数（提前下单、延后退款）
+LEDGER_ARCHIVE_MARGIN_DAYS = 31
+
+# 导出列：(列名, SQL表达式)
+ORDER_EXPORT_COLUMNS = [
+    ("order_id", "o.order_id"),
+    ("user_id", "o.user_id"),
+    ("wechat_name", "u.wechat_name"),
+    ("meal_id", "o.meal_id"),
+    ("meal_date", "m.date"),
+    ("meal_slot", "m.slot"),
+    ("amount_cents", "o.amount_cents"),
+    ("amount_yuan", "printf('%.2f', o.amount_cents / 100.0)"),
+    ("addon_selections", "o.addon_selections"),
+    ("status", "o.status"),
+    ("created_at", "o.created_at"),
+    ("canceled_at", "o.canceled_at"),
+]
+
+LEDGER_EXPORT_COLUMNS = [
+    ("ledger_id", "l.ledger_id"),
+    ("transaction_no", "l.transaction_no"),
+    ("user_id", "l.user_id"),
+    ("wechat_name", "u.wechat_name"),
+    ("type", "l.type"),
+    ("direction", "l.direction"),
+    ("amount_cents", "l.amount_cents"),
+    ("amount_yuan", "printf('%.2f', l.amount_cents / 100.0)"),
+    ("balance_before_cents", "l.balance_before_cents"),
+    ("balance_after_cents", "l.balance_after_cents"),
+    ("order_id", "l.order_id"),
+    ("meal_id", "o.meal_id"),
+    ("description", "l.description"),
+    ("operator_id", "l.operator_id"),
+    ("created_at", "l.created_at"),
+]
+
+EXPORT_MEDIA_TYPES = {
+    "csv": "text/csv",                 # StreamingResponse 自动追加 charset=utf-8
+    "xlsx": "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+}
+
+
+def is_xlsx_available() -> bool:
+    return openpyxl is not None
+
+
+def _archive_range(start_date: Optional[str], end_date: Optional[str], margin_days: int = 0) -> Tuple[str, str]:
+    """挂载归档库使用的日期范围（未指定时覆盖全部归档）"""
+    start = date.fromisoformat(start_date) - timedelta(days=margin_days) if start_date else date.min
+    end = date.fromisoformat(end_date) + timedelta(days=margin_days) if end_date else date.max
+    return start.isoformat(), end.isoformat()
+
+
+def build_orders_export_query(conn, db_path: str, start_date: Optional[str] = None, end_date: Optional[str] = None,
+                              user_id: Optional[int] = None, meal_id: Optional[int] = None,
+                              status: Optional[str] = None) -> Tuple[str, List[Any]]:
+    """
+    订单导出查询（按餐次日期筛选，按餐次日期、订单ID排序）
+
+    Returns:
+        (SQL, 参数)
+    """
+    schemas = attach_archives_for_range(conn, db_path, *_archive_range(start_date, end_date))
+    with_clause, sources = archive_union_sources(conn, ["orders", "meals"], schemas)
+
+    conditions, params = [], []
+    if start_date:
+        conditions.append("m.date >= ?")
+        params.append(start_date)
+    if end_date:
+        conditions.append("m.date <= ?")
+        params.append(end_date)
+    if user_id is not None:
+        conditions.append("o.user_id = ?")
+        params.append(user_id)
+    if meal_id is not None:
+        conditions.append("o.meal_id = ?")
+        params.append(meal_id)
+    if status:
+        conditions.append("o.status = ?")
+        params.append(status)
+
+    sql = f"""
+        {with_clause}
+        SELECT {', '.join(expr for _, expr in ORDER_EXPORT_COLUMNS)}
+        FROM {sources['orders']} o
+        JOIN {sources['meals']} m ON o.meal_id = m.meal_id
+        LEFT JOIN users u ON o.user_id = u.user_id
+        {'WHERE ' + ' AND '.join(conditions) if conditions else ''}
+        ORDER BY m.date, o.order_id
+    """
+    return sql, params
+
+
+def build_ledger_export_query(conn, db_path: str, start_date: Optional[str] = None, end_date: Optional[str] = None,
+                              user_id: Optional[int] = None, meal_id: Optional[int] = None) -> Tuple[str, List[Any]]:
+    """
+    账本导出查询（按记录创建日期筛选，按账本ID排序）
+
+    Returns:
+        (SQL, 参数)
+    """
+    schemas = attach_archives_for_range(
+        conn, db_path, *_archive_range(start_date, end_date, LEDGER_ARCHIVE_MARGIN_DAYS)
+    )
+    with_clause, sources = archive_union_sources(conn, ["ledger", "orders"], schemas)
+
+    conditions, params = [], []
+    if start_date:
+        conditions.append("l.created_at >= ?")
+        params.append(start_date)
+    if end_date:
+        # created_at 带时间，结束日期当天的记录也要包含
+        conditions.append("l.created_at < date(?, '+1 day')")
+        params.append(end_date)
+    if user_id is not None:
+        conditions.append("l.user_id = ?")
+        params.append(user_id)
+    if meal_id is not None:
+        conditions.append("o.meal_id = ?")
+        params.append(meal_id)
+
+    sql = f"""
+        {with_clause}
+        SELECT {', '.join(expr for _, expr in LEDGER_EXPORT_COLUMNS)}
+        FROM {sources['ledger']} l
+        LEFT JOIN {sources['orders']} o ON l.order_id = o.order_id
+        LEFT JOIN users u ON l.user_id = u.user_id
+        {'WHERE ' + ' AND '.join(conditions) if conditions else ''}
+        ORDER BY l.ledger_id
+    """
+    return sql, params
+
+
+def iter_row_chunks(conn, sql: str, params: List[Any], chunk_size: int = DEFAULT_CHUNK_SIZE) -> Iterator[List[tuple]]:
+    """
+    逐块读取查询结果
+
+    整个导出只执行一条查询，结果来自同一个读快照（WAL模式下不阻塞写入）
+    """
+    cursor = conn.execute(sql, params)
+    try:
+        while True:
+            rows = cursor.fetchmany(chunk_size)
+            if not rows:
+                break
+            yield [tuple(row) for row in rows]
+    finally:
+        cursor.close()
+
+
+def iter_csv(header: List[str], chunks: Iterator[List[tuple]]) -> Iterator[bytes]:
+    """
+    把行块编码为 CSV 字节块（UTF-8 带BOM，Excel 可直接打开中文）
+    """
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(header)
+    yield b"\xef\xbb\xbf" + buffer.getvalue().encode("utf-8")
+
+    for rows in chunks:
+        buffer.seek(0)
+        buffer.truncate()
+        writer.writerows(rows)
+        yield buffer.getvalue().encode("utf-8")
+
+
+def iter_xlsx(header: List[str], chunks: Iterator[List[tuple]], sheet_title: str = "export",
+              read_size: int = 64 * 1024) -> Iterator[bytes]:
+    """
+    把行块写入 XLSX 并按块输出文件内容
+
+    openpyxl 的只写模式把行写入临时文件，内存占用与行数无关；XLSX 是zip格式，
+    必须全部写完才能输出，因此首个字节块在所有行写完后产出
+
+    Raises:
+        RuntimeError: 未安装 openpyxl
+    """
+    if openpyxl is None:
+        raise RuntimeError("未安装 openpyxl，无法导出 XLSX")
+
+    workbook = openpyxl.Workbook(write_only=True)
+    sheet = workbook.create_sheet(sheet_title)
+    sheet.append(header)
+    for rows in chunks:
+        for row in rows:
+            sheet.append(row)
+
+    fd, path = tempfile.mkstemp(suffix=".xlsx")
+    os.close(fd)
+    try:
+        workbook.save(path)
+        with open(path, "rb") as f:
+            while True:
+                data = f.read(read_size)
+                if not data:
+                    break
+                yield data
+    finally:
+        os.remove(path)
+
+
+def iter_gzip(blocks: Iterator[bytes], level: int = 6) -> Iterator[bytes]:
+    """流式 gzip 压缩（输出完整的 .gz 文件）"""
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+    for block in blocks:
+        data = compressor.compress(block)
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+def export_file_name(kind: str, export_format: str, start_date: Optional[str], end_date: Optional[str],
+                     gzip: bool = False) -> str:
+    """导出文件名：<类型>_<开始>_<结束>.<格式>[.gz]"""
+    name = "_".join([kind, start_date or "all", end_date or "all"]) + f".{export_format}"
+    return name + ".gz" if gzip else name
+
+
+def iter_export(conn, kind: str, sql: str, params: List[Any], export_format: str = "csv",
+                gzip: bool = False, chunk_size: int = DEFAULT_CHUNK_SIZE) -> Iterator[bytes]:
+    """
+    导出字节流
+
+    Args:
+        conn: 数据库连接
+        kind: orders 或 ledger
+        sql/params: build_*_export_query 生成的查询
+        export_format: csv 或 xlsx
+        gzip: 是否 gzip 压缩（仅 CSV，XLSX 本身已压缩）
+        chunk_size: 每块读取的行数
+    """
+    columns = ORDER_EXPORT_COLUMNS if kind == "orders" else LEDGER_EXPORT_COLUMNS
+    header = [name for name, _ in columns]
+    chunks = iter_row_chunks(conn, sql, params, chunk_size)
+
+    if export_format == "xlsx":
+        return iter_xlsx(header, chunks, sheet_title=kind)
+    blocks = iter_csv(header, chunks)
+    return iter_gzip(blocks) if gzip else blocks
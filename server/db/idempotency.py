@@ -0,0 +1,176 @@
+# 幂等键结果表
+# 客户端在超时重试时携带相同的 Idempotency-Key，首次成功的写操作结果与业务变更在同一事务内保存，
+# 重放请求直接返回保存的结果，不再执行业务事务。结果按TTL过期清理。
+
+import hashlib
+import sqlite3
+import time
+from typing import Any, Callable, Optional, Tuple
+
+import orjson
+
+_last_prune = {}
+_ttl_seconds = None
+
+DEFAULT_TTL_SECONDS = 86400   # 幂等结果保留时长（秒）
+PRUNE_INTERVAL = 300          # 清理过期结果的间隔（秒）
+MAX_KEY_LENGTH = 128
+
+class IdempotencyKeyConflictError(ValueError):
+    """同一幂等键被用于参数不同的请求"""
+
+
+def configure_idempotency(ttl_seconds: int = DEFAULT_TTL_SECONDS):
+    """配置幂等结果保留时长（应用启动时调用）"""
+    global _ttl_seconds
+    _ttl_seconds = ttl_seconds
+
+
+def get_idempotency_ttl() -> int:
+    """获取幂等结果保留时长（秒）"""
+    return _ttl_seconds or DEFAULT_TTL_SECONDS
+
+
+def idempotency_request_hash(operation: str, *params: Any) -> str:
+    """
+    计算请求摘要
+
+    Args:
+        operation: 操作名（如 create_order）
+        *params: 影响操作结果的请求参数
+
+    Returns:
+        32位十六进制摘要
+    """
+    payload = orjson.dumps([operation, *params], option=orjson.OPT_SORT_KEYS | orjson.OPT_NON_STR_KEYS)
+    return hashlib.blake2b(payload, digest_size=16).hexdigest()
+
+
+def validate_idempotency_key(key: Optional[str]) -> Optional[str]:
+    """
+    校验请求头中的幂等键
+
+    Returns:
+        去除首尾空白后的键，未提供时返回None
+
+    Raises:
+        ValueError: 键过长
+    """
+    if key is None:
+        return None
+    key = key.strip()
+    if not key:
+        return None
+    if len(key) > MAX_KEY_LENGTH:
+        raise ValueError(f"Idempotency-Key 长度不能超过 {MAX_KEY_LENGTH}")
+    return key
+
+
+def find_idempotent_result(conn: sqlite3.Connection, user_id: int, key: str, request_hash: str,
+                           ttl_seconds: Optional[int] = None) -> Optional[Any]:
+    """
+    查询已保存的操作结果
+
+    Args:
+        conn: 数据库连接
+        user_id: 用户ID
+        key: 幂等键
+        request_hash: 本次请求摘要
+        ttl_seconds: 结果有效期（秒），默认使用配置值
+
+    Returns:
+        保存的结果，不存在或已过期时返回None
+
+    Raises:
+        IdempotencyKeyConflictError: 该键已用于参数不同的请求
+    """
+    ttl_seconds = ttl_seconds or get_idempotency_ttl()
+    row = conn.execute(
+        "SELECT request_hash, result FROM idempotency_keys "
+        "WHERE user_id = ? AND idem_key = ? AND created_at >= ?",
+        [user_id, key, int(time.time()) - ttl_seconds]
+    ).fetchone()
+
+    if row is None:
+        return None
+    if row[0] != request_hash:
+        raise IdempotencyKeyConflictError("Idempotency-Key 已用于不同的请求")
+    return orjson.loads(row[1])
+
+
+def save_idempotent_result(db_manager, user_id: int, key: str, request_hash: str, result: Any):
+    """
+    在当前事务内保存操作结果（覆盖同一键已过期的记录）
+
+    Args:
+        db_manager: 数据库管理器
+        user_id: 用户ID
+        key: 幂等键
+        request_hash: 请求摘要
+        result: 可JSON序列化的操作结果
+    """
+    db_manager.conn.execute(
+        "INSERT OR REPLACE INTO idempotency_keys (user_id, idem_key, request_hash, result, created_at) "
+        "VALUES (?, ?, ?, ?, ?)",
+        [user_id, key, request_hash, orjson.dumps(result, option=orjson.OPT_NON_STR_KEYS), int(time.time())]
+    )
+
+
+def prune_idempotency_keys(conn: sqlite3.Connection, ttl_seconds: Optional[int] = None) -> int:
+    """
+    删除过期的幂等结果
+
+    Args:
+        conn: 数据库连接
+        ttl_seconds: 结果有效期（秒），默认使用配置值
+
+    Returns:
+        删除的记录数
+    """
+    ttl_seconds = ttl_seconds or get_idempotency_ttl()
+    cursor = conn.execute(
+        "DELETE FROM idempotency_keys WHERE created_at < ?",
+        [int(time.time()) - ttl_seconds]
+    )
+    return cursor.rowcount
+
+
+def run_idempotent(db_manager, user_id: int, key: Optional[str], request_hash: str,
+                   operation: Callable[[], Any],
+                   ttl_seconds: Optional[int] = None) -> Tuple[Any, bool]:
+    """
+    幂等执行写操作
+
+    在同一个写事务（db_manager.atomic()，合并提交模式下为批次中的保存点）内检查幂等键、
+    执行操作并保存结果：写锁在检查前取得，并发重试串行执行，第二个请求能看到第一个保存的结果；
+    保存失败时业务变更随之回滚
+
+    Args:
+        db_manager: 写连接的数据库管理器
+        user_id: 用户ID
+        key: 幂等键，None表示不做幂等处理
+        request_hash: 请求摘要
+        operation: 业务操作（内部可调用 execute_transaction，不能直接调用 conn.commit()）
+        ttl_seconds: 结果有效期（秒），默认使用配置值
+
+    Returns:
+        (操作结果, 是否为重放结果)
+    """
+    if key is None:
+        return operation(), False
+
+    with db_manager.atomic():
+        stored = find_idempotent_result(db_manager.conn, user_id, key, request_hash, ttl_seconds)
+        if stored is not None:
+            return stored, True
+
+        result = operation()
+        save_idempotent_result(db_manager, user_id, key, request_hash, result)
+
+        # 顺带清理过期结果，每个数据库文件每隔 PRUNE_INTERVAL 最多一次
+        now = time.monotonic()
+        if now - _last_prune.get(db_manager.db_path, 0) > PRUNE_INTERVAL:
+            _last_prune[db_manager.db_path] = now
+            prune_idempotency_keys(db_manager.conn, ttl_seconds)
+
+    return result, False
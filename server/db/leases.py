@@ -0,0 +1,76 @@
+# 调度任务租约表
+# 多worker部署时各进程都会启动后台调度任务，通过 SQLite 中的租约行选出唯一的执行者（leader），
+# leader 定期续约，进程退出或卡死后租约过期，由其他worker接管。
+# 租约行同时保存调度进度（watermark），leader切换后从上次进度继续。
+
+import os
+import socket
+import time
+import uuid
+from typing import Optional
+
+def new_lease_owner() -> str:
+    """生成当前进程的租约持有者标识"""
+    return f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+
+def acquire_lease(db_manager, name: str, owner: str, ttl_seconds: float) -> bool:
+    """
+    获取或续约租约（独立事务，立即提交）
+
+    租约空闲、已过期或本身由 owner 持有时成功
+
+    Args:
+        db_manager: 数据库管理器
+        name: 调度任务名称
+        owner: 持有者标识
+        ttl_seconds: 租约时长（秒）
+
+    Returns:
+        是否持有租约
+    """
+    now = time.time()
+    cursor = db_manager.conn.execute("""
+        INSERT INTO scheduler_leases (name, owner, expires_at) VALUES (?, ?, ?)
+        ON CONFLICT(name) DO UPDATE SET owner = excluded.owner, expires_at = excluded.expires_at
+        WHERE scheduler_leases.owner = excluded.owner
+           OR scheduler_leases.owner IS NULL
+           OR scheduler_leases.expires_at < ?
+    """, [name, owner, now + ttl_seconds, now])
+    db_manager.conn.commit()
+    return cursor.rowcount == 1
+
+
+def release_lease(db_manager, name: str, owner: str):
+    """释放租约（保留进度），仅当 owner 仍持有时生效"""
+    db_manager.conn.execute(
+        "UPDATE scheduler_leases SET owner = NULL, expires_at = 0 WHERE name = ? AND owner = ?",
+        [name, owner]
+    )
+    db_manager.conn.commit()
+
+
+def get_lease_watermark(db_manager, name: str) -> Optional[float]:
+    """获取调度进度，尚无记录时返回None"""
+    row = db_manager.conn.execute(
+        "SELECT watermark FROM scheduler_leases WHERE name = ?", [name]
+    ).fetchone()
+    return row[0] if row else None
+
+
+def advance_lease_watermark(db_manager, name: str, owner: str, watermark: float):
+    """
+    在当前事务内推进调度进度
+
+    同时校验租约仍由 owner 持有，租约已被接管时抛出异常使整个事务回滚，
+    避免失去租约的旧leader与新leader重复执行
+
+    Raises:
+        RuntimeError: 租约已不属于 owner
+    """
+    cursor = db_manager.conn.execute("""
+        UPDATE scheduler_leases SET watermark = MAX(COALESCE(watermark, 0), ?)
+        WHERE name = ? AND owner = ? AND expires_at >= ?
+    """, [watermark, name, owner, time.time()])
+    if cursor.rowcount != 1:
+        raise RuntimeError(f"调度租约 {name} 已失效")
@@ -0,0 +1,137 @@
+# 数据库增量维护
+# 替代阻塞的全量 VACUUM + ANALYZE：
+# - WAL检查点：平时执行 PASSIVE（不等待读者、不阻塞写者），WAL文件超过阈值时升级为 TRUNCATE 收缩文件
+# - 增量清理：auto_vacuum=INCREMENTAL 的数据库按 incremental_vacuum(N) 分步释放空闲页，每步短事务，可设时间预算
+# - 统计信息：PRAGMA optimize 只分析统计信息过期的表
+# 每个步骤返回耗时和释放的页数，便于记录日志和监控。
+
+import os
+import sqlite3
+import time
+from typing import Any, Dict, List
+
+DEFAULT_WAL_TRUNCATE_BYTES = 64 * 1024 * 1024   # WAL文件超过该大小时执行 TRUNCATE 检查点
+DEFAULT_VACUUM_STEP_PAGES = 256                  # 每步 incremental_vacuum 释放的页数
+DEFAULT_VACUUM_MAX_SECONDS = 30.0                # 增量清理的时间预算（秒）
+DEFAULT_VACUUM_STEP_SLEEP = 0.01                 # 每步之间的休眠时间（秒），让出写锁
+
+AUTO_VACUUM_INCREMENTAL = 2
+
+
+def _wal_size(db_path: str) -> int:
+    wal_path = f"{db_path}-wal"
+    return os.path.getsize(wal_path) if db_path != ":memory:" and os.path.exists(wal_path) else 0
+
+
+def _elapsed_ms(started: float) -> float:
+    return round((time.monotonic() - started) * 1000, 1)
+
+
+def checkpoint_wal(conn: sqlite3.Connection, db_path: str,
+                   truncate_threshold: int = DEFAULT_WAL_TRUNCATE_BYTES) -> Dict[str, Any]:
+    """
+    执行WAL检查点
+
+    先执行 PASSIVE 检查点；WAL文件超过阈值时改为 TRUNCATE（等待读者结束后把WAL截断为0字节），
+    TRUNCATE 遇到忙时不重试，下次调度再试
+
+    Args:
+        conn: 数据库连接
+        db_path: 数据库文件路径（用于读取WAL文件大小）
+        truncate_threshold: 执行 TRUNCATE 的WAL文件大小阈值（字节）
+
+    Returns:
+        步骤报告：模式、WAL帧数、已写回帧数、WAL文件大小变化、耗时、释放的页数
+    """
+    started = time.monotonic()
+    wal_before = _wal_size(db_path)
+    mode = "TRUNCATE" if wal_before > truncate_threshold else "PASSIVE"
+    busy, wal_frames, checkpointed = conn.execute(f"PRAGMA wal_checkpoint({mode})").fetchone()
+    wal_after = _wal_size(db_path)
+    page_size = conn.execute("PRAGMA page_size").fetchone()[0]
+
+    return {
+        "step": "wal_checkpoint",
+        "mode": mode,
+        "busy": bool(busy),
+        "wal_frames": wal_frames,
+        "checkpointed_frames": checkpointed,
+        "wal_bytes_before": wal_before,
+        "wal_bytes_after": wal_after,
+        # WAL文件中被截断的帧数（每帧 = 24字节帧头 + 一页）
+        "pages_freed": max(wal_before - wal_after, 0) // (page_size + 24),
+        "duration_ms": _elapsed_ms(started)
+    }
+
+
+def incremental_vacuum(conn: sqlite3.Connection,
+                       step_pages: int = DEFAULT_VACUUM_STEP_PAGES,
+                       max_seconds: float = DEFAULT_VACUUM_MAX_SECONDS,
+                       step_sleep: float = DEFAULT_VACUUM_STEP_SLEEP) -> Dict[str, Any]:
+    """
+    分步释放空闲页（仅 auto_vacuum=INCREMENTAL 的数据库有效）
+
+    每步一个短事务释放最多 step_pages 页，直到没有空闲页或超过时间预算
+
+    Args:
+        conn: 数据库连接（会提交连接上未提交的事务，应使用独立连接）
+        step_pages: 每步释放的页数
+        max_seconds: 时间预算（秒）
+        step_sleep: 每步之间的休眠时间（秒）
+
+    Returns:
+        步骤报告：步数、释放的页数、剩余空闲页、耗时；非增量模式时 skipped 为 True
+    """
+    started = time.monotonic()
+    auto_vacuum = conn.execute("PRAGMA auto_vacuum").fetchone()[0]
+    freelist_before = conn.execute("PRAGMA freelist_count").fetchone()[0]
+    report = {"step": "incremental_vacuum", "skipped": auto_vacuum != AUTO_VACUUM_INCREMENTAL, "steps": 0}
+
+    freelist = freelist_before
+    if not report["skipped"]:
+        while freelist > 0 and time.monotonic() - started < max_seconds:
+            # executescript 会把语句执行完；execute 只执行一步，每次只释放一页
+            conn.executescript(f"PRAGMA incremental_vacuum({int(step_pages)})")
+            report["steps"] += 1
+            remaining = conn.execute("PRAGMA freelist_count").fetchone()[0]
+            if remaining >= freelist:
+                break
+            freelist = remaining
+            if freelist > 0 and step_sleep > 0:
+                time.sleep(step_sleep)
+
+    report.update({
+        "pages_freed": freelist_before - freelist,
+        "freelist_remaining": freelist,
+        "duration_ms": _elapsed_ms(started)
+    })
+    return report
+
+
+def optimize(conn: sqlite3.Connection) -> Dict[str, Any]:
+    """
+    执行 PRAGMA optimize（只重新分析统计信息可能过期的表，代替全量 ANALYZE）
+
+    Returns:
+        步骤报告：耗时
+    """
+    started = time.monotonic()
+    conn.execute("PRAGMA optimize")
+    return {"step": "optimize", "pages_freed": 0, "duration_ms": _elapsed_ms(started)}
+
+
+def run_incremental_maintenance(conn: sqlite3.Connection, db_path: str,
+                                truncate_threshold: int = DEFAULT_WAL_TRUNCATE_BYTES,
+                                vacuum_step_pages: int = DEFAULT_VACUUM_STEP_PAGES,
+                                vacuum_max_seconds: float = DEFAULT_VACUUM_MAX_SECONDS) -> List[Dict[str, Any]]:
+    """
+    依次执行增量清理、统计信息优化和WAL检查点（清理产生的WAL帧在最后的检查点中写回）
+
+    Returns:
+        各步骤报告列表
+    """
+    return [
+        incremental_vacuum(conn, vacuum_step_pages, vacuum_max_seconds),
+        optimize(conn),
+        checkpoint_wal(conn, db_path, truncate_threshold)
+    ]
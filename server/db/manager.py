@@ -2,8 +2,13 @@
 # 数据库连接和事务管理的核心组件
 
 import sqlite3
+import asyncio
 import logging
 import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
 from datetime import datetime
 from typing import List, Optional, Dict, Any, Callable
 from contextlib import contextmanager
@@ -27,6 +32,8 @@ class DatabaseManager:
         self.db_path = db_path
         self.conn = None
         self._is_connected = False
+        # 由合并提交执行器或 atomic() 设置：事务改用保存点，提交由外层统一完成
+        self._in_group_commit = False
         
         # 配置日志
         self.logger = logging.getLogger(self.__class__.__name__)
@@ -90,6 +97,7 @@ class DatabaseManager:
         try:
             # 设置SQLite优化参数
             optimizations = [
+                "PRAGMA auto_vacuum = INCREMENTAL",  # 新建数据库使用增量清理（已有数据库在下次全量VACUUM后生效）
                 "PRAGMA foreign_keys = ON",        # 启用外键约束
                 "PRAGMA journal_mode = WAL",       # 使用WAL模式提高并发性能
                 "PRAGMA synchronous = NORMAL",     # 平衡性能和安全性
@@ -144,6 +152,9 @@ class DatabaseManager:
             self.logger.warning("事务操作列表为空")
             return []
         
+        if self._in_group_commit:
+            return self._execute_savepoint(operations)
+        
         results = []
         transaction_id = datetime.now().strftime("%Y%m%d%H%M%S%f")
         
@@ -172,6 +183,26 @@ class DatabaseManager:
             
             raise e
     
+    def _execute_savepoint(self, operations: List[Callable]) -> List[Any]:
+        """
+        在合并提交的外层事务中以保存点执行操作，失败时只回滚本组操作
+        
+        Args:
+            operations: 操作函数列表
+        
+        Returns:
+            所有操作结果的列表
+        """
+        self.conn.execute("SAVEPOINT txn")
+        try:
+            results = [operation() for operation in operations]
+            self.conn.execute("RELEASE txn")
+            return results
+        except Exception:
+            self.conn.execute("ROLLBACK TO txn")
+            self.conn.execute("RELEASE txn")
+            raise
+    
     def execute_single(self, query: str, params: List = None) -> Any:
         """
         执行单个SQL查询
@@ -214,6 +245,17 @@ class DatabaseManager:
         """
         self.ensure_connected()
         
+        if self._in_group_commit:
+            self.conn.execute("SAVEPOINT manual_txn")
+            try:
+                yield self.conn
+                self.conn.execute("RELEASE manual_txn")
+            except Exception:
+                self.conn.execute("ROLLBACK TO manual_txn")
+                self.conn.execute("RELEASE manual_txn")
+                raise
+            return
+        
         try:
             self.logger.debug("手动事务开始")
             yield self.conn
@@ -228,6 +270,72 @@ class DatabaseManager:
                 self.logger.error(f"手动事务回滚失败: {str(rollback_error)}")
             raise e
     
+    @contextmanager
+    def atomic(self):
+        """
+        在一个写事务中执行多个事务操作
+
+        开启 BEGIN IMMEDIATE 写事务，块内的 execute_transaction / transaction() 改用保存点，
+        块结束时统一提交，异常时整体回滚。已处于合并提交批次或调用方事务中时以保存点执行。
+
+        Usage:
+            with db_manager.atomic():
+                row = db_manager.conn.execute("SELECT ...").fetchone()
+                db_manager.execute_transaction([operation])
+        """
+        self.ensure_connected()
+
+        if self._in_group_commit or self.conn.in_transaction:
+            self.conn.execute("SAVEPOINT atomic_txn")
+            try:
+                yield self.conn
+                self.conn.execute("RELEASE atomic_txn")
+            except Exception:
+                if self.conn.in_transaction:
+                    self.conn.execute("ROLLBACK TO atomic_txn")
+                    self.conn.execute("RELEASE atomic_txn")
+                raise
+            return
+
+        self.conn.execute("BEGIN IMMEDIATE")
+        self._in_group_commit = True
+        try:
+            yield self.conn
+            self._in_group_commit = False
+            self.conn.commit()
+        except Exception:
+            self._in_group_commit = False
+            self.conn.rollback()
+            raise
+
+    @contextmanager
+    def read_snapshot(self):
+        """
+        只读快照上下文管理器
+
+        在一个显式读事务中执行多条查询，WAL模式下所有查询看到同一时刻的数据，
+        结束时回滚（不产生写入）。已处于事务中时直接复用当前事务。
+
+        Usage:
+            with db_manager.read_snapshot():
+                meals = db_manager.conn.execute("SELECT ...").fetchall()
+                orders = db_manager.conn.execute("SELECT ...").fetchall()
+        """
+        self.ensure_connected()
+
+        if self.conn.in_transaction:
+            yield self.conn
+            return
+
+        self.conn.execute("BEGIN")
+        try:
+            yield self.conn
+        finally:
+            try:
+                self.conn.rollback()
+            except Exception as rollback_error:
+                self.logger.error(f"只读快照结束失败: {str(rollback_error)}")
+
     def get_table_info(self, table_name: str) -> Dict[str, Any]:
         """
         获取数据表信息
@@ -299,25 +407,40 @@ class DatabaseManager:
             self.logger.error(f"数据库统计分析失败: {str(e)}")
             raise e
     
-    def perform_maintenance(self):
+    def perform_maintenance(self, full: bool = False) -> List[Dict[str, Any]]:
         """
-        执行完整的数据库维护操作
+        执行数据库维护操作
+        
+        默认执行增量维护（分步释放空闲页、PRAGMA optimize、WAL检查点），每步耗时短，
+        可在业务时间执行；full=True 时执行阻塞的全量 VACUUM + ANALYZE + 完整性检查，
+        同时把旧数据库转换为增量清理模式
+        
+        Args:
+            full: 是否执行全量维护
+        
+        Returns:
+            各步骤报告（步骤名、耗时、释放的页数）
         """
         self.ensure_connected()
         
         try:
             self.logger.info("开始数据库维护操作")
             
-            # 1. 清理和压缩
-            self.vacuum()
-            
-            # 2. 更新统计信息
-            self.analyze()
-            
-            # 3. 检查数据库完整性
-            self.check_integrity()
+            if full:
+                reports = []
+                for step, func in (("vacuum", self.vacuum), ("analyze", self.analyze),
+                                   ("check_integrity", self.check_integrity)):
+                    started = time.monotonic()
+                    func()
+                    reports.append({"step": step, "duration_ms": round((time.monotonic() - started) * 1000, 1)})
+            else:
+                from db.maintenance import run_incremental_maintenance
+                reports = run_incremental_maintenance(self.conn, self.db_path)
             
+            for report in reports:
+                self.logger.info(f"维护步骤 {report['step']}: {report}")
             self.logger.info("数据库维护操作全部完成")
+            return reports
             
         except Exception as e:
             self.logger.error(f"数据库维护操作失败: {str(e)}")
@@ -501,67 +624,29 @@ class DatabaseManager:
     
     def _rebuild_meals_table_with_constraints(self):
         """
-        重建 meals 表以确保约束正确
+        重建 meals 表以确保约束正确（按基线表定义，INSERT INTO ... SELECT 一次复制全部记录）
         """
+        from db.migrations.m0001_baseline import MEALS_TABLE_SQL
+        from db.schema_migrations import rebuild_table
+        
         self.logger.info("开始重建 meals 表...")
         
+        # 重建期间原表被删除，需关闭外键检查（只能在事务外切换）
+        self.conn.execute("PRAGMA foreign_keys = OFF")
         try:
-            # 1. 备份现有数据
-            existing_data = self.conn.execute("SELECT * FROM meals").fetchall()
-            self.logger.info(f"备份了 {len(existing_data)} 条 meals 记录")
-            
-            # 2. 创建临时表
-            self.conn.execute("""
-                CREATE TABLE meals_backup AS SELECT * FROM meals
-            """)
-            
-            # 3. 删除原表
-            self.conn.execute("DROP TABLE meals")
-            
-            # 4. 重新创建表（确保主键约束）
-            self.conn.execute("""
-                CREATE TABLE meals (
-                    meal_id INTEGER PRIMARY KEY,
-                    date DATE NOT NULL,
-                    slot VARCHAR(20) NOT NULL,
-                    description TEXT,
-                    base_price_cents INTEGER NOT NULL,
-                    addon_config JSON,
-                    max_orders INTEGER DEFAULT 50,
-                    current_orders INTEGER DEFAULT 0,
-                    status VARCHAR(20) DEFAULT 'published',
-                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    locked_at TIMESTAMP,
-                    completed_at TIMESTAMP,
-                    canceled_at TIMESTAMP,
-                    canceled_by INTEGER,
-                    canceled_reason TEXT,
-                    UNIQUE(date, slot)
-                )
-            """)
-            
-            # 5. 恢复数据
-            for row in existing_data:
-                self.conn.execute("""
-                    INSERT INTO meals VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-                """, row)
-            
-            # 6. 删除备份表
-            self.conn.execute("DROP TABLE meals_backup")
-            
-            self.logger.info("meals 表重建完成")
-            
+            self.conn.execute("BEGIN IMMEDIATE")
+            try:
+                copied = rebuild_table(self.conn, "meals", MEALS_TABLE_SQL)
+                self.conn.commit()
+            except Exception:
+                self.conn.rollback()
+                raise
+            self.logger.info(f"meals 表重建完成，复制 {copied} 条记录")
         except Exception as e:
             self.logger.error(f"重建 meals 表失败: {e}")
-            # 尝试恢复
-            try:
-                self.conn.execute("DROP TABLE IF EXISTS meals")
-                self.conn.execute("ALTER TABLE meals_backup RENAME TO meals")
-                self.logger.info("已恢复原始 meals 表")
-            except:
-                pass
             raise e
+        finally:
+            self.conn.execute("PRAGMA foreign_keys = ON")
     
     def _check_and_repair_table_pk(self, table_name: str):
         """
@@ -580,27 +665,29 @@ class DatabaseManager:
         except Exception as e:
             self.logger.warning(f"检查表 {table_name} 约束失败: {e}")
 
-    def backup(self, backup_path: str):
+    def backup(self, backup_path: str, compress: bool = False) -> Dict[str, Any]:
         """
-        备份数据库（SQLite文件复制方式）
+        在线备份数据库（SQLite在线备份接口，按页分步复制）
+        
+        WAL模式下直接复制数据库文件可能得到不一致的副本，在线备份得到的是一致快照，
+        且每步之间释放读锁，不会长时间阻塞写操作
         
         Args:
             backup_path: 备份文件路径
+            compress: 是否gzip压缩
+        
+        Returns:
+            备份结果（页数、文件大小、耗时等）
         """
         self.ensure_connected()
         
         try:
-            import shutil
+            from db.backup import online_backup
             self.logger.info(f"开始备份数据库到: {backup_path}")
             
-            # 确保备份目录存在
-            backup_dir = os.path.dirname(backup_path)
-            if backup_dir and not os.path.exists(backup_dir):
-                os.makedirs(backup_dir, exist_ok=True)
-            
-            # SQLite通过文件复制进行备份
-            shutil.copy2(self.db_path, backup_path)
-            self.logger.info("数据库备份完成")
+            result = online_backup(self.conn, backup_path, compress=compress)
+            self.logger.info(f"数据库备份完成: {result['pages']} 页，耗时 {result['duration_ms']}ms")
+            return result
         except Exception as e:
             self.logger.error(f"数据库备份失败: {str(e)}")
             raise e
@@ -624,4 +711,211 @@ class DatabaseManager:
         析构函数，确保连接被正确关闭
         """
         if self.is_connected():
-            self.close()
\ No newline at end of file
+            self.close()
+
+
+class GroupCommitExecutor:
+    """
+    写操作合并提交执行器
+
+    独立写线程持有一个数据库连接，将短时间内并发提交的独立写操作（下单、取消订单、调整余额）
+    收集为一批，在同一个外层事务中逐个以保存点执行，整批只提交一次。
+    单个操作失败只回滚其保存点，不影响同批其他操作；所有结果在提交成功后才返回给调用方。
+    """
+
+    def __init__(self, db_path: str, max_batch: int = 32, max_delay: float = 0.002):
+        """
+        初始化执行器
+
+        Args:
+            db_path: 数据库文件路径
+            max_batch: 每批最多合并的操作数
+            max_delay: 收到第一个操作后继续等待合并的最长时间（秒）
+        """
+        self.db_path = db_path
+        self.max_batch = max_batch
+        self.max_delay = max_delay
+        self.logger = logging.getLogger(self.__class__.__name__)
+        self.batch_count = 0
+        self.operation_count = 0
+
+        self._queue: "queue.Queue[Optional[tuple]]" = queue.Queue()
+        self._db: Optional[DatabaseManager] = None
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, name="group-commit-writer", daemon=True)
+        self._thread.start()
+
+    def submit(self, operation: Callable[[DatabaseManager], Any]) -> Future:
+        """
+        提交写操作
+
+        Args:
+            operation: 接收写连接 DatabaseManager 的函数，内部可照常调用 execute_transaction，
+                       但不能直接调用 conn.commit()
+
+        Returns:
+            操作结果的Future，批次提交成功后完成
+        """
+        if self._closed:
+            raise RuntimeError("合并提交执行器已关闭")
+
+        future = Future()
+        self._queue.put((future, operation))
+        return future
+
+    def close(self, timeout: float = 5.0):
+        """停止写线程，已提交的操作执行完后关闭连接"""
+        if self._closed:
+            return
+        self._closed = True
+        self._queue.put(None)
+        self._thread.join(timeout)
+
+    def _run(self):
+        stopping = False
+        while not stopping:
+            item = self._queue.get()
+            if item is None:
+                break
+
+            batch = [item]
+            deadline = time.monotonic() + self.max_delay
+            while len(batch) < self.max_batch:
+                remaining = deadline - time.monotonic()
+                try:
+                    item = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if item is None:
+                    stopping = True
+                    break
+                batch.append(item)
+
+            self._execute_batch(batch)
+
+        if self._db is not None:
+            self._db.close()
+
+    def _get_db(self) -> DatabaseManager:
+        if self._db is None or not self._db.is_connected():
+            self._db = DatabaseManager(self.db_path, auto_connect=True)
+        return self._db
+
+    def _execute_batch(self, batch: List[tuple]):
+        """以一个外层事务执行一批操作，每个操作一个保存点"""
+        batch = [(future, operation) for future, operation in batch if future.set_running_or_notify_cancel()]
+        if not batch:
+            return
+
+        try:
+            db = self._get_db()
+            db.conn.execute("BEGIN IMMEDIATE")
+        except Exception as e:
+            self.logger.error(f"合并提交开启事务失败: {str(e)}")
+            for future, _ in batch:
+                future.set_exception(e)
+            if self._db is not None:
+                self._db.close()
+            return
+
+        succeeded = []
+        db._in_group_commit = True
+        try:
+            for future, operation in batch:
+                db.conn.execute("SAVEPOINT group_op")
+                try:
+                    result = operation(db)
+                    db.conn.execute("RELEASE group_op")
+                    succeeded.append((future, result))
+                except Exception as e:
+                    future.set_exception(e)
+                    if db.conn.in_transaction:
+                        db.conn.execute("ROLLBACK TO group_op")
+                        db.conn.execute("RELEASE group_op")
+                    else:
+                        # 外层事务已被SQLite中止，此前成功的操作随之失效
+                        for done_future, _ in succeeded:
+                            done_future.set_exception(RuntimeError(f"合并提交事务中止: {str(e)}"))
+                        succeeded = []
+                        db.conn.execute("BEGIN IMMEDIATE")
+
+            db.conn.commit()
+        except Exception as e:
+            self.logger.error(f"合并提交失败，整批回滚: {str(e)}")
+            try:
+                db.conn.rollback()
+            except Exception as rollback_error:
+                self.logger.error(f"合并提交回滚失败: {str(rollback_error)}")
+            # 成功操作的结果尚未返回，随整批一起失败
+            for future, _ in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        finally:
+            db._in_group_commit = False
+
+        self.batch_count += 1
+        self.operation_count += len(batch)
+        self.logger.debug(f"合并提交 {len(batch)} 个写操作，成功 {len(succeeded)} 个")
+        for future, result in succeeded:
+            future.set_result(result)
+
+
+_group_commit_options: Dict[str, Any] = {"enabled": True, "max_batch": 32, "max_delay": 0.002}
+_group_commit_executors: Dict[str, GroupCommitExecutor] = {}
+_group_commit_lock = threading.Lock()
+
+
+def configure_group_commit(enabled: bool = True, max_batch: int = 32, max_delay: float = 0.002):
+    """
+    配置合并提交（应用启动时调用，只影响之后创建的执行器）
+
+    Args:
+        enabled: 是否启用合并提交
+        max_batch: 每批最多合并的操作数
+        max_delay: 合并等待时间（秒）
+    """
+    _group_commit_options.update(enabled=enabled, max_batch=max_batch, max_delay=max_delay)
+
+
+def get_group_commit_executor(db_path: str) -> Optional[GroupCommitExecutor]:
+    """获取数据库文件对应的合并提交执行器，未启用或为内存数据库时返回None"""
+    if not _group_commit_options["enabled"] or db_path == ":memory:":
+        return None
+
+    with _group_commit_lock:
+        executor = _group_commit_executors.get(db_path)
+        if executor is None:
+            executor = GroupCommitExecutor(
+                db_path,
+                max_batch=_group_commit_options["max_batch"],
+                max_delay=_group_commit_options["max_delay"]
+            )
+            _group_commit_executors[db_path] = executor
+        return executor
+
+
+def shutdown_group_commit_executors():
+    """关闭所有合并提交执行器"""
+    with _group_commit_lock:
+        executors = list(_group_commit_executors.values())
+        _group_commit_executors.clear()
+    for executor in executors:
+        executor.close()
+
+
+async def run_grouped_write(db_manager: DatabaseManager, operation: Callable[[DatabaseManager], Any]) -> Any:
+    """
+    通过合并提交执行器执行写操作
+
+    Args:
+        db_manager: 当前请求的数据库管理器，未启用合并提交时直接在其连接上执行
+        operation: 接收 DatabaseManager 的写操作函数
+
+    Returns:
+        写操作结果
+    """
+    executor = get_group_commit_executor(db_manager.db_path)
+    if executor is None:
+        return await asyncio.to_thread(operation, db_manager)
+    return await asyncio.wrap_future(executor.submit(operation))
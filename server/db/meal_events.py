@@ -0,0 +1,103 @@
+# 餐次变更事件表
+# 餐次容量/状态变更在业务事务内写入 meal_events，事务提交后各worker轮询该表推送给SSE订阅者
+
+import sqlite3
+from typing import Any, Dict, List
+
+def record_meal_event(db_manager, meal_id: int, event_type: str):
+    """
+    在当前事务内记录餐次变更事件（读取变更后的餐次状态）
+
+    事件随业务事务一起提交或回滚，订阅者只会看到已提交的变更
+
+    Args:
+        db_manager: 数据库管理器
+        meal_id: 餐次ID
+        event_type: 事件类型
+    """
+    db_manager.conn.execute("""
+        INSERT INTO meal_events (meal_id, event_type, status, current_orders, max_orders)
+        SELECT meal_id, ?, status, current_orders, max_orders
+        FROM meals WHERE meal_id = ?
+    """, [event_type, meal_id])
+
+
+def record_meal_events(db_manager, meal_ids: List[int], event_type: str):
+    """
+    在当前事务内为多个餐次记录同一类型的变更事件（批量操作使用）
+
+    Args:
+        db_manager: 数据库管理器
+        meal_ids: 餐次ID列表
+        event_type: 事件类型
+    """
+    if not meal_ids:
+        return
+
+    placeholders = ",".join("?" * len(meal_ids))
+    db_manager.conn.execute(f"""
+        INSERT INTO meal_events (meal_id, event_type, status, current_orders, max_orders)
+        SELECT meal_id, ?, status, current_orders, max_orders
+        FROM meals WHERE meal_id IN ({placeholders})
+        ORDER BY meal_id
+    """, [event_type, *meal_ids])
+
+
+def fetch_meal_events_after(conn: sqlite3.Connection, last_event_id: int,
+                            limit: int = 500) -> List[Dict[str, Any]]:
+    """
+    获取指定事件ID之后的事件
+
+    Args:
+        conn: 数据库连接
+        last_event_id: 已处理的最大事件ID
+        limit: 最多返回条数
+
+    Returns:
+        按事件ID升序的事件列表
+    """
+    rows = conn.execute("""
+        SELECT event_id, meal_id, event_type, status, current_orders, max_orders, created_at
+        FROM meal_events
+        WHERE event_id > ?
+        ORDER BY event_id
+        LIMIT ?
+    """, [last_event_id, limit]).fetchall()
+
+    return [
+        {
+            "event_id": row[0],
+            "meal_id": row[1],
+            "type": row[2],
+            "status": row[3],
+            "current_orders": row[4],
+            "max_orders": row[5],
+            "available_slots": row[5] - row[4],
+            "created_at": row[6]
+        }
+        for row in rows
+    ]
+
+
+def get_latest_event_id(conn: sqlite3.Connection) -> int:
+    """获取当前最大事件ID"""
+    return conn.execute("SELECT COALESCE(MAX(event_id), 0) FROM meal_events").fetchone()[0]
+
+
+def prune_meal_events(conn: sqlite3.Connection, retention_seconds: int) -> int:
+    """
+    清理超过保留时间的事件
+
+    Args:
+        conn: 数据库连接
+        retention_seconds: 保留时长（秒）
+
+    Returns:
+        删除的事件数
+    """
+    cursor = conn.execute(
+        "DELETE FROM meal_events WHERE created_at < datetime('now', ?)",
+        [f"-{int(retention_seconds)} seconds"]
+    )
+    conn.commit()
+    return cursor.rowcount
@@ -0,0 +1 @@
+# 数据库结构迁移文件（由 db/schema_migrations.py 按版本号顺序执行）
@@ -0,0 +1,234 @@
+# 迁移 0001：基线结构
+# 引入迁移之前 scripts/init_db.py 创建的全部表和索引（参考 doc/db/database_structure.md）。
+# 均为 IF NOT EXISTS，对已初始化的旧数据库执行时不做修改，只记录版本号。
+# 已执行的迁移不能再修改：这里的表定义是引入迁移时的冻结副本，之后的结构变更写新的迁移。
+
+DESCRIPTION = "基线表结构和索引"
+
+# 1. 用户表（users） - 参考 doc/db/database_structure.md 2.1节
+USERS_TABLE_SQL = """
+CREATE TABLE IF NOT EXISTS users (
+    user_id INTEGER PRIMARY KEY,
+    open_id VARCHAR(128) UNIQUE NOT NULL,      -- 微信OpenID，唯一标识
+    wechat_name VARCHAR(100),                  -- 用户微信名
+    avatar_url VARCHAR(500),                   -- 头像URL
+    balance_cents INTEGER DEFAULT 0,           -- 账户余额（单位：分）
+    is_admin BOOLEAN DEFAULT FALSE,            -- 是否管理员
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    last_login_at TIMESTAMP,                   -- 最后登录时间
+    status VARCHAR(20) DEFAULT 'active'        -- 账户状态: active/suspended
+)
+"""
+
+# 2. 餐次表（meals） - 参考 doc/db/database_structure.md 2.2节
+MEALS_TABLE_SQL = """
+CREATE TABLE IF NOT EXISTS meals (
+    meal_id INTEGER PRIMARY KEY,
+    date DATE NOT NULL,                        -- 餐次日期
+    slot VARCHAR(20) NOT NULL,                 -- 时段: lunch/dinner
+    description TEXT,                          -- 餐次描述（菜品信息等）
+    base_price_cents INTEGER NOT NULL,         -- 不含附加项的基础价格（单位：分）
+    addon_config TEXT,                         -- 附加项配置：{"addon_id": max_quantity, "addon_id2": max_quantity} (SQLite使用TEXT存储JSON)
+    max_orders INTEGER DEFAULT 50,             -- 最大订餐数量
+    current_orders INTEGER DEFAULT 0,          -- 当前已订数量
+    status VARCHAR(20) DEFAULT 'published',    -- 状态: published/locked/completed/canceled
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    canceled_at TIMESTAMP,                     -- 取消时间
+    canceled_by INTEGER,                       -- 取消操作者ID
+    canceled_reason TEXT,                      -- 取消原因
+    UNIQUE(date, slot)                         -- 每天每个时段只能有一个餐次
+)
+"""
+
+# 3. 附加项表（addons） - 参考 doc/db/database_structure.md 2.3节
+ADDONS_TABLE_SQL = """
+CREATE TABLE IF NOT EXISTS addons (
+    addon_id INTEGER PRIMARY KEY,
+    name VARCHAR(100) NOT NULL,                -- 附加项名称（如"加鸡腿"、"不要鸡腿"、"加饮料"）
+    price_cents INTEGER NOT NULL,              -- 附加项价格（单位：分，可以为负数）
+    display_order INTEGER DEFAULT 0,           -- 显示顺序
+    is_default BOOLEAN DEFAULT FALSE,          -- 是否默认选中
+    status VARCHAR(20) DEFAULT 'active',       -- 状态: active/inactive
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+)
+"""
+
+# 4. 订单表（orders） - 参考 doc/db/database_structure.md 2.4节
+ORDERS_TABLE_SQL = """
+CREATE TABLE IF NOT EXISTS orders (
+    order_id INTEGER PRIMARY KEY,
+    user_id INTEGER NOT NULL,                  -- 用户ID
+    meal_id INTEGER NOT NULL,                  -- 餐次ID
+    amount_cents INTEGER NOT NULL,             -- 订单金额（单位：分，包含基础价格和选中附加项的价格）
+    addon_selections TEXT,                     -- 附加项选择：{"addon_id": quantity, "addon_id2": quantity} (SQLite使用TEXT存储JSON)
+    status VARCHAR(20) DEFAULT 'active',       -- 状态: active/canceled/completed
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    canceled_at TIMESTAMP,                     -- 取消时间
+    canceled_reason TEXT,                      -- 取消原因
+    FOREIGN KEY (user_id) REFERENCES users(user_id),
+    FOREIGN KEY (meal_id) REFERENCES meals(meal_id),
+    UNIQUE(user_id, meal_id)                   -- 每人每餐次只能订一份
+)
+"""
+
+# 5. 账本表（ledger） - 参考 doc/db/database_structure.md 2.6节
+LEDGER_TABLE_SQL = """
+CREATE TABLE IF NOT EXISTS ledger (
+    ledger_id INTEGER PRIMARY KEY,
+    transaction_no VARCHAR(32) UNIQUE NOT NULL, -- 交易号（格式：TXN20241125120001）
+    user_id INTEGER NOT NULL,                   -- 用户ID
+    type VARCHAR(20) NOT NULL,                  -- 类型: recharge/order/refund/adjustment
+    direction VARCHAR(10) NOT NULL,             -- 方向: in/out
+    amount_cents INTEGER NOT NULL,              -- 金额（单位：分，正数）
+    balance_before_cents INTEGER NOT NULL,      -- 变动前余额
+    balance_after_cents INTEGER NOT NULL,       -- 变动后余额
+    order_id INTEGER,                           -- 关联订单ID（如果是订单相关）
+    description VARCHAR(200),                   -- 交易描述
+    operator_id INTEGER,                        -- 操作员ID（充值、调整时）
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    FOREIGN KEY (user_id) REFERENCES users(user_id),
+    FOREIGN KEY (order_id) REFERENCES orders(order_id),
+    FOREIGN KEY (operator_id) REFERENCES users(user_id)
+)
+"""
+
+# 6. 餐次变更事件表（meal_events，SSE推送）
+MEAL_EVENTS_TABLE_SQL = """
+CREATE TABLE IF NOT EXISTS meal_events (
+    event_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    meal_id INTEGER NOT NULL,
+    event_type VARCHAR(20) NOT NULL,           -- 事件类型: publish/lock/complete/cancel/order/order_cancel
+    status VARCHAR(20) NOT NULL,               -- 变更后的餐次状态
+    current_orders INTEGER NOT NULL,           -- 变更后的订单数
+    max_orders INTEGER NOT NULL,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+)
+"""
+
+# 7. 幂等键结果表（idempotency_keys，客户端重试） - 参考 doc/db/database_structure.md 2.7节
+IDEMPOTENCY_TABLE_SQL = """
+CREATE TABLE IF NOT EXISTS idempotency_keys (
+    user_id INTEGER NOT NULL,                  -- 发起请求的用户（管理员操作为管理员ID）
+    idem_key VARCHAR(128) NOT NULL,            -- 客户端提供的 Idempotency-Key
+    request_hash CHAR(32) NOT NULL,            -- 操作名+请求参数摘要，同一键不可用于不同请求
+    result BLOB NOT NULL,                      -- 业务操作结果（JSON）
+    created_at INTEGER NOT NULL,               -- Unix时间戳（秒）
+    PRIMARY KEY (user_id, idem_key)
+) WITHOUT ROWID
+"""
+
+# 8. 调度租约表（scheduler_leases，多worker选主） - 参考 doc/db/database_structure.md 2.8节
+SCHEDULER_LEASES_TABLE_SQL = """
+CREATE TABLE IF NOT EXISTS scheduler_leases (
+    name VARCHAR(50) PRIMARY KEY,              -- 调度任务名称
+    owner VARCHAR(100),                        -- 当前持有者（主机名:进程号:随机串）
+    expires_at REAL NOT NULL DEFAULT 0,        -- 租约过期时间（Unix时间戳）
+    watermark REAL                             -- 调度进度（Unix时间戳，含义由任务决定）
+)
+"""
+
+# 9. 账本对账进度表（ledger_reconciliation） - 参考 doc/db/database_structure.md 2.9节
+LEDGER_RECONCILIATION_TABLE_SQL = """
+CREATE TABLE IF NOT EXISTS ledger_reconciliation (
+    user_id INTEGER PRIMARY KEY,               -- 用户ID
+    last_ledger_id INTEGER NOT NULL,           -- 最后核对的账本记录ID
+    balance_cents INTEGER NOT NULL,            -- 核对到该记录时的余额（分）
+    verified_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+)
+"""
+
+# 10. 冷数据归档段表（archive_segments） - 参考 doc/db/database_structure.md 2.10节
+ARCHIVE_SEGMENTS_TABLE_SQL = """
+CREATE TABLE IF NOT EXISTS archive_segments (
+    year INTEGER PRIMARY KEY,                  -- 归档年份（按餐次日期）
+    min_date DATE NOT NULL,                    -- 已归档餐次的最早日期
+    max_date DATE NOT NULL,                    -- 已归档餐次的最晚日期
+    meal_count INTEGER NOT NULL DEFAULT 0,     -- 已归档餐次数
+    order_count INTEGER NOT NULL DEFAULT 0,    -- 已归档订单数
+    ledger_count INTEGER NOT NULL DEFAULT 0,   -- 已归档账本记录数
+    revenue_cents INTEGER NOT NULL DEFAULT 0,  -- 已归档有效/已完成订单金额合计（分）
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+)
+"""
+
+# 11. 月度账单表（monthly_statements）和已生成月份表（statement_runs） - 参考 doc/db/database_structure.md 2.11节
+MONTHLY_STATEMENTS_TABLE_SQL = """
+CREATE TABLE IF NOT EXISTS monthly_statements (
+    user_id INTEGER NOT NULL,                  -- 用户ID
+    month VARCHAR(7) NOT NULL,                 -- 账单月份 YYYY-MM
+    opening_balance_cents INTEGER NOT NULL,    -- 期初余额（分）
+    closing_balance_cents INTEGER NOT NULL,    -- 期末余额（分）
+    total_in_cents INTEGER NOT NULL DEFAULT 0, -- 当月收入合计（充值、退款等）
+    total_out_cents INTEGER NOT NULL DEFAULT 0,-- 当月支出合计（订餐扣款等）
+    entry_count INTEGER NOT NULL DEFAULT 0,    -- 当月账本记录数
+    entries JSON,                              -- 当月账本明细（见 db/statements.py STATEMENT_ENTRY_COLUMNS）
+    generated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (user_id, month)
+)
+"""
+
+STATEMENT_RUNS_TABLE_SQL = """
+CREATE TABLE IF NOT EXISTS statement_runs (
+    month VARCHAR(7) PRIMARY KEY,              -- 已生成的账单月份
+    statement_count INTEGER NOT NULL,          -- 生成的账单数
+    entry_count INTEGER NOT NULL,              -- 汇总的账本记录数
+    generated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+)
+"""
+
+TABLES = [
+    ("users", USERS_TABLE_SQL),
+    ("addons", ADDONS_TABLE_SQL),
+    ("meals", MEALS_TABLE_SQL),
+    ("orders", ORDERS_TABLE_SQL),
+    ("ledger", LEDGER_TABLE_SQL),
+    ("meal_events", MEAL_EVENTS_TABLE_SQL),  # 餐次变更事件（SSE推送）
+    ("idempotency_keys", IDEMPOTENCY_TABLE_SQL),  # 幂等键结果（客户端重试）
+    ("scheduler_leases", SCHEDULER_LEASES_TABLE_SQL),  # 后台调度任务租约（多worker选主）
+    ("ledger_reconciliation", LEDGER_RECONCILIATION_TABLE_SQL),  # 账本对账进度
+    ("archive_segments", ARCHIVE_SEGMENTS_TABLE_SQL),  # 冷数据归档段
+    ("monthly_statements", MONTHLY_STATEMENTS_TABLE_SQL),  # 月度账单
+    ("statement_runs", STATEMENT_RUNS_TABLE_SQL)  # 已生成的账单月份
+]
+
+INDEXES = [
+    # 用户表索引
+    "CREATE INDEX IF NOT EXISTS idx_users_open_id ON users(open_id)",
+
+    # 餐次表索引
+    "CREATE INDEX IF NOT EXISTS idx_meals_date_slot ON meals(date, slot)",
+    "CREATE INDEX IF NOT EXISTS idx_meals_status ON meals(status)",
+    "CREATE INDEX IF NOT EXISTS idx_meals_date ON meals(date)",
+
+    # 订单表索引
+    "CREATE INDEX IF NOT EXISTS idx_orders_user_id ON orders(user_id)",
+    "CREATE INDEX IF NOT EXISTS idx_orders_meal_id ON orders(meal_id)",
+    "CREATE INDEX IF NOT EXISTS idx_orders_status ON orders(status)",
+    "CREATE INDEX IF NOT EXISTS idx_orders_created_at ON orders(created_at)",
+    "CREATE INDEX IF NOT EXISTS idx_orders_user_meal_status ON orders(user_id, meal_id, status)",
+
+    # 账本表索引
+    "CREATE INDEX IF NOT EXISTS idx_ledger_user_id ON ledger(user_id)",
+    "CREATE INDEX IF NOT EXISTS idx_ledger_type ON ledger(type)",
+    "CREATE INDEX IF NOT EXISTS idx_ledger_created_at ON ledger(created_at)",
+    "CREATE INDEX IF NOT EXISTS idx_ledger_transaction_no ON ledger(transaction_no)",
+
+    # 附加项表索引
+    "CREATE INDEX IF NOT EXISTS idx_addons_status ON addons(status)",
+    "CREATE INDEX IF NOT EXISTS idx_addons_display_order ON addons(display_order)",
+
+    # 餐次事件表索引
+    "CREATE INDEX IF NOT EXISTS idx_meal_events_created_at ON meal_events(created_at)",
+
+    # 幂等键表索引（过期清理）
+    "CREATE INDEX IF NOT EXISTS idx_idempotency_keys_created_at ON idempotency_keys(created_at)"
+]
+
+
+def upgrade(conn):
+    for _, create_sql in TABLES:
+        conn.execute(create_sql)
@@ -0,0 +1,21 @@
+# 迁移 0002：meals 表主键约束
+# 早期数据库的 meals 表可能缺少主键约束（原由 scripts/check_db_constraints.py 修复），
+# 缺少时按基线定义重建表；主键正常的数据库不做修改。
+
+from db.migrations.m0001_baseline import MEALS_TABLE_SQL
+from db.schema_migrations import rebuild_table
+
+DESCRIPTION = "meals 表缺少主键约束时重建"
+
+
+def upgrade(conn):
+    columns = conn.execute("PRAGMA table_info(meals)").fetchall()
+    if not columns or any(column[5] for column in columns):  # column[5] 是 pk 字段
+        return
+
+    duplicates = conn.execute(
+        "SELECT meal_id FROM meals GROUP BY meal_id HAVING COUNT(*) > 1 LIMIT 10"
+    ).fetchall()
+    if duplicates:
+        raise RuntimeError(f"meals 表存在重复的 meal_id: {[row[0] for row in duplicates]}，无法创建主键约束")
+    rebuild_table(conn, "meals", MEALS_TABLE_SQL)
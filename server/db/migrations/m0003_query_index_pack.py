@@ -0,0 +1,35 @@
+# 迁移 0003：按实际查询形态调整索引
+# 基线索引多为单列索引，热点查询是多列条件加排序。新增组合、覆盖和部分索引，删除被取代、
+# 与唯一约束重复或区分度过低的索引。各索引服务的查询见 db/query_plans.py（EXPLAIN QUERY PLAN 校验）。
+
+DESCRIPTION = "热点查询的组合、覆盖和部分索引"
+
+INDEXES = [
+    # 餐次的有效订单（餐次详情按下单时间列出、整餐取消、归档检查）：部分索引只包含有效订单，
+    # 历史订单绝大多数已完成，索引只有近期餐次的少量记录
+    "CREATE INDEX IF NOT EXISTS idx_orders_meal_active ON orders(meal_id, created_at) WHERE status = 'active'",
+
+    # 用户订单列表 WHERE user_id = ? ORDER BY created_at DESC
+    "CREATE INDEX IF NOT EXISTS idx_orders_user_created ON orders(user_id, created_at)",
+
+    # 账单历史 WHERE user_id = ? ORDER BY created_at DESC，及按用户计数（覆盖索引）
+    "CREATE INDEX IF NOT EXISTS idx_ledger_user_created ON ledger(user_id, created_at)",
+
+    # 日期范围查询餐次，每个日期+时段取最新创建的餐次：子查询 MAX(created_at) 只读索引
+    "CREATE INDEX IF NOT EXISTS idx_meals_date_slot_created ON meals(date, slot, created_at)",
+
+    # 截单自动锁定扫描 WHERE status = 'published' AND date >= ?
+    "CREATE INDEX IF NOT EXISTS idx_meals_published_date ON meals(date) WHERE status = 'published'",
+]
+
+DROPPED_INDEXES = [
+    "idx_orders_status",               # 区分度低（几乎全部为 completed）
+    "idx_orders_user_id",              # 由 idx_orders_user_created 取代
+    "idx_orders_user_meal_status",     # UNIQUE(user_id, meal_id) 的自动索引已能唯一定位
+    "idx_ledger_user_id",              # 由 idx_ledger_user_created 取代
+    "idx_ledger_type",                 # 区分度低，没有按类型过滤的热点查询
+    "idx_ledger_transaction_no",       # 与 UNIQUE(transaction_no) 的自动索引重复
+    "idx_meals_date_slot",             # 与 UNIQUE(date, slot) 的自动索引重复
+    "idx_meals_date",                  # 由 idx_meals_date_slot_created 取代
+    "idx_meals_status",                # 由 idx_meals_published_date 取代
+]
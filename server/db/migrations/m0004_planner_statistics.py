@@ -0,0 +1,25 @@
+# 迁移 0004：去掉与热点查询索引竞争的索引并刷新统计信息
+# 0003 之后同一查询仍有多个可用索引（orders(meal_id) 与有效订单的部分索引、
+# UNIQUE(date, slot) 的自动索引与 meals(date, slot, created_at)），选择哪个取决于 sqlite_stat1，
+# 旧数据库的统计信息是建索引之前的。这里让每个热点查询只有一个合适的索引，并在迁移最后重新分析相关表。
+# 不保留有效订单的部分索引：计划器估算行数时不考虑部分索引的 WHERE 条件，按餐次查询已取消、已完成订单
+# 及导出、归档又需要完整的餐次索引，两者并存时即使统计信息是新的，有效订单查询也选完整索引（见 db/query_plans.py）。
+
+DESCRIPTION = "合并竞争的订单、餐次索引并刷新统计信息"
+
+INDEXES = [
+    # 餐次的订单：有效订单列表（按下单时间）、整餐取消退款、已取消订单、按餐次导出和归档
+    "CREATE INDEX IF NOT EXISTS idx_orders_meal_status ON orders(meal_id, status, created_at)",
+]
+
+DROPPED_INDEXES = [
+    "idx_orders_meal_id",              # 由 idx_orders_meal_status 取代
+    "idx_orders_meal_active",          # 与 idx_orders_meal_status 并存时不会被选用
+    "idx_orders_created_at",           # 没有按订单创建时间过滤的查询，用户订单列表使用 idx_orders_user_created
+    "idx_meals_date_slot_created",     # UNIQUE(date, slot) 的自动索引已按日期+时段有序且唯一
+]
+
+# idx_ledger_created_at 保留：月度账单和账本导出按创建时间范围读取账本
+
+# 迁移最后重新分析的表
+ANALYZE = ["orders", "ledger", "meals", "users"]
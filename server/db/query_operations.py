@@ -3,8 +3,257 @@
 
 import json
 from datetime import datetime
-from typing import List, Optional, Dict, Any
+from typing import List, Optional, Dict, Any, Set
 from .manager import DatabaseManager
+from .archive import attach_archives_for_range, table_columns
+from utils.fields import select_columns, build_record
+
+# 餐次列表可选字段 -> 所需数据库列
+MEAL_FIELD_COLUMNS = {
+    "meal_id": ("meal_id",),
+    "date": ("date",),
+    "slot": ("slot",),
+    "description": ("description",),
+    "base_price_cents": ("base_price_cents",),
+    "base_price_yuan": ("base_price_cents",),
+    "addon_config": ("addon_config",),
+    "max_orders": ("max_orders",),
+    "current_orders": ("current_orders",),
+    "available_slots": ("max_orders", "current_orders"),
+    "status": ("status",),
+    "status_text": ("status",),
+    "created_at": ("created_at",),
+    "updated_at": ("updated_at",),
+}
+
+MEAL_FIELD_FORMATTERS = {
+    "meal_id": lambda m: m["meal_id"],
+    "date": lambda m: m["date"],
+    "slot": lambda m: m["slot"],
+    "description": lambda m: m["description"],
+    "base_price_cents": lambda m: m["base_price_cents"],
+    "base_price_yuan": lambda m: m["base_price_cents"] / 100,
+    "addon_config": lambda m: json.loads(m["addon_config"]) if m["addon_config"] else {},
+    "max_orders": lambda m: m["max_orders"],
+    "current_orders": lambda m: m["current_orders"],
+    "available_slots": lambda m: m["max_orders"] - m["current_orders"],
+    "status": lambda m: m["status"],
+    "status_text": lambda m: {
+        "published": "已发布",
+        "locked": "已锁定", 
+        "completed": "已完成"
+    }.get(m["status"], m["status"]),
+    "created_at": lambda m: m["created_at"],
+    "updated_at": lambda m: m["updated_at"],
+}
+
+# 账单历史可选字段 -> 所需数据库列（related_order/operator_info 决定是否需要关联查询）
+LEDGER_FIELD_COLUMNS = {
+    "ledger_id": ("l.ledger_id",),
+    "transaction_no": ("l.transaction_no",),
+    "type": ("l.type",),
+    "type_text": ("l.type",),
+    "direction": ("l.direction",),
+    "direction_text": ("l.direction",),
+    "amount_cents": ("l.amount_cents",),
+    "amount_yuan": ("l.amount_cents",),
+    "balance_before_cents": ("l.balance_before_cents",),
+    "balance_before_yuan": ("l.balance_before_cents",),
+    "balance_after_cents": ("l.balance_after_cents",),
+    "balance_after_yuan": ("l.balance_after_cents",),
+    "balance_change": ("l.direction", "l.amount_cents"),
+    "description": ("l.description",),
+    "operator_info": ("l.operator_id", "op.wechat_name as operator_name"),
+    "related_order": ("l.order_id", "o.meal_id", "m.date", "m.slot", "m.description as meal_description"),
+    "created_at": ("l.created_at",),
+}
+
+
+def _format_related_order(record) -> Optional[Dict[str, Any]]:
+    """构建账单关联的订单及餐次信息"""
+    if not record["order_id"]:
+        return None
+    return {
+        "order_id": record["order_id"],
+        "meal_info": {
+            "meal_id": record["meal_id"],
+            "date": record["date"],
+            "slot": record["slot"],
+            "slot_text": "午餐" if record["slot"] == "lunch" else "晚餐" if record["slot"] else None,
+            "description": record["meal_description"]
+        } if record["meal_id"] else None
+    }
+
+
+LEDGER_FIELD_FORMATTERS = {
+    "ledger_id": lambda r: r["ledger_id"],
+    "transaction_no": lambda r: r["transaction_no"],
+    "type": lambda r: r["type"],
+    "type_text": lambda r: {
+        "recharge": "充值",
+        "order": "订餐",
+        "refund": "退款",
+        "adjustment": "余额调整"
+    }.get(r["type"], r["type"]),
+    "direction": lambda r: r["direction"],
+    "direction_text": lambda r: "收入" if r["direction"] == "in" else "支出",
+    "amount_cents": lambda r: r["amount_cents"],
+    "amount_yuan": lambda r: r["amount_cents"] / 100,
+    "balance_before_cents": lambda r: r["balance_before_cents"],
+    "balance_before_yuan": lambda r: r["balance_before_cents"] / 100,
+    "balance_after_cents": lambda r: r["balance_after_cents"],
+    "balance_after_yuan": lambda r: r["balance_after_cents"] / 100,
+    "balance_change": lambda r: f"+{r['amount_cents']/100:.2f}" if r["direction"] == "in" else f"-{r['amount_cents']/100:.2f}",
+    "description": lambda r: r["description"],
+    "operator_info": lambda r: {
+        "operator_id": r["operator_id"],
+        "operator_name": r["operator_name"]
+    } if r["operator_id"] else None,
+    "related_order": _format_related_order,
+    "created_at": lambda r: r["created_at"],
+}
+
+
+# 热点查询（db/query_plans.py 用 EXPLAIN QUERY PLAN 校验其执行计划）
+
+def meals_by_date_range_sql(fields: Optional[Set[str]] = None, meals_table: str = "meals",
+                            with_clause: str = "") -> str:
+    """日期范围内的餐次，每个日期+时段只取最新创建的餐次（参数：开始日期、结束日期、条数、偏移量）"""
+    columns = select_columns(fields, MEAL_FIELD_COLUMNS, always=("meal_id",))
+    return f"""
+        {with_clause}
+        SELECT {', '.join(columns)}
+        FROM {meals_table} m1
+        WHERE date BETWEEN ? AND ?
+          AND created_at = (
+            SELECT MAX(created_at)
+            FROM {meals_table} m2
+            WHERE m1.date = m2.date AND m1.slot = m2.slot
+          )
+        ORDER BY date ASC, slot ASC
+        LIMIT ? OFFSET ?
+    """
+
+
+def meals_count_sql(meals_table: str = "meals", with_clause: str = "") -> str:
+    """日期范围内的日期+时段数（参数：开始日期、结束日期）"""
+    return f"""
+        {with_clause}
+        SELECT COUNT(*) FROM (
+            SELECT DISTINCT date, slot FROM {meals_table} m1
+            WHERE date BETWEEN ? AND ?
+              AND created_at = (
+                SELECT MAX(created_at)
+                FROM {meals_table} m2
+                WHERE m1.date = m2.date AND m1.slot = m2.slot
+              )
+        )
+    """
+
+
+# 日期范围内餐次的易变字段指纹（按 UNIQUE(date, slot) 的索引顺序拼接，不需要排序）
+MEALS_VERSION_SQL = """
+    SELECT
+        COUNT(*),
+        GROUP_CONCAT(meal_id || ':' || status || ':' || current_orders || ':'
+                     || max_orders || ':' || COALESCE(updated_at, ''), ',')
+    FROM (
+        SELECT meal_id, status, current_orders, max_orders, updated_at
+        FROM meals
+        WHERE date BETWEEN ? AND ?
+        ORDER BY date, slot
+    )
+"""
+
+# 餐次的已订用户列表（按下单时间）
+MEAL_ACTIVE_ORDERS_SQL = """
+    SELECT
+        o.order_id,
+        o.user_id,
+        u.open_id,
+        u.wechat_name,
+        o.amount_cents,
+        o.addon_selections,
+        o.created_at
+    FROM orders o
+    JOIN users u ON o.user_id = u.user_id
+    WHERE o.meal_id = ? AND o.status = 'active'
+    ORDER BY o.created_at ASC
+"""
+
+
+def user_meal_orders_sql(meal_count: int) -> str:
+    """用户在多个餐次上的有效订单（参数：用户ID、各餐次ID）"""
+    placeholders = ", ".join("?" for _ in range(meal_count))
+    return f"""
+        SELECT
+            meal_id,
+            order_id,
+            amount_cents,
+            addon_selections,
+            status,
+            created_at
+        FROM orders
+        WHERE user_id = ? AND meal_id IN ({placeholders}) AND status = 'active'
+    """
+
+
+def ledger_history_sql(fields: Optional[Set[str]] = None) -> str:
+    """用户账单历史，只在需要关联信息时才关联订单/餐次/操作员（参数：用户ID、条数、偏移量）"""
+    columns = select_columns(fields, LEDGER_FIELD_COLUMNS, always=("l.ledger_id",))
+    joins = []
+    if fields is None or "related_order" in fields:
+        joins.append("LEFT JOIN orders o ON l.order_id = o.order_id")
+        joins.append("LEFT JOIN meals m ON o.meal_id = m.meal_id")
+    if fields is None or "operator_info" in fields:
+        joins.append("LEFT JOIN users op ON l.operator_id = op.user_id")
+    return f"""
+        SELECT {', '.join(columns)}
+        FROM ledger l
+        {' '.join(joins)}
+        WHERE l.user_id = ?
+        ORDER BY l.created_at DESC
+        LIMIT ? OFFSET ?
+    """
+
+
+LEDGER_COUNT_SQL = "SELECT COUNT(*) FROM ledger WHERE user_id = ?"
+
+
+def _user_orders_where(status_filter: bool) -> str:
+    return "o.user_id = ? AND o.status = ?" if status_filter else "o.user_id = ?"
+
+
+def user_orders_sql(status_filter: bool = False) -> str:
+    """用户订单列表（参数：用户ID、[订单状态]、条数、偏移量）"""
+    return f"""
+        SELECT
+            o.order_id,
+            o.meal_id,
+            o.amount_cents,
+            o.addon_selections,
+            o.status,
+            o.created_at,
+            o.updated_at,
+            o.canceled_at,
+            o.canceled_reason,
+            m.date,
+            m.slot,
+            m.description as meal_description,
+            m.base_price_cents,
+            m.status as meal_status
+        FROM orders o
+        LEFT JOIN meals m ON o.meal_id = m.meal_id
+        WHERE {_user_orders_where(status_filter)}
+        ORDER BY o.created_at DESC
+        LIMIT ? OFFSET ?
+    """
+
+
+def user_orders_count_sql(status_filter: bool = False) -> str:
+    """用户订单数（参数：用户ID、[订单状态]）"""
+    return f"SELECT COUNT(*) FROM orders o WHERE {_user_orders_where(status_filter)}"
+
 
 class QueryOperations:
     """
@@ -24,6 +273,21 @@ class QueryOperations:
         except ValueError as e:
             raise ValueError(f"日期格式错误或无效: {str(e)}")
     
+    def _meals_source(self, start_date: str, end_date: str) -> tuple:
+        """
+        日期范围内的餐次数据源
+        
+        日期范围与已归档年份重叠时挂载对应归档库，返回 (WITH子句, 表名)，
+        否则返回 ("", "meals")，查询与归档前完全相同
+        """
+        schemas = attach_archives_for_range(self.db.conn, self.db.db_path, start_date, end_date)
+        if not schemas:
+            return "", "meals"
+        
+        columns = ", ".join(table_columns(self.db.conn, "meals"))
+        sources = [f"SELECT {columns} FROM main.meals"] + [f"SELECT {columns} FROM {schema}.meals" for schema in schemas]
+        return f"WITH all_meals AS ({' UNION ALL '.join(sources)})", "all_meals"
+    
     def _validate_pagination(self, offset: int, limit: int, max_limit: int):
         """验证分页参数"""
         if offset < 0:
@@ -33,7 +297,8 @@ class QueryOperations:
 
     # 1. 查询日期范围内的餐次信息
     def query_meals_by_date_range(self, start_date: str, end_date: str, 
-                                 offset: int = 0, limit: int = 60) -> Dict[str, Any]:
+                                 offset: int = 0, limit: int = 60,
+                                 fields: Optional[Set[str]] = None) -> Dict[str, Any]:
         """
         查询指定日期范围内的非取消状态餐次信息
         
@@ -42,6 +307,7 @@ class QueryOperations:
             end_date: 结束日期 (YYYY-MM-DD)
             offset: 偏移量，默认0
             limit: 每页条数，最大60
+            fields: 需要返回的字段（见MEAL_FIELD_COLUMNS），None表示全部；只查询所需列
         
         Returns:
             统一JSON格式的餐次列表和分页信息
@@ -50,74 +316,23 @@ class QueryOperations:
         # 参数验证
         self._validate_date_range(start_date, end_date)
         self._validate_pagination(offset, limit, 60)
+        if fields is not None and not fields <= MEAL_FIELD_COLUMNS.keys():
+            raise ValueError(f"不支持的字段: {', '.join(sorted(fields - MEAL_FIELD_COLUMNS.keys()))}")
         
-        # 查询餐次信息 - 对于每个日期+时段，只返回最新创建的餐次
-        meals_query = """
-            SELECT 
-                meal_id,
-                date,
-                slot,
-                description,
-                base_price_cents,
-                addon_config,
-                max_orders,
-                current_orders,
-                status,
-                created_at,
-                updated_at
-            FROM meals m1
-            WHERE date BETWEEN ? AND ? 
-              AND created_at = (
-                SELECT MAX(created_at) 
-                FROM meals m2 
-                WHERE m1.date = m2.date AND m1.slot = m2.slot
-              )
-            ORDER BY date ASC, slot ASC
-            LIMIT ? OFFSET ?
-        """
+        # 日期范围涉及已归档年份时合并归档库中的餐次
+        with_clause, meals_table = self._meals_source(start_date, end_date)
         
+        # 查询餐次信息 - 对于每个日期+时段，只返回最新创建的餐次
+        meals_query = meals_by_date_range_sql(fields, meals_table, with_clause)
         meals_result = self.db.conn.execute(meals_query, [start_date, end_date, limit, offset]).fetchall()
         
         # 获取总数用于分页 - 只计算每个日期+时段的最新餐次
-        count_query = """
-            SELECT COUNT(*) FROM (
-                SELECT DISTINCT date, slot FROM meals m1
-                WHERE date BETWEEN ? AND ? 
-                  AND created_at = (
-                    SELECT MAX(created_at) 
-                    FROM meals m2 
-                    WHERE m1.date = m2.date AND m1.slot = m2.slot
-                  )
-            )
-        """
+        count_query = meals_count_sql(meals_table, with_clause)
         total_count = self.db.conn.execute(count_query, [start_date, end_date]).fetchone()[0]
         
-        # 格式化结果
-        meals_list = []
-        for meal in meals_result:
-            # 解析addon_config
-            addon_config = json.loads(meal[5]) if meal[5] else {}
-            
-            meals_list.append({
-                "meal_id": meal[0],
-                "date": meal[1],
-                "slot": meal[2],
-                "description": meal[3],
-                "base_price_cents": meal[4],
-                "base_price_yuan": meal[4] / 100,
-                "addon_config": addon_config,
-                "max_orders": meal[6],
-                "current_orders": meal[7],
-                "available_slots": meal[6] - meal[7],
-                "status": meal[8],
-                "status_text": {
-                    "published": "已发布",
-                    "locked": "已锁定", 
-                    "completed": "已完成"
-                }.get(meal[8], meal[8]),
-                "created_at": meal[9],
-                "updated_at": meal[10]
-            })
+        # 格式化结果，只计算选中的字段
+        selected = None if fields is None else fields | {"meal_id"}
+        meals_list = [build_record(meal, MEAL_FIELD_FORMATTERS, selected) for meal in meals_result]
         
         return {
             "success": True,
@@ -135,6 +350,27 @@ class QueryOperations:
             "message": f"查询成功，共找到 {len(meals_list)} 条餐次记录"
         }
 
+    def query_meals_version(self, start_date: str, end_date: str) -> str:
+        """
+        计算日期范围内餐次数据的版本指纹，用于响应缓存校验
+
+        只读取参与展示的易变字段（状态、订单数、容量、更新时间），
+        任何下单、取消、发布、锁定、完成操作都会改变该指纹；
+        只读取主库：归档的餐次不再变化，归档时餐次从主库移出同样会改变指纹
+
+        Args:
+            start_date: 开始日期 (YYYY-MM-DD)
+            end_date: 结束日期 (YYYY-MM-DD)
+
+        Returns:
+            版本指纹字符串
+        """
+        self._validate_date_range(start_date, end_date)
+
+        version_row = self.db.conn.execute(MEALS_VERSION_SQL, [start_date, end_date]).fetchone()
+
+        return f"{version_row[0]}|{version_row[1] or ''}"
+
     # 2. 查询餐次详细信息
     def query_meal_detail(self, meal_id: int) -> Dict[str, Any]:
         """
@@ -196,22 +432,7 @@ class QueryOperations:
                 })
         
         # 查询已订用户列表（包含openid和用户名）
-        orders_query = """
-            SELECT 
-                o.order_id,
-                o.user_id,
-                u.open_id,
-                u.wechat_name,
-                o.amount_cents,
-                o.addon_selections,
-                o.created_at
-            FROM orders o
-            JOIN users u ON o.user_id = u.user_id
-            WHERE o.meal_id = ? AND o.status = 'active'
-            ORDER BY o.created_at ASC
-        """
-        
-        orders_result = self.db.conn.execute(orders_query, [meal_id]).fetchall()
+        orders_result = self.db.conn.execute(MEAL_ACTIVE_ORDERS_SQL, [meal_id]).fetchall()
         
         orders_list = []
         for order in orders_result:
@@ -341,8 +562,48 @@ class QueryOperations:
             }
         }
 
+    def query_user_meal_orders(self, user_id: int, meal_ids: List[int]) -> Dict[str, Any]:
+        """
+        批量查询某用户在多个餐次下的活跃订单信息（一次IN查询）
+
+        Args:
+            user_id: 用户ID
+            meal_ids: 餐次ID列表，最多100个
+
+        Returns:
+            按餐次ID返回订单信息的JSON格式数据，没有订单的餐次has_order为False
+        """
+
+        meal_ids = list(dict.fromkeys(meal_ids))
+        if len(meal_ids) > 100:
+            raise ValueError("一次最多查询100个餐次")
+
+        orders_by_meal = {}
+        if meal_ids:
+            orders_query = user_meal_orders_sql(len(meal_ids))
+            for order in self.db.conn.execute(orders_query, [user_id] + meal_ids).fetchall():
+                orders_by_meal[order["meal_id"]] = {
+                    "has_order": True,
+                    "order_id": order["order_id"],
+                    "order_status": order["status"],
+                    "amount_cents": order["amount_cents"],
+                    "addon_selections": json.loads(order["addon_selections"]) if order["addon_selections"] else {},
+                    "created_at": order["created_at"]
+                }
+
+        return {
+            "success": True,
+            "data": {
+                "orders": {
+                    meal_id: orders_by_meal.get(meal_id, {"has_order": False})
+                    for meal_id in meal_ids
+                }
+            }
+        }
+
     # 4. 查询用户历史账单变更信息
-    def query_user_ledger_history(self, user_id: int, offset: int = 0, limit: int = 200) -> Dict[str, Any]:
+    def query_user_ledger_history(self, user_id: int, offset: int = 0, limit: int = 200,
+                                  fields: Optional[Set[str]] = None) -> Dict[str, Any]:
         """
         查询用户的历史账单变更信息
         
@@ -350,6 +611,8 @@ class QueryOperations:
             user_id: 用户ID
             offset: 偏移量，默认0
             limit: 每页条数，最大200
+            fields: 需要返回的字段（见LEDGER_FIELD_COLUMNS），None表示全部；
+                    未选择related_order/operator_info时跳过对应的关联查询
         
         Returns:
             用户账单历史的JSON格式数据
@@ -357,6 +620,8 @@ class QueryOperations:
         
         # 参数验证
         self._validate_pagination(offset, limit, 200)
+        if fields is not None and not fields <= LEDGER_FIELD_COLUMNS.keys():
+            raise ValueError(f"不支持的字段: {', '.join(sorted(fields - LEDGER_FIELD_COLUMNS.keys()))}")
         
         # 检查用户是否存在
         user_info = self.db.conn.execute("""
@@ -378,89 +643,15 @@ class QueryOperations:
                 "data": None
             }
         
-        # 查询账单历史，包含关联的订单和餐次信息
-        ledger_query = """
-            SELECT 
-                l.ledger_id,
-                l.transaction_no,
-                l.type,
-                l.direction,
-                l.amount_cents,
-                l.balance_before_cents,
-                l.balance_after_cents,
-                l.order_id,
-                l.description,
-                l.operator_id,
-                l.created_at,
-                o.meal_id,
-                m.date,
-                m.slot,
-                m.description as meal_description,
-                op.wechat_name as operator_name
-            FROM ledger l
-            LEFT JOIN orders o ON l.order_id = o.order_id
-            LEFT JOIN meals m ON o.meal_id = m.meal_id
-            LEFT JOIN users op ON l.operator_id = op.user_id
-            WHERE l.user_id = ?
-            ORDER BY l.created_at DESC
-            LIMIT ? OFFSET ?
-        """
-        
-        ledger_result = self.db.conn.execute(ledger_query, [user_id, limit, offset]).fetchall()
+        # 查询账单历史，只在需要关联信息时才关联订单/餐次/操作员
+        selected = None if fields is None else fields | {"ledger_id"}
+        ledger_result = self.db.conn.execute(ledger_history_sql(selected), [user_id, limit, offset]).fetchall()
         
         # 获取总数
-        count_query = "SELECT COUNT(*) FROM ledger WHERE user_id = ?"
-        total_count = self.db.conn.execute(count_query, [user_id]).fetchone()[0]
+        total_count = self.db.conn.execute(LEDGER_COUNT_SQL, [user_id]).fetchone()[0]
         
         # 格式化账单记录
-        ledger_list = []
-        for record in ledger_result:
-            # 判断交易类型和方向
-            type_text = {
-                "recharge": "充值",
-                "order": "订餐",
-                "refund": "退款",
-                "adjustment": "余额调整"
-            }.get(record[2], record[2])
-            
-            direction_text = "收入" if record[3] == "in" else "支出"
-            
-            # 构建关联信息
-            related_info = None
-            if record[7]:  # 有关联订单
-                related_info = {
-                    "order_id": record[7],
-                    "meal_info": {
-                        "meal_id": record[11],
-                        "date": record[12],
-                        "slot": record[13],
-                        "slot_text": "午餐" if record[13] == "lunch" else "晚餐" if record[13] else None,
-                        "description": record[14]
-                    } if record[11] else None
-                }
-            
-            ledger_list.append({
-                "ledger_id": record[0],
-                "transaction_no": record[1],
-                "type": record[2],
-                "type_text": type_text,
-                "direction": record[3],
-                "direction_text": direction_text,
-                "amount_cents": record[4],
-                "amount_yuan": record[4] / 100,
-                "balance_before_cents": record[5],
-                "balance_before_yuan": record[5] / 100,
-                "balance_after_cents": record[6],
-                "balance_after_yuan": record[6] / 100,
-                "balance_change": f"+{record[4]/100:.2f}" if record[3] == "in" else f"-{record[4]/100:.2f}",
-                "description": record[8],
-                "operator_info": {
-                    "operator_id": record[9],
-                    "operator_name": record[15]
-                } if record[9] else None,
-                "related_order": related_info,
-                "created_at": record[10]
-            })
+        ledger_list = [build_record(record, LEDGER_FIELD_FORMATTERS, selected) for record in ledger_result]
         
         return {
             "success": True,
@@ -622,45 +813,15 @@ class QueryOperations:
                 }
             
             # 构建查询条件
-            where_conditions = ["o.user_id = ?"]
             params = [user_id]
-            
             if status:
-                where_conditions.append("o.status = ?")
                 params.append(status)
             
-            where_clause = " AND ".join(where_conditions)
-            
             # 查询订单列表
-            orders_query = f"""
-                SELECT 
-                    o.order_id,
-                    o.meal_id,
-                    o.amount_cents,
-                    o.addon_selections,
-                    o.status,
-                    o.created_at,
-                    o.updated_at,
-                    o.canceled_at,
-                    o.canceled_reason,
-                    m.date,
-                    m.slot,
-                    m.description as meal_description,
-                    m.base_price_cents,
-                    m.status as meal_status
-                FROM orders o
-                LEFT JOIN meals m ON o.meal_id = m.meal_id
-                WHERE {where_clause}
-                ORDER BY o.created_at DESC
-                LIMIT ? OFFSET ?
-            """
-            
-            query_params = params + [limit, offset]
-            orders_result = self.db.conn.execute(orders_query, query_params).fetchall()
+            orders_result = self.db.conn.execute(user_orders_sql(bool(status)), params + [limit, offset]).fetchall()
             
             # 获取总数
-            count_query = f"SELECT COUNT(*) FROM orders o WHERE {where_clause}"
-            total_count = self.db.conn.execute(count_query, params).fetchone()[0]
+            total_count = self.db.conn.execute(user_orders_count_sql(bool(status)), params).fetchone()[0]
             
             # 格式化订单列表
             orders_list = []
@@ -0,0 +1,159 @@
+# 热点查询的执行计划校验
+# 业务热点查询直接引用各业务模块中的SQL常量和构造函数，用 EXPLAIN QUERY PLAN 检查每个查询：
+# 使用了预期的索引、没有全表扫描、（需要时）排序由索引完成而不是临时B树。
+# 调整索引或修改热点查询后运行 scripts/check_query_plans.py 或对应测试确认。
+
+import re
+import sqlite3
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Sequence
+
+from db.core_operations import (
+    ACTIVE_ORDER_EXISTS_SQL, CANCEL_MEAL_ORDERS_SQL, CANCEL_MEAL_REFUND_BALANCES_SQL,
+    CANCEL_MEAL_REFUND_LEDGER_SQL, LAST_TRANSACTION_NO_SQL
+)
+from db.query_operations import (
+    LEDGER_COUNT_SQL, MEAL_ACTIVE_ORDERS_SQL, MEALS_VERSION_SQL, ledger_history_sql, meals_by_date_range_sql,
+    meals_count_sql, user_meal_orders_sql, user_orders_count_sql, user_orders_sql
+)
+from utils.auto_lock import PUBLISHED_MEALS_SQL
+
+_FULL_SCAN = re.compile(r"^SCAN (\w+)$")
+_SUBQUERY = re.compile(r"^(?:MATERIALIZE|CO-ROUTINE) (\w+)$")
+
+# 统计信息显示表的行数少于该值时，计划器按代价选择全表扫描是正确的，执行计划不能反映索引设计
+SMALL_TABLE_ROWS = 20
+
+
+@dataclass
+class HotQuery:
+    """
+    热点查询
+
+    indexes 中的每个索引都必须出现在执行计划中；allow_sort=False 时不允许 USE TEMP B-TREE
+    （ORDER BY ... LIMIT 需要由索引顺序完成，否则每次都要读取并排序全部匹配行）
+    """
+    name: str
+    source: str
+    sql: str
+    params: Sequence[Any]
+    indexes: Sequence[str]
+    allow_sort: bool = False
+
+
+HOT_QUERIES = [
+    HotQuery(
+        "order_exists", "CoreOperations.create_order",
+        ACTIVE_ORDER_EXISTS_SQL, [1, 1], ["sqlite_autoindex_orders_1"],
+    ),
+    HotQuery(
+        "user_meal_orders", "QueryOperations.query_user_meal_orders",
+        user_meal_orders_sql(3), [1, 1, 2, 3], ["sqlite_autoindex_orders_1"],
+    ),
+    HotQuery(
+        "meal_active_orders", "QueryOperations.query_meal_detail",
+        MEAL_ACTIVE_ORDERS_SQL, [1], ["idx_orders_meal_status"],
+    ),
+    HotQuery(
+        "cancel_meal_refund_balances", "CoreOperations.admin_cancel_meal",
+        CANCEL_MEAL_REFUND_BALANCES_SQL, [1], ["idx_orders_meal_status"], allow_sort=True,
+    ),
+    HotQuery(
+        "cancel_meal_refund_ledger", "CoreOperations.admin_cancel_meal",
+        CANCEL_MEAL_REFUND_LEDGER_SQL, [0, "TXN20241125", 0, 1], ["idx_orders_meal_status"], allow_sort=True,
+    ),
+    HotQuery(
+        "cancel_meal_orders", "CoreOperations.admin_cancel_meal",
+        CANCEL_MEAL_ORDERS_SQL, [1], ["idx_orders_meal_status"],
+    ),
+    HotQuery(
+        "user_orders", "QueryOperations.query_user_orders",
+        user_orders_sql(), [1, 20, 0], ["idx_orders_user_created"],
+    ),
+    HotQuery(
+        "user_orders_count", "QueryOperations.query_user_orders",
+        user_orders_count_sql(), [1], ["idx_orders_user_created"],
+    ),
+    HotQuery(
+        "ledger_history", "QueryOperations.query_user_ledger_history",
+        ledger_history_sql(), [1, 200, 0], ["idx_ledger_user_created"],
+    ),
+    HotQuery(
+        "ledger_count", "QueryOperations.query_user_ledger_history",
+        LEDGER_COUNT_SQL, [1], ["idx_ledger_user_created"],
+    ),
+    HotQuery(
+        "transaction_no_max", "CoreOperations._last_transaction_seq",
+        LAST_TRANSACTION_NO_SQL, ["TXN20241125", "TXN20241125:"], ["sqlite_autoindex_ledger_1"],
+    ),
+    HotQuery(
+        "meals_by_date_range", "QueryOperations.query_meals_by_date_range",
+        meals_by_date_range_sql(), ["2024-11-17", "2024-12-07", 60, 0], ["sqlite_autoindex_meals_1"],
+    ),
+    HotQuery(
+        "meals_count", "QueryOperations.query_meals_by_date_range",
+        meals_count_sql(), ["2024-11-17", "2024-12-07"], ["sqlite_autoindex_meals_1"],
+    ),
+    HotQuery(
+        "meals_version", "QueryOperations.query_meals_version",
+        MEALS_VERSION_SQL, ["2024-11-17", "2024-12-07"], ["sqlite_autoindex_meals_1"],
+    ),
+    HotQuery(
+        "auto_lock_candidates", "AutoLockScheduler.resync",
+        PUBLISHED_MEALS_SQL, ["2024-11-25"], ["idx_meals_published_date"],
+    ),
+]
+
+
+def explain(conn: sqlite3.Connection, sql: str, params: Sequence[Any] = ()) -> List[str]:
+    """EXPLAIN QUERY PLAN 的各步骤描述"""
+    return [row[3] for row in conn.execute(f"EXPLAIN QUERY PLAN {sql}", list(params)).fetchall()]
+
+
+def _analyzed_rows(conn: sqlite3.Connection, index_name: str) -> Optional[int]:
+    """索引所在表在 sqlite_stat1 中记录的行数，未分析过时返回None"""
+    if not conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'sqlite_stat1'").fetchone():
+        return None
+    # 部分索引的统计行只记录索引中的行数，取该表各索引中最大的行数
+    rows = conn.execute("""
+        SELECT s.stat FROM sqlite_master i JOIN sqlite_stat1 s ON s.tbl = i.tbl_name
+        WHERE i.type = 'index' AND i.name = ? AND s.stat IS NOT NULL
+    """, [index_name]).fetchall()
+    return max(int(row[0].split()[0]) for row in rows) if rows else None
+
+
+def check_query_plan(conn: sqlite3.Connection, query: HotQuery) -> Dict[str, Any]:
+    """
+    检查一个热点查询的执行计划
+
+    预期索引所在的表按统计信息都只有很少的行时，不满足的检查只记为跳过（skipped）
+
+    Returns:
+        {"name", "source", "ok", "skipped", "problems", "plan"}
+    """
+    plan = explain(conn, query.sql, query.params)
+    # 读取物化的子查询结果不是全表扫描
+    subqueries = {match.group(1) for match in map(_SUBQUERY.match, plan) if match}
+    problems = []
+    for index_name in query.indexes:
+        if not any(f"INDEX {index_name}" in step for step in plan):
+            problems.append(f"未使用索引 {index_name}")
+    for step in plan:
+        match = _FULL_SCAN.match(step)
+        if match and match.group(1) != "CONSTANT" and match.group(1) not in subqueries:
+            problems.append(f"全表扫描 {match.group(1)}")
+        if not query.allow_sort and "USE TEMP B-TREE" in step:
+            problems.append(f"需要临时排序: {step}")
+
+    skipped = None
+    if problems and query.indexes:
+        rows = [_analyzed_rows(conn, index_name) for index_name in query.indexes]
+        if all(count is not None and count < SMALL_TABLE_ROWS for count in rows):
+            skipped = f"表只有 {max(rows)} 行，计划器选择全表扫描"
+    return {"name": query.name, "source": query.source, "ok": not problems or skipped is not None,
+            "skipped": skipped, "problems": problems, "plan": plan}
+
+
+def verify_query_plans(conn: sqlite3.Connection, queries: Sequence[HotQuery] = None) -> List[Dict[str, Any]]:
+    """检查全部热点查询的执行计划"""
+    return [check_query_plan(conn, query) for query in (HOT_QUERIES if queries is None else queries)]
@@ -0,0 +1,202 @@
+# 账本与余额增量对账
+# 账本有多个写入方（下单扣款、退款、取消餐次批量退款、修改订单补差价、管理员调账），
+# 对账检查每个用户的账本链是否连续、每条记录金额是否自洽、最终余额是否等于 users.balance_cents。
+# 每个用户已核对的进度（最后核对的 ledger_id 和对应余额）保存在 ledger_reconciliation 表中，
+# 每次只核对进度之后新增的账本记录；按 ledger_id 分块读取，每块一条独立的查询语句，不会长时间持有读事务。
+# 归档会把订单相关的账本记录移到归档库（充值、调账留在主库），对账时挂载全部归档库，
+# 按 ledger_id 合并主库与归档库的账本，用户的账本链和余额才完整。
+
+import sqlite3
+import time
+from typing import Any, Dict, Iterator, List, Optional
+
+from db.archive import attach_all_archives, detach_archives
+
+DEFAULT_CHUNK_SIZE = 1000
+
+LEDGER_COLUMNS = (
+    "ledger_id, transaction_no, user_id, direction, amount_cents, balance_before_cents, balance_after_cents"
+)
+
+def reset_reconciliation(db_manager):
+    """清空对账进度，下次对账从头核对全部账本"""
+    db_manager.execute_transaction([lambda: db_manager.conn.execute("DELETE FROM ledger_reconciliation")])
+
+
+def _load_checkpoints(conn: sqlite3.Connection, user_ids: List[int]) -> Dict[int, Dict[str, int]]:
+    placeholders = ",".join("?" * len(user_ids))
+    rows = conn.execute(
+        f"SELECT user_id, last_ledger_id, balance_cents FROM ledger_reconciliation WHERE user_id IN ({placeholders})",
+        user_ids
+    ).fetchall()
+    return {row[0]: {"last_ledger_id": row[1], "balance_cents": row[2]} for row in rows}
+
+
+def _check_chunk(rows: List[sqlite3.Row], checkpoints: Dict[int, Dict[str, int]]) -> List[Dict[str, Any]]:
+    """
+    核对一块账本记录，更新 checkpoints 中各用户的进度
+
+    发现不一致时以账本记录的变动后余额为准继续核对，每处不一致只报告一次
+    """
+    mismatches = []
+    for row in rows:
+        state = checkpoints.setdefault(row["user_id"], {"last_ledger_id": 0, "balance_cents": 0})
+        if state["last_ledger_id"] >= row["ledger_id"]:
+            continue
+
+        if row["balance_before_cents"] != state["balance_cents"]:
+            mismatches.append({
+                "type": "mismatch",
+                "kind": "chain_break",
+                "user_id": row["user_id"],
+                "ledger_id": row["ledger_id"],
+                "transaction_no": row["transaction_no"],
+                "previous_ledger_id": state["last_ledger_id"] or None,
+                "expected_cents": state["balance_cents"],
+                "actual_cents": row["balance_before_cents"]
+            })
+
+        sign = 1 if row["direction"] == "in" else -1 if row["direction"] == "out" else 0
+        expected_after = row["balance_before_cents"] + sign * row["amount_cents"]
+        if sign == 0 or row["balance_after_cents"] != expected_after:
+            mismatches.append({
+                "type": "mismatch",
+                "kind": "amount_mismatch",
+                "user_id": row["user_id"],
+                "ledger_id": row["ledger_id"],
+                "transaction_no": row["transaction_no"],
+                "direction": row["direction"],
+                "amount_cents": row["amount_cents"],
+                "expected_cents": expected_after,
+                "actual_cents": row["balance_after_cents"]
+            })
+
+        state["last_ledger_id"] = row["ledger_id"]
+        state["balance_cents"] = row["balance_after_cents"]
+    return mismatches
+
+
+def _save_checkpoints(db_manager, checkpoints: Dict[int, Dict[str, int]]):
+    def save():
+        db_manager.conn.executemany("""
+            INSERT INTO ledger_reconciliation (user_id, last_ledger_id, balance_cents, verified_at)
+            VALUES (?, ?, ?, CURRENT_TIMESTAMP)
+            ON CONFLICT(user_id) DO UPDATE SET
+                last_ledger_id = excluded.last_ledger_id,
+                balance_cents = excluded.balance_cents,
+                verified_at = excluded.verified_at
+        """, [(user_id, state["last_ledger_id"], state["balance_cents"]) for user_id, state in checkpoints.items()])
+
+    db_manager.execute_transaction([save])
+
+
+def _ledger_chunk_sql(schemas: List[str]) -> str:
+    """
+    读取一块账本记录的查询（参数：每个数据源一个起始ledger_id，最后为块大小）
+
+    主库与归档库各自按主键范围读取，UNION ALL 按 ledger_id 归并，读够一块即停止
+    """
+    sources = [f"SELECT {LEDGER_COLUMNS} FROM {schema}.ledger WHERE ledger_id > ?" for schema in ["main", *schemas]]
+    return f"{' UNION ALL '.join(sources)} ORDER BY ledger_id LIMIT ?"
+
+
+def _check_balances(conn: sqlite3.Connection, schemas: List[str]) -> List[Dict[str, Any]]:
+    """
+    核对余额：已核对到最新账本记录的用户，users.balance_cents 必须等于核对进度中的余额
+
+    有更新账本记录（主库或归档库中）的用户跳过（下次对账时核对），没有账本记录的用户余额应为0；
+    单条查询语句，余额和账本在同一快照中读取
+    """
+    newer_ledger = " AND ".join(f"""NOT EXISTS (
+              SELECT 1 FROM {schema}.ledger l
+              WHERE l.user_id = u.user_id AND l.ledger_id > COALESCE(r.last_ledger_id, 0)
+          )""" for schema in ["main", *schemas])
+    rows = conn.execute(f"""
+        SELECT u.user_id, u.balance_cents, COALESCE(r.balance_cents, 0), r.last_ledger_id
+        FROM users u
+        LEFT JOIN ledger_reconciliation r ON r.user_id = u.user_id
+        WHERE u.balance_cents != COALESCE(r.balance_cents, 0)
+          AND {newer_ledger}
+    """).fetchall()
+    return [{
+        "type": "mismatch",
+        "kind": "balance_mismatch",
+        "user_id": row[0],
+        "ledger_id": row[3],
+        "expected_cents": row[2],
+        "actual_cents": row[1]
+    } for row in rows]
+
+
+def reconcile_ledger(db_manager, chunk_size: int = DEFAULT_CHUNK_SIZE,
+                     max_chunks: Optional[int] = None) -> Iterator[Dict[str, Any]]:
+    """
+    增量对账
+
+    从所有用户核对进度中最大的 ledger_id 之后开始，按 ledger_id 分块读取新增账本记录（包括已归档的记录）
+    并核对，每块核对后在一个短事务内保存涉及用户的进度；全部新增记录核对完后核对用户余额
+
+    Args:
+        db_manager: 数据库管理器（应使用独立连接，对账期间会提交该连接上的事务）
+        chunk_size: 每块读取的账本记录数
+        max_chunks: 本次最多核对的块数，None表示核对到最新；未核对完时跳过余额核对
+
+    Yields:
+        不一致记录 {"type": "mismatch", "kind": "chain_break" / "amount_mismatch" / "balance_mismatch", ...}，
+        最后一条为汇总 {"type": "summary", ...}
+
+    Raises:
+        ValueError: 归档库过多，无法全部挂载
+    """
+    conn = db_manager.conn
+    schemas = attach_all_archives(conn, db_manager.db_path)
+    try:
+        yield from _reconcile(db_manager, schemas, chunk_size, max_chunks)
+    finally:
+        detach_archives(conn, schemas)
+
+
+def _reconcile(db_manager, schemas: List[str], chunk_size: int,
+               max_chunks: Optional[int]) -> Iterator[Dict[str, Any]]:
+    """在已挂载归档库的连接上执行增量对账（见 reconcile_ledger）"""
+    started = time.monotonic()
+    conn = db_manager.conn
+    chunk_sql = _ledger_chunk_sql(schemas)
+
+    # 账本ID在串行的写事务内分配，提交顺序与ID顺序一致，进度之前不会再出现新的记录
+    cursor_id = conn.execute("SELECT COALESCE(MAX(last_ledger_id), 0) FROM ledger_reconciliation").fetchone()[0]
+    summary = {"type": "summary", "from_ledger_id": cursor_id, "chunks": 0, "rows_checked": 0,
+               "users_checked": 0, "mismatches": 0, "complete": False}
+    users = set()
+
+    while max_chunks is None or summary["chunks"] < max_chunks:
+        rows = conn.execute(chunk_sql, [cursor_id] * (len(schemas) + 1) + [chunk_size]).fetchall()
+        if not rows:
+            summary["complete"] = True
+            break
+
+        checkpoints = _load_checkpoints(conn, list({row["user_id"] for row in rows}))
+        for mismatch in _check_chunk(rows, checkpoints):
+            summary["mismatches"] += 1
+            yield mismatch
+        _save_checkpoints(db_manager, checkpoints)
+
+        cursor_id = rows[-1]["ledger_id"]
+        users.update(checkpoints)
+        summary["chunks"] += 1
+        summary["rows_checked"] += len(rows)
+        if len(rows) < chunk_size:
+            summary["complete"] = True
+            break
+
+    if summary["complete"]:
+        for mismatch in _check_balances(conn, schemas):
+            summary["mismatches"] += 1
+            yield mismatch
+
+    summary.update({
+        "to_ledger_id": cursor_id,
+        "users_checked": len(users),
+        "duration_ms": round((time.monotonic() - started) * 1000, 1)
+    })
+    yield summary
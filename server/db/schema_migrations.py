@@ -0,0 +1,290 @@
+# 数据库结构迁移
+# 迁移文件位于 db/migrations/，文件名为 m<4位版本号>_<名称>.py，按版本号顺序执行；
+# 已执行的版本记录在 schema_version 表。应用启动时执行，多worker部署时通过调度租约
+# 只由一个进程执行迁移，其他进程等待租约释放后确认没有待执行的迁移。
+#
+# 每个迁移先在一个写事务中执行 upgrade(conn)，再逐个创建 INDEXES 中的索引（每个索引一个写事务，
+# 索引之间释放写锁，不会长时间阻塞其他worker的写操作），新索引建好后才删除 DROPPED_INDEXES 中
+# 被取代的索引，重新分析 ANALYZE 中列出的表（计划器按新索引的统计信息选择），并在同一事务中记录版本号。
+# 中途中断的迁移下次会重新执行，upgrade 和索引语句需可重复执行（IF NOT EXISTS、先检查再修改）。
+# 全部表由迁移创建，业务模块不在运行时建表；只有迁移自身使用的租约表和版本表在获取租约前创建。
+
+import importlib
+import logging
+import pkgutil
+import re
+import sqlite3
+import time
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+from db.leases import acquire_lease, new_lease_owner, release_lease
+from db.manager import DatabaseManager
+from db.migrations.m0001_baseline import SCHEDULER_LEASES_TABLE_SQL
+
+logger = logging.getLogger(__name__)
+
+MIGRATIONS_PACKAGE = "db.migrations"
+MIGRATION_LEASE = "schema_migrations"
+DEFAULT_LEASE_SECONDS = 600       # 迁移租约时长（单个迁移步骤的最长耗时）
+DEFAULT_WAIT_TIMEOUT = 900        # 等待其他进程完成迁移的最长时间（秒）
+LEASE_POLL_INTERVAL = 0.5
+ANALYSIS_LIMIT = 1000             # ANALYZE 每个索引最多读取的行数（近似统计，大表也能快速完成）
+
+_MIGRATION_FILE = re.compile(r"^m(\d{4})_(\w+)$")
+
+SCHEMA_VERSION_TABLE_SQL = """
+    CREATE TABLE IF NOT EXISTS schema_version (
+        version INTEGER PRIMARY KEY,               -- 迁移版本号
+        name VARCHAR(100) NOT NULL,                -- 迁移名称
+        applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        duration_ms REAL                           -- 执行耗时（毫秒）
+    )
+"""
+
+
+@dataclass
+class Migration:
+    """一个结构迁移"""
+    version: int
+    name: str
+    description: str
+    upgrade: Callable[[sqlite3.Connection], None]
+    indexes: Sequence[str] = ()
+    dropped_indexes: Sequence[str] = ()
+    analyze: Sequence[str] = ()
+
+
+def load_migrations() -> List[Migration]:
+    """
+    按版本号顺序加载 db/migrations/ 下的迁移
+
+    Raises:
+        ValueError: 版本号重复
+    """
+    package = importlib.import_module(MIGRATIONS_PACKAGE)
+    migrations: Dict[int, Migration] = {}
+    for module_info in pkgutil.iter_modules(package.__path__):
+        match = _MIGRATION_FILE.match(module_info.name)
+        if not match:
+            continue
+        version = int(match.group(1))
+        if version in migrations:
+            raise ValueError(f"迁移版本号重复: {version}")
+        module = importlib.import_module(f"{MIGRATIONS_PACKAGE}.{module_info.name}")
+        migrations[version] = Migration(
+            version=version,
+            name=match.group(2),
+            description=getattr(module, "DESCRIPTION", ""),
+            upgrade=getattr(module, "upgrade", lambda conn: None),
+            indexes=tuple(getattr(module, "INDEXES", ())),
+            dropped_indexes=tuple(getattr(module, "DROPPED_INDEXES", ())),
+            analyze=tuple(getattr(module, "ANALYZE", ())),
+        )
+    return [migrations[version] for version in sorted(migrations)]
+
+
+def get_schema_version(conn: sqlite3.Connection) -> int:
+    """当前结构版本，未执行过迁移时为0"""
+    exists = conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'schema_version'"
+    ).fetchone()
+    if not exists:
+        return 0
+    return conn.execute("SELECT COALESCE(MAX(version), 0) FROM schema_version").fetchone()[0]
+
+
+def rebuild_table(conn: sqlite3.Connection, table: str, create_sql: str,
+                  column_expressions: Optional[Dict[str, str]] = None) -> int:
+    """
+    按新的表定义重建表（在调用方的事务中执行，需先关闭外键检查）
+
+    新表以临时名称创建，用一条 INSERT INTO ... SELECT 复制数据，再替换原表并重建原表上的索引和触发器
+
+    Args:
+        table: 表名
+        create_sql: 新表的 CREATE TABLE 语句（表名会替换为临时名称）
+        column_expressions: 新表列 -> 取值表达式（新增或改名的列）；其余同名列直接复制，
+            原表没有且未指定表达式的列使用默认值
+
+    Returns:
+        复制的行数
+    """
+    temp_table = f"{table}__rebuild"
+    old_columns = {row[1] for row in conn.execute(f"PRAGMA table_info({table})")}
+    dependents = [row[0] for row in conn.execute(
+        "SELECT sql FROM sqlite_master WHERE tbl_name = ? AND type IN ('index', 'trigger') AND sql IS NOT NULL",
+        [table]
+    )]
+
+    conn.execute(f"DROP TABLE IF EXISTS {temp_table}")
+    conn.execute(re.sub(r"CREATE\s+TABLE\s+(IF\s+NOT\s+EXISTS\s+)?\w+", f"CREATE TABLE {temp_table}",
+                        create_sql, count=1, flags=re.IGNORECASE))
+
+    expressions = column_expressions or {}
+    targets, sources = [], []
+    for row in conn.execute(f"PRAGMA table_info({temp_table})"):
+        column = row[1]
+        if column in expressions:
+            targets.append(column)
+            sources.append(expressions[column])
+        elif column in old_columns:
+            targets.append(column)
+            sources.append(column)
+
+    copied = conn.execute(
+        f"INSERT INTO {temp_table} ({', '.join(targets)}) SELECT {', '.join(sources)} FROM {table}"
+    ).rowcount
+    conn.execute(f"DROP TABLE {table}")
+    conn.execute(f"ALTER TABLE {temp_table} RENAME TO {table}")
+    for sql in dependents:
+        conn.execute(sql)
+    return copied
+
+
+def _run_in_write_transaction(conn: sqlite3.Connection, operation: Callable[[], Any]) -> Any:
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        result = operation()
+        conn.commit()
+        return result
+    except Exception:
+        conn.rollback()
+        raise
+
+
+def _apply_migration(conn: sqlite3.Connection, migration: Migration, renew_lease: Callable[[], None]) -> float:
+    """执行一个迁移，返回耗时（毫秒）"""
+    started = time.perf_counter()
+
+    def upgrade():
+        migration.upgrade(conn)
+        try:
+            violations = conn.execute("PRAGMA foreign_key_check").fetchall()
+        except sqlite3.OperationalError as e:
+            # 被引用表缺少主键/唯一约束（旧数据库的结构问题，由后续迁移修复）时无法检查
+            logger.warning(f"迁移 {migration.version} 后无法检查外键: {e}")
+            violations = []
+        if violations:
+            raise RuntimeError(f"迁移 {migration.version} 后存在外键不一致的记录: {len(violations)} 条")
+
+    _run_in_write_transaction(conn, upgrade)
+    for index_sql in migration.indexes:
+        renew_lease()
+        _run_in_write_transaction(conn, lambda: conn.execute(index_sql))
+
+    def finish():
+        for index_name in migration.dropped_indexes:
+            conn.execute(f"DROP INDEX IF EXISTS {index_name}")
+        if migration.analyze:
+            previous_limit = conn.execute("PRAGMA analysis_limit").fetchone()[0]
+            conn.execute(f"PRAGMA analysis_limit = {ANALYSIS_LIMIT}")
+            try:
+                for table in migration.analyze:
+                    conn.execute(f"ANALYZE {table}")
+            finally:
+                conn.execute(f"PRAGMA analysis_limit = {previous_limit}")
+        duration_ms = round((time.perf_counter() - started) * 1000, 1)
+        conn.execute(
+            "INSERT OR IGNORE INTO schema_version (version, name, duration_ms) VALUES (?, ?, ?)",
+            [migration.version, migration.name, duration_ms]
+        )
+        return duration_ms
+
+    renew_lease()
+    return _run_in_write_transaction(conn, finish)
+
+
+def apply_migrations(db_manager: DatabaseManager, migrations: Optional[List[Migration]] = None,
+                     lease_seconds: float = DEFAULT_LEASE_SECONDS,
+                     wait_timeout: float = DEFAULT_WAIT_TIMEOUT) -> List[Dict[str, Any]]:
+    """
+    执行待执行的迁移
+
+    先获取迁移租约，其他进程正在迁移时等待其完成；执行期间关闭外键检查（表重建需要），
+    每个迁移结束前用 PRAGMA foreign_key_check 校验
+
+    Args:
+        db_manager: 数据库管理器
+        migrations: 迁移列表，默认加载 db/migrations/ 下的全部迁移
+        lease_seconds: 租约时长（秒）
+        wait_timeout: 等待其他进程完成迁移的最长时间（秒）
+
+    Returns:
+        本次执行的迁移 [{"version", "name", "duration_ms"}]
+
+    Raises:
+        TimeoutError: 等待其他进程完成迁移超时
+        RuntimeError: 迁移期间失去租约
+    """
+    db_manager.ensure_connected()
+    conn = db_manager.conn
+    migrations = load_migrations() if migrations is None else migrations
+
+    # 与基线迁移相同的租约表定义（IF NOT EXISTS），新数据库在执行迁移前也能获取迁移租约
+    conn.execute(SCHEDULER_LEASES_TABLE_SQL)
+    conn.execute(SCHEMA_VERSION_TABLE_SQL)
+    conn.commit()
+
+    owner = new_lease_owner()
+    deadline = time.monotonic() + wait_timeout
+    while not acquire_lease(db_manager, MIGRATION_LEASE, owner, lease_seconds):
+        if time.monotonic() > deadline:
+            raise TimeoutError("等待其他进程完成数据库迁移超时")
+        time.sleep(LEASE_POLL_INTERVAL)
+
+    def renew_lease():
+        if not acquire_lease(db_manager, MIGRATION_LEASE, owner, lease_seconds):
+            raise RuntimeError("数据库迁移租约已失效")
+
+    applied = []
+    try:
+        conn.execute("PRAGMA foreign_keys = OFF")
+        try:
+            for migration in migrations:
+                if migration.version <= get_schema_version(conn):
+                    continue
+                renew_lease()
+                logger.info(f"执行数据库迁移 {migration.version:04d}_{migration.name}: {migration.description}")
+                duration_ms = _apply_migration(conn, migration, renew_lease)
+                applied.append({"version": migration.version, "name": migration.name, "duration_ms": duration_ms})
+                logger.info(f"数据库迁移 {migration.version:04d}_{migration.name} 完成，耗时 {duration_ms}ms")
+        finally:
+            conn.execute("PRAGMA foreign_keys = ON")
+    finally:
+        release_lease(db_manager, MIGRATION_LEASE, owner)
+    return applied
+
+
+def migrate_database(db_path: str, **kwargs) -> List[Dict[str, Any]]:
+    """
+    打开数据库文件并执行待执行的迁移（应用启动、初始化脚本使用）
+
+    Args:
+        db_path: 数据库文件路径
+        **kwargs: 传给 apply_migrations
+
+    Returns:
+        本次执行的迁移
+    """
+    with DatabaseManager(db_path) as db_manager:
+        return apply_migrations(db_manager, **kwargs)
+
+
+def migration_status(db_manager: DatabaseManager) -> Dict[str, Any]:
+    """
+    迁移状态
+
+    Returns:
+        {"current_version", "latest_version", "pending": [{"version", "name", "description"}]}
+    """
+    migrations = load_migrations()
+    current = get_schema_version(db_manager.conn)
+    return {
+        "current_version": current,
+        "latest_version": migrations[-1].version if migrations else 0,
+        "pending": [
+            {"version": m.version, "name": m.name, "description": m.description}
+            for m in migrations if m.version > current
+        ],
+    }
@@ -0,0 +1,359 @@
+# 大规模模拟数据生成
+# 为压测、基准测试构造可复现的真实历史：用户陆续加入和流失，在职期间大多数人几乎每天订午餐、
+# 部分人订晚餐；少数附加项很受欢迎；余额不足时充值；少量订单被取消退款，偶尔整餐取消批量退款。
+# 按时间顺序模拟余额变化，账本链（balance_before/after）与用户余额完全一致，满足外键和唯一约束。
+# 相同的种子、规模和结束日期生成完全相同的数据；在少数几个大事务内 executemany 批量写入。
+
+import json
+import random
+import time
+from dataclasses import dataclass, replace
+from datetime import date, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+
+DEFAULT_SEED = 20241125
+DEFAULT_BATCH_SIZE = 50000        # 每批写入的行数
+ADMIN_USER_ID = 1
+
+# 附加项：(名称, 价格分, 被选中的概率)，热门程度差异较大
+SEED_ADDONS = [
+    ("加鸡腿", 300, 0.35),
+    ("加饮料", 200, 0.18),
+    ("加煎蛋", 150, 0.10),
+    ("加米饭", 100, 0.06),
+    ("不要香菜", 0, 0.04),
+    ("少放盐", 0, 0.02),
+    ("加例汤", 200, 0.015),
+    ("不要鸡腿", -300, 0.01),
+]
+
+RECHARGE_AMOUNTS = [10000, 20000, 20000, 30000, 50000]
+SLOT_ORDER_FACTORS = {"lunch": 1.0, "dinner": 0.35}   # 各时段相对午餐的订餐意愿
+SLOT_PRICES = {"lunch": 1500, "dinner": 1800}
+
+# 各时段订单的下单时间窗口（相对餐次日期的秒数），窗口结束时执行整餐取消；
+# 相邻餐次的窗口首尾相接不重叠，每个用户的账本时间随账本ID递增
+SLOT_WINDOWS = {
+    "lunch": (-8 * 3600 + 1, 10 * 3600),     # 前一天 16:00 ~ 当天 10:00
+    "dinner": (10 * 3600 + 1, 16 * 3600),    # 当天 10:00 ~ 16:00
+}
+FUTURE_WINDOW = (8 * 3600, 20 * 3600)        # 尚未到来的餐次在结束日期当天该时段内依次下单
+
+
+@dataclass(frozen=True)
+class SeedScale:
+    """数据规模与分布参数"""
+    users: int = 5000                 # 普通用户数（另有1个管理员）
+    days: int = 1095                  # 历史天数（截止到结束日期）
+    future_days: int = 7              # 从结束日期起已发布（尚未到来）的餐次天数
+    slots: Tuple[str, ...] = ("lunch", "dinner")
+    weekdays_only: bool = True        # 只在工作日供餐
+    max_orders: int = 2000            # 每餐最大订餐数
+    initial_users_ratio: float = 0.3  # 开始时已加入的用户比例，其余在期间内陆续加入
+    mean_tenure_days: int = 365       # 平均在职天数（指数分布）
+    cancel_rate: float = 0.03         # 订单取消率
+    meal_cancel_rate: float = 0.005   # 整餐取消率
+
+
+SCALE_PRESETS = {
+    "tiny": SeedScale(users=20, days=30, future_days=3, max_orders=50),
+    "small": SeedScale(users=200, days=90, max_orders=200),
+    "medium": SeedScale(users=1000, days=365, max_orders=1000),
+    "large": SeedScale(),
+}
+
+
+def get_scale(name: str, **overrides) -> SeedScale:
+    """
+    按预设名获取规模参数，可覆盖单个参数
+
+    Raises:
+        ValueError: 预设名不存在
+    """
+    if name not in SCALE_PRESETS:
+        raise ValueError(f"未知的数据规模: {name}，可选: {', '.join(SCALE_PRESETS)}")
+    return replace(SCALE_PRESETS[name], **{key: value for key, value in overrides.items() if value is not None})
+
+
+class _Writer:
+    """按外键依赖顺序分批写入（meals -> orders -> ledger）"""
+
+    def __init__(self, conn, batch_size: int):
+        self.conn = conn
+        self.batch_size = batch_size
+        self.meals: List[tuple] = []
+        self.orders: List[tuple] = []
+        self.ledger: List[tuple] = []
+        self.counts = {"meals": 0, "orders": 0, "ledger": 0}
+
+    def maybe_flush(self):
+        if len(self.ledger) + len(self.orders) >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        if self.meals:
+            self.conn.executemany("""
+                INSERT INTO meals (meal_id, date, slot, description, base_price_cents, addon_config, max_orders,
+                                   current_orders, status, created_at, updated_at, canceled_at, canceled_by,
+                                   canceled_reason)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            """, self.meals)
+        if self.orders:
+            self.conn.executemany("""
+                INSERT INTO orders (order_id, user_id, meal_id, amount_cents, addon_selections, status,
+                                    created_at, updated_at, canceled_at, canceled_reason)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            """, self.orders)
+        if self.ledger:
+            self.conn.executemany("""
+                INSERT INTO ledger (ledger_id, transaction_no, user_id, type, direction, amount_cents,
+                                    balance_before_cents, balance_after_cents, order_id, description,
+                                    operator_id, created_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            """, self.ledger)
+        for table in self.counts:
+            self.counts[table] += len(getattr(self, table))
+        self.meals, self.orders, self.ledger = [], [], []
+
+
+class _Clock:
+    """时间用相对开始日期零点的秒数表示，格式化结果按日期和时刻缓存（逐行 strftime 是生成耗时的大头）"""
+
+    def __init__(self, start: date):
+        self.start = start
+        self._days: Dict[int, Tuple[str, str]] = {}
+        self._times: Dict[int, str] = {}
+
+    def day(self, day_index: int) -> Tuple[str, str]:
+        """(YYYY-MM-DD, YYYYMMDD)"""
+        cached = self._days.get(day_index)
+        if cached is None:
+            day = self.start + timedelta(days=day_index)
+            cached = self._days[day_index] = (day.isoformat(), day.strftime("%Y%m%d"))
+        return cached
+
+    def format(self, seconds: int) -> str:
+        day_index, time_of_day = divmod(seconds, 86400)
+        clock = self._times.get(time_of_day)
+        if clock is None:
+            hours, rest = divmod(time_of_day, 3600)
+            clock = self._times[time_of_day] = f"{hours:02d}:{rest // 60:02d}:{rest % 60:02d}"
+        return f"{self.day(day_index)[0]} {clock}"
+
+
+class _Ledger:
+    """按时间顺序记账，维护用户余额和每日交易号序号"""
+
+    def __init__(self, writer: _Writer, balances: Dict[int, int], clock: _Clock):
+        self.writer = writer
+        self.balances = balances
+        self.clock = clock
+        self.next_id = 1
+        self.daily_seq: Dict[str, int] = {}
+
+    def record(self, user_id: int, entry_type: str, direction: str, amount: int, at: int,
+               order_id: Optional[int] = None, description: str = "", operator_id: Optional[int] = None):
+        """记一笔账，at 为相对开始日期零点的秒数"""
+        before = self.balances[user_id]
+        after = before + amount if direction == "in" else before - amount
+        self.balances[user_id] = after
+
+        day = self.clock.day(at // 86400)[1]
+        seq = self.daily_seq.get(day, 0) + 1
+        self.daily_seq[day] = seq
+        self.writer.ledger.append((
+            self.next_id, f"TXN{day}{seq:06d}", user_id, entry_type, direction, amount, before, after,
+            order_id, description, operator_id, self.clock.format(at)
+        ))
+        self.next_id += 1
+
+
+def _plan_users(rng: random.Random, scale: SeedScale) -> List[Tuple[int, int, int, float]]:
+    """用户的加入日、离开日（相对开始日期的天数）和订餐意愿：[(user_id, join_day, leave_day, propensity)]"""
+    users = []
+    for index in range(scale.users):
+        join_day = 0 if rng.random() < scale.initial_users_ratio else rng.randrange(scale.days)
+        leave_day = join_day + int(rng.expovariate(1 / scale.mean_tenure_days)) + 1
+        # 订餐意愿偏向高值：大多数人几乎每天都订
+        users.append((ADMIN_USER_ID + 1 + index, join_day, leave_day, rng.betavariate(6, 1.5)))
+    return users
+
+
+def seed_database(db_manager, scale: SeedScale, end_date: date, seed: int = DEFAULT_SEED,
+                  batch_size: int = DEFAULT_BATCH_SIZE) -> Dict[str, Any]:
+    """
+    向空数据库写入模拟数据
+
+    Args:
+        db_manager: 数据库管理器（表结构已创建，且没有用户数据）
+        scale: 数据规模与分布参数
+        end_date: 历史数据的最后一天（该日之前的餐次已完成，之后的餐次为已发布）
+        seed: 随机种子
+        batch_size: 每批写入的行数
+
+    Returns:
+        各表写入行数和耗时
+
+    Raises:
+        ValueError: 数据库中已有用户
+    """
+    started = time.monotonic()
+    conn = db_manager.conn
+    if conn.execute("SELECT COUNT(*) FROM users").fetchone()[0]:
+        raise ValueError("数据库中已有用户数据，请使用空数据库")
+
+    rng = random.Random(seed)
+    start = end_date - timedelta(days=scale.days - 1)
+    clock = _Clock(start)
+    created_at = clock.format(-86400)
+    writer = _Writer(conn, batch_size)
+    selection_json: Dict[tuple, str] = {}
+
+    def seed_all():
+        # 用户和附加项
+        users = _plan_users(rng, scale)
+        conn.execute("""
+            INSERT INTO users (user_id, open_id, wechat_name, balance_cents, is_admin, status, created_at, updated_at)
+            VALUES (?, 'admin_openid_mock', '系统管理员', 0, TRUE, 'active', ?, ?)
+        """, [ADMIN_USER_ID, created_at, created_at])
+        conn.executemany("""
+            INSERT INTO users (user_id, open_id, wechat_name, balance_cents, is_admin, status, created_at, updated_at)
+            VALUES (?, ?, ?, 0, FALSE, ?, ?, ?)
+        """, [
+            (user_id, f"seed_openid_{user_id}", f"用户{user_id}",
+             "active" if leave_day > scale.days else "suspended", clock.format(join_day * 86400), created_at)
+            for user_id, join_day, leave_day, _ in users
+        ])
+        conn.executemany("""
+            INSERT INTO addons (addon_id, name, price_cents, display_order, is_default, status, created_at, updated_at)
+            VALUES (?, ?, ?, ?, FALSE, 'active', ?, ?)
+        """, [(index + 1, name, price, index + 1, created_at, created_at)
+              for index, (name, price, _) in enumerate(SEED_ADDONS)])
+        addon_config = json.dumps({str(index + 1): 2 for index in range(len(SEED_ADDONS))})
+        addon_choices = [(str(index + 1), price, probability) for index, (_, price, probability) in enumerate(SEED_ADDONS)]
+
+        balances = {user_id: 0 for user_id, _, _, _ in users}
+        ledger = _Ledger(writer, balances, clock)
+
+        # 按加入/离开日维护在职用户
+        joins: Dict[int, List[tuple]] = {}
+        leaves: Dict[int, List[int]] = {}
+        for user in users:
+            joins.setdefault(user[1], []).append(user)
+            leaves.setdefault(user[2], []).append(user[0])
+        active: Dict[int, float] = {}
+
+        meal_id = order_id = 0
+        end_index = scale.days - 1
+        future_meals = len(scale.slots) * sum(
+            1 for offset in range(scale.future_days)
+            if not (scale.weekdays_only and (end_date + timedelta(days=offset)).weekday() >= 5)
+        )
+        future_width = (FUTURE_WINDOW[1] - FUTURE_WINDOW[0]) // max(future_meals, 1)
+        future_index = 0
+        for day_index in range(end_index + scale.future_days):
+            for user_id, _, _, propensity in joins.get(day_index, []):
+                active[user_id] = propensity
+            for user_id in leaves.get(day_index, []):
+                active.pop(user_id, None)
+
+            meal_date = start + timedelta(days=day_index)
+            if scale.weekdays_only and meal_date.weekday() >= 5:
+                continue
+            date_text = clock.day(day_index)[0]
+            midnight = day_index * 86400
+            past = day_index < end_index
+
+            for slot in scale.slots:
+                meal_id += 1
+                window_start, window_end = SLOT_WINDOWS.get(slot, SLOT_WINDOWS["lunch"])
+                window_start, window_end = midnight + window_start, midnight + window_end
+                if not past:
+                    # 尚未到来的餐次：订单都在结束日期当天下单，每个餐次占用一段
+                    window_start = end_index * 86400 + FUTURE_WINDOW[0] + future_index * future_width
+                    window_end = window_start + future_width - 1
+                    future_index += 1
+                meal_canceled = past and rng.random() < scale.meal_cancel_rate
+
+                factor = SLOT_ORDER_FACTORS.get(slot, 1.0)
+                diners = [user_id for user_id, propensity in active.items() if rng.random() < propensity * factor]
+                if len(diners) > scale.max_orders:
+                    diners = rng.sample(diners, scale.max_orders)
+                # 按下单时间排序，保证每个用户的账本时间顺序
+                placed = sorted((rng.randrange(window_start, window_end), user_id) for user_id in diners)
+
+                current_orders = 0
+                base_price = SLOT_PRICES.get(slot, 1500)
+                order_description = f"订餐 {date_text} {slot}"
+                for placed_at, user_id in placed:
+                    order_id += 1
+                    selections = []
+                    amount = base_price
+                    for addon_key, price, probability in addon_choices:
+                        if rng.random() < probability:
+                            quantity = 2 if rng.random() < 0.1 else 1
+                            selections.append((addon_key, quantity))
+                            amount += price * quantity
+                    selections = tuple(selections)
+                    selections_text = selection_json.get(selections)
+                    if selections_text is None:
+                        selections_text = selection_json[selections] = json.dumps(dict(selections))
+
+                    # 余额不足时先充值
+                    while balances[user_id] < amount:
+                        ledger.record(user_id, "recharge", "in", rng.choice(RECHARGE_AMOUNTS), placed_at - 1,
+                                      description="微信充值", operator_id=ADMIN_USER_ID)
+                    ledger.record(user_id, "order", "out", amount, placed_at, order_id=order_id,
+                                  description=order_description)
+
+                    canceled_at = reason = None
+                    if meal_canceled:
+                        canceled_at, reason = window_end, "餐次取消"
+                    elif rng.random() < scale.cancel_rate:
+                        canceled_at = placed_at + rng.randint(1, max(window_end - placed_at, 1))
+                        reason = "用户取消"
+
+                    placed_text = clock.format(placed_at)
+                    if canceled_at is not None:
+                        ledger.record(user_id, "refund", "in", amount, canceled_at, order_id=order_id,
+                                      description=f"订单取消退款: {reason}")
+                        status = "canceled"
+                        canceled_text = clock.format(canceled_at)
+                    else:
+                        status = "completed" if past else "active"
+                        canceled_text = None
+                        current_orders += 1
+
+                    writer.orders.append((
+                        order_id, user_id, meal_id, amount, selections_text, status,
+                        placed_text, canceled_text or placed_text, canceled_text, reason
+                    ))
+
+                meal_status = "canceled" if meal_canceled else "completed" if past else "published"
+                meal_created = clock.format(midnight - 3 * 86400)
+                closed_text = clock.format(window_end)
+                writer.meals.append((
+                    meal_id, date_text, slot, f"{date_text} {slot} 套餐", base_price,
+                    addon_config, scale.max_orders, current_orders, meal_status, meal_created,
+                    closed_text if past else meal_created,
+                    closed_text if meal_canceled else None,
+                    ADMIN_USER_ID if meal_canceled else None,
+                    "模拟取消" if meal_canceled else None
+                ))
+                writer.maybe_flush()
+
+        writer.flush()
+        conn.executemany("UPDATE users SET balance_cents = ? WHERE user_id = ?",
+                         [(balance, user_id) for user_id, balance in balances.items()])
+
+    db_manager.execute_transaction([seed_all])
+
+    return {
+        "users": scale.users + 1,
+        "addons": len(SEED_ADDONS),
+        **writer.counts,
+        "seed": seed,
+        "start_date": start.isoformat(),
+        "end_date": end_date.isoformat(),
+        "duration_ms": round((time.monotonic() - started) * 1000, 1)
+    }
@@ -0,0 +1,246 @@
+# 月度账单
+# 每月初批量生成上月每个用户的账单：期初余额、当月每一笔账本记录（扣款、退款、充值、调整）、期末余额。
+# 按 (user_id, ledger_id) 顺序对当月账本做一次遍历，逐用户汇总，期初/期末余额取自
+# 第一条记录的 balance_before_cents 和最后一条记录的 balance_after_cents；
+# 当月没有账本记录的用户沿用上月期末余额（无上月账单时取该月之前最后一条账本记录）。
+# 账单保存为每用户每月一行（明细为紧凑的JSON数组），用户查询账单只读取一行。
+
+import json
+import sqlite3
+import time
+from datetime import date, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+
+from db.archive import archive_union_sources, attach_archives_for_range
+
+DEFAULT_CHUNK_SIZE = 500          # 每个写事务保存的账单数
+ARCHIVE_MARGIN_DAYS = 31          # 账本记录与所属餐次日期的最大间隔（归档按餐次日期划分）
+
+# 账单明细列（entries 中每条记录为按该顺序排列的数组）
+STATEMENT_ENTRY_COLUMNS = [
+    "ledger_id", "created_at", "type", "direction", "amount_cents", "balance_after_cents", "order_id", "description"
+]
+
+def month_range(month: str) -> Tuple[str, str]:
+    """
+    月份的起止日期
+
+    Args:
+        month: YYYY-MM
+
+    Returns:
+        (当月第一天, 下月第一天)
+
+    Raises:
+        ValueError: 月份格式错误
+    """
+    try:
+        year, month_number = (int(part) for part in month.split("-"))
+        start = date(year, month_number, 1)
+    except (TypeError, ValueError):
+        raise ValueError(f"月份格式错误，应为YYYY-MM: {month}")
+    if len(month) != 7:
+        raise ValueError(f"月份格式错误，应为YYYY-MM: {month}")
+    end = date(year + 1, 1, 1) if month_number == 12 else date(year, month_number + 1, 1)
+    return start.isoformat(), end.isoformat()
+
+
+def previous_month(month: str) -> str:
+    start, _ = month_range(month)
+    year, month_number = int(start[:4]), int(start[5:7])
+    return f"{year - 1}-12" if month_number == 1 else f"{year}-{month_number - 1:02d}"
+
+
+def last_finished_month(today: Optional[date] = None) -> str:
+    """上一个自然月（最近一个已结束的月份）"""
+    today = today or date.today()
+    return previous_month(f"{today.year}-{today.month:02d}")
+
+
+def _build_statement(user_id: int, rows: List[sqlite3.Row]) -> tuple:
+    """一个用户当月的账单行"""
+    total_in = sum(row["amount_cents"] for row in rows if row["direction"] == "in")
+    total_out = sum(row["amount_cents"] for row in rows if row["direction"] == "out")
+    entries = [[row[column] for column in STATEMENT_ENTRY_COLUMNS] for row in rows]
+    return (
+        user_id,
+        rows[0]["balance_before_cents"],
+        rows[-1]["balance_after_cents"],
+        total_in,
+        total_out,
+        len(rows),
+        json.dumps(entries, ensure_ascii=False, separators=(",", ":"))
+    )
+
+
+def _save_statements(db_manager, month: str, statements: List[tuple]):
+    def save():
+        db_manager.conn.executemany("""
+            INSERT OR REPLACE INTO monthly_statements (
+                user_id, month, opening_balance_cents, closing_balance_cents,
+                total_in_cents, total_out_cents, entry_count, entries, generated_at
+            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, CURRENT_TIMESTAMP)
+        """, [(statement[0], month) + statement[1:] for statement in statements])
+
+    db_manager.execute_transaction([save])
+
+
+def _carried_balances(conn: sqlite3.Connection, month: str, start: str,
+                      ledger_source: str, with_clause: str) -> List[Tuple[int, int]]:
+    """
+    当月之前的期末余额 [(user_id, balance_cents)]
+
+    上月账单已生成时直接读取上月期末余额，否则取每个用户该月之前最后一条账本记录
+    """
+    last_month = previous_month(month)
+    if conn.execute("SELECT 1 FROM statement_runs WHERE month = ?", [last_month]).fetchone():
+        return [tuple(row) for row in conn.execute(
+            "SELECT user_id, closing_balance_cents FROM monthly_statements WHERE month = ?", [last_month]
+        ).fetchall()]
+
+    return [tuple(row) for row in conn.execute(f"""
+        {with_clause}
+        SELECT l.user_id, l.balance_after_cents
+        FROM {ledger_source} l
+        JOIN (
+            SELECT user_id, MAX(ledger_id) AS ledger_id FROM {ledger_source}
+            WHERE created_at < ? GROUP BY user_id
+        ) last ON last.ledger_id = l.ledger_id
+    """, [start]).fetchall()]
+
+
+def _generate(db_manager, month: str, start: str, end: str, schemas: List[str], chunk_size: int) -> Dict[str, Any]:
+    """遍历当月账本生成账单，返回汇总"""
+    conn = db_manager.conn
+    with_clause, sources = archive_union_sources(conn, ["ledger"], schemas)
+
+    summary = {"month": month, "statements": 0, "active_users": 0, "entries": 0}
+    pending, active_users = [], set()
+    current_user, current_rows = None, []
+
+    def flush_user():
+        if current_rows:
+            pending.append(_build_statement(current_user, current_rows))
+            active_users.add(current_user)
+            summary["entries"] += len(current_rows)
+
+    # 一次遍历当月账本，按用户分组
+    cursor = conn.execute(f"""
+        {with_clause}
+        SELECT user_id, ledger_id, created_at, type, direction, amount_cents,
+               balance_before_cents, balance_after_cents, order_id, description
+        FROM {sources['ledger']}
+        WHERE created_at >= ? AND created_at < ?
+        ORDER BY user_id, ledger_id
+    """, [start, end])
+    for row in cursor:
+        if row["user_id"] != current_user:
+            flush_user()
+            current_user, current_rows = row["user_id"], []
+            if len(pending) >= chunk_size:
+                _save_statements(db_manager, month, pending)
+                summary["statements"] += len(pending)
+                pending = []
+        current_rows.append(row)
+    flush_user()
+    cursor.close()
+
+    # 当月没有账本记录的用户沿用之前的余额
+    for user_id, balance in _carried_balances(conn, month, start, sources["ledger"], with_clause):
+        if user_id not in active_users:
+            pending.append((user_id, balance, balance, 0, 0, 0, "[]"))
+
+    if pending:
+        _save_statements(db_manager, month, pending)
+        summary["statements"] += len(pending)
+    summary["active_users"] = len(active_users)
+
+    def record_run():
+        conn.execute("""
+            INSERT OR REPLACE INTO statement_runs (month, statement_count, entry_count, generated_at)
+            VALUES (?, ?, ?, CURRENT_TIMESTAMP)
+        """, [month, summary["statements"], summary["entries"]])
+
+    db_manager.execute_transaction([record_run])
+
+    return summary
+
+
+def generate_monthly_statements(db_manager, month: str, chunk_size: int = DEFAULT_CHUNK_SIZE,
+                                today: Optional[date] = None) -> Dict[str, Any]:
+    """
+    生成某月所有用户的账单（重复生成时覆盖）
+
+    Args:
+        db_manager: 数据库管理器（应使用独立连接，生成期间会提交该连接上的事务）
+        month: 账单月份 YYYY-MM，必须是已结束的月份
+        chunk_size: 每个写事务保存的账单数
+        today: 当前日期（测试用）
+
+    Returns:
+        汇总 {"month", "statements", "active_users", "entries", "duration_ms"}
+
+    Raises:
+        ValueError: 月份格式错误或月份尚未结束
+    """
+    started = time.monotonic()
+    start, end = month_range(month)
+    if end > (today or date.today()).isoformat():
+        raise ValueError(f"{month} 尚未结束，不能生成账单")
+
+    conn = db_manager.conn
+
+    # 已归档的账本记录在按餐次日期划分的归档库中：挂载该月前后一个月内的归档；
+    # 上月账单未生成时需要读取该月之前的全部账本，挂载之前的全部归档
+    has_previous = conn.execute(
+        "SELECT 1 FROM statement_runs WHERE month = ?", [previous_month(month)]
+    ).fetchone() is not None
+    archive_start = date.fromisoformat(start) - timedelta(days=ARCHIVE_MARGIN_DAYS) if has_previous else date.min
+    archive_end = date.fromisoformat(end) + timedelta(days=ARCHIVE_MARGIN_DAYS)
+    schemas = attach_archives_for_range(conn, db_manager.db_path, archive_start.isoformat(), archive_end.isoformat())
+
+    try:
+        summary = _generate(db_manager, month, start, end, schemas, chunk_size)
+    finally:
+        for schema in schemas:
+            conn.execute(f"DETACH DATABASE {schema}")
+
+    summary["duration_ms"] = round((time.monotonic() - started) * 1000, 1)
+    return summary
+
+
+def get_user_statement(conn: sqlite3.Connection, user_id: int, month: str) -> Optional[Dict[str, Any]]:
+    """
+    读取用户某月账单
+
+    Returns:
+        账单字典；该月账单已生成但用户没有账单（没有任何账本记录）时返回余额为0的空账单；
+        该月账单尚未生成时返回None
+
+    Raises:
+        ValueError: 月份格式错误
+    """
+    month_range(month)
+    row = conn.execute("""
+        SELECT opening_balance_cents, closing_balance_cents, total_in_cents, total_out_cents,
+               entry_count, entries, generated_at
+        FROM monthly_statements WHERE user_id = ? AND month = ?
+    """, [user_id, month]).fetchone()
+
+    if row is None:
+        run = conn.execute("SELECT generated_at FROM statement_runs WHERE month = ?", [month]).fetchone()
+        if run is None:
+            return None
+        row = (0, 0, 0, 0, 0, "[]", run[0])
+
+    return {
+        "user_id": user_id,
+        "month": month,
+        "opening_balance_cents": row[0],
+        "closing_balance_cents": row[1],
+        "total_in_cents": row[2],
+        "total_out_cents": row[3],
+        "entry_count": row[4],
+        "entries": [dict(zip(STATEMENT_ENTRY_COLUMNS, entry)) for entry in json.loads(row[5] or "[]")],
+        "generated_at": row[6]
+    }
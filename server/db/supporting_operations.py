@@ -5,8 +5,42 @@
 import json
 import hashlib
 from datetime import datetime
-from typing import List, Optional, Dict, Any
+from typing import List, Optional, Dict, Any, Set
 from .manager import DatabaseManager
+from utils.fields import select_columns, build_record
+
+# 用户列表可选字段 -> 所需数据库列
+USER_FIELD_COLUMNS = {
+    'user_id': ('user_id',),
+    'open_id': ('open_id',),
+    'wechat_name': ('wechat_name',),
+    'avatar_url': ('avatar_url',),
+    'balance_cents': ('balance_cents',),
+    'balance_yuan': ('balance_cents',),
+    'is_admin': ('is_admin',),
+    'is_admin_text': ('is_admin',),
+    'status': ('status',),
+    'status_text': ('status',),
+    'created_at': ('created_at',),
+    'updated_at': ('updated_at',),
+    'last_login_at': ('last_login_at',),
+}
+
+USER_FIELD_FORMATTERS = {
+    'user_id': lambda u: u['user_id'],
+    'open_id': lambda u: u['open_id'],
+    'wechat_name': lambda u: u['wechat_name'],
+    'avatar_url': lambda u: u['avatar_url'],
+    'balance_cents': lambda u: u['balance_cents'],
+    'balance_yuan': lambda u: u['balance_cents'] / 100,
+    'is_admin': lambda u: u['is_admin'],
+    'is_admin_text': lambda u: "是" if u['is_admin'] else "否",
+    'status': lambda u: u['status'],
+    'status_text': lambda u: "正常" if u['status'] == 'active' else "停用",
+    'created_at': lambda u: u['created_at'],
+    'updated_at': lambda u: u['updated_at'],
+    'last_login_at': lambda u: u['last_login_at'],
+}
 
 class SupportingOperations:
     """
@@ -403,7 +437,8 @@ class SupportingOperations:
         return self.db.execute_transaction([set_status_operation])[0]
 
     def query_users_list(self, status: str = None, is_admin: bool = None, 
-                         offset: int = 0, limit: int = 100) -> Dict[str, Any]:
+                         offset: int = 0, limit: int = 100,
+                         fields: Optional[Set[str]] = None) -> Dict[str, Any]:
         """
         查询用户列表（管理员功能）
         
@@ -412,6 +447,7 @@ class SupportingOperations:
             is_admin: 管理员权限过滤
             offset: 偏移量
             limit: 每页条数，最大100
+            fields: 需要返回的字段（见USER_FIELD_COLUMNS），None表示全部
         
         Returns:
             用户列表
@@ -421,6 +457,8 @@ class SupportingOperations:
             raise ValueError("每页条数必须在1-100之间")
         if offset < 0:
             raise ValueError("偏移量不能为负数")
+        if fields is not None and not fields <= USER_FIELD_COLUMNS.keys():
+            raise ValueError(f"不支持的字段: {', '.join(sorted(fields - USER_FIELD_COLUMNS.keys()))}")
         
         # 构建查询条件
         where_conditions = []
@@ -438,11 +476,11 @@ class SupportingOperations:
         if where_clause:
             where_clause = "WHERE " + where_clause
         
-        # 查询用户列表
+        # 查询用户列表，只查询所需列
+        selected = None if fields is None else fields | {'user_id'}
+        columns = select_columns(selected, USER_FIELD_COLUMNS, always=('user_id',))
         users_query = f"""
-            SELECT 
-                user_id, open_id, wechat_name, avatar_url, balance_cents,
-                is_admin, status, created_at, updated_at, last_login_at
+            SELECT {', '.join(columns)}
             FROM users
             {where_clause}
             ORDER BY created_at DESC
@@ -457,23 +495,7 @@ class SupportingOperations:
         total_count = self.db.conn.execute(count_query, params).fetchone()[0]
         
         # 格式化用户列表
-        users_list = []
-        for user in users_result:
-            users_list.append({
-                'user_id': user[0],
-                'open_id': user[1],
-                'wechat_name': user[2],
-                'avatar_url': user[3],
-                'balance_cents': user[4],
-                'balance_yuan': user[4] / 100,
-                'is_admin': user[5],
-                'is_admin_text': "是" if user[5] else "否",
-                'status': user[6],
-                'status_text': "正常" if user[6] == 'active' else "停用",
-                'created_at': user[7],
-                'updated_at': user[8],
-                'last_login_at': user[9]
-            })
+        users_list = [build_record(user, USER_FIELD_FORMATTERS, selected) for user in users_result]
         
         return {
             "success": True,
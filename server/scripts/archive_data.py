@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+# 参考文档: doc/server/db/database_structure.md - 2.10 归档段表
+# 冷数据归档脚本：把早于N个月的已完成/已取消餐次及其订单、账本记录移动到按年份划分的归档库
+
+import argparse
+import logging
+import sys
+from pathlib import Path
+
+# 添加项目根目录到Python路径
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from db.archive import DEFAULT_ARCHIVE_MONTHS, DEFAULT_CHUNK_SIZE, archive_cold_data
+from db.manager import DatabaseManager
+from utils.config import Config
+
+
+def main():
+    """
+    主函数：按当前环境配置归档冷数据
+    """
+
+    # 配置日志
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(levelname)s - %(message)s'
+    )
+
+    config = Config()
+    parser = argparse.ArgumentParser(description="冷数据归档")
+    parser.add_argument("--months", type=int, default=config.get("database.archive_months", DEFAULT_ARCHIVE_MONTHS),
+                        help="归档早于该月数的餐次")
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE, help="每块移动的餐次数")
+    parser.add_argument("--dry-run", action="store_true", help="只统计待归档的餐次数")
+    args = parser.parse_args()
+
+    db_path = config.get_database_config()["path"]
+    logging.info(f"开始归档: {db_path}，归档 {args.months} 个月前的餐次")
+
+    try:
+        with DatabaseManager(db_path) as db_manager:
+            summary = archive_cold_data(
+                db_manager,
+                months=args.months,
+                chunk_size=args.chunk_size,
+                archive_dir=config.get("database.archive_dir"),
+                dry_run=args.dry_run
+            )
+
+        if args.dry_run:
+            logging.info(f"截止日期 {summary['cutoff_date']} 之前待归档餐次 {summary['meals']} 个")
+        else:
+            logging.info(
+                f"归档完成: 餐次 {summary['meals']} 个，订单 {summary['orders']} 个，"
+                f"账本记录 {summary['ledger']} 条，年份 {summary['years']}"
+            )
+    except Exception as e:
+        logging.error(f"归档失败: {e}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+# 参考文档: doc/server/server_structure.md - 数据库维护
+# 数据库在线备份脚本（服务运行期间也可执行）
+
+import argparse
+import logging
+import os
+import sqlite3
+import sys
+from pathlib import Path
+
+# 添加项目根目录到Python路径
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from db.backup import DEFAULT_KEEP, backup_file_name, online_backup, rotate_backups
+from utils.config import Config
+
+
+def main():
+    """
+    主函数：按当前环境配置备份数据库
+    """
+
+    # 配置日志
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(levelname)s - %(message)s'
+    )
+
+    db_config = Config().get_database_config()
+    db_path = db_config["path"]
+    default_dir = db_config.get("backup_dir") or os.path.join(os.path.dirname(db_path), "backups")
+
+    parser = argparse.ArgumentParser(description="数据库在线备份")
+    parser.add_argument("--output-dir", default=default_dir, help="备份目录")
+    parser.add_argument("--no-compress", action="store_true", help="不压缩备份文件")
+    parser.add_argument("--keep", type=int, default=db_config.get("backup_keep", DEFAULT_KEEP),
+                        help="保留的备份份数（0表示不清理）")
+    args = parser.parse_args()
+
+    compress = not args.no_compress
+    backup_path = os.path.join(args.output_dir, backup_file_name(db_path, compress=compress))
+    logging.info(f"开始备份数据库: {db_path} -> {backup_path}")
+
+    try:
+        conn = sqlite3.connect(db_path)
+        try:
+            result = online_backup(conn, backup_path, compress=compress)
+        finally:
+            conn.close()
+
+        logging.info(
+            f"备份完成: {result['pages']} 页，{result['size_bytes']} 字节，耗时 {result['duration_ms']}ms"
+        )
+        for path in rotate_backups(args.output_dir, db_path, args.keep):
+            logging.info(f"删除旧备份: {path}")
+
+    except Exception as e:
+        logging.error(f"数据库备份失败: {e}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,59 @@
+#!/usr/bin/env python3
+# 参考文档: doc/server/database_structure.md - 索引策略
+# 热点查询执行计划检查：对 db/query_plans.py 中的每个热点查询运行 EXPLAIN QUERY PLAN，
+# 确认使用了预期的索引，有查询不满足时以状态码1退出
+
+import argparse
+import logging
+import sys
+from pathlib import Path
+
+# 添加项目根目录到Python路径
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from db.manager import DatabaseManager
+from db.query_plans import verify_query_plans
+from utils.config import Config
+
+
+def main():
+    """
+    主函数：检查当前环境数据库的热点查询执行计划
+    """
+
+    # 配置日志
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(levelname)s - %(message)s'
+    )
+
+    parser = argparse.ArgumentParser(description="热点查询执行计划检查")
+    parser.add_argument("--db", help="数据库文件路径（默认使用当前环境配置）")
+    parser.add_argument("--verbose", action="store_true", help="输出每个查询的完整执行计划")
+    args = parser.parse_args()
+
+    db_path = args.db or Config().get_database_config()["path"]
+
+    with DatabaseManager(db_path) as db_manager:
+        results = verify_query_plans(db_manager.conn)
+
+    failed = [result for result in results if not result["ok"]]
+    for result in results:
+        status = "SKIP" if result["skipped"] else "OK" if result["ok"] else "FAIL"
+        logging.info(f"[{status}] {result['name']} ({result['source']})")
+        if result["skipped"]:
+            logging.info(f"    {result['skipped']}")
+        for problem in result["problems"]:
+            logging.warning(f"    {problem}")
+        if args.verbose or not result["ok"]:
+            for step in result["plan"]:
+                logging.info(f"      {step}")
+
+    logging.info(f"共 {len(results)} 个热点查询，{len(failed)} 个不满足")
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
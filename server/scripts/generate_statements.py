@@ -0,0 +1,52 @@
+#!/usr/bin/env python3
+# 参考文档: doc/server/db/database_structure.md - 2.11 月度账单表
+# 月度账单生成脚本：生成指定月份（默认上月）所有用户的账单，重复生成时覆盖
+
+import argparse
+import logging
+import sys
+from pathlib import Path
+
+# 添加项目根目录到Python路径
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from db.manager import DatabaseManager
+from db.statements import DEFAULT_CHUNK_SIZE, generate_monthly_statements, last_finished_month
+from utils.config import Config
+
+
+def main():
+    """
+    主函数：按当前环境配置生成月度账单
+    """
+
+    # 配置日志
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(levelname)s - %(message)s'
+    )
+
+    parser = argparse.ArgumentParser(description="月度账单生成")
+    parser.add_argument("--month", default=last_finished_month(), help="账单月份 YYYY-MM，默认上月")
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE, help="每个写事务保存的账单数")
+    args = parser.parse_args()
+
+    db_path = Config().get_database_config()["path"]
+    logging.info(f"开始生成 {args.month} 月度账单: {db_path}")
+
+    try:
+        with DatabaseManager(db_path) as db_manager:
+            summary = generate_monthly_statements(db_manager, args.month, chunk_size=args.chunk_size)
+
+        logging.info(
+            f"账单生成完成: {summary['statements']} 份账单（有账本记录的用户 {summary['active_users']} 个），"
+            f"账本记录 {summary['entries']} 条，耗时 {summary['duration_ms']}ms"
+        )
+    except Exception as e:
+        logging.error(f"账单生成失败: {e}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
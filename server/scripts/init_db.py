@@ -12,114 +12,17 @@ project_root = Path(__file__).parent.parent
 sys.path.insert(0, str(project_root))
 
 from db.manager import DatabaseManager
+from db.migrations.m0001_baseline import TABLES, INDEXES
+from db.schema_migrations import apply_migrations
 
 def create_tables(db_manager: DatabaseManager):
     """
-    创建所有数据表
+    创建所有数据表（基线结构，见 db/migrations/m0001_baseline.py）
     严格按照 doc/db/database_structure.md 的表结构定义
-    """
     
-    # 1. 用户表（users） - 参考 doc/db/database_structure.md 2.1节
-    create_users_table = """
-    CREATE TABLE IF NOT EXISTS users (
-        user_id INTEGER PRIMARY KEY,
-        open_id VARCHAR(128) UNIQUE NOT NULL,      -- 微信OpenID，唯一标识
-        wechat_name VARCHAR(100),                  -- 用户微信名
-        avatar_url VARCHAR(500),                   -- 头像URL
-        balance_cents INTEGER DEFAULT 0,           -- 账户余额（单位：分）
-        is_admin BOOLEAN DEFAULT FALSE,            -- 是否管理员
-        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-        updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-        last_login_at TIMESTAMP,                   -- 最后登录时间
-        status VARCHAR(20) DEFAULT 'active'        -- 账户状态: active/suspended
-    )
+    批量导入数据时先建表、导入后再执行迁移（创建索引并记录版本），其他情况直接使用 apply_migrations
     """
-    
-    # 2. 餐次表（meals） - 参考 doc/db/database_structure.md 2.2节
-    create_meals_table = """
-    CREATE TABLE IF NOT EXISTS meals (
-        meal_id INTEGER PRIMARY KEY,
-        date DATE NOT NULL,                        -- 餐次日期
-        slot VARCHAR(20) NOT NULL,                 -- 时段: lunch/dinner
-        description TEXT,                          -- 餐次描述（菜品信息等）
-        base_price_cents INTEGER NOT NULL,         -- 不含附加项的基础价格（单位：分）
-        addon_config TEXT,                         -- 附加项配置：{"addon_id": max_quantity, "addon_id2": max_quantity} (SQLite使用TEXT存储JSON)
-        max_orders INTEGER DEFAULT 50,             -- 最大订餐数量
-        current_orders INTEGER DEFAULT 0,          -- 当前已订数量
-        status VARCHAR(20) DEFAULT 'published',    -- 状态: published/locked/completed/canceled
-        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-        updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-        canceled_at TIMESTAMP,                     -- 取消时间
-        canceled_by INTEGER,                       -- 取消操作者ID
-        canceled_reason TEXT,                      -- 取消原因
-        UNIQUE(date, slot)                         -- 每天每个时段只能有一个餐次
-    )
-    """
-    
-    # 3. 附加项表（addons） - 参考 doc/db/database_structure.md 2.3节
-    create_addons_table = """
-    CREATE TABLE IF NOT EXISTS addons (
-        addon_id INTEGER PRIMARY KEY,
-        name VARCHAR(100) NOT NULL,                -- 附加项名称（如"加鸡腿"、"不要鸡腿"、"加饮料"）
-        price_cents INTEGER NOT NULL,              -- 附加项价格（单位：分，可以为负数）
-        display_order INTEGER DEFAULT 0,           -- 显示顺序
-        is_default BOOLEAN DEFAULT FALSE,          -- 是否默认选中
-        status VARCHAR(20) DEFAULT 'active',       -- 状态: active/inactive
-        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-        updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-    )
-    """
-    
-    # 4. 订单表（orders） - 参考 doc/db/database_structure.md 2.4节
-    create_orders_table = """
-    CREATE TABLE IF NOT EXISTS orders (
-        order_id INTEGER PRIMARY KEY,
-        user_id INTEGER NOT NULL,                  -- 用户ID
-        meal_id INTEGER NOT NULL,                  -- 餐次ID
-        amount_cents INTEGER NOT NULL,             -- 订单金额（单位：分，包含基础价格和选中附加项的价格）
-        addon_selections TEXT,                     -- 附加项选择：{"addon_id": quantity, "addon_id2": quantity} (SQLite使用TEXT存储JSON)
-        status VARCHAR(20) DEFAULT 'active',       -- 状态: active/canceled/completed
-        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-        updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-        canceled_at TIMESTAMP,                     -- 取消时间
-        canceled_reason TEXT,                      -- 取消原因
-        FOREIGN KEY (user_id) REFERENCES users(user_id),
-        FOREIGN KEY (meal_id) REFERENCES meals(meal_id),
-        UNIQUE(user_id, meal_id)                   -- 每人每餐次只能订一份
-    )
-    """
-    
-    # 5. 账本表（ledger） - 参考 doc/db/database_structure.md 2.6节
-    create_ledger_table = """
-    CREATE TABLE IF NOT EXISTS ledger (
-        ledger_id INTEGER PRIMARY KEY,
-        transaction_no VARCHAR(32) UNIQUE NOT NULL, -- 交易号（格式：TXN20241125120001）
-        user_id INTEGER NOT NULL,                   -- 用户ID
-        type VARCHAR(20) NOT NULL,                  -- 类型: recharge/order/refund/adjustment
-        direction VARCHAR(10) NOT NULL,             -- 方向: in/out
-        amount_cents INTEGER NOT NULL,              -- 金额（单位：分，正数）
-        balance_before_cents INTEGER NOT NULL,      -- 变动前余额
-        balance_after_cents INTEGER NOT NULL,       -- 变动后余额
-        order_id INTEGER,                           -- 关联订单ID（如果是订单相关）
-        description VARCHAR(200),                   -- 交易描述
-        operator_id INTEGER,                        -- 操作员ID（充值、调整时）
-        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-        FOREIGN KEY (user_id) REFERENCES users(user_id),
-        FOREIGN KEY (order_id) REFERENCES orders(order_id),
-        FOREIGN KEY (operator_id) REFERENCES users(user_id)
-    )
-    """
-    
-    # 执行建表语句
-    tables = [
-        ("users", create_users_table),
-        ("addons", create_addons_table), 
-        ("meals", create_meals_table),
-        ("orders", create_orders_table),
-        ("ledger", create_ledger_table)
-    ]
-    
-    for table_name, create_sql in tables:
+    for table_name, create_sql in TABLES:
         try:
             db_manager.execute_single(create_sql)
             logging.info(f"成功创建表: {table_name}")
@@ -129,37 +32,10 @@ def create_tables(db_manager: DatabaseManager):
 
 def create_indexes(db_manager: DatabaseManager):
     """
-    创建索引
+    创建基线索引
     严格按照 doc/db/database_structure.md 的索引策略
     """
-    
-    indexes = [
-        # 用户表索引
-        "CREATE INDEX IF NOT EXISTS idx_users_open_id ON users(open_id)",
-        
-        # 餐次表索引  
-        "CREATE INDEX IF NOT EXISTS idx_meals_date_slot ON meals(date, slot)",
-        "CREATE INDEX IF NOT EXISTS idx_meals_status ON meals(status)",
-        "CREATE INDEX IF NOT EXISTS idx_meals_date ON meals(date)",
-        
-        # 订单表索引
-        "CREATE INDEX IF NOT EXISTS idx_orders_user_id ON orders(user_id)",
-        "CREATE INDEX IF NOT EXISTS idx_orders_meal_id ON orders(meal_id)", 
-        "CREATE INDEX IF NOT EXISTS idx_orders_status ON orders(status)",
-        "CREATE INDEX IF NOT EXISTS idx_orders_created_at ON orders(created_at)",
-        
-        # 账本表索引
-        "CREATE INDEX IF NOT EXISTS idx_ledger_user_id ON ledger(user_id)",
-        "CREATE INDEX IF NOT EXISTS idx_ledger_type ON ledger(type)",
-        "CREATE INDEX IF NOT EXISTS idx_ledger_created_at ON ledger(created_at)",
-        "CREATE INDEX IF NOT EXISTS idx_ledger_transaction_no ON ledger(transaction_no)",
-        
-        # 附加项表索引
-        "CREATE INDEX IF NOT EXISTS idx_addons_status ON addons(status)",
-        "CREATE INDEX IF NOT EXISTS idx_addons_display_order ON addons(display_order)"
-    ]
-    
-    for index_sql in indexes:
+    for index_sql in INDEXES:
         try:
             db_manager.execute_single(index_sql)
             logging.info(f"成功创建索引")
@@ -253,13 +129,10 @@ def main():
         db_manager = DatabaseManager(db_path)
         db_manager.connect()
         
-        # 创建表结构
-        logging.info("创建数据表...")
-        create_tables(db_manager)
-        
-        # 创建索引
-        logging.info("创建索引...")
-        create_indexes(db_manager)
+        # 创建表结构和索引（执行待执行的结构迁移）
+        logging.info("执行数据库迁移...")
+        applied = apply_migrations(db_manager)
+        logging.info(f"执行了 {len(applied)} 个迁移")
         
         # 插入初始数据
         logging.info("插入初始数据...")
@@ -0,0 +1,54 @@
+#!/usr/bin/env python3
+# 参考文档: doc/server/server_structure.md - 数据库结构迁移
+# 数据库结构迁移脚本：执行待执行的迁移（应用启动时也会自动执行），--status 只查看迁移状态
+
+import argparse
+import logging
+import sys
+from pathlib import Path
+
+# 添加项目根目录到Python路径
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from db.manager import DatabaseManager
+from db.schema_migrations import apply_migrations, migration_status
+from utils.config import Config
+
+
+def main():
+    """
+    主函数：按当前环境配置迁移数据库
+    """
+
+    # 配置日志
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(levelname)s - %(message)s'
+    )
+
+    parser = argparse.ArgumentParser(description="数据库结构迁移")
+    parser.add_argument("--status", action="store_true", help="只查看当前版本和待执行的迁移")
+    parser.add_argument("--db", help="数据库文件路径（默认使用当前环境配置）")
+    args = parser.parse_args()
+
+    db_path = args.db or Config().get_database_config()["path"]
+
+    try:
+        with DatabaseManager(db_path) as db_manager:
+            status = migration_status(db_manager)
+            logging.info(f"数据库: {db_path}，当前版本 {status['current_version']}，最新版本 {status['latest_version']}")
+            for migration in status["pending"]:
+                logging.info(f"  待执行: {migration['version']:04d}_{migration['name']} - {migration['description']}")
+            if args.status:
+                return
+
+            applied = apply_migrations(db_manager)
+            logging.info(f"迁移完成，执行了 {len(applied)} 个迁移")
+    except Exception as e:
+        logging.error(f"数据库迁移失败: {e}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,49 @@
+#!/usr/bin/env python3
+# 参考文档: doc/server/server_structure.md - 数据库维护
+# 数据库维护脚本：默认执行增量维护（可在业务时间执行），--full 执行全量 VACUUM + ANALYZE
+
+import argparse
+import logging
+import sys
+from pathlib import Path
+
+# 添加项目根目录到Python路径
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from db.manager import DatabaseManager
+from utils.config import Config
+
+
+def main():
+    """
+    主函数：按当前环境配置维护数据库
+    """
+
+    # 配置日志
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(levelname)s - %(message)s'
+    )
+
+    parser = argparse.ArgumentParser(description="数据库维护")
+    parser.add_argument("--full", action="store_true",
+                        help="执行阻塞的全量 VACUUM + ANALYZE（同时把旧数据库转换为增量清理模式），请在停机窗口执行")
+    args = parser.parse_args()
+
+    db_path = Config().get_database_config()["path"]
+    logging.info(f"开始维护数据库: {db_path}（{'全量' if args.full else '增量'}）")
+
+    try:
+        with DatabaseManager(db_path) as db_manager:
+            for report in db_manager.perform_maintenance(full=args.full):
+                logging.info(
+                    f"{report['step']}: 耗时 {report['duration_ms']}ms，释放 {report.get('pages_freed', 0)} 页"
+                )
+    except Exception as e:
+        logging.error(f"数据库维护失败: {e}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+# 参考文档: doc/server/db/database_structure.md - 2.9 对账进度表
+# 账本与余额增量对账脚本：不一致记录以 NDJSON 写入报告文件（默认标准输出），存在不一致时退出码为2
+
+import argparse
+import logging
+import sys
+from pathlib import Path
+
+import orjson
+
+# 添加项目根目录到Python路径
+project_root = Path(__file__).parent.parent
+sys.path.insert(0, str(project_root))
+
+from db.manager import DatabaseManager
+from db.reconciliation import DEFAULT_CHUNK_SIZE, reconcile_ledger, reset_reconciliation
+from utils.config import Config
+
+
+def main():
+    """
+    主函数：核对上次对账之后新增的账本记录
+    """
+
+    # 配置日志（输出到标准错误，标准输出留给报告）
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(levelname)s - %(message)s',
+        stream=sys.stderr
+    )
+
+    parser = argparse.ArgumentParser(description="账本与余额增量对账")
+    parser.add_argument("--output", help="报告文件路径（NDJSON），默认输出到标准输出")
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE, help="每块核对的账本记录数")
+    parser.add_argument("--full", action="store_true", help="清空对账进度，从头核对全部账本")
+    args = parser.parse_args()
+
+    db_path = Config().get_database_config()["path"]
+    logging.info(f"开始账本对账: {db_path}")
+
+    output = open(args.output, "wb") if args.output else sys.stdout.buffer
+    try:
+        with DatabaseManager(db_path) as db_manager:
+            if args.full:
+                reset_reconciliation(db_manager)
+
+            summary = None
+            for item in reconcile_ledger(db_manager, chunk_size=args.chunk_size):
+                output.write(orjson.dumps(item) + b"\n")
+                output.flush()
+                summary = item
+
+        logging.info(
+            f"对账完成: 核对 {summary['rows_checked']} 条账本记录，"
+            f"{summary['users_checked']} 个用户，不一致 {summary['mismatches']} 处"
+        )
+    except Exception as e:
+        logging.error(f"账本对账失败: {e}")
+        sys.exit(1)
+    finally:
+        if args.output:
+            output.close()
+
+    if summary["mismatches"]:
+        sys.exit(2)
+
+
+if __name__ == "__main__":
+    main()
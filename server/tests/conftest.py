@@ -14,16 +14,20 @@ sys.path.insert(0, str(project_root))
 # 设置测试环境
 os.environ['CONFIG_ENV'] = 'development'
 
-from api.main import app
+from api.main import app, config
 from db.manager import DatabaseManager
 from db.core_operations import CoreOperations
 from db.query_operations import QueryOperations
 from db.supporting_operations import SupportingOperations
+from db.migrations.m0001_baseline import TABLES as BASELINE_TABLES, INDEXES as BASELINE_INDEXES
+from db.schema_migrations import migrate_database
+from tests.statement_recorder import StatementRecorder
 
 
 @pytest.fixture
 def client():
-    """FastAPI测试客户端"""
+    """FastAPI测试客户端（与应用启动时一样先执行数据库迁移）"""
+    migrate_database(config.get_database_config()["path"])
     return TestClient(app)
 
 
@@ -39,6 +43,54 @@ def test_db():
     db.close()
 
 
+@pytest.fixture
+def file_db(tmp_path):
+    """测试数据库实例（文件数据库，用于需要独立连接、WAL或挂载其他库的测试）"""
+    db = DatabaseManager(str(tmp_path / "app.db"), auto_connect=True)
+    create_test_tables(db)
+
+    yield db
+    db.close()
+
+
+@pytest.fixture
+def count_statements(test_db):
+    """
+    SQL语句计数（默认记录 test_db，可传入其他 DatabaseManager）
+
+    Usage:
+        with count_statements() as recorded:
+            ...
+        recorded.assert_at_most(3, "日历查询")
+    """
+    def recorder(*db_managers):
+        return StatementRecorder(*(db_managers or (test_db,)))
+    return recorder
+
+
+@pytest.fixture
+def publish_addon_meal(core_ops, sample_admin_user):
+    """发布配置了指定数量附加项的餐次，返回 (meal_id, addon_ids)"""
+    def publish(addon_count: int):
+        addon_ids = [
+            core_ops.admin_create_addon(admin_user_id=sample_admin_user, name=f"预算附加项{index}",
+                                        price_cents=200)["addon_id"]
+            for index in range(addon_count)
+        ]
+        meal_id = core_ops.admin_publish_meal(
+            admin_user_id=sample_admin_user, date="2024-12-26", slot="lunch", description="预算餐次",
+            base_price_cents=1500, addon_config={addon_id: 2 for addon_id in addon_ids}, max_orders=10
+        )["meal_id"]
+        return meal_id, addon_ids
+    return publish
+
+
+@pytest.fixture
+def three_addon_meal(publish_addon_meal):
+    """配置了三个附加项的餐次，返回 (meal_id, addon_ids)"""
+    return publish_addon_meal(3)
+
+
 @pytest.fixture
 def core_ops(test_db):
     """核心业务操作实例"""
@@ -150,6 +202,15 @@ def create_test_tables(db: DatabaseManager):
     for sql in tables_sql:
         db.execute_single(sql)
 
+    # 辅助表（餐次事件、幂等键、租约、对账、归档、账单）由迁移创建，使用基线迁移中的定义
+    business_tables = {"users", "addons", "meals", "orders", "ledger"}
+    for name, create_sql in BASELINE_TABLES:
+        if name not in business_tables:
+            db.execute_single(create_sql)
+    for index_sql in BASELINE_INDEXES:
+        if index_sql.split(" ON ")[1].split("(")[0] not in business_tables:
+            db.execute_single(index_sql)
+
 
 @pytest.fixture
 def sample_admin_user(support_ops):
@@ -205,4 +266,4 @@ def sample_meal(core_ops, sample_admin_user, sample_addon):
         addon_config={sample_addon: 2},
         max_orders=10
     )
-    return result['meal_id']
\ No newline at end of file
+    return result['meal_id']
@@ -0,0 +1,63 @@
+# SQL语句计数工具
+# 通过 sqlite3 的 set_trace_callback 记录代码块内在 DatabaseManager 连接上执行的每条语句，
+# 用于为热点路径设置语句数预算：每行多一次查询（N+1）这类性能回退在测试中直接失败。
+
+import re
+import threading
+from typing import List
+
+from db.manager import DatabaseManager
+
+# 事务控制语句不计入预算
+_TRANSACTION_CONTROL = re.compile(r"^\s*(BEGIN|COMMIT|END|ROLLBACK|SAVEPOINT|RELEASE)\b", re.IGNORECASE)
+
+
+class StatementRecorder:
+    """
+    SQL语句记录器
+
+    Usage:
+        with StatementRecorder(db) as recorded:
+            core_ops.create_order(...)
+        recorded.assert_at_most(12, "create_order")
+    """
+
+    def __init__(self, *db_managers: DatabaseManager):
+        self.db_managers = db_managers
+        self.statements: List[str] = []
+        self._lock = threading.Lock()
+
+    def _record(self, statement: str):
+        # 写操作可能在 asyncio.to_thread 的线程中执行
+        with self._lock:
+            self.statements.append(" ".join(statement.split()))
+
+    def __enter__(self) -> "StatementRecorder":
+        for db_manager in self.db_managers:
+            db_manager.conn.set_trace_callback(self._record)
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        for db_manager in self.db_managers:
+            if db_manager.conn is not None:
+                db_manager.conn.set_trace_callback(None)
+
+    @property
+    def queries(self) -> List[str]:
+        """计入预算的语句（不含 BEGIN/COMMIT/SAVEPOINT 等事务控制语句）"""
+        return [statement for statement in self.statements if not _TRANSACTION_CONTROL.match(statement)]
+
+    @property
+    def count(self) -> int:
+        return len(self.queries)
+
+    def assert_at_most(self, budget: int, label: str = ""):
+        """
+        断言语句数不超过预算
+
+        Raises:
+            AssertionError: 超出预算，错误信息中列出执行的全部语句
+        """
+        if self.count > budget:
+            listing = "\n".join(f"  {index + 1}. {query[:160]}" for index, query in enumerate(self.queries))
+            raise AssertionError(f"{label or 'SQL语句'} 执行了 {self.count} 条语句，超出预算 {budget}:\n{listing}")
@@ -4,6 +4,7 @@ import pytest
 import os
 import sys
 from pathlib import Path
+from fastapi import FastAPI
 from fastapi.testclient import TestClient
 
 # 添加项目路径
@@ -14,6 +15,12 @@ sys.path.insert(0, str(project_root))
 os.environ['CONFIG_ENV'] = 'development'
 
 from api.main import app
+import api.meals.routes as meal_routes
+import api.orders.routes as order_routes
+from api.auth.routes import get_database, jwt_manager
+from utils.response import FastJSONResponse
+from utils.response_cache import ResponseCache
+from utils.seat_reservation import SeatReservationManager
 
 
 @pytest.fixture
@@ -138,4 +145,27 @@ def sample_user_id(client, auth_token):
         return response.json()["data"]["user_info"]["user_id"]
     
     # 如果获取失败，返回一个假的ID供测试使用
-    return 1
\ No newline at end of file
+    return 1
+
+
+@pytest.fixture
+def local_client(test_db, monkeypatch):
+    """使用内存测试库的餐次、订单接口客户端（独立的日历缓存和座位预占状态）"""
+    monkeypatch.setattr(meal_routes, "calendar_cache", ResponseCache(max_entries=4))
+    seat_manager = SeatReservationManager()
+    monkeypatch.setattr(order_routes, "get_seat_manager", lambda: seat_manager)
+
+    app = FastAPI(default_response_class=FastJSONResponse)
+    app.include_router(meal_routes.router)
+    app.include_router(order_routes.router)
+    app.dependency_overrides[get_database] = lambda: test_db
+    return TestClient(app)
+
+
+@pytest.fixture
+def user_headers(core_ops, sample_admin_user, sample_user):
+    """已充值普通用户的认证头"""
+    core_ops.admin_adjust_balance(admin_user_id=sample_admin_user, target_user_id=sample_user,
+                                  amount_cents=10000, reason="测试充值")
+    token = jwt_manager.create_token({"user_id": sample_user, "open_id": "test_user_openid", "is_admin": False})
+    return {"Authorization": f"Bearer {token}"}
@@ -0,0 +1,90 @@
+# 响应压缩与响应缓存测试
+
+import gzip
+import pytest
+from fastapi import FastAPI, Request
+from fastapi.testclient import TestClient
+
+from api.middleware.compression import setup_compression_middleware
+from utils.compression import negotiate_encoding
+from utils.response import FastJSONResponse, create_success_response
+from utils.response_cache import ResponseCache
+
+
+@pytest.fixture
+def compression_client():
+    """挂载压缩中间件的最小应用"""
+    app = FastAPI(default_response_class=FastJSONResponse)
+    setup_compression_middleware(app, {"compression": {"minimum_size": 256}})
+    cache = ResponseCache(max_entries=2)
+    
+    @app.get("/large")
+    async def large():
+        return create_success_response(data=[{"meal_id": i, "status_text": "已发布"} for i in range(100)])
+    
+    @app.get("/small")
+    async def small():
+        return create_success_response(data={"ok": True})
+    
+    @app.get("/cached/{version}")
+    async def cached(version: int, request: Request):
+        entry = cache.get("calendar", version)
+        if entry is None:
+            entry = cache.put("calendar", version, create_success_response(data=list(range(500))))
+        return entry.to_response(negotiate_encoding(request.headers.get("accept-encoding")))
+    
+    client = TestClient(app)
+    client.cache = cache
+    return client
+
+
+class TestNegotiation:
+    """Accept-Encoding协商测试"""
+    
+    def test_negotiate_gzip(self):
+        assert negotiate_encoding("gzip, deflate") == "gzip"
+    
+    def test_negotiate_rejected(self):
+        assert negotiate_encoding("gzip;q=0") is None
+        assert negotiate_encoding(None) is None
+        assert negotiate_encoding("identity") is None
+
+
+class TestCompressionMiddleware:
+    """压缩中间件测试"""
+    
+    def test_large_response_compressed(self, compression_client):
+        """超过阈值的响应被gzip压缩"""
+        response = compression_client.get("/large", headers={"Accept-Encoding": "gzip"})
+        
+        assert response.headers["content-encoding"] == "gzip"
+        assert response.headers["vary"] == "Accept-Encoding"
+        assert len(response.json()["data"]) == 100
+    
+    def test_small_response_not_compressed(self, compression_client):
+        """低于阈值的响应保持原样"""
+        response = compression_client.get("/small", headers={"Accept-Encoding": "gzip"})
+        
+        assert "content-encoding" not in response.headers
+        assert response.json()["data"] == {"ok": True}
+
+
+class TestResponseCache:
+    """预压缩响应缓存测试"""
+    
+    def test_compressed_once_per_version(self, compression_client):
+        """同一缓存版本只压缩一次，版本变化时重新生成"""
+        headers = {"Accept-Encoding": "gzip"}
+        first = compression_client.get("/cached/1", headers=headers)
+        entry = compression_client.cache.get("calendar", 1)
+        compressed = entry.encoded["gzip"]
+        
+        second = compression_client.get("/cached/1", headers=headers)
+        
+        assert first.headers["content-encoding"] == "gzip"
+        assert second.json() == first.json()
+        assert compression_client.cache.get("calendar", 1).encoded["gzip"] is compressed
+        assert gzip.decompress(compressed) == entry.body
+        
+        compression_client.get("/cached/2", headers=headers)
+        assert compression_client.cache.get("calendar", 1) is None
@@ -0,0 +1,62 @@
+# 管理员导出、流式接口测试
+# 只挂载管理员路由的最小应用，管理员认证替换为固定的管理员
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+import api.admin.routes as admin_routes
+from api.auth.models import TokenData
+from api.auth.routes import get_admin_user, get_database
+from db.manager import DatabaseManager
+from tests.test_db.test_export import file_db  # noqa: F401
+
+
+def _admin_app(request_db):
+    app = FastAPI()
+    app.include_router(admin_routes.router)
+    app.dependency_overrides[get_admin_user] = lambda: TokenData(user_id=1, open_id="admin", is_admin=True)
+    app.dependency_overrides[get_database] = lambda: request_db
+    return TestClient(app)
+
+
+@pytest.fixture
+def admin_client(file_db):
+    return _admin_app(file_db)
+
+
+@pytest.fixture
+def closed_request_client(file_db):
+    """请求的数据库连接在响应开始前已关闭（FastAPI 0.106 起依赖清理早于流式响应）"""
+    request_db = DatabaseManager(file_db.db_path)
+    return _admin_app(request_db)
+
+
+class TestExportRoutes:
+    """导出接口测试"""
+
+    def test_csv_content_type(self, admin_client):
+        """测试CSV导出的Content-Type只有一个charset"""
+        response = admin_client.get("/api/admin/export/orders")
+
+        assert response.status_code == 200
+        assert response.headers["content-type"] == "text/csv; charset=utf-8"
+        assert response.text.lstrip("﻿").startswith("order_id")
+        assert len(response.text.strip().splitlines()) == 5
+
+    @pytest.mark.parametrize("path", ["/api/admin/export/orders", "/api/admin/export/ledger?gzip=true"])
+    def test_export_streams_on_own_connection(self, closed_request_client, path):
+        """测试导出不使用请求的数据库连接"""
+        response = closed_request_client.get(path)
+
+        assert response.status_code == 200
+        assert response.headers["content-type"].split(";")[0] in ("text/csv", "application/gzip")
+        assert len(response.content) > 100
+
+    def test_reconcile_streams_on_own_connection(self, closed_request_client):
+        """测试对账流不使用请求的数据库连接"""
+        response = closed_request_client.post("/api/admin/ledger/reconcile")
+
+        lines = [line for line in response.text.splitlines() if line]
+        assert '"type":"summary"' in lines[-1]
+        assert all('"type":"error"' not in line for line in lines)
@@ -1,10 +1,19 @@
 # 参考文档: doc/api.md
 # 餐次API测试
 
+import asyncio
 import pytest
 import json
+from fastapi import FastAPI
 from fastapi.testclient import TestClient
 
+import api.meals.routes as meal_routes
+from api.auth.models import TokenData
+from api.auth.routes import get_current_user, get_database
+from db.manager import DatabaseManager
+from db.meal_events import record_meal_event
+from utils.event_bus import MealEventBus
+
 
 class TestMealsList:
     """餐次列表测试"""
@@ -69,6 +78,24 @@ class TestMealsList:
         assert response.status_code == 401
 
 
+class TestMealsFieldSelection:
+    """餐次列表稀疏字段测试"""
+
+    @pytest.mark.parametrize("path", ["/api/meals", "/api/meals/calendar"])
+    @pytest.mark.parametrize("field", ["available_slots", "base_price_yuan", "status_text", "slot_text"])
+    def test_derived_field_alone(self, local_client, user_headers, sample_meal, path, field):
+        """测试只请求一个派生字段时查询了其依赖的列"""
+        response = local_client.get(path, headers=user_headers, params={
+            "start_date": "2024-12-01", "end_date": "2024-12-31", "fields": field
+        })
+
+        data = response.json()
+        assert data["success"] is True, data.get("message")
+        meal = data["data"]["meals"][0]
+        assert set(meal) == {field}
+        assert meal[field] is not None
+
+
 class TestMealDetail:
     """餐次详情测试"""
     
@@ -147,4 +174,86 @@ class TestMealOrder:
         """测试未授权检查订单"""
         response = client.get("/api/meals/1/order")
         
-        assert response.status_code == 401
\ No newline at end of file
+        assert response.status_code == 401
+
+
+async def read_sse(app, path, headers, on_event, count):
+    """
+    以ASGI方式请求SSE接口，读到 count 个事件后断开
+
+    TestClient 会等响应结束后才返回，无法读取不会结束的事件流；on_event 在每个事件到达后调用
+    """
+    disconnected = asyncio.Event()
+    messages = asyncio.Queue()
+
+    async def receive():
+        await disconnected.wait()
+        return {"type": "http.disconnect"}
+
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "GET", "scheme": "http",
+        "path": path, "raw_path": path.encode(), "root_path": "", "query_string": b"",
+        "headers": [(key.lower().encode(), value.encode()) for key, value in headers.items()],
+        "server": ("testserver", 80), "client": ("testclient", 50000),
+    }
+    task = asyncio.create_task(app(scope, receive, messages.put))
+    events, buffer = [], b""
+    try:
+        start = await asyncio.wait_for(messages.get(), timeout=5)
+        while len(events) < count:
+            message = await asyncio.wait_for(messages.get(), timeout=5)
+            buffer += message.get("body", b"")
+            while b"\n\n" in buffer:
+                block, buffer = buffer.split(b"\n\n", 1)
+                if block.startswith(b":"):
+                    continue
+                event = dict(line.split(": ", 1) for line in block.decode().splitlines())
+                events.append(event)
+                on_event(event)
+    finally:
+        disconnected.set()
+        await asyncio.wait_for(task, timeout=5)
+    return start, events
+
+
+class TestMealEventStream:
+    """餐次事件流测试"""
+
+    @pytest.fixture
+    def stream_app(self, file_db, monkeypatch):
+        """事件流接口的最小应用：请求的数据库连接已关闭，事件总线使用测试库"""
+        file_db.conn.execute("""
+            INSERT INTO meals (meal_id, date, slot, base_price_cents, status, current_orders, max_orders)
+            VALUES (1, '2030-01-01', 'lunch', 1500, 'published', 0, 10)
+        """)
+        record_meal_event(file_db, 1, "publish")
+        file_db.conn.commit()
+        monkeypatch.setattr(meal_routes, "get_meal_event_bus",
+                            lambda: MealEventBus(db_path=file_db.db_path, poll_interval=0.01))
+
+        app = FastAPI()
+        app.include_router(meal_routes.router)
+        app.dependency_overrides[get_current_user] = lambda: TokenData(user_id=1, open_id="u1", is_admin=False)
+        app.dependency_overrides[get_database] = lambda: DatabaseManager(file_db.db_path)
+        return app
+
+    def test_streams_events_after_response_started(self, stream_app, file_db):
+        """测试响应开始后补发错过的事件并推送新提交的事件，不使用请求的数据库连接"""
+        def on_event(event):
+            if event["event"] == "meal" and event["id"] == "1":
+                file_db.conn.execute("UPDATE meals SET current_orders = 1 WHERE meal_id = 1")
+                record_meal_event(file_db, 1, "order")
+                file_db.conn.commit()
+
+        start, events = asyncio.run(read_sse(stream_app, "/api/meals/stream", {"last-event-id": "0"}, on_event, 2))
+
+        assert start["status"] == 200
+        assert [(event["event"], event["id"]) for event in events] == [("meal", "1"), ("meal", "2")]
+        assert json.loads(events[1]["data"])["current_orders"] == 1
+
+    def test_ready_event_reports_latest_id(self, stream_app):
+        """测试不带 Last-Event-ID 时先返回当前最新事件ID"""
+        _, events = asyncio.run(read_sse(stream_app, "/api/meals/stream", {}, lambda event: None, 1))
+
+        assert events[0]["event"] == "ready"
+        assert json.loads(events[0]["data"]) == {"last_event_id": 1}
@@ -0,0 +1,90 @@
+# 下单座位预占测试
+
+import asyncio
+import pytest
+
+from utils.seat_reservation import SeatReservationManager, SeatUnavailableError
+
+
+def run(coro):
+    return asyncio.run(coro)
+
+
+class TestSeatReservation:
+    """座位预占准入控制测试"""
+
+    def test_rejects_when_full_without_inflight(self):
+        """测试名额已满且无进行中事务时直接拒绝"""
+        async def scenario():
+            manager = SeatReservationManager()
+            loads = []
+
+            def loader():
+                loads.append(1)
+                return (2, 2)
+
+            with pytest.raises(SeatUnavailableError, match="餐次已满"):
+                await manager.reserve(1, loader)
+            return len(loads)
+
+        # 拒绝前会强制从数据库确认一次
+        assert run(scenario()) == 2
+
+    def test_fifo_waiters_take_released_seats(self):
+        """测试事务回滚空出的名额按排队先后分配"""
+        async def scenario():
+            manager = SeatReservationManager(wait_timeout=1)
+            assert await manager.reserve(1, lambda: (0, 1)) is True
+
+            order = []
+
+            async def waiter(name):
+                await manager.reserve(1, lambda: (0, 1))
+                order.append(name)
+                manager.release(1, committed=False)
+
+            tasks = [asyncio.create_task(waiter(name)) for name in ("a", "b")]
+            await asyncio.sleep(0)
+            manager.release(1, committed=False)
+            await asyncio.gather(*tasks)
+            return order
+
+        assert run(scenario()) == ["a", "b"]
+
+    def test_commit_fails_remaining_waiters(self):
+        """测试最后一个名额提交后排队请求被拒绝"""
+        async def scenario():
+            manager = SeatReservationManager(wait_timeout=1)
+            await manager.reserve(1, lambda: (0, 1))
+            waiter = asyncio.create_task(manager.reserve(1, lambda: (0, 1)))
+            await asyncio.sleep(0)
+            manager.release(1, committed=True)
+            with pytest.raises(SeatUnavailableError, match="餐次已满"):
+                await waiter
+
+        run(scenario())
+
+    def test_bounded_queue(self):
+        """测试排队数量上限"""
+        async def scenario():
+            manager = SeatReservationManager(max_waiters=1, wait_timeout=1)
+            await manager.reserve(1, lambda: (0, 1))
+            waiter = asyncio.create_task(manager.reserve(1, lambda: (0, 1)))
+            await asyncio.sleep(0)
+            with pytest.raises(SeatUnavailableError, match="人数过多"):
+                await manager.reserve(1, lambda: (0, 1))
+            manager.release(1, committed=False)
+            assert await waiter is True
+
+        run(scenario())
+
+    def test_order_canceled_frees_seat(self):
+        """测试取消订单后名额可再次预占"""
+        async def scenario():
+            manager = SeatReservationManager(refresh_interval=60)
+            await manager.reserve(1, lambda: (0, 1))
+            manager.release(1, committed=True)
+            manager.order_canceled(1)
+            return await manager.reserve(1, lambda: (1, 1))
+
+        assert run(scenario()) is True
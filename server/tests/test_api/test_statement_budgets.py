@@ -0,0 +1,43 @@
+# 热点接口SQL语句数预算测试
+# 使用只挂载餐次、订单路由的最小应用（local_client）；预算包含认证时查询用户的1条语句
+
+import pytest
+
+
+class TestApiStatementBudgets:
+    """接口语句数预算"""
+
+    def test_calendar(self, local_client, count_statements, user_headers, three_addon_meal):
+        """未命中缓存：认证 + 数据版本 + 归档段 + 餐次列表 + 总数；命中缓存：认证 + 数据版本"""
+        params = {"start_date": "2024-12-01", "end_date": "2024-12-31"}
+        with count_statements() as recorded:
+            response = local_client.get("/api/meals/calendar", params=params, headers=user_headers)
+        assert response.json()["success"]
+        recorded.assert_at_most(5, "日历（未命中缓存）")
+
+        with count_statements() as recorded:
+            local_client.get("/api/meals/calendar", params=params, headers=user_headers)
+        recorded.assert_at_most(2, "日历（命中缓存）")
+
+    def test_create_and_cancel_order(self, local_client, count_statements, user_headers, three_addon_meal):
+        meal_id, addon_ids = three_addon_meal
+        with count_statements() as recorded:
+            response = local_client.post("/api/orders", headers=user_headers, json={
+                "meal_id": meal_id, "addon_selections": {str(addon_id): 1 for addon_id in addon_ids}
+            })
+        assert response.json()["success"]
+        recorded.assert_at_most(15, "创建订单（3个附加项）")
+
+        order_id = response.json()["data"]["order_id"]
+        with count_statements() as recorded:
+            response = local_client.delete(f"/api/orders/{order_id}", headers=user_headers)
+        assert response.json()["success"]
+        recorded.assert_at_most(14, "取消订单")
+
+    def test_my_orders(self, local_client, count_statements, user_headers, three_addon_meal):
+        meal_id, _ = three_addon_meal
+        local_client.post("/api/orders", headers=user_headers, json={"meal_id": meal_id})
+        with count_statements() as recorded:
+            response = local_client.get("/api/orders/my", headers=user_headers)
+        assert response.json()["success"]
+        recorded.assert_at_most(4, "我的订单")
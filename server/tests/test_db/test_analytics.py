@@ -0,0 +1,82 @@
+# 分析镜像测试（需安装 duckdb）
+
+import json
+
+import pytest
+
+pytest.importorskip("duckdb")
+
+from db.analytics import AnalyticsEngine, AnalyticsUnavailableError, refresh_mirror
+
+
+@pytest.fixture
+def file_db(file_db):
+    """带订单数据的文件数据库"""
+    conn = file_db.conn
+    conn.executemany(
+        "INSERT INTO users (user_id, open_id, wechat_name) VALUES (?, ?, ?)",
+        [(1, "u1", "张三"), (2, "u2", "李四")]
+    )
+    conn.execute("INSERT INTO addons (addon_id, name, price_cents) VALUES (1, '鸡腿', 300)")
+    conn.executemany(
+        "INSERT INTO meals (meal_id, date, slot, base_price_cents, status) VALUES (?, ?, ?, 1500, 'completed')",
+        [(1, "2030-01-01", "lunch"), (2, "2030-01-02", "lunch")]
+    )
+    conn.executemany(
+        "INSERT INTO orders (order_id, user_id, meal_id, amount_cents, addon_selections, status) "
+        "VALUES (?, ?, ?, ?, ?, ?)",
+        [
+            (1, 1, 1, 2100, json.dumps({"1": 2}), "completed"),
+            (2, 2, 1, 1500, "{}", "completed"),
+            (3, 1, 2, 1800, json.dumps({"1": 1}), "canceled"),
+        ]
+    )
+    conn.commit()
+    return file_db
+
+
+class TestAnalyticsMirror:
+    """分析镜像测试"""
+
+    def test_reports_before_refresh_unavailable(self, file_db):
+        """测试镜像尚未生成时报表不可用"""
+        with pytest.raises(AnalyticsUnavailableError):
+            AnalyticsEngine(file_db.db_path).revenue("2030-01-01", "2030-01-31")
+
+    def test_reports_from_snapshot(self, file_db):
+        """测试刷新后报表只统计有效和已完成订单"""
+        result = refresh_mirror(file_db.db_path)
+        assert result["rows"]["orders"] == 3
+
+        engine = AnalyticsEngine(file_db.db_path)
+        assert engine.revenue("2030-01-01", "2030-01-31") == [
+            {"period": "2030-01-01", "orders": 2, "users": 2, "revenue_cents": 3600}
+        ]
+        assert engine.revenue("2030-01-01", "2030-01-31", granularity="month")[0]["period"] == "2030-01-01"
+        addons = engine.addon_popularity("2030-01-01", "2030-01-31")
+        assert [(row["name"], row["quantity"], row["amount_cents"]) for row in addons] == [("鸡腿", 2, 600)]
+        assert [row["user_id"] for row in engine.user_spend("2030-01-01", "2030-01-31", limit=1)] == [1]
+
+    def test_incremental_refresh(self, file_db):
+        """测试增量刷新同步变更订单并重建其附加项，账本只追加新记录"""
+        refresh_mirror(file_db.db_path)
+
+        file_db.conn.execute("""
+            UPDATE orders SET status = 'completed', updated_at = '2999-01-01 00:00:00' WHERE order_id = 3
+        """)
+        file_db.conn.execute("""
+            INSERT INTO ledger (transaction_no, user_id, type, direction, amount_cents,
+                                balance_before_cents, balance_after_cents)
+            VALUES ('TXN1', 1, 'recharge', 'in', 1000, 0, 1000)
+        """)
+        file_db.conn.commit()
+
+        result = refresh_mirror(file_db.db_path)
+        assert result["rows"]["orders"] == 1 and result["rows"]["ledger"] == 1
+
+        engine = AnalyticsEngine(file_db.db_path)
+        assert [row["quantity"] for row in engine.addon_popularity("2030-01-01", "2030-01-31")] == [3]
+        assert engine.query("SELECT COUNT(*) AS n FROM ledger") == [{"n": 1}]
+
+        # 没有新变更时只重新核对水位时刻的行
+        assert refresh_mirror(file_db.db_path)["rows"]["ledger"] == 0
@@ -0,0 +1,97 @@
+# 冷数据归档测试
+
+import os
+from datetime import date
+
+import pytest
+
+from db.archive import archive_cold_data, archive_path, get_archive_totals, months_before
+from db.query_operations import QueryOperations
+
+
+@pytest.fixture
+def file_db(file_db):
+    """带历史数据的文件数据库"""
+    conn = file_db.conn
+    conn.execute("INSERT INTO users (user_id, open_id, wechat_name, balance_cents) VALUES (1, 'u1', '用户', 0)")
+
+    meals = [
+        (1, "2023-03-01", "lunch", "completed"),
+        (2, "2024-12-31", "dinner", "canceled"),
+        (3, "2024-11-01", "lunch", "completed"),   # 仍有有效订单，不归档
+        (4, "2030-01-01", "lunch", "published"),
+    ]
+    conn.executemany(
+        "INSERT INTO meals (meal_id, date, slot, base_price_cents, status) VALUES (?, ?, ?, 1500, ?)",
+        meals
+    )
+    conn.executemany(
+        "INSERT INTO orders (order_id, user_id, meal_id, amount_cents, status) VALUES (?, 1, ?, 1500, ?)",
+        [(1, 1, "completed"), (2, 2, "canceled"), (3, 3, "active"), (4, 4, "active")]
+    )
+    conn.executemany("""
+        INSERT INTO ledger (ledger_id, transaction_no, user_id, type, direction, amount_cents,
+                            balance_before_cents, balance_after_cents, order_id)
+        VALUES (?, ?, 1, ?, ?, 1500, ?, ?, ?)
+    """, [
+        (1, "TXN1", "recharge", "in", 0, 1500, None),
+        (2, "TXN2", "order", "out", 1500, 0, 1),
+        (3, "TXN3", "order", "out", 0, -1500, 2),
+        (4, "TXN4", "refund", "in", -1500, 0, 2),
+    ])
+    conn.commit()
+    return file_db
+
+
+def count(conn, sql):
+    return conn.execute(sql).fetchone()[0]
+
+
+class TestArchive:
+    """冷数据归档测试"""
+
+    def test_months_before(self):
+        """测试截止日期按月计算，目标月没有该日时取月末"""
+        assert months_before(date(2030, 3, 31), 1) == date(2030, 2, 28)
+        assert months_before(date(2030, 1, 15), 6) == date(2029, 7, 15)
+
+    def test_moves_cold_meals_per_year(self, file_db):
+        """测试按年份移动已结束的餐次及其订单、账本，与订单无关的账本保留"""
+        summary = archive_cold_data(file_db, months=6, chunk_size=1, today=date(2030, 1, 1))
+
+        assert summary["years"] == [2023, 2024]
+        assert (summary["meals"], summary["orders"], summary["ledger"]) == (2, 2, 3)
+        conn = file_db.conn
+        assert [row[0] for row in conn.execute("SELECT meal_id FROM meals ORDER BY meal_id")] == [3, 4]
+        assert [row[0] for row in conn.execute("SELECT ledger_id FROM ledger")] == [1]
+        # 归档结束后卸载归档库
+        assert [row[1] for row in conn.execute("PRAGMA database_list")] == ["main"]
+
+        for year in (2023, 2024):
+            assert os.path.exists(archive_path(file_db.db_path, year))
+        assert get_archive_totals(conn) == {
+            "meal_count": 2, "order_count": 2, "ledger_count": 3, "revenue_cents": 1500
+        }
+
+        # 再次归档没有新数据
+        assert archive_cold_data(file_db, months=6, today=date(2030, 1, 1))["meals"] == 0
+
+    def test_query_attaches_only_overlapping_archives(self, file_db):
+        """测试查询日期范围涉及归档年份时才挂载归档库"""
+        archive_cold_data(file_db, months=6, today=date(2030, 1, 1))
+        query_ops = QueryOperations(file_db)
+
+        recent = query_ops.query_meals_by_date_range("2030-01-01", "2030-01-31")
+        assert [meal["meal_id"] for meal in recent["data"]["meals"]] == [4]
+        assert [row[1] for row in file_db.conn.execute("PRAGMA database_list")] == ["main"]
+
+        history = query_ops.query_meals_by_date_range("2024-01-01", "2024-12-31")
+        assert [meal["meal_id"] for meal in history["data"]["meals"]] == [3, 2]
+        assert history["data"]["pagination"]["total_count"] == 2
+        assert [row[1] for row in file_db.conn.execute("PRAGMA database_list")] == ["main", "archive_2024"]
+
+    def test_dry_run_moves_nothing(self, file_db):
+        """测试dry_run只统计待归档数量"""
+        summary = archive_cold_data(file_db, months=6, today=date(2030, 1, 1), dry_run=True)
+        assert summary["meals"] == 2
+        assert count(file_db.conn, "SELECT COUNT(*) FROM meals") == 4
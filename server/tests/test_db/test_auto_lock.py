@@ -0,0 +1,133 @@
+# 截单自动锁定测试
+
+import asyncio
+import time
+from datetime import datetime
+from zoneinfo import ZoneInfo
+
+import pytest
+
+from db.leases import acquire_lease, advance_lease_watermark, get_lease_watermark, release_lease
+from db.manager import DatabaseManager
+from db.meal_events import fetch_meal_events_after
+from tests.conftest import create_test_tables
+from utils.auto_lock import LEASE_NAME, AutoLockScheduler, meal_deadline
+
+TZ = ZoneInfo("Asia/Shanghai")
+
+
+def publish_meal(db, date, slot, status='published'):
+    cursor = db.conn.execute(
+        "INSERT INTO meals (date, slot, base_price_cents, status) VALUES (?, ?, 1500, ?)",
+        [date, slot, status]
+    )
+    db.conn.commit()
+    return cursor.lastrowid
+
+
+class TestLeases:
+    """调度租约测试"""
+
+    def test_single_leader_until_expired(self, test_db):
+        """测试租约同一时间只有一个持有者，过期或释放后可被接管"""
+        assert acquire_lease(test_db, "job", "worker-a", 30) is True
+        assert acquire_lease(test_db, "job", "worker-b", 30) is False
+        # 持有者续约
+        assert acquire_lease(test_db, "job", "worker-a", 30) is True
+
+        release_lease(test_db, "job", "worker-a")
+        assert acquire_lease(test_db, "job", "worker-b", 30) is True
+
+        test_db.conn.execute("UPDATE scheduler_leases SET expires_at = 0")
+        test_db.conn.commit()
+        assert acquire_lease(test_db, "job", "worker-a", 30) is True
+
+    def test_watermark_requires_lease(self, test_db):
+        """测试只有租约持有者能推进调度进度"""
+        acquire_lease(test_db, "job", "worker-a", 30)
+        advance_lease_watermark(test_db, "job", "worker-a", 100)
+        with pytest.raises(RuntimeError, match="已失效"):
+            advance_lease_watermark(test_db, "job", "worker-b", 200)
+        test_db.conn.commit()
+        assert get_lease_watermark(test_db, "job") == 100
+
+
+class TestAutoLockMeals:
+    """批量自动锁定测试"""
+
+    def test_locks_only_published_meals(self, core_ops, test_db):
+        """测试批量锁定跳过非发布状态的餐次并记录事件"""
+        published = publish_meal(test_db, "2030-01-01", "lunch")
+        canceled = publish_meal(test_db, "2030-01-01", "dinner", status='canceled')
+
+        result = core_ops.auto_lock_meals([published, canceled])
+
+        assert result['locked_meal_ids'] == [published]
+        statuses = dict(test_db.conn.execute("SELECT meal_id, status FROM meals").fetchall())
+        assert statuses == {published: 'locked', canceled: 'canceled'}
+        events = fetch_meal_events_after(test_db.conn, 0)
+        assert [(e['meal_id'], e['type']) for e in events] == [(published, 'lock')]
+
+
+class TestAutoLockScheduler:
+    """截单调度器测试"""
+
+    def test_heap_respects_watermark(self):
+        """测试截单时间不晚于调度进度的餐次不再调度"""
+        scheduler = AutoLockScheduler(":memory:", {"lunch": "10:30", "dinner": "16:30"})
+        scheduler.watermark = meal_deadline("2030-01-01", "lunch", scheduler.deadlines, TZ)
+
+        assert scheduler.schedule(1, "2030-01-01", "lunch") is False
+        assert scheduler.schedule(2, "2030-01-02", "lunch") is True
+        assert scheduler.schedule(3, "2030-01-01", "dinner") is True
+        assert scheduler.schedule(3, "2030-01-01", "dinner") is False
+
+        due = scheduler.pop_due(meal_deadline("2030-01-01", "dinner", scheduler.deadlines, TZ))
+        assert [meal_id for _, meal_id in due] == [3]
+        assert scheduler.next_deadline() == meal_deadline("2030-01-02", "lunch", scheduler.deadlines, TZ)
+
+    def test_leader_locks_due_meals(self, tmp_path):
+        """测试leader接管后补锁错过截单的餐次，非leader不执行"""
+        db_path = str(tmp_path / "auto_lock.db")
+        db = DatabaseManager(db_path, auto_connect=True)
+        create_test_tables(db)
+
+        # 截单时间设为当前分钟（已过去不到一分钟），调度进度早于该时间
+        now = datetime.now(TZ)
+        deadlines = {"lunch": now.strftime("%H:%M"), "dinner": "23:59"}
+        today = now.date().isoformat()
+        due_meal = publish_meal(db, today, "lunch")
+        future_meal = publish_meal(db, "2099-01-01", "lunch")
+
+        acquire_lease(db, LEASE_NAME, "seed", 30)
+        advance_lease_watermark(db, LEASE_NAME, "seed", time.time() - 120)
+        db.conn.commit()
+        release_lease(db, LEASE_NAME, "seed")
+
+        async def run():
+            leader = AutoLockScheduler(db_path, deadlines, lease_seconds=30)
+            follower = AutoLockScheduler(db_path, deadlines, lease_seconds=30)
+            leader.start()
+            await asyncio.sleep(0.3)
+            follower.start()
+            for _ in range(50):
+                status = db.conn.execute("SELECT status FROM meals WHERE meal_id = ?", [due_meal]).fetchone()[0]
+                if status == 'locked':
+                    break
+                await asyncio.sleep(0.05)
+            states = (leader.is_leader, follower.is_leader, leader.next_deadline())
+            await follower.stop()
+            await leader.stop()
+            return status, states
+
+        try:
+            status, (leader_is_leader, follower_is_leader, next_deadline) = asyncio.run(run())
+            assert status == 'locked'
+            assert leader_is_leader is True and follower_is_leader is False
+            assert next_deadline == meal_deadline("2099-01-01", "lunch", deadlines, TZ)
+            future_status = db.conn.execute("SELECT status FROM meals WHERE meal_id = ?", [future_meal]).fetchone()[0]
+            assert future_status == 'published'
+            # 停止后释放租约
+            assert acquire_lease(db, LEASE_NAME, "other", 30) is True
+        finally:
+            db.close()
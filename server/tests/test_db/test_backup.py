@@ -0,0 +1,118 @@
+# 在线备份和定时备份调度测试
+
+import asyncio
+import os
+import sqlite3
+import time
+from datetime import datetime
+from zoneinfo import ZoneInfo
+
+import pytest
+
+from db.backup import online_backup, restore_backup, rotate_backups
+from db.leases import acquire_lease, advance_lease_watermark, release_lease
+from utils.backup_scheduler import LEASE_NAME, BackupScheduler
+from utils.cron import CronSchedule
+
+TZ = ZoneInfo("Asia/Shanghai")
+
+
+class TestOnlineBackup:
+    """在线备份测试"""
+
+    def test_backup_includes_uncheckpointed_wal(self, tmp_path, file_db):
+        """测试备份包含尚在WAL中的已提交数据，压缩备份可恢复"""
+        file_db.conn.execute("PRAGMA wal_autocheckpoint = 0")
+        file_db.conn.executemany(
+            "INSERT INTO meals (date, slot, base_price_cents, status) VALUES (?, 'lunch', 1500, 'published')",
+            [(f"2030-01-{day:02d}",) for day in range(1, 29)]
+        )
+        file_db.conn.commit()
+        assert os.path.getsize(file_db.db_path + "-wal") > 0
+
+        backup_path = str(tmp_path / "backups" / "app.db.gz")
+        result = online_backup(file_db.conn, backup_path, pages_per_step=1, step_sleep=0,
+                               compress=True, checkpoint=False)
+
+        assert result["pages"] > 1 and result["steps"] >= result["pages"]
+        assert not [name for name in os.listdir(tmp_path / "backups") if name.endswith(".tmp")]
+
+        restored = str(tmp_path / "restored.db")
+        restore_backup(backup_path, restored)
+        conn = sqlite3.connect(restored)
+        try:
+            assert conn.execute("SELECT COUNT(*) FROM meals").fetchone()[0] == 28
+        finally:
+            conn.close()
+
+    def test_rotate_keeps_newest(self, tmp_path):
+        """测试只清理同一数据库最旧的备份"""
+        for name in ["app-20300101-020000.db.gz", "app-20300102-020000.db.gz",
+                     "app-20300103-020000.db", "app_dev-20300101-020000.db.gz"]:
+            (tmp_path / name).write_bytes(b"")
+
+        removed = rotate_backups(str(tmp_path), "/data/app.db", keep=2)
+
+        assert [os.path.basename(path) for path in removed] == ["app-20300101-020000.db.gz"]
+        assert sorted(os.listdir(tmp_path)) == [
+            "app-20300102-020000.db.gz", "app-20300103-020000.db", "app_dev-20300101-020000.db.gz"
+        ]
+
+
+class TestCronSchedule:
+    """cron表达式测试"""
+
+    @staticmethod
+    def at(text):
+        return datetime.strptime(text, "%Y-%m-%d %H:%M").replace(tzinfo=TZ).timestamp()
+
+    def test_next_after(self):
+        """测试每日、工作日和日/周并集规则"""
+        daily = CronSchedule("0 2 * * *")
+        assert daily.next_after(self.at("2030-01-01 01:59")) == self.at("2030-01-01 02:00")
+        assert daily.next_after(self.at("2030-01-01 02:00")) == self.at("2030-01-02 02:00")
+
+        # 2030-01-05 为周六
+        weekdays = CronSchedule("*/30 9-10 * * 1-5")
+        assert weekdays.next_after(self.at("2030-01-04 10:45")) == self.at("2030-01-07 09:00")
+
+        either = CronSchedule("0 0 1 * 0")
+        assert either.next_after(self.at("2030-01-02 00:00")) == self.at("2030-01-06 00:00")
+
+    def test_invalid_expression(self):
+        """测试格式错误的表达式"""
+        with pytest.raises(ValueError):
+            CronSchedule("0 2 * *")
+        with pytest.raises(ValueError):
+            CronSchedule("60 2 * * *")
+
+
+class TestBackupScheduler:
+    """定时备份调度器测试"""
+
+    def test_leader_catches_up_missed_backup(self, tmp_path, file_db):
+        """测试leader接管时补做停机期间错过的备份并推进执行进度"""
+        backup_dir = str(tmp_path / "backups")
+
+        acquire_lease(file_db, LEASE_NAME, "seed", 30)
+        advance_lease_watermark(file_db, LEASE_NAME, "seed", time.time() - 120)
+        file_db.conn.commit()
+        release_lease(file_db, LEASE_NAME, "seed")
+
+        async def run():
+            scheduler = BackupScheduler(file_db.db_path, CronSchedule("* * * * *"), backup_dir, keep=3)
+            scheduler.start()
+            for _ in range(100):
+                if scheduler.last_result is not None:
+                    break
+                await asyncio.sleep(0.05)
+            await asyncio.sleep(0.1)
+            watermark = scheduler.watermark
+            await scheduler.stop()
+            return scheduler.last_result, watermark
+
+        started = time.time()
+        result, watermark = asyncio.run(run())
+        assert result is not None and result["compressed"] is True
+        assert os.listdir(backup_dir) == [os.path.basename(result["path"])]
+        assert watermark >= started - 1
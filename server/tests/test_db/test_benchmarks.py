@@ -0,0 +1,54 @@
+# 微基准测试框架测试
+
+import pytest
+
+from benchmarks.cases import BenchmarkContext, build_cases
+from benchmarks.datasets import open_dataset, prepare_dataset
+from benchmarks.harness import BenchmarkCase, compare_results, run_case, summarize
+
+
+def _results(medians):
+    return {"results": [
+        {"scale": "tiny", "storage": "memory", "name": name, "stats": {"median_ms": median}}
+        for name, median in medians.items()
+    ]}
+
+
+class TestBenchmarks:
+    """微基准测试框架测试"""
+
+    def test_summarize(self):
+        """测试统计汇总"""
+        stats = summarize([4.0, 1.0, 3.0, 2.0, 5.0])
+        assert (stats["n"], stats["min_ms"], stats["median_ms"], stats["max_ms"]) == (5, 1.0, 3.0, 5.0)
+        assert stats["p25_ms"] == 2.0 and stats["p95_ms"] == pytest.approx(4.8)
+        assert stats["ops_per_sec"] == pytest.approx(333.3)
+
+    def test_compare_results(self):
+        """测试按中位数与基线比较，忽略小于最小差值的变化"""
+        baseline = _results({"slow": 10.0, "fast": 10.0, "same": 10.0, "tiny": 0.01})
+        current = _results({"slow": 13.0, "fast": 7.0, "same": 11.0, "tiny": 0.03, "added": 1.0})
+        statuses = {item["key"].split("/")[-1]: item["status"] for item in compare_results(current, baseline, 0.25)}
+        assert statuses == {"slow": "regression", "fast": "improvement", "same": "ok", "tiny": "ok", "added": "new"}
+
+    def test_run_case_setup_untimed(self):
+        """测试准备步骤的返回值传给被计时函数，预热时校验结果"""
+        calls = []
+        case = BenchmarkCase("case", lambda value: calls.append(value) or value, setup=lambda: len(calls),
+                             check=lambda result: calls.append("checked"), repeat=2)
+        result = run_case(case, repeat=5, warmup=1)
+        assert result["stats"]["n"] == 2
+        assert calls == [0, "checked", 2, 3]
+
+    def test_cases_run_on_dataset(self, tmp_path):
+        """测试所有用例在小数据集上能执行"""
+        db = open_dataset(prepare_dataset("tiny", cache_dir=str(tmp_path / "cache")), "disk", str(tmp_path / "work"))
+        ctx = BenchmarkContext(db)
+        try:
+            for case in build_cases(ctx):
+                if "orders=200" in case.name:
+                    continue
+                assert run_case(case, repeat=1, warmup=1)["stats"]["n"] == 1
+        finally:
+            ctx.close()
+            db.close()
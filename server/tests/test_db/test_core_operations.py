@@ -64,6 +64,41 @@ class TestAdminOperations:
         assert result['slot'] == "dinner"
         assert "发布成功" in result['message']
     
+    def test_admin_publish_meals_bulk(self, core_ops, test_db, sample_admin_user, sample_addon):
+        """测试管理员批量发布餐次（冲突检测、试运行、重用已取消餐次）"""
+        def meal(date, slot):
+            return {'date': date, 'slot': slot, 'description': '批量餐次', 'base_price_cents': 1500,
+                    'addon_config': {sample_addon: 2}, 'max_orders': 30}
+        
+        existing = core_ops.admin_publish_meal(sample_admin_user, "2025-01-06", "lunch", "已有餐次", 1500, {}, 20)
+        canceled = core_ops.admin_publish_meal(sample_admin_user, "2025-01-07", "lunch", "已取消", 1500, {}, 20)
+        test_db.conn.execute("UPDATE meals SET status = 'canceled' WHERE meal_id = ?", [canceled['meal_id']])
+        test_db.conn.commit()
+        meals = [meal("2025-01-06", "lunch"), meal("2025-01-07", "lunch"), meal("2025-01-08", "lunch")]
+        
+        # 试运行只返回冲突报告
+        plan = core_ops.admin_publish_meals_bulk(sample_admin_user, meals, dry_run=True)
+        assert plan['conflicts'] == [{'date': "2025-01-06", 'slot': "lunch",
+                                      'meal_id': existing['meal_id'], 'status': 'published'}]
+        assert (plan['created_count'], plan['reused_count']) == (1, 1)
+        assert test_db.conn.execute("SELECT COUNT(*) FROM meals").fetchone()[0] == 2
+        
+        # 存在冲突时整批失败
+        with pytest.raises(ValueError, match="2025-01-06 lunch"):
+            core_ops.admin_publish_meals_bulk(sample_admin_user, meals)
+        
+        result = core_ops.admin_publish_meals_bulk(sample_admin_user, meals, skip_conflicts=True)
+        published = {item['date']: item for item in result['published']}
+        assert set(published) == {"2025-01-07", "2025-01-08"}
+        assert published["2025-01-07"]['meal_id'] == canceled['meal_id']
+        assert published["2025-01-07"]['is_new_meal'] is False
+        assert published["2025-01-08"]['is_new_meal'] is True
+        rows = test_db.conn.execute(
+            "SELECT status, max_orders, addon_config FROM meals WHERE meal_id IN (?, ?)",
+            [published["2025-01-07"]['meal_id'], published["2025-01-08"]['meal_id']]
+        ).fetchall()
+        assert all(row[0] == 'published' and row[1] == 30 and str(sample_addon) in row[2] for row in rows)
+    
     def test_admin_lock_meal(self, core_ops, sample_admin_user, sample_meal):
         """测试管理员锁定餐次"""
         result = core_ops.admin_lock_meal(
@@ -84,6 +119,48 @@ class TestAdminOperations:
         assert result['meal_id'] == sample_meal
         assert "已完成" in result['message']
     
+    def test_admin_complete_meals_batch(self, core_ops, test_db, sample_admin_user, sample_user, sample_meal):
+        """测试批量完成餐次返回每餐次汇总"""
+        core_ops.admin_adjust_balance(sample_admin_user, sample_user, 5000, "测试充值")
+        order = core_ops.create_order(user_id=sample_user, meal_id=sample_meal, addon_selections={})
+        other_meal = core_ops.admin_publish_meal(sample_admin_user, "2020-01-01", "lunch", "旧餐次", 1000, {}, 10)
+        core_ops.admin_lock_meal(sample_admin_user, other_meal['meal_id'])
+        
+        meal_ids = core_ops.list_completable_meals(meal_ids=[sample_meal, other_meal['meal_id']])
+        assert meal_ids[0] == other_meal['meal_id']
+        assert core_ops.list_completable_meals(before_date="2021-01-01") == [other_meal['meal_id']]
+        
+        result = core_ops.admin_complete_meals_batch(sample_admin_user, meal_ids)
+        
+        assert result['orders_completed'] == 1
+        assert result['amount_cents'] == order['amount_cents']
+        summary = {meal['meal_id']: meal for meal in result['meals']}
+        assert summary[sample_meal]['orders'] == 1
+        assert summary[other_meal['meal_id']]['orders'] == 0
+        statuses = test_db.conn.execute(
+            "SELECT status FROM meals WHERE meal_id IN (?, ?)", meal_ids
+        ).fetchall()
+        assert {row[0] for row in statuses} == {'completed'}
+        assert test_db.conn.execute(
+            "SELECT status FROM orders WHERE order_id = ?", [order['order_id']]
+        ).fetchone()[0] == 'completed'
+        # 已完成的餐次再次提交时跳过
+        assert core_ops.admin_complete_meals_batch(sample_admin_user, meal_ids)['meals'] == []
+    
+    def test_complete_meals_batch_includes_published(self, core_ops, test_db, sample_admin_user):
+        """测试批量完成包含未锁定的已发布餐次，不含截止日期当天"""
+        published = core_ops.admin_publish_meal(sample_admin_user, "2020-01-01", "lunch", "未锁定餐次", 1000, {}, 10)
+        same_day = core_ops.admin_publish_meal(sample_admin_user, "2020-01-02", "lunch", "截止当天", 1000, {}, 10)
+        
+        meal_ids = core_ops.list_completable_meals(before_date="2020-01-02")
+        assert meal_ids == [published['meal_id']]
+        
+        core_ops.admin_complete_meals_batch(sample_admin_user, meal_ids)
+        statuses = dict(test_db.conn.execute(
+            "SELECT meal_id, status FROM meals WHERE meal_id IN (?, ?)", [published['meal_id'], same_day['meal_id']]
+        ).fetchall())
+        assert statuses == {published['meal_id']: 'completed', same_day['meal_id']: 'published'}
+    
     def test_admin_cancel_meal(self, core_ops, sample_admin_user):
         """测试管理员取消餐次"""
         # 先创建一个新餐次用于取消测试
@@ -108,6 +185,34 @@ class TestAdminOperations:
         assert result['cancel_reason'] == "测试取消"
         assert "取消成功" in result['message']
     
+    def test_admin_cancel_meal_refunds(self, core_ops, support_ops, test_db, sample_admin_user):
+        """测试取消餐次为每个订单退款并写入连续的退款流水"""
+        meal_id = core_ops.admin_publish_meal(sample_admin_user, "2024-12-27", "dinner", "多人餐次", 1200, {}, 10)['meal_id']
+        user_ids = []
+        for index in range(3):
+            user_id = support_ops.register_user(open_id=f"cancel_user_{index}", wechat_name=f"取消用户{index}")['user_id']
+            core_ops.admin_adjust_balance(sample_admin_user, user_id, 5000, "测试充值")
+            core_ops.create_order(user_id=user_id, meal_id=meal_id, addon_selections={})
+            user_ids.append(user_id)
+        
+        result = core_ops.admin_cancel_meal(sample_admin_user, meal_id)
+        
+        assert result['canceled_orders_count'] == 3
+        assert result['total_refund_amount'] == 3600
+        transaction_nos = [order['refund_transaction_no'] for order in result['canceled_orders']]
+        assert len(set(transaction_nos)) == 3 and transaction_nos == sorted(transaction_nos)
+        for user_id in user_ids:
+            balance = test_db.conn.execute("SELECT balance_cents FROM users WHERE user_id = ?", [user_id]).fetchone()[0]
+            refund = test_db.conn.execute(
+                "SELECT balance_before_cents, balance_after_cents FROM ledger WHERE user_id = ? AND type = 'refund'",
+                [user_id]
+            ).fetchone()
+            assert balance == 5000
+            assert tuple(refund) == (3800, 5000)
+        assert test_db.conn.execute(
+            "SELECT COUNT(*) FROM orders WHERE meal_id = ? AND status = 'active'", [meal_id]
+        ).fetchone()[0] == 0
+    
     def test_admin_adjust_balance(self, core_ops, sample_admin_user, sample_user):
         """测试管理员调整用户余额"""
         # 测试充值
@@ -0,0 +1,84 @@
+# 订单、账本流式导出测试
+
+import csv
+import gzip
+import io
+from datetime import date
+
+import pytest
+
+from db.archive import archive_cold_data
+from db.export import build_ledger_export_query, build_orders_export_query, iter_export
+
+
+@pytest.fixture
+def file_db(file_db):
+    """带订单、账本数据的文件数据库"""
+    conn = file_db.conn
+    conn.executemany(
+        "INSERT INTO users (user_id, open_id, wechat_name) VALUES (?, ?, ?)",
+        [(1, "u1", "张三"), (2, "u2", "李四")]
+    )
+    conn.executemany(
+        "INSERT INTO meals (meal_id, date, slot, base_price_cents, status) VALUES (?, ?, 'lunch', 1500, ?)",
+        [(1, "2024-01-10", "completed"), (2, "2030-01-10", "published"), (3, "2030-02-10", "published")]
+    )
+    conn.executemany(
+        "INSERT INTO orders (order_id, user_id, meal_id, amount_cents, status) VALUES (?, ?, ?, ?, ?)",
+        [(1, 1, 1, 1500, "completed"), (2, 1, 2, 1800, "active"), (3, 2, 2, 1505, "active"), (4, 2, 3, 1500, "active")]
+    )
+    conn.executemany("""
+        INSERT INTO ledger (ledger_id, transaction_no, user_id, type, direction, amount_cents,
+                            balance_before_cents, balance_after_cents, order_id, created_at)
+        VALUES (?, ?, ?, 'order', 'out', ?, 0, ?, ?, ?)
+    """, [
+        (1, "TXN1", 1, 1500, -1500, 1, "2024-01-09 12:00:00"),
+        (2, "TXN2", 1, 1800, -3300, 2, "2030-01-09 12:00:00"),
+        (3, "TXN3", 2, 1505, -1505, 3, "2030-01-31 23:59:59"),
+        (4, "TXN4", 2, 1500, -3005, 4, "2030-02-01 08:00:00"),
+    ])
+    conn.commit()
+    return file_db
+
+
+def read_csv(blocks):
+    data = b"".join(blocks)
+    assert data.startswith(b"\xef\xbb\xbf")
+    return list(csv.DictReader(io.StringIO(data[3:].decode("utf-8"))))
+
+
+class TestExport:
+    """流式导出测试"""
+
+    def test_orders_csv_filters(self, file_db):
+        """测试订单按餐次日期和用户筛选，金额同时输出分和元"""
+        sql, params = build_orders_export_query(file_db.conn, file_db.db_path, "2030-01-01", "2030-01-31")
+        rows = read_csv(iter_export(file_db.conn, "orders", sql, params, chunk_size=1))
+        assert [row["order_id"] for row in rows] == ["2", "3"]
+        assert (rows[1]["wechat_name"], rows[1]["amount_yuan"], rows[1]["meal_date"]) == ("李四", "15.05", "2030-01-10")
+
+        sql, params = build_orders_export_query(file_db.conn, file_db.db_path, user_id=2)
+        assert [row["order_id"] for row in read_csv(iter_export(file_db.conn, "orders", sql, params))] == ["3", "4"]
+
+    def test_ledger_gzip_includes_end_date(self, file_db):
+        """测试账本按创建日期筛选包含结束日期当天，gzip输出为完整的gz文件"""
+        sql, params = build_ledger_export_query(file_db.conn, file_db.db_path, "2030-01-01", "2030-01-31")
+        data = b"".join(iter_export(file_db.conn, "ledger", sql, params, gzip=True))
+        rows = read_csv([gzip.decompress(data)])
+        assert [row["transaction_no"] for row in rows] == ["TXN2", "TXN3"]
+        assert rows[0]["meal_id"] == "2"
+
+        sql, params = build_ledger_export_query(file_db.conn, file_db.db_path, meal_id=3)
+        assert [row["ledger_id"] for row in read_csv(iter_export(file_db.conn, "ledger", sql, params))] == ["4"]
+
+    def test_includes_archived_rows(self, file_db):
+        """测试导出范围涉及已归档年份时包含归档数据"""
+        archive_cold_data(file_db, months=6, today=date(2030, 1, 1))
+        assert file_db.conn.execute("SELECT COUNT(*) FROM orders").fetchone()[0] == 3
+
+        sql, params = build_orders_export_query(file_db.conn, file_db.db_path, "2024-01-01", "2024-12-31")
+        assert [row["order_id"] for row in read_csv(iter_export(file_db.conn, "orders", sql, params))] == ["1"]
+
+        sql, params = build_ledger_export_query(file_db.conn, file_db.db_path)
+        rows = read_csv(iter_export(file_db.conn, "ledger", sql, params))
+        assert [row["ledger_id"] for row in rows] == ["1", "2", "3", "4"]
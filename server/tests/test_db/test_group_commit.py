@@ -0,0 +1,80 @@
+# 写操作合并提交测试
+
+import pytest
+from concurrent.futures import wait
+
+from db.core_operations import CoreOperations
+from db.manager import DatabaseManager, GroupCommitExecutor
+from tests.conftest import create_test_tables
+
+
+@pytest.fixture
+def file_db(tmp_path):
+    """文件数据库（合并提交执行器需要独立连接访问同一数据库）"""
+    db_path = str(tmp_path / "group_commit.db")
+    db = DatabaseManager(db_path, auto_connect=True)
+    db.conn.execute("CREATE TABLE items (item_id INTEGER PRIMARY KEY, name TEXT UNIQUE)")
+    db.conn.commit()
+    yield db
+    db.close()
+
+
+def insert_item(name):
+    def operation(db):
+        def insert():
+            return db.conn.execute("INSERT INTO items (name) VALUES (?)", [name]).lastrowid
+        return db.execute_transaction([insert])[0]
+    return operation
+
+
+class TestGroupCommitExecutor:
+    """合并提交执行器测试"""
+
+    def test_batch_keeps_per_operation_rollback(self, file_db):
+        """测试同批次中失败操作只回滚自身"""
+        executor = GroupCommitExecutor(file_db.db_path, max_delay=0.2)
+        try:
+            futures = [executor.submit(insert_item(name)) for name in ("a", "b", "a", "c")]
+            wait(futures, timeout=5)
+        finally:
+            executor.close()
+
+        assert futures[0].result() and futures[1].result() and futures[3].result()
+        with pytest.raises(Exception, match="UNIQUE"):
+            futures[2].result()
+
+        names = [row[0] for row in file_db.conn.execute("SELECT name FROM items ORDER BY item_id")]
+        assert names == ["a", "b", "c"]
+        # 四个操作在一个事务中提交
+        assert executor.batch_count == 1
+        assert executor.operation_count == 4
+
+    def test_core_operations_in_group(self, tmp_path):
+        """测试核心业务操作通过执行器下单"""
+        db_path = str(tmp_path / "orders.db")
+        db = DatabaseManager(db_path, auto_connect=True)
+        create_test_tables(db)
+        db.conn.execute("INSERT INTO users (open_id, wechat_name, balance_cents) VALUES ('u1', '用户', 5000)")
+        db.conn.execute("INSERT INTO users (open_id, wechat_name, is_admin) VALUES ('admin', '管理员', TRUE)")
+        db.conn.commit()
+        admin_id = db.conn.execute("SELECT user_id FROM users WHERE open_id = 'admin'").fetchone()[0]
+        meal_id = CoreOperations(db).admin_publish_meal(
+            admin_id, "2030-01-01", "lunch", "测试餐", 1500, {}, 1
+        )["meal_id"]
+
+        executor = GroupCommitExecutor(db_path, max_delay=0.2)
+        try:
+            futures = [
+                executor.submit(lambda writer: CoreOperations(writer).create_order(1, meal_id, {}))
+                for _ in range(2)
+            ]
+            wait(futures, timeout=5)
+        finally:
+            executor.close()
+
+        assert futures[0].result()["meal_id"] == meal_id
+        with pytest.raises(ValueError, match="已有该餐次的有效订单"):
+            futures[1].result()
+        assert db.conn.execute("SELECT balance_cents FROM users WHERE user_id = 1").fetchone()[0] == 3500
+        assert db.conn.execute("SELECT COUNT(*) FROM ledger").fetchone()[0] == 1
+        db.close()
@@ -0,0 +1,123 @@
+# 幂等键测试
+
+import sqlite3
+import threading
+import time
+import pytest
+
+from db import idempotency
+from db.idempotency import (
+    IdempotencyKeyConflictError, find_idempotent_result, idempotency_request_hash,
+    prune_idempotency_keys, run_idempotent
+)
+from db.manager import DatabaseManager
+from tests.conftest import create_test_tables
+
+
+class TestIdempotency:
+    """幂等键结果表测试"""
+
+    def test_replay_skips_business_transaction(self, core_ops, test_db, sample_admin_user, sample_user):
+        """测试同一键的重复充值只执行一次"""
+        request_hash = idempotency_request_hash("recharge", sample_user, 2000, "测试充值")
+
+        def recharge():
+            return core_ops.admin_adjust_balance(
+                admin_user_id=sample_admin_user,
+                target_user_id=sample_user,
+                amount_cents=2000,
+                reason="测试充值"
+            )
+
+        first, first_replayed = run_idempotent(test_db, sample_admin_user, "key-1", request_hash, recharge)
+        second, second_replayed = run_idempotent(test_db, sample_admin_user, "key-1", request_hash, recharge)
+
+        assert first_replayed is False and second_replayed is True
+        assert second["transaction_no"] == first["transaction_no"]
+        balance = test_db.conn.execute(
+            "SELECT balance_cents FROM users WHERE user_id = ?", [sample_user]
+        ).fetchone()[0]
+        assert balance == 2000
+        ledger_count = test_db.conn.execute(
+            "SELECT COUNT(*) FROM ledger WHERE user_id = ?", [sample_user]
+        ).fetchone()[0]
+        assert ledger_count == 1
+
+    def test_key_reused_for_different_request(self, test_db):
+        """测试同一键用于不同请求时报错"""
+        run_idempotent(test_db, 1, "key-1", idempotency_request_hash("cancel_order", 1, "原因"), lambda: {"ok": True})
+
+        with pytest.raises(IdempotencyKeyConflictError):
+            find_idempotent_result(test_db.conn, 1, "key-1", idempotency_request_hash("cancel_order", 2, "原因"))
+        # 键按用户隔离
+        assert find_idempotent_result(test_db.conn, 2, "key-1", "other") is None
+
+    def test_failed_operation_not_stored(self, test_db):
+        """测试失败的操作不保存结果，可用同一键重试"""
+        def fail():
+            raise ValueError("余额不足")
+
+        with pytest.raises(ValueError):
+            run_idempotent(test_db, 1, "key-1", "hash", fail)
+        assert find_idempotent_result(test_db.conn, 1, "key-1", "hash") is None
+
+    def test_expired_results_ignored_and_pruned(self, test_db):
+        """测试过期结果不再返回并被清理"""
+        run_idempotent(test_db, 1, "key-1", "hash", lambda: {"ok": True})
+        test_db.conn.execute("UPDATE idempotency_keys SET created_at = ?", [int(time.time()) - 100])
+        test_db.conn.commit()
+
+        assert find_idempotent_result(test_db.conn, 1, "key-1", "hash", ttl_seconds=50) is None
+        assert prune_idempotency_keys(test_db.conn, ttl_seconds=50) == 1
+
+    def test_save_failure_rolls_back_operation(self, core_ops, test_db, sample_admin_user, sample_user, monkeypatch):
+        """测试未启用合并提交时保存结果失败，业务变更随之回滚"""
+        def broken_save(*args):
+            raise sqlite3.OperationalError("disk I/O error")
+
+        monkeypatch.setattr(idempotency, "save_idempotent_result", broken_save)
+        with pytest.raises(sqlite3.OperationalError):
+            run_idempotent(test_db, sample_admin_user, "key-1", "hash", lambda: core_ops.admin_adjust_balance(
+                admin_user_id=sample_admin_user, target_user_id=sample_user, amount_cents=2000, reason="测试充值"
+            ))
+
+        assert test_db.conn.in_transaction is False
+        balance = test_db.conn.execute("SELECT balance_cents FROM users WHERE user_id = ?", [sample_user]).fetchone()[0]
+        assert balance == 0
+
+    def test_concurrent_retries_execute_once(self, tmp_path):
+        """测试未启用合并提交时，两个连接同时用同一键重试只执行一次"""
+        db_path = str(tmp_path / "idempotency.db")
+        with DatabaseManager(db_path) as db:
+            create_test_tables(db)
+            db.conn.execute("CREATE TABLE counter (value INTEGER)")
+            db.conn.execute("INSERT INTO counter VALUES (0)")
+            db.conn.commit()
+
+        barrier = threading.Barrier(2)
+        results, errors = [], []
+
+        def retry():
+            with DatabaseManager(db_path) as db:
+                def increment():
+                    time.sleep(0.05)  # 放大检查与保存之间的窗口
+                    db.execute_transaction([lambda: db.conn.execute("UPDATE counter SET value = value + 1")])
+                    return {"value": db.conn.execute("SELECT value FROM counter").fetchone()[0]}
+
+                barrier.wait()
+                try:
+                    results.append(run_idempotent(db, 1, "key-1", "hash", increment))
+                except Exception as e:
+                    errors.append(e)
+
+        threads = [threading.Thread(target=retry) for _ in range(2)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert errors == []
+        assert sorted(replayed for _, replayed in results) == [False, True]
+        assert [result for result, _ in results] == [{"value": 1}, {"value": 1}]
+        with DatabaseManager(db_path) as db:
+            assert db.conn.execute("SELECT value FROM counter").fetchone()[0] == 1
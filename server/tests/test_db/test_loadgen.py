@@ -0,0 +1,54 @@
+# HTTP 压测基础组件测试
+
+import sqlite3
+import time
+
+from benchmarks.loadgen import LockProbe, RequestRecord, classify, summarize_records
+
+
+class TestLoadgen:
+    """HTTP 压测基础组件测试"""
+
+    def test_classify(self):
+        """测试按状态码和错误信息区分成功、业务拒绝、约束冲突、锁超时和错误"""
+        assert classify(200, {"success": True}) == "ok"
+        assert classify(200, {"success": False, "error": "创建订单失败: 餐次已满，无法下单"}) == "rejected"
+        assert classify(200, {"success": False, "error": "UNIQUE constraint failed: orders.user_id"}) == \
+            "constraint_violation"
+        assert classify(500, {"success": False, "error": "database is locked"}) == "db_locked"
+        assert classify(500, {"success": False, "error": "服务器内部错误"}) == "error"
+        assert classify(None, None) == "error"
+
+    def test_summarize_records(self):
+        """测试各路由请求数、结果比例和延迟百分位数"""
+        records = [RequestRecord("GET /a", "ok", float(ms), 200) for ms in range(1, 101)]
+        records += [RequestRecord("POST /b", "rejected", 5.0, 200), RequestRecord("POST /b", "error", 7.0, 500, "x")]
+        summary = summarize_records(records, elapsed=2.0)
+
+        assert summary["total"]["requests"] == 102 and summary["total"]["throughput_rps"] == 51.0
+        route = summary["routes"]["GET /a"]
+        assert (route["p50_ms"], route["p99_ms"], route["max_ms"]) == (50.5, 99.01, 100.0)
+        assert summary["routes"]["POST /b"]["error_rate"] == 0.5
+        assert summary["routes"]["POST /b"]["rejection_rate"] == 0.5
+        assert summary["top_errors"] == {"POST /b: 500 x": 1}
+
+    def test_lock_probe_measures_wait(self, tmp_path):
+        """测试探针测量到其他连接持有写锁时的等待"""
+        path = str(tmp_path / "probe.db")
+        holder = sqlite3.connect(path, isolation_level=None)
+        holder.execute("PRAGMA journal_mode = WAL")
+        holder.execute("CREATE TABLE t (id INTEGER)")
+
+        probe = LockProbe(path, interval=0.01, timeout=2.0)
+        probe.start()
+        time.sleep(0.05)
+        holder.execute("BEGIN IMMEDIATE")
+        time.sleep(0.2)
+        holder.execute("ROLLBACK")
+        time.sleep(0.05)
+        probe.stop()
+        holder.close()
+
+        summary = probe.summary()
+        assert summary["timeouts"] == 0 and summary["contended"] >= 1
+        assert summary["max_ms"] >= 100
@@ -0,0 +1,68 @@
+# 数据库增量维护测试
+
+import sqlite3
+
+import pytest
+
+from db.maintenance import checkpoint_wal, incremental_vacuum
+
+
+@pytest.fixture
+def free_pages_db(file_db):
+    """插入后删除大量数据，产生空闲页的数据库"""
+    conn = file_db.conn
+    conn.execute("PRAGMA wal_autocheckpoint = 0")
+    conn.executemany(
+        "INSERT INTO meals (date, slot, description, base_price_cents) VALUES (?, 'lunch', ?, 1500)",
+        [(f"2030-{month:02d}-{day:02d}", "x" * 2000) for month in range(1, 13) for day in range(1, 29)]
+    )
+    conn.commit()
+    conn.execute("DELETE FROM meals")
+    conn.commit()
+    return file_db
+
+
+class TestIncrementalMaintenance:
+    """增量维护步骤测试"""
+
+    def test_incremental_vacuum_in_bounded_steps(self, free_pages_db):
+        """测试新建数据库为增量清理模式，按步释放空闲页"""
+        conn = free_pages_db.conn
+        assert conn.execute("PRAGMA auto_vacuum").fetchone()[0] == 2
+        free_pages = conn.execute("PRAGMA freelist_count").fetchone()[0]
+        assert free_pages > 100
+
+        report = incremental_vacuum(conn, step_pages=50, step_sleep=0)
+
+        assert report["skipped"] is False
+        assert report["pages_freed"] == free_pages
+        assert report["freelist_remaining"] == 0
+        assert report["steps"] >= free_pages // 50
+
+    def test_incremental_vacuum_skipped_without_auto_vacuum(self, tmp_path):
+        """测试未开启增量清理的旧数据库跳过清理"""
+        conn = sqlite3.connect(str(tmp_path / "legacy.db"))
+        try:
+            conn.execute("CREATE TABLE t (x)")
+            report = incremental_vacuum(conn)
+            assert report["skipped"] is True and report["pages_freed"] == 0
+        finally:
+            conn.close()
+
+    def test_checkpoint_escalates_to_truncate(self, free_pages_db):
+        """测试WAL超过阈值时升级为TRUNCATE检查点并截断WAL"""
+        db = free_pages_db
+        passive = checkpoint_wal(db.conn, db.db_path, truncate_threshold=1 << 40)
+        assert passive["mode"] == "PASSIVE" and passive["wal_bytes_after"] > 0
+
+        truncated = checkpoint_wal(db.conn, db.db_path, truncate_threshold=0)
+        assert truncated["mode"] == "TRUNCATE"
+        assert truncated["wal_bytes_after"] == 0
+        assert truncated["pages_freed"] > 0
+
+    def test_perform_maintenance_reports_steps(self, free_pages_db):
+        """测试默认维护执行增量步骤并报告耗时和释放页数"""
+        reports = free_pages_db.perform_maintenance()
+        assert [report["step"] for report in reports] == ["incremental_vacuum", "optimize", "wal_checkpoint"]
+        assert all("duration_ms" in report and "pages_freed" in report for report in reports)
+        assert reports[0]["pages_freed"] > 0
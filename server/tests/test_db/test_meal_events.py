@@ -0,0 +1,104 @@
+# 餐次变更事件测试
+
+import asyncio
+import pytest
+
+from db.manager import DatabaseManager
+from db.meal_events import fetch_meal_events_after, get_latest_event_id, record_meal_event
+from utils.event_bus import MealEventBus
+from tests.conftest import create_test_tables
+
+
+class TestMealEvents:
+    """餐次变更事件表测试"""
+
+    def test_order_records_event(self, core_ops, test_db, sample_admin_user, sample_user, sample_meal):
+        """测试下单和取消订单记录容量变更事件"""
+        core_ops.admin_adjust_balance(
+            admin_user_id=sample_admin_user,
+            target_user_id=sample_user,
+            amount_cents=3000,
+            reason="测试充值"
+        )
+        start_id = get_latest_event_id(test_db.conn)
+
+        order_result = core_ops.create_order(user_id=sample_user, meal_id=sample_meal, addon_selections={})
+        core_ops.cancel_order(user_id=sample_user, order_id=order_result['order_id'])
+
+        events = fetch_meal_events_after(test_db.conn, start_id)
+        assert [event['type'] for event in events] == ['order', 'order_cancel']
+        assert events[0]['meal_id'] == sample_meal
+        assert events[0]['current_orders'] == 1
+        assert events[0]['available_slots'] == events[0]['max_orders'] - 1
+        assert events[1]['current_orders'] == 0
+
+    def test_admin_operations_record_events(self, core_ops, test_db, sample_admin_user, sample_meal):
+        """测试管理员锁定餐次记录状态变更事件"""
+        core_ops.admin_lock_meal(sample_admin_user, sample_meal)
+
+        events = fetch_meal_events_after(test_db.conn, 0)
+        assert events[-1]['type'] == 'lock'
+        assert events[-1]['status'] == 'locked'
+
+    def test_failed_transaction_records_nothing(self, core_ops, test_db, sample_user, sample_meal):
+        """测试事务回滚时事件一并回滚"""
+        test_db.conn.execute("UPDATE meals SET current_orders = max_orders WHERE meal_id = ?", [sample_meal])
+        test_db.conn.commit()
+        start_id = get_latest_event_id(test_db.conn)
+
+        with pytest.raises(ValueError, match="餐次已满"):
+            core_ops.create_order(user_id=sample_user, meal_id=sample_meal, addon_selections={})
+
+        assert fetch_meal_events_after(test_db.conn, start_id) == []
+
+
+class TestMealEventBus:
+    """事件总线测试"""
+
+    def test_dispatch_filters_by_meal(self):
+        """测试按餐次过滤分发"""
+        async def run():
+            bus = MealEventBus(db_path=":memory:", poll_interval=60)
+            all_queue = bus.subscribe()
+            filtered_queue = bus.subscribe({2})
+            bus.dispatch([{"event_id": 1, "meal_id": 1}, {"event_id": 2, "meal_id": 2}])
+            bus.unsubscribe(all_queue)
+            bus.unsubscribe(filtered_queue)
+            return all_queue.qsize(), filtered_queue.get_nowait()
+
+        all_count, filtered_event = asyncio.run(run())
+        assert all_count == 2
+        assert filtered_event["meal_id"] == 2
+
+    def test_poll_loop_delivers_committed_events(self, tmp_path):
+        """测试轮询任务将其他连接提交的事件推送给订阅者"""
+        db_path = str(tmp_path / "events.db")
+        writer = DatabaseManager(db_path, auto_connect=True)
+        create_test_tables(writer)
+        writer.conn.execute("""
+            INSERT INTO meals (meal_id, date, slot, base_price_cents, status, current_orders, max_orders)
+            VALUES (1, '2030-01-01', 'lunch', 1500, 'published', 0, 10)
+        """)
+        writer.conn.commit()
+
+        async def run():
+            bus = MealEventBus(db_path=db_path, poll_interval=0.01)
+            queue = bus.subscribe()
+            await asyncio.sleep(0.05)
+
+            writer.conn.execute("UPDATE meals SET current_orders = 3 WHERE meal_id = 1")
+            record_meal_event(writer, 1, 'order')
+            writer.conn.commit()
+
+            event = await asyncio.wait_for(queue.get(), timeout=2)
+            bus.unsubscribe(queue)
+            return event
+
+        try:
+            event = asyncio.run(run())
+        finally:
+            writer.close()
+
+        assert event["meal_id"] == 1
+        assert event["current_orders"] == 3
+        assert event["available_slots"] == 7
@@ -0,0 +1,95 @@
+# 数据库结构迁移测试
+
+import threading
+
+import pytest
+
+from db.manager import DatabaseManager
+from db.migrations.m0001_baseline import INDEXES, TABLES
+from db.schema_migrations import Migration, apply_migrations, get_schema_version, load_migrations, migrate_database
+
+
+@pytest.fixture
+def file_db(tmp_path):
+    db = DatabaseManager(str(tmp_path / "migrations.db"), auto_connect=True)
+    yield db
+    db.close()
+
+
+def _names(db, object_type):
+    return {row[0] for row in db.conn.execute("SELECT name FROM sqlite_master WHERE type = ?", [object_type])}
+
+
+class TestMigrations:
+    """数据库结构迁移测试"""
+
+    def test_fresh_database(self, file_db):
+        """测试空数据库执行全部迁移，再次执行时没有待执行的迁移"""
+        applied = apply_migrations(file_db)
+
+        latest = load_migrations()[-1].version
+        assert [item["version"] for item in applied] == list(range(1, latest + 1))
+        assert get_schema_version(file_db.conn) == latest
+        assert {name for name, _ in TABLES} <= _names(file_db, "table")
+        assert "idx_orders_meal_status" in _names(file_db, "index")
+        assert "idx_orders_meal_active" not in _names(file_db, "index")
+        assert "idx_orders_user_meal_status" not in _names(file_db, "index")
+        assert len(INDEXES) > 0
+        assert apply_migrations(file_db) == []
+
+    def test_rebuild_meals_without_primary_key(self, file_db):
+        """测试旧数据库 meals 表缺少主键时整表重建，保留记录、索引和引用它的订单"""
+        file_db.conn.executescript("""
+            CREATE TABLE meals (meal_id INTEGER, date DATE NOT NULL, slot VARCHAR(20) NOT NULL, description TEXT,
+                                base_price_cents INTEGER NOT NULL, current_orders INTEGER DEFAULT 0,
+                                status VARCHAR(20) DEFAULT 'published');
+            CREATE INDEX idx_meals_legacy ON meals(status);
+            INSERT INTO meals VALUES (1, '2024-12-01', 'lunch', '旧餐次', 1500, 1, 'completed');
+            INSERT INTO meals VALUES (2, '2024-12-01', 'dinner', NULL, 1800, 0, 'canceled');
+        """)
+        apply_migrations(file_db)
+
+        columns = file_db.conn.execute("PRAGMA table_info(meals)").fetchall()
+        assert [column[1] for column in columns if column[5]] == ["meal_id"]
+        rows = file_db.conn.execute("SELECT meal_id, description, max_orders, status FROM meals ORDER BY meal_id")
+        assert [tuple(row) for row in rows] == [(1, "旧餐次", 50, "completed"), (2, None, 50, "canceled")]
+        assert "idx_meals_legacy" in _names(file_db, "index")
+        assert file_db.conn.execute("PRAGMA foreign_keys").fetchone()[0] == 1
+
+    def test_failed_migration_rolls_back(self, file_db):
+        """测试迁移失败时回滚且不记录版本，租约释放后可以重新执行"""
+        def broken(conn):
+            conn.execute("CREATE TABLE half_done (id INTEGER)")
+            raise RuntimeError("boom")
+
+        with pytest.raises(RuntimeError, match="boom"):
+            apply_migrations(file_db, migrations=[Migration(1, "broken", "", broken)])
+        assert "half_done" not in _names(file_db, "table")
+        assert get_schema_version(file_db.conn) == 0
+
+        fixed = Migration(1, "fixed", "", lambda conn: conn.execute("CREATE TABLE done (id INTEGER)"),
+                          indexes=("CREATE INDEX IF NOT EXISTS idx_done ON done(id)",))
+        assert [item["name"] for item in apply_migrations(file_db, migrations=[fixed], wait_timeout=1)] == ["fixed"]
+        assert "idx_done" in _names(file_db, "index")
+
+    def test_concurrent_workers_migrate_once(self, tmp_path):
+        """测试多个进程同时启动时只有一个执行迁移"""
+        db_path = str(tmp_path / "workers.db")
+        results, errors = [], []
+
+        def worker():
+            try:
+                results.append(migrate_database(db_path))
+            except Exception as e:
+                errors.append(e)
+
+        threads = [threading.Thread(target=worker) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert errors == []
+        assert sorted(len(applied) for applied in results) == [0, 0, 0, len(load_migrations())]
+        with DatabaseManager(db_path) as db:
+            assert db.conn.execute("SELECT COUNT(*) FROM schema_version").fetchone()[0] == len(load_migrations())
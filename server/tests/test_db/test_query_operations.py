@@ -131,7 +131,32 @@ class TestUserQueries:
         
         assert result['success'] is True
         assert result['data']['has_order'] is False
-    
+
+    def test_query_user_meal_orders(self, query_ops, core_ops, test_db, sample_admin_user, sample_user, sample_meal, sample_addon):
+        """测试批量查询用户多个餐次的订单"""
+        core_ops.admin_adjust_balance(
+            admin_user_id=sample_admin_user,
+            target_user_id=sample_user,
+            amount_cents=3000,
+            reason="测试充值"
+        )
+        order_result = core_ops.create_order(
+            user_id=sample_user,
+            meal_id=sample_meal,
+            addon_selections={sample_addon: 1}
+        )
+
+        with test_db.read_snapshot():
+            result = query_ops.query_user_meal_orders(sample_user, [sample_meal, 9999])
+
+        assert result['success'] is True
+        orders = result['data']['orders']
+        assert orders[sample_meal]['has_order'] is True
+        assert orders[sample_meal]['order_id'] == order_result['order_id']
+        assert orders[sample_meal]['amount_cents'] == 1800
+        assert orders[9999] == {"has_order": False}
+        assert test_db.conn.in_transaction is False
+
     def test_query_user_ledger_history(self, query_ops, core_ops, sample_admin_user, sample_user):
         """测试查询用户账单历史"""
         # 创建一些交易记录
@@ -331,4 +356,64 @@ class TestErrorHandling:
                 end_date="2024-12-20"  # 结束日期早于开始日期
             )
         
-        assert "日期" in str(exc_info.value)
\ No newline at end of file
+        assert "日期" in str(exc_info.value)
+
+class TestFieldSelection:
+    """稀疏字段选择测试"""
+    
+    def test_meals_fields_projection(self, query_ops, sample_meal):
+        """测试餐次列表只返回所选字段"""
+        result = query_ops.query_meals_by_date_range(
+            start_date="2024-12-01",
+            end_date="2024-12-31",
+            fields={"date", "available_slots"}
+        )
+        
+        assert result['success'] is True
+        meal = result['data']['meals'][0]
+        assert set(meal.keys()) == {"meal_id", "date", "available_slots"}
+        assert meal['available_slots'] == 10
+    
+    def test_meals_unknown_field(self, query_ops):
+        """测试不支持的字段"""
+        with pytest.raises(ValueError, match="不支持的字段"):
+            query_ops.query_meals_by_date_range(
+                start_date="2024-12-01",
+                end_date="2024-12-31",
+                fields={"password"}
+            )
+    
+    def test_ledger_fields_skip_joins(self, query_ops, core_ops, test_db, sample_admin_user, sample_user):
+        """测试未选择关联信息时账单查询不关联订单/餐次/用户表"""
+        core_ops.admin_adjust_balance(
+            admin_user_id=sample_admin_user,
+            target_user_id=sample_user,
+            amount_cents=5000,
+            reason="充值"
+        )
+        
+        statements = []
+        test_db.conn.set_trace_callback(statements.append)
+        try:
+            result = query_ops.query_user_ledger_history(sample_user, fields={"amount_yuan", "type"})
+        finally:
+            test_db.conn.set_trace_callback(None)
+        
+        record = result['data']['ledger_records'][0]
+        assert set(record.keys()) == {"ledger_id", "amount_yuan", "type"}
+        assert record['amount_yuan'] == 50.0
+        
+        ledger_sql = next(sql for sql in statements if "FROM ledger l" in sql)
+        assert "JOIN" not in ledger_sql
+        
+        # 请求关联订单时才关联订单和餐次表
+        statements.clear()
+        test_db.conn.set_trace_callback(statements.append)
+        try:
+            query_ops.query_user_ledger_history(sample_user, fields={"related_order"})
+        finally:
+            test_db.conn.set_trace_callback(None)
+        
+        ledger_sql = next(sql for sql in statements if "FROM ledger l" in sql)
+        assert "LEFT JOIN meals m" in ledger_sql
+        assert "LEFT JOIN users op" not in ledger_sql
@@ -0,0 +1,87 @@
+# 热点查询执行计划测试
+
+from datetime import date, datetime
+
+import pytest
+
+from db.manager import DatabaseManager
+from db.query_plans import HOT_QUERIES, verify_query_plans
+from db.schema_migrations import apply_migrations, load_migrations
+from db.seed_data import get_scale, seed_database
+
+
+@pytest.fixture
+def migrated_db(tmp_path):
+    db = DatabaseManager(str(tmp_path / "plans.db"), auto_connect=True)
+    yield db
+    db.close()
+
+
+class TestQueryPlans:
+    """热点查询执行计划测试"""
+
+    def test_hot_queries_use_indexes(self, migrated_db):
+        """测试迁移到最新版本后每个热点查询都使用预期的索引"""
+        apply_migrations(migrated_db)
+
+        results = verify_query_plans(migrated_db.conn)
+        assert len(results) == len(HOT_QUERIES)
+        assert [(r["name"], r["problems"]) for r in results if not r["ok"]] == []
+        assert [r["name"] for r in results if r["skipped"]] == []
+
+    def test_hot_queries_with_stale_statistics(self, migrated_db):
+        """测试旧数据库带着建索引之前的统计信息迁移后，每个热点查询仍使用预期的索引"""
+        migrations = load_migrations()
+        apply_migrations(migrated_db, migrations=[m for m in migrations if m.version < 3])
+        seed_database(migrated_db, get_scale("tiny"), date(2024, 11, 25))
+        migrated_db.conn.execute("ANALYZE")
+        migrated_db.conn.commit()
+
+        # 只补索引不刷新统计信息时，计划器仍按旧统计信息选择索引
+        apply_migrations(migrated_db, migrations=[m for m in migrations if m.version == 3])
+        failed = {r["name"] for r in verify_query_plans(migrated_db.conn) if not r["ok"]}
+        assert "auto_lock_candidates" in failed
+
+        apply_migrations(migrated_db)
+        results = verify_query_plans(migrated_db.conn)
+        assert [(r["name"], r["problems"]) for r in results if not r["ok"]] == []
+        assert [r["name"] for r in results if r["skipped"]] == []
+        analyzed = {row[0] for row in migrated_db.conn.execute("SELECT idx FROM sqlite_stat1")}
+        assert {"idx_orders_meal_status", "idx_meals_published_date"} <= analyzed
+
+    def test_small_tables_skipped(self, migrated_db):
+        """测试表只有几行时计划器选择全表扫描，记为跳过而不是失败"""
+        apply_migrations(migrated_db)
+        migrated_db.conn.executemany(
+            "INSERT INTO meals (date, slot, base_price_cents) VALUES (?, 'lunch', 1500)",
+            [["2024-11-24"], ["2024-11-25"]]
+        )
+        migrated_db.conn.execute("ANALYZE")
+        migrated_db.conn.commit()
+
+        results = {r["name"]: r for r in verify_query_plans(migrated_db.conn)}
+        assert all(r["ok"] for r in results.values())
+        skipped = [r for r in results.values() if r["skipped"]]
+        assert skipped and all(r["problems"] for r in skipped)
+        assert results["ledger_history"]["skipped"] is None
+
+    def test_detects_missing_indexes(self, migrated_db):
+        """测试只有基线索引时能发现排序和索引问题"""
+        apply_migrations(migrated_db, migrations=[m for m in load_migrations() if m.version < 3])
+
+        failed = {r["name"]: r["problems"] for r in verify_query_plans(migrated_db.conn) if not r["ok"]}
+        assert "未使用索引 idx_ledger_user_created" in failed["ledger_history"]
+        assert any("临时排序" in problem for problem in failed["ledger_history"])
+        assert "meal_active_orders" in failed
+
+    def test_transaction_no_sequence(self, core_ops, sample_user):
+        """测试流水号按当日最大序号递增，不受其他日期流水号影响"""
+        prefix = f"TXN{datetime.now().strftime('%Y%m%d')}"
+        for transaction_no in [f"{prefix}000009", "TXN99991231000042"]:
+            core_ops.db.conn.execute(
+                "INSERT INTO ledger (transaction_no, user_id, type, direction, amount_cents, balance_before_cents,"
+                " balance_after_cents) VALUES (?, ?, 'recharge', 'in', 100, 0, 100)",
+                [transaction_no, sample_user]
+            )
+
+        assert core_ops._generate_transaction_no() == f"{prefix}000010"
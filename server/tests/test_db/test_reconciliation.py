@@ -0,0 +1,113 @@
+# 账本增量对账测试
+
+from datetime import date
+
+from db.archive import archive_cold_data
+from db.core_operations import CoreOperations
+from db.reconciliation import reconcile_ledger, reset_reconciliation
+from db.supporting_operations import SupportingOperations
+
+
+def adjust(core_ops, admin_id, user_id, amount_cents):
+    return core_ops.admin_adjust_balance(
+        admin_user_id=admin_id,
+        target_user_id=user_id,
+        amount_cents=amount_cents,
+        reason="测试调账"
+    )
+
+
+def run(test_db, **kwargs):
+    items = list(reconcile_ledger(test_db, **kwargs))
+    return items[:-1], items[-1]
+
+
+class TestLedgerReconciliation:
+    """账本对账测试"""
+
+    def test_incremental_run_checks_only_new_rows(self, core_ops, test_db, sample_admin_user, sample_user):
+        """测试一致的账本无不一致记录，再次对账只核对新增记录"""
+        adjust(core_ops, sample_admin_user, sample_user, 3000)
+        adjust(core_ops, sample_admin_user, sample_user, -1000)
+
+        mismatches, summary = run(test_db)
+        assert mismatches == []
+        assert summary["rows_checked"] == 2 and summary["complete"] is True
+
+        adjust(core_ops, sample_admin_user, sample_user, 500)
+        mismatches, summary = run(test_db)
+        assert mismatches == []
+        assert summary["rows_checked"] == 1 and summary["users_checked"] == 1
+
+        _, summary = run(test_db)
+        assert summary["rows_checked"] == 0
+
+    def test_reports_each_break_once(self, core_ops, test_db, sample_admin_user, sample_user):
+        """测试账本链断裂只报告一次，余额不一致在修复前持续报告"""
+        adjust(core_ops, sample_admin_user, sample_user, 3000)
+        run(test_db)
+
+        # 绕过账本直接修改余额，随后的正常调账会以修改后的余额为变动前余额
+        test_db.conn.execute("UPDATE users SET balance_cents = balance_cents + 100 WHERE user_id = ?", [sample_user])
+        test_db.conn.commit()
+        mismatches, _ = run(test_db)
+        assert [(m["kind"], m["expected_cents"], m["actual_cents"]) for m in mismatches] == [
+            ("balance_mismatch", 3000, 3100)
+        ]
+
+        adjust(core_ops, sample_admin_user, sample_user, 200)
+        mismatches, _ = run(test_db)
+        assert [(m["kind"], m["expected_cents"], m["actual_cents"]) for m in mismatches] == [
+            ("chain_break", 3000, 3100)
+        ]
+
+        mismatches, _ = run(test_db)
+        assert mismatches == []
+
+    def test_chunked_run_resumes(self, core_ops, test_db, sample_admin_user, sample_user):
+        """测试分块对账中断后从进度继续，全量对账从头核对"""
+        for amount in (100, 200, 300):
+            adjust(core_ops, sample_admin_user, sample_user, amount)
+        test_db.conn.execute("UPDATE ledger SET balance_after_cents = 999 WHERE ledger_id = (SELECT MAX(ledger_id) FROM ledger)")
+        test_db.conn.commit()
+
+        mismatches, summary = run(test_db, chunk_size=1, max_chunks=2)
+        assert mismatches == []
+        assert summary["rows_checked"] == 2 and summary["complete"] is False
+
+        mismatches, summary = run(test_db, chunk_size=1)
+        assert [m["kind"] for m in mismatches] == ["amount_mismatch", "balance_mismatch"]
+        assert summary["from_ledger_id"] == summary["to_ledger_id"] - 1
+
+        reset_reconciliation(test_db)
+        mismatches, summary = run(test_db, chunk_size=2)
+        assert summary["rows_checked"] == 3
+        assert [m["kind"] for m in mismatches] == ["amount_mismatch", "balance_mismatch"]
+
+    def test_full_run_reads_archived_ledger(self, file_db):
+        """测试订单账本归档后（充值留在主库）全量对账和增量对账都读取归档库，没有误报"""
+        core_ops, support_ops = CoreOperations(file_db), SupportingOperations(file_db)
+        admin_id = support_ops.register_user(open_id="admin", wechat_name="管理员")["user_id"]
+        file_db.conn.execute("UPDATE users SET is_admin = TRUE WHERE user_id = ?", [admin_id])
+        file_db.conn.commit()
+        user_id = support_ops.register_user(open_id="user", wechat_name="用户")["user_id"]
+        meal_id = core_ops.admin_publish_meal(admin_user_id=admin_id, date="2024-01-10", slot="lunch",
+                                              description="历史餐次", base_price_cents=500,
+                                              addon_config={}, max_orders=10)["meal_id"]
+
+        adjust(core_ops, admin_id, user_id, 1000)
+        core_ops.create_order(user_id, meal_id, {})
+        core_ops.admin_complete_meal(admin_id, meal_id)
+        adjust(core_ops, admin_id, user_id, 200)
+        # 归档前未核对过：归档后的增量对账需要读取归档库中的订单扣款
+        assert archive_cold_data(file_db, months=6, today=date(2030, 1, 1))["ledger"] == 1
+
+        mismatches, summary = run(file_db)
+        assert mismatches == []
+        assert summary["rows_checked"] == 3
+
+        reset_reconciliation(file_db)
+        mismatches, summary = run(file_db, chunk_size=2)
+        assert mismatches == []
+        assert summary["rows_checked"] == 3 and summary["complete"] is True
+        assert [row[1] for row in file_db.conn.execute("PRAGMA database_list")] == ["main"]
@@ -0,0 +1,74 @@
+# 模拟数据生成测试
+
+from datetime import date
+
+import pytest
+
+from db.manager import DatabaseManager
+from db.reconciliation import reconcile_ledger
+from db.seed_data import get_scale, seed_database
+from tests.conftest import create_test_tables
+
+END_DATE = date(2030, 6, 28)
+
+
+def _seeded_db(path, seed=7):
+    db = DatabaseManager(str(path), auto_connect=True)
+    create_test_tables(db)
+    summary = seed_database(db, get_scale("tiny"), END_DATE, seed=seed, batch_size=100)
+    return db, summary
+
+
+def _dump(conn):
+    return [conn.execute(f"SELECT * FROM {table} ORDER BY 1").fetchall()
+            for table in ("users", "meals", "orders", "ledger")]
+
+
+class TestSeedData:
+    """模拟数据生成测试"""
+
+    def test_reproducible(self, tmp_path):
+        """测试相同种子生成相同数据，不同种子生成不同数据"""
+        first, summary = _seeded_db(tmp_path / "a.db")
+        second, _ = _seeded_db(tmp_path / "b.db")
+        other, _ = _seeded_db(tmp_path / "c.db", seed=8)
+        try:
+            assert summary["orders"] > 0 and summary["ledger"] > summary["orders"]
+            assert [list(map(tuple, rows)) for rows in _dump(first.conn)] == \
+                [list(map(tuple, rows)) for rows in _dump(second.conn)]
+            assert _dump(first.conn)[3] != _dump(other.conn)[3]
+        finally:
+            for db in (first, second, other):
+                db.close()
+
+    def test_consistent(self, tmp_path):
+        """测试外键、账本链、用户余额和餐次订单数一致"""
+        db, _ = _seeded_db(tmp_path / "app.db")
+        conn = db.conn
+        try:
+            assert conn.execute("PRAGMA foreign_key_check").fetchall() == []
+            results = list(reconcile_ledger(db))
+            assert results[-1]["complete"] and results[-1]["mismatches"] == 0
+
+            assert conn.execute("""
+                SELECT COUNT(*) FROM meals m WHERE current_orders != (
+                    SELECT COUNT(*) FROM orders o WHERE o.meal_id = m.meal_id AND o.status IN ('active', 'completed')
+                )
+            """).fetchone()[0] == 0
+            # 结束日期之后的餐次为已发布，订单为有效状态
+            assert conn.execute("SELECT COUNT(*) FROM meals WHERE date > ? AND status != 'published'",
+                                [END_DATE.isoformat()]).fetchone()[0] == 0
+            assert conn.execute("SELECT COUNT(*) FROM meals WHERE status = 'published'").fetchone()[0] > 0
+        finally:
+            db.close()
+
+    def test_rejects_existing_users(self, tmp_path):
+        """测试已有用户的数据库拒绝写入"""
+        db, _ = _seeded_db(tmp_path / "app.db")
+        try:
+            with pytest.raises(ValueError):
+                seed_database(db, get_scale("tiny"), END_DATE)
+            with pytest.raises(ValueError):
+                get_scale("huge")
+        finally:
+            db.close()
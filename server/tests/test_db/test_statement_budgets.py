@@ -0,0 +1,71 @@
+# 热点路径SQL语句数预算测试
+# 预算为当前实现的语句数（不含事务控制语句）；优化后应同步调低，新增查询导致超出时先确认是否必要
+
+import pytest
+
+
+@pytest.fixture
+def funded_users(core_ops, support_ops, sample_admin_user):
+    """已充值的测试用户"""
+    user_ids = []
+    for index in range(5):
+        user_id = support_ops.register_user(open_id=f"budget_user_{index}", wechat_name=f"预算用户{index}")["user_id"]
+        core_ops.admin_adjust_balance(admin_user_id=sample_admin_user, target_user_id=user_id,
+                                      amount_cents=10000, reason="测试充值")
+        user_ids.append(user_id)
+    return user_ids
+
+
+class TestWriteBudgets:
+    """写操作语句数预算"""
+
+    @pytest.mark.parametrize("addon_count", [1, 8])
+    def test_create_order(self, core_ops, count_statements, funded_users, publish_addon_meal, addon_count):
+        """附加项价格一次查询，语句数与附加项数无关"""
+        meal_id, addon_ids = publish_addon_meal(addon_count)
+        with count_statements() as recorded:
+            core_ops.create_order(funded_users[0], meal_id, {addon_id: 1 for addon_id in addon_ids})
+        recorded.assert_at_most(13, f"create_order（{addon_count}个附加项）")
+
+    def test_cancel_order(self, core_ops, count_statements, funded_users, three_addon_meal):
+        meal_id, addon_ids = three_addon_meal
+        order_id = core_ops.create_order(funded_users[0], meal_id, {addon_ids[0]: 1})["order_id"]
+        with count_statements() as recorded:
+            core_ops.cancel_order(funded_users[0], order_id)
+        recorded.assert_at_most(12, "cancel_order")
+
+    @pytest.mark.parametrize("order_count", [1, 5])
+    def test_admin_cancel_meal(self, core_ops, count_statements, sample_admin_user, funded_users, three_addon_meal,
+                               order_count):
+        """退款、流水和订单取消均为集合操作，语句数与订单数无关"""
+        meal_id, _ = three_addon_meal
+        for user_id in funded_users[:order_count]:
+            core_ops.create_order(user_id, meal_id, {})
+        with count_statements() as recorded:
+            core_ops.admin_cancel_meal(sample_admin_user, meal_id)
+        recorded.assert_at_most(10, f"admin_cancel_meal（{order_count}个订单）")
+
+
+class TestQueryBudgets:
+    """查询语句数预算"""
+
+    def test_meals_by_date_range(self, query_ops, count_statements, three_addon_meal):
+        """归档段 + 餐次列表 + 总数"""
+        with count_statements() as recorded:
+            query_ops.query_meals_by_date_range("2024-12-01", "2024-12-31")
+        recorded.assert_at_most(3, "query_meals_by_date_range")
+
+    def test_meal_detail(self, query_ops, core_ops, count_statements, funded_users, three_addon_meal):
+        meal_id, _ = three_addon_meal
+        for user_id in funded_users:
+            core_ops.create_order(user_id, meal_id, {})
+        with count_statements() as recorded:
+            query_ops.query_meal_detail(meal_id)
+        recorded.assert_at_most(3, "query_meal_detail")
+
+    def test_ledger_history(self, query_ops, core_ops, count_statements, funded_users, three_addon_meal):
+        meal_id, _ = three_addon_meal
+        core_ops.create_order(funded_users[0], meal_id, {})
+        with count_statements() as recorded:
+            query_ops.query_user_ledger_history(funded_users[0])
+        recorded.assert_at_most(3, "query_user_ledger_history")
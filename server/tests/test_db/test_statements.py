@@ -0,0 +1,71 @@
+# 月度账单测试
+
+from datetime import date
+
+import pytest
+
+from db.statements import generate_monthly_statements, get_user_statement, month_range
+
+
+@pytest.fixture
+def file_db(file_db):
+    """带两个月账本记录的文件数据库"""
+    conn = file_db.conn
+    conn.executemany(
+        "INSERT INTO users (user_id, open_id, wechat_name) VALUES (?, ?, ?)",
+        [(1, "u1", "张三"), (2, "u2", "李四"), (3, "u3", "王五")]
+    )
+    conn.executemany("""
+        INSERT INTO ledger (ledger_id, transaction_no, user_id, type, direction, amount_cents,
+                            balance_before_cents, balance_after_cents, order_id, created_at)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+    """, [
+        (1, "TXN1", 1, "recharge", "in", 5000, 0, 5000, None, "2030-01-05 10:00:00"),
+        (2, "TXN2", 2, "recharge", "in", 3000, 0, 3000, None, "2030-01-06 10:00:00"),
+        (3, "TXN3", 1, "order", "out", 1500, 5000, 3500, 1, "2030-02-01 00:00:00"),
+        (4, "TXN4", 1, "refund", "in", 1500, 3500, 5000, 1, "2030-02-28 23:59:59"),
+        (5, "TXN5", 1, "order", "out", 1800, 5000, 3200, 2, "2030-02-28 23:59:59"),
+        (6, "TXN6", 2, "order", "out", 1000, 3000, 2000, 3, "2030-03-01 00:00:00"),
+    ])
+    conn.commit()
+    return file_db
+
+
+class TestMonthlyStatements:
+    """月度账单测试"""
+
+    def test_month_range(self):
+        """测试月份起止日期及格式校验"""
+        assert month_range("2030-12") == ("2030-12-01", "2031-01-01")
+        for month in ("2030-13", "2030-1", "abc"):
+            with pytest.raises(ValueError):
+                month_range(month)
+
+    def test_generate_month(self, file_db):
+        """测试按用户汇总当月记录，无记录的用户沿用之前余额"""
+        summary = generate_monthly_statements(file_db, "2030-02", chunk_size=1, today=date(2030, 3, 1))
+        assert (summary["statements"], summary["active_users"], summary["entries"]) == (2, 1, 3)
+
+        statement = get_user_statement(file_db.conn, 1, "2030-02")
+        assert (statement["opening_balance_cents"], statement["closing_balance_cents"]) == (5000, 3200)
+        assert (statement["total_in_cents"], statement["total_out_cents"]) == (1500, 3300)
+        assert [entry["ledger_id"] for entry in statement["entries"]] == [3, 4, 5]
+        assert statement["entries"][0]["order_id"] == 1
+
+        quiet = get_user_statement(file_db.conn, 2, "2030-02")
+        assert (quiet["opening_balance_cents"], quiet["closing_balance_cents"], quiet["entries"]) == (3000, 3000, [])
+
+        # 从未有账本记录的用户返回空账单，未生成的月份返回None
+        assert get_user_statement(file_db.conn, 3, "2030-02")["closing_balance_cents"] == 0
+        assert get_user_statement(file_db.conn, 1, "2030-01") is None
+
+    def test_next_month_carries_previous_statements(self, file_db):
+        """测试上月账单已生成时沿用上月期末余额，未结束的月份不能生成"""
+        generate_monthly_statements(file_db, "2030-02", today=date(2030, 3, 1))
+        with pytest.raises(ValueError):
+            generate_monthly_statements(file_db, "2030-03", today=date(2030, 3, 31))
+
+        generate_monthly_statements(file_db, "2030-03", today=date(2030, 4, 1))
+        assert get_user_statement(file_db.conn, 1, "2030-03")["opening_balance_cents"] == 3200
+        statement = get_user_statement(file_db.conn, 2, "2030-03")
+        assert (statement["opening_balance_cents"], statement["closing_balance_cents"]) == (3000, 2000)
@@ -225,6 +225,14 @@ class TestUsersList:
             assert user['is_admin'] is True
             assert user['is_admin_text'] == "是"
     
+    def test_query_users_list_fields(self, support_ops, sample_admin_user, sample_user):
+        """测试用户列表只返回所选字段"""
+        result = support_ops.query_users_list(fields={"wechat_name", "balance_yuan"})
+        
+        assert result['success'] is True
+        for user in result['data']['users']:
+            assert set(user.keys()) == {"user_id", "wechat_name", "balance_yuan"}
+    
     def test_query_users_list_filter_by_status(self, support_ops, sample_admin_user, sample_user):
         """测试按状态筛选用户"""
         # 先停用一个用户
@@ -0,0 +1,58 @@
+# 分析镜像刷新调度器
+# 租约保护的cron任务（多worker时只由一个worker执行），默认每10分钟增量刷新一次 DuckDB 镜像并导出 Parquet 快照
+# 未安装 duckdb、未启用或内存数据库时不创建任务
+
+import logging
+from typing import Any, Dict, Optional
+
+from db.analytics import DEFAULT_CHUNK_SIZE, is_analytics_available, refresh_mirror
+from utils.cron import CronSchedule
+from utils.scheduled_job import LeasedCronJob
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_REFRESH_SCHEDULE = "*/10 * * * *"
+
+
+class AnalyticsRefreshJob(LeasedCronJob):
+    """定时刷新分析镜像任务"""
+
+    lease_name = "analytics_refresh"
+    description = "分析镜像刷新"
+
+    def __init__(self, db_path: str, schedule: CronSchedule, mirror_dir: Optional[str] = None,
+                 chunk_size: int = DEFAULT_CHUNK_SIZE, **kwargs):
+        super().__init__(db_path, schedule, **kwargs)
+        self.mirror_dir = mirror_dir
+        self.chunk_size = chunk_size
+
+    def run_job(self) -> Dict[str, Any]:
+        return refresh_mirror(self.db_path, self.mirror_dir, self.chunk_size)
+
+
+def create_analytics_refresh_job() -> Optional[AnalyticsRefreshJob]:
+    """按配置创建分析镜像刷新任务"""
+    from utils.config import Config
+
+    config = Config()
+    db_path = config.get_database_config()["path"]
+    if db_path == ":memory:" or not config.get("analytics.enabled", True):
+        return None
+    if not is_analytics_available():
+        logger.info("未安装 duckdb，分析镜像刷新任务未启动")
+        return None
+
+    try:
+        schedule = CronSchedule(
+            config.get("analytics.refresh_schedule", DEFAULT_REFRESH_SCHEDULE),
+            config.get("business.timezone", "Asia/Shanghai")
+        )
+    except ValueError as e:
+        logger.error(f"分析镜像刷新计划配置错误，刷新任务未启动: {str(e)}")
+        return None
+
+    return AnalyticsRefreshJob(
+        db_path, schedule,
+        mirror_dir=config.get("analytics.mirror_dir"),
+        chunk_size=config.get("analytics.chunk_size", DEFAULT_CHUNK_SIZE)
+    )
@@ -0,0 +1,291 @@
+# 餐次截单自动锁定调度器
+# 按 business.order_deadline 配置的截单时间自动锁定餐次。每个worker启动一个调度任务，
+# 通过租约表选出唯一的leader执行；leader在内存中维护截单时间小顶堆，休眠到最近的截单时间，
+# 到期后用一条批量UPDATE锁定所有到期餐次。新发布/取消锁定的餐次通过餐次事件总线实时加入堆。
+
+import asyncio
+import heapq
+import logging
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Set, Tuple
+from zoneinfo import ZoneInfo
+
+from db.core_operations import CoreOperations
+from db.leases import acquire_lease, advance_lease_watermark, get_lease_watermark, new_lease_owner, release_lease
+from db.manager import DatabaseManager
+from utils.seat_reservation import get_seat_manager
+
+logger = logging.getLogger(__name__)
+
+LEASE_NAME = "auto_lock_meals"
+DEFAULT_LEASE_SECONDS = 30        # 租约时长（秒），leader每1/3租约时长续约一次
+DEFAULT_RESYNC_INTERVAL = 300     # 全量重新加载截单时间的间隔（秒），兜底事件丢失
+DEFAULT_TIMEZONE = "Asia/Shanghai"
+RETRY_DELAY = 5                   # 锁定失败后的重试间隔（秒）
+
+# 待截单的已发布餐次（db/query_plans.py 校验其执行计划）
+PUBLISHED_MEALS_SQL = "SELECT meal_id, date, slot FROM meals WHERE status = 'published' AND date >= ?"
+
+
+def meal_deadline(date: str, slot: str, deadlines: Dict[str, str], tz: ZoneInfo) -> Optional[float]:
+    """
+    计算餐次的截单时间
+
+    Args:
+        date: 餐次日期 (YYYY-MM-DD)
+        slot: 时段 (lunch/dinner)
+        deadlines: 各时段截单时间 {"lunch": "10:30"}
+        tz: 业务时区
+
+    Returns:
+        截单时间的Unix时间戳，时段未配置截单时间时返回None
+    """
+    deadline = deadlines.get(slot)
+    if not deadline:
+        return None
+    local = datetime.strptime(f"{date} {deadline}", "%Y-%m-%d %H:%M").replace(tzinfo=tz)
+    return local.timestamp()
+
+
+class AutoLockScheduler:
+    """
+    截单自动锁定调度器
+
+    调度进度（watermark）保存在租约行中，为最近一次处理的截单时间：
+    - 只调度截单时间晚于watermark的餐次，管理员在截单后手动取消锁定的餐次不会被再次锁定
+    - leader切换或服务重启后，停机期间错过截单的餐次会在接管时补锁
+    """
+
+    def __init__(self, db_path: str, deadlines: Dict[str, str], timezone: str = DEFAULT_TIMEZONE,
+                 lease_seconds: float = DEFAULT_LEASE_SECONDS,
+                 resync_interval: float = DEFAULT_RESYNC_INTERVAL, event_bus=None):
+        self.db_path = db_path
+        self.deadlines = deadlines
+        self.tz = ZoneInfo(timezone)
+        self.lease_seconds = lease_seconds
+        self.resync_interval = resync_interval
+        self.event_bus = event_bus
+        self.owner = new_lease_owner()
+        self.is_leader = False
+        self.watermark: Optional[float] = None
+
+        self._heap: List[Tuple[float, int]] = []
+        self._scheduled: Set[int] = set()
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self):
+        """在当前事件循环中启动调度任务"""
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self):
+        """停止调度任务并释放租约"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def schedule(self, meal_id: int, date: str, slot: str) -> bool:
+        """
+        将餐次加入截单时间堆
+
+        Returns:
+            是否加入（未配置截单时间、截单时间不晚于watermark或已在堆中时不加入）
+        """
+        if meal_id in self._scheduled:
+            return False
+        deadline = meal_deadline(date, slot, self.deadlines, self.tz)
+        if deadline is None or (self.watermark is not None and deadline <= self.watermark):
+            return False
+        heapq.heappush(self._heap, (deadline, meal_id))
+        self._scheduled.add(meal_id)
+        return True
+
+    def pop_due(self, now: float) -> List[Tuple[float, int]]:
+        """弹出所有截单时间已到的餐次"""
+        due = []
+        while self._heap and self._heap[0][0] <= now:
+            entry = heapq.heappop(self._heap)
+            self._scheduled.discard(entry[1])
+            due.append(entry)
+        return due
+
+    def next_deadline(self) -> Optional[float]:
+        return self._heap[0][0] if self._heap else None
+
+    def lock_due(self, db: DatabaseManager, due: List[Tuple[float, int]]) -> List[int]:
+        """
+        批量锁定到期餐次，并在同一事务内推进watermark（同时校验租约）
+
+        Returns:
+            实际锁定的餐次ID列表
+        """
+        watermark = max(deadline for deadline, _ in due)
+        result = CoreOperations(db).auto_lock_meals(
+            [meal_id for _, meal_id in due],
+            on_locked=lambda _: advance_lease_watermark(db, LEASE_NAME, self.owner, watermark)
+        )
+        self.watermark = max(self.watermark or 0, watermark)
+        return result['locked_meal_ids']
+
+    def resync(self, db: DatabaseManager):
+        """从数据库重新加载所有待截单的已发布餐次"""
+        self._heap = []
+        self._scheduled = set()
+        start_date = datetime.fromtimestamp(self.watermark, self.tz).date() - timedelta(days=1)
+        rows = db.conn.execute(PUBLISHED_MEALS_SQL, [start_date.isoformat()]).fetchall()
+        for row in rows:
+            self.schedule(row[0], row[1], row[2])
+
+    def _become_leader(self, db: DatabaseManager):
+        """成为leader：读取watermark（首次运行时从当前时间开始，不补锁历史餐次）并加载截单时间"""
+        self.watermark = get_lease_watermark(db, LEASE_NAME)
+        if self.watermark is None:
+            now = time.time()
+            db.execute_transaction([lambda: advance_lease_watermark(db, LEASE_NAME, self.owner, now)])
+            self.watermark = now
+        self.resync(db)
+
+    def _schedule_meals(self, db: DatabaseManager, meal_ids: Set[int]):
+        """将事件通知的已发布餐次加入截单时间堆"""
+        placeholders = ",".join("?" * len(meal_ids))
+        rows = db.conn.execute(
+            f"SELECT meal_id, date, slot FROM meals WHERE status = 'published' AND meal_id IN ({placeholders})",
+            list(meal_ids)
+        ).fetchall()
+        for row in rows:
+            self.schedule(row[0], row[1], row[2])
+
+    async def _run(self):
+        db = DatabaseManager(self.db_path, auto_connect=True)
+        # 任务被取消时线程中的数据库操作仍在执行，关闭连接前需等待其结束
+        db_lock = threading.Lock()
+
+        def run_locked(func, *args):
+            with db_lock:
+                return func(db, *args)
+
+        queue = None
+        last_resync = 0.0
+        try:
+            while True:
+                try:
+                    leader = await asyncio.to_thread(
+                        run_locked, acquire_lease, LEASE_NAME, self.owner, self.lease_seconds
+                    )
+                except Exception as e:
+                    logger.warning(f"自动锁定调度获取租约失败: {str(e)}")
+                    leader = False
+
+                if not leader:
+                    if self.is_leader:
+                        logger.info("自动锁定调度失去leader租约")
+                        self.is_leader = False
+                        self._heap, self._scheduled = [], set()
+                        if queue is not None:
+                            self.event_bus.unsubscribe(queue)
+                            queue = None
+                    await asyncio.sleep(self.lease_seconds / 2)
+                    continue
+
+                if not self.is_leader or time.monotonic() - last_resync > self.resync_interval:
+                    try:
+                        if not self.is_leader:
+                            # 先订阅再加载，避免加载期间发布的餐次遗漏
+                            if self.event_bus is not None and queue is None:
+                                queue = self.event_bus.subscribe()
+                            await asyncio.to_thread(run_locked, self._become_leader)
+                            self.is_leader = True
+                            logger.info(f"自动锁定调度成为leader，待截单餐次 {len(self._heap)} 个")
+                        else:
+                            await asyncio.to_thread(run_locked, self.resync)
+                        last_resync = time.monotonic()
+                    except Exception as e:
+                        logger.error(f"加载待截单餐次失败: {str(e)}")
+                        await asyncio.sleep(RETRY_DELAY)
+                        continue
+
+                due = self.pop_due(time.time())
+                if due:
+                    try:
+                        locked = await asyncio.to_thread(run_locked, self.lock_due, due)
+                        for meal_id in locked:
+                            get_seat_manager().invalidate(meal_id)
+                        logger.info(f"截单自动锁定餐次: {locked}")
+                    except Exception as e:
+                        logger.error(f"截单自动锁定失败: {str(e)}")
+                        for entry in due:
+                            heapq.heappush(self._heap, entry)
+                            self._scheduled.add(entry[1])
+                        await asyncio.sleep(RETRY_DELAY)
+                        continue
+
+                # 休眠到最近的截单时间、续约时间或下次全量加载，期间有餐次发布事件时提前唤醒
+                now = time.time()
+                timeout = min(self.lease_seconds / 3, self.resync_interval - (time.monotonic() - last_resync))
+                next_deadline = self.next_deadline()
+                if next_deadline is not None:
+                    timeout = min(timeout, next_deadline - now)
+                timeout = max(timeout, 0)
+
+                if queue is None:
+                    await asyncio.sleep(timeout)
+                    continue
+
+                try:
+                    events = [await asyncio.wait_for(queue.get(), timeout=timeout)]
+                except asyncio.TimeoutError:
+                    continue
+                while not queue.empty():
+                    events.append(queue.get_nowait())
+
+                meal_ids = {
+                    event["meal_id"] for event in events
+                    if event["type"] in ("publish", "unlock") and event["status"] == "published"
+                }
+                if meal_ids:
+                    try:
+                        await asyncio.to_thread(run_locked, self._schedule_meals, meal_ids)
+                    except Exception as e:
+                        # 下次全量加载时补上
+                        logger.warning(f"加入待截单餐次失败: {str(e)}")
+        finally:
+            if queue is not None:
+                self.event_bus.unsubscribe(queue)
+            self.is_leader = False
+
+            def shutdown():
+                with db_lock:
+                    try:
+                        release_lease(db, LEASE_NAME, self.owner)
+                    except Exception as e:
+                        logger.warning(f"释放自动锁定调度租约失败: {str(e)}")
+                    db.close()
+
+            # 取消时不能再等待线程，直接同步释放
+            shutdown()
+
+
+def create_auto_lock_scheduler() -> Optional[AutoLockScheduler]:
+    """按配置创建截单自动锁定调度器，未启用或未配置截单时间时返回None"""
+    from utils.config import Config
+    from utils.event_bus import get_meal_event_bus
+
+    config = Config()
+    deadlines = config.get("business.order_deadline")
+    if not deadlines or not config.get("business.auto_lock.enabled", True):
+        return None
+
+    return AutoLockScheduler(
+        db_path=config.get_database_config()["path"],
+        deadlines=deadlines,
+        timezone=config.get("business.timezone", DEFAULT_TIMEZONE),
+        lease_seconds=config.get("business.auto_lock.lease_seconds", DEFAULT_LEASE_SECONDS),
+        resync_interval=config.get("business.auto_lock.resync_interval", DEFAULT_RESYNC_INTERVAL),
+        event_bus=get_meal_event_bus()
+    )
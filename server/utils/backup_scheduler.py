@@ -0,0 +1,82 @@
+# 数据库定时备份调度器
+# 按 database.backup_schedule（cron表达式）定时执行在线备份，多worker时通过租约只由一个worker执行
+
+import logging
+import os
+import sqlite3
+from typing import Any, Dict, Optional
+
+from db.backup import (
+    DEFAULT_KEEP, DEFAULT_PAGES_PER_STEP, DEFAULT_STEP_SLEEP, backup_file_name, online_backup, rotate_backups
+)
+from utils.cron import CronSchedule
+from utils.scheduled_job import DEFAULT_LEASE_SECONDS, LeasedCronJob
+
+logger = logging.getLogger(__name__)
+
+LEASE_NAME = "database_backup"
+
+
+class BackupScheduler(LeasedCronJob):
+    """定时在线备份任务"""
+
+    lease_name = LEASE_NAME
+    description = "数据库定时备份"
+
+    def __init__(self, db_path: str, schedule: CronSchedule, backup_dir: str,
+                 keep: int = DEFAULT_KEEP, compress: bool = True,
+                 pages_per_step: int = DEFAULT_PAGES_PER_STEP,
+                 step_sleep: float = DEFAULT_STEP_SLEEP,
+                 lease_seconds: float = DEFAULT_LEASE_SECONDS):
+        super().__init__(db_path, schedule, lease_seconds=lease_seconds)
+        self.backup_dir = backup_dir
+        self.keep = keep
+        self.compress = compress
+        self.pages_per_step = pages_per_step
+        self.step_sleep = step_sleep
+
+    def run_job(self) -> Dict[str, Any]:
+        """备份到备份目录并清理超出保留份数的旧备份"""
+        backup_path = os.path.join(self.backup_dir, backup_file_name(self.db_path, compress=self.compress))
+        # 使用独立连接，备份期间不影响调度协程续约
+        conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        try:
+            result = online_backup(
+                conn, backup_path,
+                pages_per_step=self.pages_per_step,
+                step_sleep=self.step_sleep,
+                compress=self.compress
+            )
+        finally:
+            conn.close()
+
+        result["removed"] = rotate_backups(self.backup_dir, self.db_path, self.keep)
+        return result
+
+
+def create_backup_scheduler() -> Optional[BackupScheduler]:
+    """按配置创建定时备份调度器，未启用、未配置备份时间或内存数据库时返回None"""
+    from utils.config import Config
+
+    config = Config()
+    db_config = config.get_database_config()
+    schedule = db_config.get("backup_schedule")
+    db_path = db_config["path"]
+    if not db_config.get("backup_enabled") or not schedule or db_path == ":memory:":
+        return None
+
+    try:
+        cron = CronSchedule(schedule, config.get("business.timezone", "Asia/Shanghai"))
+    except ValueError as e:
+        logger.error(f"数据库备份计划配置错误，定时备份未启动: {str(e)}")
+        return None
+
+    return BackupScheduler(
+        db_path=db_path,
+        schedule=cron,
+        backup_dir=db_config.get("backup_dir") or os.path.join(os.path.dirname(db_path), "backups"),
+        keep=db_config.get("backup_keep", DEFAULT_KEEP),
+        compress=db_config.get("backup_compress", True),
+        pages_per_step=db_config.get("backup_pages_per_step", DEFAULT_PAGES_PER_STEP),
+        step_sleep=db_config.get("backup_step_sleep_ms", DEFAULT_STEP_SLEEP * 1000) / 1000
+    )
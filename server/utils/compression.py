@@ -0,0 +1,99 @@
+# 响应压缩工具
+# 负责Accept-Encoding协商以及gzip/brotli压缩，供压缩中间件和响应缓存共用
+
+import gzip
+from typing import Optional
+
+try:
+    import brotli
+except ImportError:  # brotli 未安装时仅提供 gzip
+    brotli = None
+
+# 可压缩的响应类型（按前缀匹配）
+COMPRESSIBLE_TYPES = (
+    "application/json",
+    "application/javascript",
+    "text/",
+)
+
+DEFAULT_MINIMUM_SIZE = 1024
+DEFAULT_GZIP_LEVEL = 6
+DEFAULT_BROTLI_QUALITY = 4
+
+
+def supported_encodings() -> list:
+    """
+    返回服务端支持的编码，按优先级排序
+    """
+    return ["br", "gzip"] if brotli is not None else ["gzip"]
+
+
+def negotiate_encoding(accept_encoding: Optional[str]) -> Optional[str]:
+    """
+    根据Accept-Encoding请求头选择压缩编码
+
+    Args:
+        accept_encoding: 客户端Accept-Encoding请求头
+
+    Returns:
+        选中的编码（br/gzip），无可用编码时返回None
+    """
+    if not accept_encoding:
+        return None
+
+    accepted = {}
+    for part in accept_encoding.split(","):
+        token, _, params = part.strip().partition(";")
+        token = token.strip().lower()
+        if not token:
+            continue
+        quality = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        accepted[token] = quality
+
+    wildcard = accepted.get("*", 0.0)
+    for encoding in supported_encodings():
+        if accepted.get(encoding, wildcard) > 0:
+            return encoding
+    return None
+
+
+def is_compressible(content_type: Optional[str]) -> bool:
+    """
+    判断响应类型是否适合压缩
+    """
+    if not content_type:
+        return False
+    content_type = content_type.lower()
+    if content_type.startswith("text/event-stream"):
+        return False
+    return content_type.startswith(COMPRESSIBLE_TYPES)
+
+
+def compress(body: bytes, encoding: str,
+             gzip_level: int = DEFAULT_GZIP_LEVEL,
+             brotli_quality: int = DEFAULT_BROTLI_QUALITY) -> bytes:
+    """
+    按指定编码压缩响应体
+
+    Args:
+        body: 原始响应体
+        encoding: br 或 gzip
+        gzip_level: gzip压缩级别
+        brotli_quality: brotli压缩质量
+
+    Returns:
+        压缩后的字节串
+    """
+    if encoding == "br":
+        if brotli is None:
+            raise ValueError("brotli 未安装，无法使用br编码")
+        return brotli.compress(body, quality=brotli_quality)
+    if encoding == "gzip":
+        return gzip.compress(body, compresslevel=gzip_level, mtime=0)
+    raise ValueError(f"不支持的压缩编码: {encoding}")
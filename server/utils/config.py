@@ -34,7 +34,7 @@ def _process_config_values(config: Dict[str, Any]) -> Dict[str, Any]:
 def load_config() -> Dict[str, Any]:
     """
     加载配置文件
-    根据 CONFIG_ENV 环境变量选择配置文件
+    根据 CONFIG_ENV 环境变量选择配置文件；设置 CONFIG_FILE 时直接使用该文件（压测等临时环境）
     参考文档: doc/server_structure.md - 配置管理
     
     Returns:
@@ -49,7 +49,7 @@ def load_config() -> Dict[str, Any]:
         'development-remote': 'config/config-dev-remote.json'
     }
     
-    config_file = config_files.get(config_env, 'config/config.json')
+    config_file = os.getenv('CONFIG_FILE') or config_files.get(config_env, 'config/config.json')
     
     # 确保配置文件路径是绝对路径
     if not os.path.isabs(config_file):
@@ -0,0 +1,110 @@
+# Cron表达式解析
+# 支持标准5字段格式（分 时 日 月 周），字段支持 *、数字、逗号列表、a-b 范围和 /n 步长，
+# 用于按配置（如 database.backup_schedule）计算后台任务的下次执行时间
+
+from datetime import datetime, timedelta
+from typing import Set
+from zoneinfo import ZoneInfo
+
+# 各字段取值范围（周字段 0 和 7 都表示周日）
+FIELD_RANGES = [(0, 59), (0, 23), (1, 31), (1, 12), (0, 7)]
+MAX_SEARCH_DAYS = 366 * 5
+
+
+def _parse_field(field: str, low: int, high: int) -> Set[int]:
+    """解析单个字段为取值集合"""
+    values = set()
+    for part in field.split(","):
+        step = 1
+        if "/" in part:
+            part, step_text = part.split("/", 1)
+            step = int(step_text)
+            if step <= 0:
+                raise ValueError(f"步长必须为正数: {field}")
+
+        if part == "*":
+            start, end = low, high
+        elif "-" in part:
+            start_text, end_text = part.split("-", 1)
+            start, end = int(start_text), int(end_text)
+        else:
+            start = int(part)
+            # 单个数字带步长（如 5/15）表示从该值开始到最大值
+            end = high if step > 1 else start
+
+        if start < low or end > high or start > end:
+            raise ValueError(f"取值超出范围 {low}-{high}: {field}")
+        values.update(range(start, end + 1, step))
+    return values
+
+
+class CronSchedule:
+    """
+    Cron调度表达式
+
+    日和周字段都有限制时按标准cron语义取并集（满足其一即可）
+    """
+
+    def __init__(self, expression: str, timezone: str = "Asia/Shanghai"):
+        """
+        Args:
+            expression: 5字段cron表达式，如 "0 2 * * *"
+            timezone: 计算执行时间使用的时区
+
+        Raises:
+            ValueError: 表达式格式错误
+        """
+        fields = expression.split()
+        if len(fields) != 5:
+            raise ValueError(f"cron表达式必须为5个字段: {expression}")
+
+        try:
+            parsed = [_parse_field(field, low, high) for field, (low, high) in zip(fields, FIELD_RANGES)]
+        except ValueError as e:
+            raise ValueError(f"cron表达式格式错误: {expression} ({str(e)})")
+
+        self.expression = expression
+        self.tz = ZoneInfo(timezone)
+        self.minutes, self.hours, self.days, self.months, weekdays = parsed
+        # cron周日为0（或7），Python weekday() 周一为0
+        self.weekdays = {(day - 1) % 7 for day in weekdays}
+        self._day_restricted = fields[2] != "*"
+        self._weekday_restricted = fields[4] != "*"
+
+    def _day_matches(self, moment: datetime) -> bool:
+        day_match = moment.day in self.days
+        weekday_match = moment.weekday() in self.weekdays
+        if self._day_restricted and self._weekday_restricted:
+            return day_match or weekday_match
+        return day_match and weekday_match
+
+    def next_after(self, timestamp: float) -> float:
+        """
+        计算指定时间之后（不含）的下一次执行时间
+
+        Args:
+            timestamp: Unix时间戳
+
+        Returns:
+            下次执行时间的Unix时间戳
+
+        Raises:
+            ValueError: 表达式在可搜索范围内没有执行时间（如 2月30日）
+        """
+        moment = datetime.fromtimestamp(timestamp, self.tz).replace(second=0, microsecond=0) + timedelta(minutes=1)
+        limit = moment + timedelta(days=MAX_SEARCH_DAYS)
+
+        while moment < limit:
+            if moment.month not in self.months:
+                year, month = (moment.year + 1, 1) if moment.month == 12 else (moment.year, moment.month + 1)
+                moment = moment.replace(year=year, month=month, day=1, hour=0, minute=0)
+            elif not self._day_matches(moment):
+                moment = moment.replace(hour=0, minute=0) + timedelta(days=1)
+            elif moment.hour not in self.hours:
+                moment = moment.replace(minute=0) + timedelta(hours=1)
+            elif moment.minute not in self.minutes:
+                moment += timedelta(minutes=1)
+            else:
+                return moment.timestamp()
+
+        raise ValueError(f"cron表达式没有可执行时间: {self.expression}")
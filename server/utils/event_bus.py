@@ -0,0 +1,163 @@
+# 餐次事件总线
+# 进程内发布/订阅：每个worker用一个后台任务轮询 meal_events 变更表，再分发给本进程的SSE订阅者，
+# 所有worker读取同一张表，因此任一worker提交的变更都会推送到全部连接
+
+import asyncio
+import logging
+import threading
+import time
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from db.manager import DatabaseManager
+from db.meal_events import (
+    fetch_meal_events_after, get_latest_event_id, prune_meal_events
+)
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_POLL_INTERVAL = 0.5        # 变更表轮询间隔（秒）
+DEFAULT_RETENTION_SECONDS = 600    # 事件保留时长（秒），决定断线重连可补发的范围
+DEFAULT_QUEUE_SIZE = 100           # 每个订阅者的缓冲事件数，慢消费者丢弃最旧事件
+PRUNE_INTERVAL = 60                # 清理过期事件的间隔（秒）
+
+
+class MealEventBus:
+    """
+    餐次事件总线
+
+    有订阅者时才启动轮询任务，最后一个订阅者退出后轮询任务自动结束
+    """
+
+    def __init__(self, db_path: str, poll_interval: float = DEFAULT_POLL_INTERVAL,
+                 retention_seconds: int = DEFAULT_RETENTION_SECONDS,
+                 queue_size: int = DEFAULT_QUEUE_SIZE):
+        self.db_path = db_path
+        self.poll_interval = poll_interval
+        self.retention_seconds = retention_seconds
+        self.queue_size = queue_size
+        self._subscribers: Dict[asyncio.Queue, Optional[Set[int]]] = {}
+        self._poll_task: Optional[asyncio.Task] = None
+        self._poll_started: Optional[asyncio.Event] = None
+        self._last_event_id = 0
+
+    @property
+    def subscriber_count(self) -> int:
+        return len(self._subscribers)
+
+    def subscribe(self, meal_ids: Optional[Set[int]] = None) -> asyncio.Queue:
+        """
+        订阅餐次事件
+
+        Args:
+            meal_ids: 只接收这些餐次的事件，None表示全部
+
+        Returns:
+            事件队列
+        """
+        queue = asyncio.Queue(maxsize=self.queue_size)
+        self._subscribers[queue] = meal_ids
+
+        if self._poll_task is None or self._poll_task.done():
+            self._poll_started = asyncio.Event()
+            self._poll_task = asyncio.get_running_loop().create_task(self._poll_loop(self._poll_started))
+
+        return queue
+
+    async def catch_up(self, last_event_id: Optional[int]) -> Tuple[int, List[Dict[str, Any]]]:
+        """
+        订阅者的起始位置和需要补发的事件
+
+        须在 subscribe 之后调用。等轮询任务读到起始事件ID后再补发，此后提交的事件都会进入订阅队列，
+        补发与实时事件之间不会遗漏；补发在线程中用独立的短连接读取（不使用请求的数据库连接，不阻塞事件循环）
+
+        Args:
+            last_event_id: 客户端已收到的最大事件ID，None表示从当前最新事件之后开始
+
+        Returns:
+            (起始事件ID, 补发事件列表)；last_event_id 为None时补发列表为空
+        """
+        await self._poll_started.wait()
+        if last_event_id is None:
+            # 已进入队列的事件都不大于该ID，会按事件ID去重跳过
+            return self._last_event_id, []
+
+        def read():
+            db = DatabaseManager(self.db_path, auto_connect=True)
+            try:
+                return fetch_meal_events_after(db.conn, last_event_id)
+            finally:
+                db.close()
+
+        return last_event_id, await asyncio.to_thread(read)
+
+    def unsubscribe(self, queue: asyncio.Queue):
+        """取消订阅"""
+        self._subscribers.pop(queue, None)
+
+    def dispatch(self, events: List[Dict[str, Any]]):
+        """
+        将事件分发给本进程的订阅者
+
+        Args:
+            events: 按事件ID升序的事件列表
+        """
+        for event in events:
+            for queue, meal_ids in list(self._subscribers.items()):
+                if meal_ids is not None and event["meal_id"] not in meal_ids:
+                    continue
+                if queue.full():
+                    # 慢消费者：丢弃最旧事件，客户端可通过Last-Event-ID重连补发
+                    queue.get_nowait()
+                queue.put_nowait(event)
+
+    async def _poll_loop(self, started: asyncio.Event):
+        """轮询变更表，直到没有订阅者；读到起始事件ID后设置 started"""
+        db = DatabaseManager(self.db_path, auto_connect=True)
+        # 任务被取消时线程中的查询仍在执行，关闭连接前需等待其结束
+        db_lock = threading.Lock()
+
+        def run_locked(func, *args):
+            with db_lock:
+                return func(db.conn, *args)
+
+        try:
+            self._last_event_id = await asyncio.to_thread(run_locked, get_latest_event_id)
+            started.set()
+            last_prune = time.monotonic()
+
+            while self._subscribers:
+                await asyncio.sleep(self.poll_interval)
+
+                try:
+                    events = await asyncio.to_thread(run_locked, fetch_meal_events_after, self._last_event_id)
+                    if events:
+                        self._last_event_id = events[-1]["event_id"]
+                        self.dispatch(events)
+
+                    if time.monotonic() - last_prune > PRUNE_INTERVAL:
+                        last_prune = time.monotonic()
+                        await asyncio.to_thread(run_locked, prune_meal_events, self.retention_seconds)
+                except Exception as e:
+                    logger.warning(f"轮询餐次事件失败: {str(e)}")
+        finally:
+            started.set()
+            with db_lock:
+                db.close()
+
+
+_bus: Optional[MealEventBus] = None
+
+
+def get_meal_event_bus() -> MealEventBus:
+    """获取当前进程的餐次事件总线（首次调用时按配置创建）"""
+    global _bus
+    if _bus is None:
+        from utils.config import Config
+        config = Config()
+        _bus = MealEventBus(
+            db_path=config.get_database_config()["path"],
+            poll_interval=config.get("events.poll_interval", DEFAULT_POLL_INTERVAL),
+            retention_seconds=config.get("events.retention_seconds", DEFAULT_RETENTION_SECONDS),
+            queue_size=config.get("events.queue_size", DEFAULT_QUEUE_SIZE)
+        )
+    return _bus
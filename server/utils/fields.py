@@ -0,0 +1,93 @@
+# 稀疏字段选择工具
+# 解析 fields= 查询参数，并将输出字段映射为其依赖的底层字段/数据库列
+
+from typing import Any, Callable, Dict, Iterable, List, Optional, Set
+
+
+def parse_fields(fields: Optional[str], available: Iterable[str]) -> Optional[Set[str]]:
+    """
+    解析逗号分隔的字段列表
+
+    Args:
+        fields: fields查询参数，如 "meal_id,date,status"
+        available: 允许选择的字段
+
+    Returns:
+        选中的字段集合，未指定时返回None（表示全部字段）
+
+    Raises:
+        ValueError: 包含不支持的字段时抛出
+    """
+    if fields is None or not fields.strip():
+        return None
+
+    selected = {name.strip() for name in fields.split(",") if name.strip()}
+    unknown = selected - set(available)
+    if unknown:
+        raise ValueError(f"不支持的字段: {', '.join(sorted(unknown))}")
+
+    return selected
+
+
+def expand_fields(selected: Optional[Set[str]],
+                  sources: Dict[str, Iterable[str]]) -> Optional[Set[str]]:
+    """
+    将输出字段展开为其依赖的底层字段
+
+    Args:
+        selected: 选中的输出字段，None表示全部
+        sources: 输出字段 -> 依赖字段，未列出的字段依赖自身
+
+    Returns:
+        依赖字段集合，None表示全部
+    """
+    if selected is None:
+        return None
+
+    expanded = set()
+    for name in selected:
+        expanded.update(sources.get(name, (name,)))
+    return expanded
+
+
+def select_columns(selected: Optional[Set[str]], field_columns: Dict[str, Iterable[str]],
+                   always: Iterable[str] = ()) -> List[str]:
+    """
+    根据选中字段生成SQL投影列（保持field_columns中的声明顺序）
+
+    Args:
+        selected: 选中的输出字段，None表示全部
+        field_columns: 输出字段 -> 所需SQL列表达式
+        always: 始终需要查询的列（如主键、排序键）
+
+    Returns:
+        去重后的SQL列表达式列表
+    """
+    columns = list(always)
+    for name, field_cols in field_columns.items():
+        if selected is not None and name not in selected:
+            continue
+        for column in field_cols:
+            if column not in columns:
+                columns.append(column)
+    return columns
+
+
+def build_record(source: Any, formatters: Dict[str, Callable[[Any], Any]],
+                 selected: Optional[Set[str]]) -> Dict[str, Any]:
+    """
+    按选中字段格式化单条记录
+
+    Args:
+        source: 原始行（sqlite3.Row 或 dict）
+        formatters: 输出字段 -> 取值函数
+        selected: 选中的输出字段，None表示全部
+
+    Returns:
+        只包含选中字段的字典
+    """
+    return {
+        name: formatter(source)
+        for name, formatter in formatters.items()
+        if selected is None or name in selected
+    }
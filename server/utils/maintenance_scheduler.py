@@ -0,0 +1,106 @@
+# 数据库维护调度器
+# 两个租约保护的cron任务（多worker时各自只由一个worker执行）：
+# - WAL检查点：默认每5分钟一次 PASSIVE 检查点，WAL超过阈值时升级为 TRUNCATE
+# - 空闲时段维护：默认每天 03:30 分步增量清理 + PRAGMA optimize + 检查点
+# 每个步骤的耗时和释放页数随任务结果记录到日志
+
+import logging
+import sqlite3
+from typing import Any, Dict, List
+
+from db.maintenance import (
+    DEFAULT_VACUUM_MAX_SECONDS, DEFAULT_VACUUM_STEP_PAGES, DEFAULT_WAL_TRUNCATE_BYTES,
+    checkpoint_wal, run_incremental_maintenance
+)
+from utils.cron import CronSchedule
+from utils.scheduled_job import LeasedCronJob
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CHECKPOINT_SCHEDULE = "*/5 * * * *"
+DEFAULT_MAINTENANCE_SCHEDULE = "30 3 * * *"
+
+
+class CheckpointJob(LeasedCronJob):
+    """定时WAL检查点任务"""
+
+    lease_name = "wal_checkpoint"
+    description = "WAL检查点"
+
+    def __init__(self, db_path: str, schedule: CronSchedule,
+                 truncate_threshold: int = DEFAULT_WAL_TRUNCATE_BYTES, **kwargs):
+        super().__init__(db_path, schedule, **kwargs)
+        self.truncate_threshold = truncate_threshold
+
+    def run_job(self) -> Dict[str, Any]:
+        conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        try:
+            return checkpoint_wal(conn, self.db_path, self.truncate_threshold)
+        finally:
+            conn.close()
+
+
+class MaintenanceJob(LeasedCronJob):
+    """空闲时段增量维护任务"""
+
+    lease_name = "database_maintenance"
+    description = "数据库增量维护"
+
+    def __init__(self, db_path: str, schedule: CronSchedule,
+                 truncate_threshold: int = DEFAULT_WAL_TRUNCATE_BYTES,
+                 vacuum_step_pages: int = DEFAULT_VACUUM_STEP_PAGES,
+                 vacuum_max_seconds: float = DEFAULT_VACUUM_MAX_SECONDS, **kwargs):
+        super().__init__(db_path, schedule, **kwargs)
+        self.truncate_threshold = truncate_threshold
+        self.vacuum_step_pages = vacuum_step_pages
+        self.vacuum_max_seconds = vacuum_max_seconds
+
+    def run_job(self) -> Dict[str, Any]:
+        conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        try:
+            steps = run_incremental_maintenance(
+                conn, self.db_path,
+                truncate_threshold=self.truncate_threshold,
+                vacuum_step_pages=self.vacuum_step_pages,
+                vacuum_max_seconds=self.vacuum_max_seconds
+            )
+        finally:
+            conn.close()
+        return {
+            "steps": steps,
+            "pages_freed": sum(step["pages_freed"] for step in steps),
+            "duration_ms": round(sum(step["duration_ms"] for step in steps), 1)
+        }
+
+
+def create_maintenance_schedulers() -> List[LeasedCronJob]:
+    """按配置创建维护任务，未启用或内存数据库时返回空列表"""
+    from utils.config import Config
+
+    config = Config()
+    db_path = config.get_database_config()["path"]
+    if db_path == ":memory:" or not config.get("database.maintenance.enabled", True):
+        return []
+
+    timezone = config.get("business.timezone", "Asia/Shanghai")
+    truncate_threshold = config.get("database.maintenance.wal_truncate_mb", 64) * 1024 * 1024
+    try:
+        checkpoint_schedule = CronSchedule(
+            config.get("database.maintenance.checkpoint_schedule", DEFAULT_CHECKPOINT_SCHEDULE), timezone
+        )
+        maintenance_schedule = CronSchedule(
+            config.get("database.maintenance.schedule", DEFAULT_MAINTENANCE_SCHEDULE), timezone
+        )
+    except ValueError as e:
+        logger.error(f"数据库维护计划配置错误，维护任务未启动: {str(e)}")
+        return []
+
+    return [
+        CheckpointJob(db_path, checkpoint_schedule, truncate_threshold=truncate_threshold),
+        MaintenanceJob(
+            db_path, maintenance_schedule,
+            truncate_threshold=truncate_threshold,
+            vacuum_step_pages=config.get("database.maintenance.vacuum_step_pages", DEFAULT_VACUUM_STEP_PAGES),
+            vacuum_max_seconds=config.get("database.maintenance.vacuum_max_seconds", DEFAULT_VACUUM_MAX_SECONDS)
+        )
+    ]
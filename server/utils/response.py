@@ -1,52 +1,112 @@
 # 参考文档: doc/api.md 统一响应格式
 # 统一API响应格式工具
 
+import sqlite3
 from datetime import datetime
+from decimal import Decimal
 from typing import Any, Dict, Optional
 
+import orjson
+from fastapi.responses import JSONResponse
+
+
+def _orjson_default(obj: Any) -> Any:
+    """
+    orjson 无法原生处理的类型的序列化回调
+
+    datetime/date/uuid 等由 orjson 原生处理，这里只补充数据库行和少量边缘类型
+    """
+    if isinstance(obj, sqlite3.Row):
+        return dict(zip(obj.keys(), obj))
+    if isinstance(obj, Decimal):
+        return float(obj)
+    if isinstance(obj, (set, frozenset)):
+        return list(obj)
+    if isinstance(obj, bytes):
+        return obj.decode('utf-8', errors='replace')
+    if hasattr(obj, 'model_dump'):
+        return obj.model_dump()
+    raise TypeError(f"无法序列化类型: {type(obj).__name__}")
+
+
+def dumps(content: Any) -> bytes:
+    """
+    将响应内容直接序列化为JSON字节串
+
+    Args:
+        content: 响应内容
+
+    Returns:
+        UTF-8编码的JSON字节串
+    """
+    return orjson.dumps(content, default=_orjson_default, option=orjson.OPT_NON_STR_KEYS)
+
+
+class FastJSONResponse(JSONResponse):
+    """
+    基于orjson的JSON响应
+
+    作为应用默认响应类使用。路由直接返回该响应对象时，FastAPI 会跳过
+    response_model 校验和 jsonable_encoder，由 orjson 一次性序列化为字节
+    """
+    media_type = "application/json"
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
+
 
 def create_success_response(
-    data: Any = None, 
-    message: str = "操作成功"
-) -> Dict[str, Any]:
+    data: Any = None,
+    message: str = "操作成功",
+    status_code: int = 200
+) -> FastJSONResponse:
     """
     创建成功响应
-    
+
     Args:
         data: 响应数据
         message: 成功消息
-        
+        status_code: HTTP状态码
+
     Returns:
         标准格式的成功响应
     """
-    return {
-        "success": True,
-        "data": data,
-        "message": message,
-        "timestamp": datetime.utcnow().isoformat() + "Z"
-    }
+    return FastJSONResponse(
+        content={
+            "success": True,
+            "data": data,
+            "message": message,
+            "timestamp": datetime.utcnow().isoformat() + "Z"
+        },
+        status_code=status_code
+    )
 
 
 def create_error_response(
     error: str,
-    data: Any = None
-) -> Dict[str, Any]:
+    data: Any = None,
+    status_code: int = 200
+) -> FastJSONResponse:
     """
     创建错误响应
-    
+
     Args:
         error: 错误描述信息
         data: 可选的错误数据
-        
+        status_code: HTTP状态码（业务错误默认仍返回200）
+
     Returns:
         标准格式的错误响应
     """
-    return {
-        "success": False,
-        "error": error,
-        "data": data,
-        "timestamp": datetime.utcnow().isoformat() + "Z"
-    }
+    return FastJSONResponse(
+        content={
+            "success": False,
+            "error": error,
+            "data": data,
+            "timestamp": datetime.utcnow().isoformat() + "Z"
+        },
+        status_code=status_code
+    )
 
 
 def create_pagination_response(
@@ -55,27 +115,26 @@ def create_pagination_response(
     current_page: int,
     per_page: int,
     message: str = "查询成功"
-) -> Dict[str, Any]:
+) -> FastJSONResponse:
     """
     创建分页响应
-    
+
     Args:
         items: 数据项列表
         total_count: 总记录数
         current_page: 当前页码
         per_page: 每页数量
         message: 成功消息
-        
+
     Returns:
         标准格式的分页响应
     """
     total_pages = (total_count + per_page - 1) // per_page  # 向上取整
     has_next = current_page < total_pages
     has_prev = current_page > 1
-    
-    return {
-        "success": True,
-        "data": {
+
+    return create_success_response(
+        data={
             "items": items,
             "pagination": {
                 "total_count": total_count,
@@ -86,6 +145,5 @@ def create_pagination_response(
                 "has_prev": has_prev
             }
         },
-        "message": message,
-        "timestamp": datetime.utcnow().isoformat() + "Z"
-    }
\ No newline at end of file
+        message=message
+    )
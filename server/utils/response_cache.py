@@ -0,0 +1,122 @@
+# 响应缓存工具
+# 按缓存键+数据版本缓存已序列化的响应体，并在同一条目中保存各编码的预压缩结果
+
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Optional
+
+from fastapi import Response
+
+from utils.compression import compress, DEFAULT_GZIP_LEVEL, DEFAULT_BROTLI_QUALITY
+
+
+class CachedResponse:
+    """
+    单个缓存条目
+
+    保存原始JSON字节及按需生成的压缩字节，每个缓存版本每种编码只压缩一次
+    """
+
+    def __init__(self, version: Any, body: bytes, status_code: int = 200,
+                 media_type: str = "application/json"):
+        self.version = version
+        self.body = body
+        self.status_code = status_code
+        self.media_type = media_type
+        self.encoded: Dict[str, bytes] = {}
+        self._lock = threading.Lock()
+
+    def get_body(self, encoding: Optional[str],
+                 gzip_level: int = DEFAULT_GZIP_LEVEL,
+                 brotli_quality: int = DEFAULT_BROTLI_QUALITY) -> bytes:
+        """
+        获取指定编码的响应体，首次请求时压缩并保存
+        """
+        if encoding is None:
+            return self.body
+
+        with self._lock:
+            if encoding not in self.encoded:
+                self.encoded[encoding] = compress(
+                    self.body, encoding, gzip_level=gzip_level, brotli_quality=brotli_quality
+                )
+            return self.encoded[encoding]
+
+    def to_response(self, encoding: Optional[str], minimum_size: int = 0) -> Response:
+        """
+        构造响应对象，压缩编码由调用方根据Accept-Encoding协商得出
+
+        Args:
+            encoding: 协商得到的编码，None表示不压缩
+            minimum_size: 原始响应体小于该值时不压缩
+        """
+        if encoding is not None and len(self.body) < minimum_size:
+            encoding = None
+
+        headers = {"Vary": "Accept-Encoding"}
+        if encoding is not None:
+            headers["Content-Encoding"] = encoding
+
+        return Response(
+            content=self.get_body(encoding),
+            status_code=self.status_code,
+            media_type=self.media_type,
+            headers=headers
+        )
+
+
+class ResponseCache:
+    """
+    进程内LRU响应缓存
+
+    条目以 (key, version) 方式校验：版本不一致视为失效并在下次写入时替换
+    """
+
+    def __init__(self, max_entries: int = 64):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Hashable, CachedResponse]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable, version: Any) -> Optional[CachedResponse]:
+        """
+        获取缓存条目，版本不匹配时返回None
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry.version != version:
+                return None
+            self._entries.move_to_end(key)
+            return entry
+
+    def put(self, key: Hashable, version: Any, response: Response) -> CachedResponse:
+        """
+        将已渲染的响应写入缓存
+
+        Args:
+            key: 缓存键
+            version: 数据版本
+            response: 已渲染的响应对象（使用其body）
+
+        Returns:
+            新的缓存条目
+        """
+        entry = CachedResponse(version, bytes(response.body), response.status_code, response.media_type)
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return entry
+
+    def invalidate(self, key: Optional[Hashable] = None):
+        """
+        清除指定缓存键，未指定时清空全部缓存
+        """
+        with self._lock:
+            if key is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(key, None)
+
+    def __len__(self) -> int:
+        return len(self._entries)
@@ -0,0 +1,161 @@
+# 按cron调度的后台任务
+# 每个worker启动一个调度任务，通过租约表选出唯一的leader执行；租约行的watermark保存上次执行时间，
+# leader切换或服务重启后，停机期间错过的执行会在接管时补做一次。
+# 任务本身在线程中执行（使用独立连接），执行期间调度协程继续续约，长时间任务不会丢失租约。
+
+import asyncio
+import logging
+import threading
+import time
+from typing import Any, Dict, Optional
+
+from db.leases import acquire_lease, advance_lease_watermark, get_lease_watermark, new_lease_owner, release_lease
+from db.manager import DatabaseManager
+from utils.cron import CronSchedule
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_LEASE_SECONDS = 60        # 租约时长（秒），leader每1/3租约时长续约一次
+DEFAULT_RETRY_DELAY = 300         # 执行失败后的重试间隔（秒）
+
+
+class LeasedCronJob:
+    """
+    租约保护的cron后台任务基类
+
+    子类设置 lease_name / description 并实现 run_job()，run_job 在线程中执行，返回执行结果字典
+    """
+
+    lease_name = "scheduled_job"
+    description = "后台任务"
+
+    def __init__(self, db_path: str, schedule: CronSchedule,
+                 lease_seconds: float = DEFAULT_LEASE_SECONDS,
+                 retry_delay: float = DEFAULT_RETRY_DELAY):
+        self.db_path = db_path
+        self.schedule = schedule
+        self.lease_seconds = lease_seconds
+        self.retry_delay = retry_delay
+        self.owner = new_lease_owner()
+        self.is_leader = False
+        self.watermark: Optional[float] = None
+        self.last_result: Optional[Dict[str, Any]] = None
+
+        self._task: Optional[asyncio.Task] = None
+
+    def run_job(self) -> Dict[str, Any]:
+        """执行任务（在线程中调用）"""
+        raise NotImplementedError
+
+    def start(self):
+        """在当前事件循环中启动调度任务"""
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self):
+        """停止调度任务并释放租约（正在线程中执行的任务会继续执行完）"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def next_run(self) -> Optional[float]:
+        """下次执行时间（非leader时为None）"""
+        if not self.is_leader or self.watermark is None:
+            return None
+        return self.schedule.next_after(self.watermark)
+
+    def _load_watermark(self, db: DatabaseManager):
+        """成为leader：读取上次执行时间，首次运行时从当前时间开始"""
+        self.watermark = get_lease_watermark(db, self.lease_name)
+        if self.watermark is None:
+            now = time.time()
+            db.execute_transaction([lambda: advance_lease_watermark(db, self.lease_name, self.owner, now)])
+            self.watermark = now
+
+    def _advance_watermark(self, db: DatabaseManager, watermark: float):
+        db.execute_transaction([lambda: advance_lease_watermark(db, self.lease_name, self.owner, watermark)])
+        self.watermark = max(self.watermark or 0, watermark)
+
+    async def _execute(self, run_locked) -> Dict[str, Any]:
+        """在线程中执行任务，期间定期续约"""
+        job = asyncio.ensure_future(asyncio.to_thread(self.run_job))
+        while True:
+            done, _ = await asyncio.wait({job}, timeout=self.lease_seconds / 3)
+            if done:
+                return job.result()
+            try:
+                if not await asyncio.to_thread(
+                    run_locked, acquire_lease, self.lease_name, self.owner, self.lease_seconds
+                ):
+                    logger.warning(f"{self.description}执行期间失去租约")
+            except Exception as e:
+                logger.warning(f"{self.description}续约失败: {str(e)}")
+
+    async def _run(self):
+        db = DatabaseManager(self.db_path, auto_connect=True)
+        # 任务被取消时线程中的数据库操作仍在执行，关闭连接前需等待其结束
+        db_lock = threading.Lock()
+
+        def run_locked(func, *args):
+            with db_lock:
+                return func(db, *args)
+
+        try:
+            while True:
+                try:
+                    leader = await asyncio.to_thread(
+                        run_locked, acquire_lease, self.lease_name, self.owner, self.lease_seconds
+                    )
+                except Exception as e:
+                    logger.warning(f"{self.description}获取租约失败: {str(e)}")
+                    leader = False
+
+                if not leader:
+                    if self.is_leader:
+                        logger.info(f"{self.description}失去leader租约")
+                        self.is_leader = False
+                    await asyncio.sleep(self.lease_seconds / 2)
+                    continue
+
+                if not self.is_leader:
+                    try:
+                        await asyncio.to_thread(run_locked, self._load_watermark)
+                    except Exception as e:
+                        logger.error(f"{self.description}读取执行进度失败: {str(e)}")
+                        await asyncio.sleep(self.lease_seconds / 2)
+                        continue
+                    self.is_leader = True
+                    logger.info(f"{self.description}成为leader，下次执行时间: {time.ctime(self.next_run())}")
+
+                next_run = self.schedule.next_after(self.watermark)
+                now = time.time()
+                if next_run <= now:
+                    try:
+                        self.last_result = await self._execute(run_locked)
+                        # 停机期间错过多次执行时只补做一次
+                        await asyncio.to_thread(run_locked, self._advance_watermark, now)
+                        logger.info(f"{self.description}完成: {self.last_result}")
+                    except Exception as e:
+                        logger.error(f"{self.description}失败: {str(e)}")
+                        await asyncio.sleep(self.retry_delay)
+                    continue
+
+                # 休眠到下次执行时间或续约时间
+                await asyncio.sleep(max(min(self.lease_seconds / 3, next_run - now), 0))
+        finally:
+            self.is_leader = False
+
+            def shutdown():
+                with db_lock:
+                    try:
+                        release_lease(db, self.lease_name, self.owner)
+                    except Exception as e:
+                        logger.warning(f"释放{self.description}租约失败: {str(e)}")
+                    db.close()
+
+            # 取消时不能再等待线程，直接同步释放
+            shutdown()
@@ -0,0 +1,208 @@
+# 餐次座位预占（下单准入控制）
+# 每个worker为热门餐次维护内存座位计数，名额已满的请求在进入数据库写事务前直接拒绝，
+# 可能因其他请求回滚而空出名额时按先来先到排队等待。数据库中的条件更新仍是最终容量校验。
+
+import asyncio
+import logging
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Callable, Deque, Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_WAITERS = 50        # 每个餐次的最大排队数
+DEFAULT_WAIT_TIMEOUT = 5.0      # 排队最长等待时间（秒）
+DEFAULT_REFRESH_INTERVAL = 1.0  # 从数据库刷新已下单数的最小间隔（秒），用于同步其他worker的变更
+
+
+class SeatUnavailableError(ValueError):
+    """名额不足或排队已满，请求在进入数据库前被拒绝"""
+
+
+@dataclass
+class _MealSeats:
+    """单个餐次的座位状态"""
+    max_orders: int
+    committed: int                      # 数据库中已提交的订单数
+    loaded_at: float
+    inflight: int = 0                   # 已预占、事务尚未结束的名额
+    waiters: Deque[asyncio.Future] = field(default_factory=deque)
+
+    @property
+    def available(self) -> int:
+        return self.max_orders - self.committed - self.inflight
+
+
+class SeatReservationManager:
+    """
+    餐次座位预占管理器
+
+    reserve() 预占一个名额，下单事务结束后必须调用 release() 归还或确认
+    """
+
+    def __init__(self, max_waiters: int = DEFAULT_MAX_WAITERS,
+                 wait_timeout: float = DEFAULT_WAIT_TIMEOUT,
+                 refresh_interval: float = DEFAULT_REFRESH_INTERVAL):
+        self.max_waiters = max_waiters
+        self.wait_timeout = wait_timeout
+        self.refresh_interval = refresh_interval
+        self._meals: Dict[int, _MealSeats] = {}
+
+    def _load(self, meal_id: int, loader: Callable[[], Optional[Tuple[int, int]]],
+              force: bool = False) -> Optional[_MealSeats]:
+        """加载或刷新餐次座位状态，loader返回 (current_orders, max_orders)"""
+        seats = self._meals.get(meal_id)
+        now = time.monotonic()
+        if seats is not None and not force:
+            # 有进行中的事务时不刷新，避免已提交未释放的名额被重复计数
+            if seats.inflight > 0 or now - seats.loaded_at < self.refresh_interval:
+                return seats
+
+        capacity = loader()
+        if capacity is None:
+            self._meals.pop(meal_id, None)
+            return None
+
+        current_orders, max_orders = capacity
+        if seats is None:
+            seats = _MealSeats(max_orders=max_orders, committed=current_orders, loaded_at=now)
+            self._meals[meal_id] = seats
+        else:
+            seats.max_orders = max_orders
+            seats.committed = current_orders
+            seats.loaded_at = now
+        return seats
+
+    async def reserve(self, meal_id: int, loader: Callable[[], Optional[Tuple[int, int]]]) -> bool:
+        """
+        预占一个名额
+
+        Args:
+            meal_id: 餐次ID
+            loader: 从数据库读取 (current_orders, max_orders) 的函数，餐次不存在时返回None
+
+        Returns:
+            是否预占了名额（餐次不存在时不预占），为True时事务结束后需调用release()
+
+        Raises:
+            SeatUnavailableError: 名额已满、排队已满或排队超时
+        """
+        seats = self._load(meal_id, loader)
+        if seats is None:
+            # 餐次不存在，交给下单事务给出准确错误
+            return False
+
+        if seats.available > 0 and not seats.waiters:
+            seats.inflight += 1
+            return True
+
+        if seats.inflight == 0:
+            # 没有进行中的事务，名额不会再空出；拒绝前从数据库确认一次
+            seats = self._load(meal_id, loader, force=True)
+            if seats is None:
+                return False
+            if seats.available > 0 and not seats.waiters:
+                seats.inflight += 1
+                return True
+            if seats.inflight == 0:
+                raise SeatUnavailableError("餐次已满，无法下单")
+
+        if len(seats.waiters) >= self.max_waiters:
+            raise SeatUnavailableError("当前下单人数过多，请稍后重试")
+
+        future = asyncio.get_running_loop().create_future()
+        seats.waiters.append(future)
+        try:
+            # 被唤醒时名额已记入inflight
+            await asyncio.wait_for(asyncio.shield(future), timeout=self.wait_timeout)
+            return True
+        except asyncio.TimeoutError:
+            if future.done() and not future.cancelled() and future.exception() is None:
+                # 超时与唤醒同时发生，名额已分配，照常使用
+                return True
+            if future in seats.waiters:
+                seats.waiters.remove(future)
+            raise SeatUnavailableError("下单排队超时，请稍后重试")
+        except asyncio.CancelledError:
+            # 客户端断开：归还已分配的名额或退出排队
+            if future.done() and not future.cancelled() and future.exception() is None:
+                self.release(meal_id, committed=False)
+            elif future in seats.waiters:
+                seats.waiters.remove(future)
+            raise
+
+    def release(self, meal_id: int, committed: bool):
+        """
+        下单事务结束后归还或确认名额
+
+        Args:
+            meal_id: 餐次ID
+            committed: 订单是否已提交
+        """
+        seats = self._meals.get(meal_id)
+        if seats is None:
+            return
+
+        seats.inflight = max(seats.inflight - 1, 0)
+        if committed:
+            seats.committed += 1
+        self._wake(seats)
+
+    def order_canceled(self, meal_id: int):
+        """订单取消后释放一个已提交名额"""
+        seats = self._meals.get(meal_id)
+        if seats is None:
+            return
+
+        seats.committed = max(seats.committed - 1, 0)
+        self._wake(seats)
+
+    def invalidate(self, meal_id: int):
+        """餐次状态或容量被管理员修改后丢弃缓存状态，排队请求按已满处理"""
+        seats = self._meals.pop(meal_id, None)
+        if seats is not None:
+            self._fail_waiters(seats, "餐次状态已变更，请刷新后重试")
+
+    def _wake(self, seats: _MealSeats):
+        """按先来先到唤醒排队请求；名额确定用尽时拒绝剩余排队请求"""
+        while seats.waiters and seats.available > 0:
+            future = seats.waiters.popleft()
+            if not future.done():
+                seats.inflight += 1
+                future.set_result(True)
+
+        if seats.waiters and seats.available <= 0 and seats.inflight == 0:
+            self._fail_waiters(seats, "餐次已满，无法下单")
+
+    @staticmethod
+    def _fail_waiters(seats: _MealSeats, message: str):
+        while seats.waiters:
+            future = seats.waiters.popleft()
+            if not future.done():
+                future.set_exception(SeatUnavailableError(message))
+
+
+def load_meal_capacity(db_manager, meal_id: int) -> Optional[Tuple[int, int]]:
+    """读取餐次 (current_orders, max_orders)，餐次不存在时返回None"""
+    row = db_manager.conn.execute(
+        "SELECT current_orders, max_orders FROM meals WHERE meal_id = ?", [meal_id]
+    ).fetchone()
+    return (row[0], row[1]) if row else None
+
+
+_manager: Optional[SeatReservationManager] = None
+
+
+def get_seat_manager() -> SeatReservationManager:
+    """获取当前进程的座位预占管理器（首次调用时按配置创建）"""
+    global _manager
+    if _manager is None:
+        from utils.config import Config
+        config = Config()
+        _manager = SeatReservationManager(
+            max_waiters=config.get("business.order_admission.max_waiters", DEFAULT_MAX_WAITERS),
+            wait_timeout=config.get("business.order_admission.wait_timeout", DEFAULT_WAIT_TIMEOUT),
+            refresh_interval=config.get("business.order_admission.refresh_interval", DEFAULT_REFRESH_INTERVAL)
+        )
+    return _manager
@@ -0,0 +1,51 @@
+# 月度账单生成调度器
+# 租约保护的cron任务（多worker时只由一个worker执行），默认每月1日 00:10 生成上月所有用户的账单
+
+import logging
+from typing import Any, Dict, Optional
+
+from db.manager import DatabaseManager
+from db.statements import DEFAULT_CHUNK_SIZE, generate_monthly_statements, last_finished_month
+from utils.cron import CronSchedule
+from utils.scheduled_job import LeasedCronJob
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_STATEMENT_SCHEDULE = "10 0 1 * *"
+
+
+class StatementJob(LeasedCronJob):
+    """月度账单生成任务"""
+
+    lease_name = "monthly_statements"
+    description = "月度账单生成"
+
+    def __init__(self, db_path: str, schedule: CronSchedule, chunk_size: int = DEFAULT_CHUNK_SIZE, **kwargs):
+        super().__init__(db_path, schedule, **kwargs)
+        self.chunk_size = chunk_size
+
+    def run_job(self) -> Dict[str, Any]:
+        # 使用独立连接，生成期间不影响调度协程续约
+        with DatabaseManager(self.db_path) as db_manager:
+            return generate_monthly_statements(db_manager, last_finished_month(), chunk_size=self.chunk_size)
+
+
+def create_statement_job() -> Optional[StatementJob]:
+    """按配置创建月度账单生成任务，未启用或内存数据库时返回None"""
+    from utils.config import Config
+
+    config = Config()
+    db_path = config.get_database_config()["path"]
+    if db_path == ":memory:" or not config.get("statements.enabled", True):
+        return None
+
+    try:
+        schedule = CronSchedule(
+            config.get("statements.schedule", DEFAULT_STATEMENT_SCHEDULE),
+            config.get("business.timezone", "Asia/Shanghai")
+        )
+    except ValueError as e:
+        logger.error(f"月度账单计划配置错误，账单任务未启动: {str(e)}")
+        return None
+
+    return StatementJob(db_path, schedule, chunk_size=config.get("statements.chunk_size", DEFAULT_CHUNK_SIZE))